@@ -0,0 +1,48 @@
+"""Unique index on QR codes per revision page
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-16 12:00:00.000000
+
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Upgrade database schema."""
+    # Keep only the latest QR code of every revision page before enforcing uniqueness
+    op.execute(
+        """
+        DELETE FROM pte_qr.qr_codes AS older
+        USING pte_qr.qr_codes AS newer
+        WHERE older.enovia_id = newer.enovia_id
+          AND older.revision = newer.revision
+          AND older.page_number = newer.page_number
+          AND (older.created_at, older.id) < (newer.created_at, newer.id)
+        """
+    )
+
+    # Conflict target of INSERT ... ON CONFLICT in bulk QR code upserts
+    op.create_index(
+        "uq_qr_codes_enovia_revision_page",
+        "qr_codes",
+        ["enovia_id", "revision", "page_number"],
+        unique=True,
+        schema="pte_qr",
+    )
+
+
+def downgrade() -> None:
+    """Downgrade database schema."""
+    op.drop_index(
+        "uq_qr_codes_enovia_revision_page",
+        table_name="qr_codes",
+        schema="pte_qr",
+    )
@@ -0,0 +1,94 @@
+"""Covering indexes for document status and QR page lookups
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-16 14:00:00.000000
+
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Upgrade database schema."""
+    # Status check of a scanned document: WHERE enovia_id = ? -> id, revision, is_actual
+    op.create_index(
+        "uq_documents_enovia_id_status",
+        "documents",
+        ["enovia_id"],
+        unique=True,
+        postgresql_include=["id", "revision", "is_actual"],
+        schema="pte_qr",
+    )
+    op.drop_index(
+        "ix_documents_enovia_id",
+        table_name="documents",
+        schema="pte_qr",
+        if_exists=True,
+    )
+
+    # QR page lookup:
+    #   WHERE enovia_id = ? AND revision = ? AND page_number = ? -> document_id.
+    # The new index is created before the old one is dropped so that uniqueness
+    # (and the ON CONFLICT target of bulk upserts) is never lost.
+    op.create_index(
+        "uq_qr_codes_enovia_revision_page_doc",
+        "qr_codes",
+        ["enovia_id", "revision", "page_number"],
+        unique=True,
+        postgresql_include=["document_id"],
+        schema="pte_qr",
+    )
+    op.drop_index(
+        "uq_qr_codes_enovia_revision_page",
+        table_name="qr_codes",
+        schema="pte_qr",
+    )
+    # Prefix of the composite index above
+    op.drop_index(
+        "ix_qr_codes_enovia_id",
+        table_name="qr_codes",
+        schema="pte_qr",
+        if_exists=True,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade database schema."""
+    op.create_index(
+        "ix_qr_codes_enovia_id",
+        "qr_codes",
+        ["enovia_id"],
+        schema="pte_qr",
+    )
+    op.create_index(
+        "uq_qr_codes_enovia_revision_page",
+        "qr_codes",
+        ["enovia_id", "revision", "page_number"],
+        unique=True,
+        schema="pte_qr",
+    )
+    op.drop_index(
+        "uq_qr_codes_enovia_revision_page_doc",
+        table_name="qr_codes",
+        schema="pte_qr",
+    )
+
+    op.create_index(
+        "ix_documents_enovia_id",
+        "documents",
+        ["enovia_id"],
+        unique=True,
+        schema="pte_qr",
+    )
+    op.drop_index(
+        "uq_documents_enovia_id_status",
+        table_name="documents",
+        schema="pte_qr",
+    )
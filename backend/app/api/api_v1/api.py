@@ -15,6 +15,7 @@ from app.api.api_v1.endpoints import (
     pdf_upload,
     qrcodes,
     settings,
+    stamping_jobs,
 )
 
 api_router = APIRouter()
@@ -26,6 +27,7 @@ api_router.include_router(documents.router, prefix="/documents", tags=["document
 api_router.include_router(qrcodes.router, prefix="/qrcodes", tags=["qrcodes"])
 api_router.include_router(pdf.router, prefix="/pdf", tags=["pdf"])
 api_router.include_router(pdf_upload.router, prefix="/pdf", tags=["pdf-upload"])
+api_router.include_router(stamping_jobs.router, prefix="/pdf/jobs", tags=["pdf-jobs"])
 api_router.include_router(admin.router, prefix="/admin", tags=["admin"])
 api_router.include_router(settings.router, prefix="/settings", tags=["settings"])
 api_router.include_router(normocontrol.router, prefix="/normocontrol", tags=["normocontrol"])
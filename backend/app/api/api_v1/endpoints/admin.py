@@ -6,22 +6,24 @@ import time
 
 import structlog
 from fastapi import APIRouter, Depends, HTTPException, Request
-from sqlalchemy import desc, func
-from sqlalchemy.orm import Session
+from sqlalchemy import desc, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 
-from app.core.database import get_db
+from app.core.database import get_async_db
 from app.models.document import Document
 from app.models.qr_code import QRCode
 from app.models.user import User
 from app.services.cache_service import cache_service
 from app.services.metrics_service import metrics_service
+from app.services.principal_cache import principal_cache
 
 router = APIRouter()
 logger = structlog.get_logger()
 
 
 @router.get("/stats")
-async def get_system_stats(request: Request, db: Session = Depends(get_db)):
+async def get_system_stats(request: Request, db: AsyncSession = Depends(get_async_db)):
     """
     Get system statistics
     """
@@ -29,23 +31,26 @@ async def get_system_stats(request: Request, db: Session = Depends(get_db)):
 
     try:
         # Get document statistics
-        total_documents = db.query(func.count(Document.id)).scalar() or 0
-        total_revisions = db.query(func.count(Document.id)).scalar() or 0
-        total_status_checks = db.query(func.count(Document.id)).scalar() or 0
+        total_documents = await db.scalar(select(func.count(Document.id))) or 0
+        total_revisions = total_documents
+        total_status_checks = total_documents
 
         # Get QR code statistics
-        total_qr_codes = db.query(func.count(QRCode.id)).scalar() or 0
+        total_qr_codes = await db.scalar(select(func.count(QRCode.id))) or 0
 
         # Get user statistics
-        total_users = db.query(func.count(User.id)).scalar() or 0
+        total_users = await db.scalar(select(func.count(User.id))) or 0
         active_users = (
-            db.query(func.count(User.id)).filter(User.is_active.is_(True)).scalar() or 0
+            await db.scalar(select(func.count(User.id)).where(User.is_active.is_(True)))
+            or 0
         )
 
         # Get recent activity
         recent_status_checks = (
-            db.query(Document).order_by(desc(Document.created_at)).limit(10).all()
-        )
+            await db.scalars(
+                select(Document).order_by(desc(Document.created_at)).limit(10)
+            )
+        ).all()
 
         # Get cache statistics
         cache_health = await cache_service.health_check()
@@ -97,7 +102,10 @@ async def get_system_stats(request: Request, db: Session = Depends(get_db)):
 
 @router.get("/users")
 async def get_users(
-    request: Request, db: Session = Depends(get_db), skip: int = 0, limit: int = 100
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    skip: int = 0,
+    limit: int = 100,
 ):
     """
     Get all users with pagination
@@ -106,8 +114,12 @@ async def get_users(
 
     try:
         # Get users with pagination
-        users = db.query(User).offset(skip).limit(limit).all()
-        total_users = db.query(func.count(User.id)).scalar() or 0
+        users = (
+            await db.scalars(
+                select(User).options(selectinload(User.roles)).offset(skip).limit(limit)
+            )
+        ).all()
+        total_users = await db.scalar(select(func.count(User.id))) or 0
 
         user_list = []
         for user in users:
@@ -141,14 +153,16 @@ async def get_users(
 
 
 @router.get("/users/{user_id}")
-async def get_user(user_id: int, request: Request, db: Session = Depends(get_db)):
+async def get_user(
+    user_id: int, request: Request, db: AsyncSession = Depends(get_async_db)
+):
     """
     Get specific user by ID
     """
     start_time = time.time()
 
     try:
-        user = db.query(User).filter(User.id == user_id).first()
+        user = await db.get(User, user_id, options=[selectinload(User.roles)])
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
 
@@ -184,19 +198,22 @@ async def get_user(user_id: int, request: Request, db: Session = Depends(get_db)
 
 
 @router.put("/users/{user_id}/activate")
-async def activate_user(user_id: int, request: Request, db: Session = Depends(get_db)):
+async def activate_user(
+    user_id: int, request: Request, db: AsyncSession = Depends(get_async_db)
+):
     """
     Activate user account
     """
     start_time = time.time()
 
     try:
-        user = db.query(User).filter(User.id == user_id).first()
+        user = await db.get(User, user_id, options=[selectinload(User.roles)])
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
 
         user.is_active = True
-        db.commit()
+        await db.commit()
+        await principal_cache.invalidate_user(user.username)
 
         duration = time.time() - start_time
         metrics_service.record_api_request(
@@ -225,7 +242,7 @@ async def activate_user(user_id: int, request: Request, db: Session = Depends(ge
 
 @router.put("/users/{user_id}/deactivate")
 async def deactivate_user(
-    user_id: int, request: Request, db: Session = Depends(get_db)
+    user_id: int, request: Request, db: AsyncSession = Depends(get_async_db)
 ):
     """
     Deactivate user account
@@ -233,12 +250,13 @@ async def deactivate_user(
     start_time = time.time()
 
     try:
-        user = db.query(User).filter(User.id == user_id).first()
+        user = await db.get(User, user_id, options=[selectinload(User.roles)])
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
 
         user.is_active = False
-        db.commit()
+        await db.commit()
+        await principal_cache.invalidate_user(user.username)
 
         duration = time.time() - start_time
         metrics_service.record_api_request(
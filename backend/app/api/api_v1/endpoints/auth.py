@@ -6,9 +6,9 @@ import time
 
 import structlog
 from fastapi import APIRouter, Depends, HTTPException, Request
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.database import get_db
+from app.core.database import get_async_db
 from app.services.auth_service import auth_service
 from app.services.metrics_service import metrics_service
 from app.core.logging import DebugLogger, log_api_request, log_api_response
@@ -19,7 +19,9 @@ debug_logger = DebugLogger(__name__)
 
 
 @router.post("/login")
-async def login(credentials: dict, request: Request, db: Session = Depends(get_db)):
+async def login(
+    credentials: dict, request: Request, db: AsyncSession = Depends(get_async_db)
+):
     """
     User login endpoint
     """
@@ -148,7 +150,7 @@ async def logout(request: Request):
 
 
 @router.get("/me")
-async def get_current_user(request: Request, db: Session = Depends(get_db)):
+async def get_current_user(request: Request, db: AsyncSession = Depends(get_async_db)):
     """
     Get current user information
     """
@@ -204,7 +206,9 @@ async def get_current_user(request: Request, db: Session = Depends(get_db)):
 
 
 @router.post("/register")
-async def register(user_data: dict, request: Request, db: Session = Depends(get_db)):
+async def register(
+    user_data: dict, request: Request, db: AsyncSession = Depends(get_async_db)
+):
     """
     Register new user
     """
@@ -259,7 +263,7 @@ async def register(user_data: dict, request: Request, db: Session = Depends(get_
 
 @router.post("/change-password")
 async def change_password(
-    password_data: dict, request: Request, db: Session = Depends(get_db)
+    password_data: dict, request: Request, db: AsyncSession = Depends(get_async_db)
 ):
     """
     Change user password
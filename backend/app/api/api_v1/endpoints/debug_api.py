@@ -4,13 +4,13 @@ API для системы отладки и мониторинга
 
 import structlog
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional, Dict, Any
 import time
 from datetime import datetime, timedelta
 
 from app.api.dependencies import get_current_user
-from app.core.database import get_db
+from app.core.database import get_async_db
 from app.core.logging import DebugLogger
 from app.models.user import User
 from app.utils.debug_system import debug_system, DebugLevel
@@ -29,7 +29,7 @@ async def get_debug_events(
     since: Optional[float] = Query(None, description="Filter events since timestamp"),
     limit: int = Query(100, description="Maximum number of events to return"),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Получение событий отладки
@@ -84,7 +84,7 @@ async def get_performance_metrics(
     since: Optional[float] = Query(None, description="Filter metrics since timestamp"),
     limit: int = Query(100, description="Maximum number of metrics to return"),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Получение метрик производительности
@@ -124,7 +124,7 @@ async def get_performance_metrics(
             description="Get comprehensive statistics about the debug system")
 async def get_debug_statistics(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Получение статистики системы отладки
@@ -155,7 +155,7 @@ async def get_debug_statistics(
             description="Check the health status of the debug system")
 async def check_debug_system_health(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Проверка состояния системы отладки
@@ -217,7 +217,7 @@ async def check_debug_system_health(
 async def export_debug_data(
     filepath: str = Query(..., description="Path to export file"),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Экспорт данных отладки
@@ -251,7 +251,7 @@ async def export_debug_data(
              description="Clear all debug data")
 async def clear_debug_data(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Очистка данных отладки
@@ -283,7 +283,7 @@ async def clear_debug_data(
 async def update_debug_config(
     config_updates: Dict[str, Any],
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Обновление конфигурации системы отладки
@@ -317,7 +317,7 @@ async def update_debug_config(
             description="Get real-time debug data for monitoring")
 async def get_realtime_debug_data(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Получение данных отладки в реальном времени
@@ -7,13 +7,15 @@ from typing import Optional
 
 import structlog
 from fastapi import APIRouter, Depends, HTTPException, Query, Request
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.dependencies import get_current_user_optional
-from app.core.database import get_db
+from app.core.database import get_async_db
 from app.models.user import User
-from app.services.cache_service import cache_service
+from app.services.cache_service import document_cache_tag
+from app.services.document_service import DocumentService
 from app.services.metrics_service import metrics_service
+from app.services.tiered_cache import status_cache
 
 router = APIRouter()
 logger = structlog.get_logger()
@@ -24,7 +26,7 @@ async def get_document_status(
     doc_uid: str,
     rev: str,
     page: int = Query(..., ge=1, description="Page number"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     request: Request = None,
     current_user: Optional[User] = Depends(get_current_user_optional),
 ):
@@ -43,7 +45,8 @@ async def get_document_status(
         # Check cache first (include authentication status in cache key)
         auth_status = "auth" if current_user is not None else "noauth"
         cache_key = f"status:{doc_uid}:{rev}:{page}:{auth_status}"
-        cached_status = await cache_service.get(cache_key)
+        cache_tags = [document_cache_tag(doc_uid)]
+        cached_status = await status_cache.get(cache_key, tags=cache_tags)
 
         if cached_status:
             logger.info("Status cache hit", doc_uid=doc_uid, revision=rev, page=page)
@@ -52,10 +55,8 @@ async def get_document_status(
 
         metrics_service.record_cache_miss("document_status")
 
-        # Check if document exists in database
-        from app.models.document import Document
-
-        document = db.query(Document).filter(Document.doc_uid == doc_uid).first()
+        # Check if document exists in database (index-only status lookup)
+        document = await DocumentService(db).get_document_status(doc_uid)
 
         if not document:
             logger.warning("Document not found", doc_uid=doc_uid)
@@ -118,7 +119,9 @@ async def get_document_status(
             }
 
         # Cache the result
-        await cache_service.set(cache_key, response_data, ttl=900)  # 15 minutes TTL
+        await status_cache.set(
+            cache_key, response_data, ttl=900, tags=cache_tags
+        )  # 15 minutes TTL
 
         # Record metrics
         metrics_service.record_document_status_check(doc_uid, rev, True)
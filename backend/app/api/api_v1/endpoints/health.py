@@ -6,9 +6,9 @@ import time
 
 import structlog
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.database import get_db
+from app.core.database import get_async_db
 from app.services.cache_service import cache_service
 from app.services.enovia_service import enovia_service
 from app.services.metrics_service import metrics_service
@@ -18,7 +18,7 @@ router = APIRouter()
 
 
 @router.get("/")
-async def health_check(db: Session = Depends(get_db)):
+async def health_check(db: AsyncSession = Depends(get_async_db)):
     """
     Comprehensive health check for all services
     """
@@ -32,7 +32,7 @@ async def health_check(db: Session = Depends(get_db)):
         logger.info("Checking database connection")
         from sqlalchemy import text
 
-        db.execute(text("SELECT 1"))
+        await db.execute(text("SELECT 1"))
         checks["database"] = "healthy"
         logger.info("Database check passed")
     except Exception as e:
@@ -111,7 +111,7 @@ async def metrics_json():
 
 
 @router.get("/status")
-async def detailed_status(db: Session = Depends(get_db)):
+async def detailed_status(db: AsyncSession = Depends(get_async_db)):
     """
     Detailed system status with metrics
     """
@@ -129,7 +129,7 @@ async def detailed_status(db: Session = Depends(get_db)):
         try:
             from sqlalchemy import text
 
-            db.execute(text("SELECT 1"))
+            await db.execute(text("SELECT 1"))
         except Exception as e:
             logger.error(f"Database health check failed: {e}")
 
@@ -3,8 +3,8 @@
 """
 
 import asyncio
+import os
 import random
-import tempfile
 from datetime import datetime
 from typing import Any, Dict, List, Optional
 from uuid import uuid4
@@ -12,14 +12,17 @@ from uuid import uuid4
 from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.api.dependencies import get_current_user
-from app.core.logging import configure_logging
+from app.api.dependencies import receive_pdf_upload
+from app.core.database import get_async_db
+from app.core.logging import get_logger
 from app.models.user import User
 from app.services.pdf_service import PDFService
 from app.services.qr_service import QRService
+from app.services.settings_service import SettingsService
 
-logger = configure_logging()
+logger = get_logger(__name__)
 router = APIRouter()
 
 # Модели данных для нормоконтроля
@@ -36,7 +39,7 @@ class NormoControlResult(BaseModel):
     control_id: str
     status: str  # passed, failed, warning
     score: float  # 0.0 - 100.0
-    issues: List[Dict[str, str]]
+    issues: List[Dict[str, Any]]  # page может быть None или номером листа
     recommendations: List[str]
     qr_codes_added: int
     processing_time: float
@@ -166,7 +169,8 @@ async def normocontrol_upload(
     file: UploadFile = File(...),
     enovia_id: str = Form(...),
     revision: str = Form("0"),
-    control_type: str = Form("full")
+    control_type: str = Form("full"),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Загрузка PDF документа для нормоконтроля
@@ -186,15 +190,14 @@ async def normocontrol_upload(
                 detail="Поддерживаются только PDF файлы"
             )
         
-        # Читаем содержимое файла
-        pdf_content = await file.read()
-        
-        # Создаем временный файл для обработки
-        with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as temp_file:
-            temp_file.write(pdf_content)
-            temp_file_path = temp_file.name
-        
-        try:
+        # Префикс URL в QR кодах из системных настроек
+        system_settings = await SettingsService(db).get_settings()
+        url_prefix = system_settings.get("urlPrefix", "https://pte-qr.example.com")
+        document_status_url = system_settings.get("documentStatusUrl", "r")
+        base_url_prefix = f"{url_prefix}/{document_status_url}"
+
+        # Принимаем файл потоком во временный файл (удаляется при выходе из блока)
+        async with await receive_pdf_upload(file) as upload:
             # Инициализируем сервисы
             pdf_service = PDFService()
             qr_service = QRService()
@@ -202,10 +205,10 @@ async def normocontrol_upload(
             # Обрабатываем PDF и добавляем QR коды
             logger.info("Обработка PDF документа для нормоконтроля")
             processed_pdf_content, qr_data_list = await pdf_service.add_qr_codes_to_pdf(
-                pdf_content=pdf_content,
+                pdf_content=upload,
                 enovia_id=enovia_id,
                 revision=revision,
-                output_path=temp_file_path
+                base_url_prefix=base_url_prefix
             )
             
             # Генерируем моковый результат нормоконтроля
@@ -218,7 +221,9 @@ async def normocontrol_upload(
             
             # Сохраняем обработанный PDF
             output_filename = f"normocontrol_{enovia_id}_{revision}_{uuid4().hex[:8]}.pdf"
-            output_path = f"/tmp/processed_pdfs/{output_filename}"
+            output_dir = "/tmp/processed_pdfs"
+            os.makedirs(output_dir, exist_ok=True)
+            output_path = os.path.join(output_dir, output_filename)
             
             with open(output_path, 'wb') as output_file:
                 output_file.write(processed_pdf_content)
@@ -235,14 +240,6 @@ async def normocontrol_upload(
                 message=f"Нормоконтроль завершен. Статус: {control_result.status.upper()}",
                 result=control_result
             )
-            
-        finally:
-            # Удаляем временный файл
-            import os
-            try:
-                os.unlink(temp_file_path)
-            except:
-                pass
                 
     except Exception as e:
         logger.error("Ошибка при нормоконтроле документа",
@@ -334,8 +331,9 @@ async def validate_document_structure(
     Валидация структуры документа (быстрая проверка)
     """
     try:
-        # Читаем PDF
-        pdf_content = await file.read()
+        # Принимаем PDF потоком (сигнатура и %%EOF проверяются по ходу)
+        async with await receive_pdf_upload(file):
+            pass
         
         # Моковая валидация
         validation_result = {
@@ -359,6 +357,8 @@ async def validate_document_structure(
         
         return validation_result
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error("Ошибка валидации документа", error=str(e))
         raise HTTPException(status_code=500, detail="Ошибка валидации документа")
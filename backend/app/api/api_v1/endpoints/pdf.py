@@ -6,10 +6,12 @@ import time
 
 import structlog
 from fastapi import APIRouter, Depends, File, HTTPException, Request, UploadFile
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.database import get_db
-from app.models.document import Document
+from app.api.dependencies import receive_pdf_upload
+from app.core.database import get_async_db
+from app.core.executor import ExecutorOverloadedError, pdf_executor
+from app.services.document_service import DocumentService
 from app.services.metrics_service import metrics_service
 from app.services.pdf_service import pdf_service
 from app.core.logging import DebugLogger, log_api_request, log_api_response, log_file_operation
@@ -26,7 +28,7 @@ async def stamp_pdf_with_qr(
     revision: str = None,
     pages: str = None,
     request: Request = None,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     Stamp existing PDF with QR codes
@@ -55,6 +57,7 @@ async def stamp_pdf_with_qr(
         client_ip=client_ip
     )
 
+    upload = None
     try:
         # Validate file
         if not file.filename.endswith(".pdf"):
@@ -68,9 +71,11 @@ async def stamp_pdf_with_qr(
             log_api_response(400, duration, error="Invalid file type")
             raise HTTPException(status_code=400, detail="File must be a PDF")
 
-        # Read file content
+        # Stream the upload to the spool (size, signature and %%EOF checked on the way)
         debug_logger.debug("Reading PDF file", filename=file.filename)
-        pdf_data = await file.read()
+        # Kept open until the response is built: services get its memory map
+        upload = await receive_pdf_upload(file)
+        pdf_data = upload.view
         log_file_operation("read", file.filename, file_size=len(pdf_data))
 
         # Validate PDF
@@ -95,12 +100,12 @@ async def stamp_pdf_with_qr(
                 raise HTTPException(status_code=400, detail="Invalid pages format")
         else:
             # Get all pages from PDF
-            pdf_info = pdf_service.extract_pdf_info(pdf_data)
+            pdf_info = await pdf_executor.run(pdf_service.extract_pdf_info, pdf_data)
             page_list = list(range(1, pdf_info["pages"] + 1))
 
-        # Validate document exists if doc_uid provided
+        # Validate document exists if doc_uid (the ENOVIA ID) provided
         if doc_uid:
-            document = db.query(Document).filter(Document.doc_uid == doc_uid).first()
+            document = await DocumentService(db).get_document_status(doc_uid)
             if not document:
                 raise HTTPException(status_code=404, detail="Document not found")
         else:
@@ -109,7 +114,8 @@ async def stamp_pdf_with_qr(
             revision = "A"
 
         # Stamp PDF with QR codes
-        stamped_pdf = pdf_service.stamp_pdf_with_qr(
+        stamped_pdf = await pdf_executor.run(
+            pdf_service.stamp_pdf_with_qr,
             pdf_data=pdf_data,
             doc_uid=doc_uid,
             revision=revision or "A",
@@ -146,6 +152,15 @@ async def stamp_pdf_with_qr(
         duration = time.time() - start_time
         metrics_service.record_api_request("POST", "/pdf/stamp", 400, duration)
         raise
+    except ExecutorOverloadedError as e:
+        duration = time.time() - start_time
+        metrics_service.record_api_request("POST", "/pdf/stamp", 503, duration)
+        logger.warning("PDF executor overloaded", error=str(e))
+        raise HTTPException(
+            status_code=503,
+            detail="Server is busy processing other documents, try again later",
+            headers={"Retry-After": "10"},
+        )
     except Exception as e:
         duration = time.time() - start_time
         metrics_service.record_api_request("POST", "/pdf/stamp", 500, duration)
@@ -157,6 +172,9 @@ async def stamp_pdf_with_qr(
             exc_info=True,
         )
         raise HTTPException(status_code=500, detail="Internal server error")
+    finally:
+        if upload is not None:
+            upload.close()
 
 
 @router.post("/info")
@@ -166,13 +184,15 @@ async def get_pdf_info(file: UploadFile = File(...), request: Request = None):
     """
     start_time = time.time()
 
+    upload = None
     try:
         # Validate file
         if not file.filename.endswith(".pdf"):
             raise HTTPException(status_code=400, detail="File must be a PDF")
 
-        # Read file content
-        pdf_data = await file.read()
+        # Stream the upload to the spool
+        upload = await receive_pdf_upload(file)
+        pdf_data = upload.view
 
         # Validate PDF
         is_valid, error_msg = pdf_service.validate_pdf(pdf_data)
@@ -213,3 +233,6 @@ async def get_pdf_info(file: UploadFile = File(...), request: Request = None):
             exc_info=True,
         )
         raise HTTPException(status_code=500, detail="Internal server error")
+    finally:
+        if upload is not None:
+            upload.close()
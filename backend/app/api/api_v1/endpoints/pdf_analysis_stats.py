@@ -4,13 +4,14 @@ API endpoints для получения статистики анализа PDF
 
 import structlog
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.dependencies import get_current_user
-from app.core.database import get_db
+from app.core.database import get_async_db
 from app.core.logging import DebugLogger
 from app.models.user import User
 from app.utils.pdf_analyzer import PDFAnalyzer
+from app.utils.resource_monitor import resource_monitor
 
 router = APIRouter()
 logger = structlog.get_logger()
@@ -20,7 +21,7 @@ debug_logger = DebugLogger(__name__)
             description="Get detailed statistics about PDF analysis performance and errors")
 async def get_pdf_analysis_stats(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Получение статистики анализа PDF
@@ -172,12 +173,13 @@ async def check_pdf_analysis_health(
         except ImportError:
             pass
         
-        # Проверяем системные ресурсы
+        # Проверяем системные ресурсы (последний замер фонового монитора)
         import psutil
         
+        snapshot = resource_monitor.snapshot
         system_health = {
-            "memory_available_gb": psutil.virtual_memory().available / (1024**3),
-            "cpu_usage_percent": psutil.cpu_percent(interval=1),
+            "memory_available_gb": snapshot.available_memory / (1024**3),
+            "cpu_usage_percent": snapshot.cpu_percent,
             "disk_usage_percent": psutil.disk_usage('/').percent,
             "status": "healthy"
         }
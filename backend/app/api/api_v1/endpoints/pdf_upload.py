@@ -3,19 +3,19 @@ API endpoints for PDF upload and QR code generation
 """
 
 import os
-import tempfile
 import uuid
-from typing import Dict, Any
+from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
 from fastapi.responses import FileResponse
-from sqlalchemy.orm import Session
-from app.core.database import get_db
-from app.api.dependencies import get_current_user
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.database import get_async_db
+from app.api.dependencies import get_current_user, receive_pdf_upload
 from app.models.user import User
 from app.services.pdf_service import PDFService
 from app.services.qr_service import QRService
 from app.services.document_service import DocumentService
 from app.services.settings_service import SettingsService
+from app.utils.qr_overlay import RENDER_MODES
 
 router = APIRouter()
 
@@ -25,8 +25,11 @@ async def upload_pdf_with_qr_codes(
     enovia_id: str = Form(..., description="ENOVIA document ID"),
     title: str = Form(..., description="Document title"),
     revision: str = Form(..., description="Document revision"),
+    render_mode: Optional[str] = Form(
+        None, description="QR rendering: image or vector"
+    ),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Upload PDF document and generate QR codes for each page
@@ -51,6 +54,12 @@ async def upload_pdf_with_qr_codes(
             detail="All fields (enovia_id, title, revision) are required"
         )
 
+    if render_mode is not None and render_mode not in RENDER_MODES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"render_mode must be one of: {', '.join(RENDER_MODES)}"
+        )
+
     try:
         # Initialize services
         pdf_service = PDFService()
@@ -64,59 +73,47 @@ async def upload_pdf_with_qr_codes(
         document_status_url = settings.get("documentStatusUrl", "r")
         base_url_prefix = f"{url_prefix}/{document_status_url}"
 
-        # Create temporary file for PDF processing
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as temp_file:
-            # Save uploaded file to temporary location
-            content = await file.read()
-            temp_file.write(content)
-            temp_file_path = temp_file.name
-
-        try:
-            # Read PDF content
-            with open(temp_file_path, 'rb') as f:
-                pdf_content = f.read()
-
+        # Stream the upload to the spool; processing reads it through a memory map
+        async with await receive_pdf_upload(file) as upload:
             # Process PDF (add QR codes)
             processed_pdf_content, qr_codes_data = await pdf_service.add_qr_codes_to_pdf(
-                pdf_content=pdf_content,
+                pdf_content=upload,
                 enovia_id=enovia_id.strip(),
                 revision=revision.strip(),
                 base_url_prefix=base_url_prefix,
+                render_mode=render_mode,
             )
 
-            # Save document and QR codes to database
-            document = await document_service.create_document_with_qr_codes(
-                db=db,
-                enovia_id=enovia_id.strip(),
-                title=title.strip(),
-                revision=revision.strip(),
-                creator_id=current_user.id,
-                qr_codes_data=qr_codes_data,
-            )
+        # Save document and QR codes to database
+        document = await document_service.create_document_with_qr_codes(
+            db=db,
+            enovia_id=enovia_id.strip(),
+            title=title.strip(),
+            revision=revision.strip(),
+            creator_id=current_user.id,
+            qr_codes_data=qr_codes_data,
+        )
 
-            # Save processed PDF to file system
-            output_filename = f"{enovia_id}_{revision}_{uuid.uuid4().hex[:8]}.pdf"
-            output_dir = "/app/tmp/processed_pdfs"
-            os.makedirs(output_dir, exist_ok=True)
-            output_path = os.path.join(output_dir, output_filename)
-            
-            with open(output_path, 'wb') as f:
-                f.write(processed_pdf_content)
+        # Save processed PDF to file system
+        output_filename = f"{enovia_id}_{revision}_{uuid.uuid4().hex[:8]}.pdf"
+        output_dir = "/app/tmp/processed_pdfs"
+        os.makedirs(output_dir, exist_ok=True)
+        output_path = os.path.join(output_dir, output_filename)
 
-            return {
-                "message": "PDF processed successfully",
-                "document_id": str(document.id),
-                "qr_codes_count": len(qr_codes_data),
-                "pages_processed": len(qr_codes_data),
-                "output_file": output_filename,
-                "download_url": f"/api/v1/pdf/download/{output_filename}"
-            }
+        with open(output_path, 'wb') as f:
+            f.write(processed_pdf_content)
 
-        finally:
-            # Clean up temporary file
-            if os.path.exists(temp_file_path):
-                os.unlink(temp_file_path)
+        return {
+            "message": "PDF processed successfully",
+            "document_id": str(document.id),
+            "qr_codes_count": len(qr_codes_data),
+            "pages_processed": len(qr_codes_data),
+            "output_file": output_filename,
+            "download_url": f"/api/v1/pdf/download/{output_filename}"
+        }
 
+    except HTTPException:
+        raise
     except Exception as e:
         error_message = str(e)
         
@@ -153,7 +150,7 @@ async def upload_pdf_with_qr_codes(
 async def download_processed_pdf(
     filename: str,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Download processed PDF with QR codes
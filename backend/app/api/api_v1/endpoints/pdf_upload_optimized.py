@@ -10,10 +10,10 @@ from typing import Dict, Any
 
 import structlog
 from fastapi import APIRouter, Depends, File, Form, HTTPException, Request, UploadFile, status
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.api.dependencies import get_current_user
-from app.core.database import get_db
+from app.api.dependencies import get_current_user, receive_pdf_upload
+from app.core.database import get_async_db
 from app.core.logging import DebugLogger
 from app.models.user import User
 from app.services.document_service import DocumentService
@@ -32,13 +32,14 @@ async def upload_pdf_with_qr_codes_optimized(
     title: str = Form(..., description="Document title"),
     revision: str = Form(..., description="Document revision"),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Оптимизированная загрузка PDF с генерацией QR кодов
     """
     start_time = time.time()
     
+    upload = None
     try:
         debug_logger.info("Starting optimized PDF upload", 
                         filename=file.filename,
@@ -54,20 +55,11 @@ async def upload_pdf_with_qr_codes_optimized(
                 detail="Only PDF files are allowed"
             )
         
-        # Проверка размера файла (максимум 50MB)
-        file_content = await file.read()
-        if len(file_content) > 50 * 1024 * 1024:  # 50MB
-            raise HTTPException(
-                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
-                detail="File size exceeds 50MB limit"
-            )
-        
-        # Проверка магических байтов PDF
-        if not file_content.startswith(b'%PDF'):
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Invalid PDF file format"
-            )
+        # Потоковый приём файла: размер (максимум 50MB), сигнатура PDF и %%EOF
+        # проверяются по мере чтения. Файл открыт до ответа: сервис получает
+        # его отображение в память, а не копию содержимого
+        upload = await receive_pdf_upload(file)
+        file_content = upload.view
         
         # Инициализация сервисов
         pdf_service = OptimizedPDFService()
@@ -146,6 +138,9 @@ async def upload_pdf_with_qr_codes_optimized(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"Error processing PDF: {error_message}"
             )
+    finally:
+        if upload is not None:
+            upload.close()
 
 @router.get("/download-optimized/{filename}", summary="Download processed PDF (optimized)", 
             description="Download processed PDF with QR codes")
@@ -208,6 +203,7 @@ async def get_pdf_info_optimized(
     """
     Получение информации о PDF файле без обработки
     """
+    upload = None
     try:
         debug_logger.info("Getting PDF info", 
                         filename=file.filename,
@@ -220,15 +216,9 @@ async def get_pdf_info_optimized(
                 detail="Only PDF files are allowed"
             )
         
-        # Читаем содержимое файла
-        file_content = await file.read()
-        
-        # Проверка магических байтов PDF
-        if not file_content.startswith(b'%PDF'):
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Invalid PDF file format"
-            )
+        # Потоковый приём файла с проверкой сигнатуры PDF
+        upload = await receive_pdf_upload(file)
+        file_content = upload.view
         
         # Получаем информацию о PDF
         pdf_service = OptimizedPDFService()
@@ -255,3 +245,6 @@ async def get_pdf_info_optimized(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Error analyzing PDF file"
         )
+    finally:
+        if upload is not None:
+            upload.close()
@@ -5,16 +5,18 @@
 
 import structlog
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 import time
 
-from app.api.dependencies import get_current_user
-from app.core.database import get_db
+from app.api.dependencies import get_current_user, receive_pdf_upload
+from app.core.database import get_async_db
+from app.core.executor import ExecutorOverloadedError, pdf_executor, pdf_memory_budget
 from app.core.logging import DebugLogger
 from app.models.user import User
 from app.services.pdf_service_v2 import PDFServiceV2
 from app.utils.pdf_exceptions import PDFAnalysisError, PDFFileError
+from app.utils.qr_overlay import RENDER_MODES
 
 router = APIRouter()
 logger = structlog.get_logger()
@@ -30,8 +32,11 @@ pdf_service = PDFServiceV2()
 async def upload_pdf_with_qr_codes_v2(
     file: UploadFile = File(..., description="PDF file to process"),
     qr_data: str = Form(..., description="Comma-separated QR code data for each page"),
+    render_mode: Optional[str] = Form(
+        None, description="QR rendering: image or vector"
+    ),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Загрузка PDF файла и добавление QR кодов
@@ -39,6 +44,7 @@ async def upload_pdf_with_qr_codes_v2(
     """
     start_time = time.time()
     
+    upload = None
     try:
         debug_logger.info("Starting PDF upload with QR codes", 
                          user_id=str(current_user.id),
@@ -55,14 +61,10 @@ async def upload_pdf_with_qr_codes_v2(
         if file.content_type and file.content_type != 'application/pdf':
             raise HTTPException(status_code=400, detail="File must be a PDF")
         
-        # Читаем содержимое файла
-        pdf_content = await file.read()
-        
-        if not pdf_content:
-            raise HTTPException(status_code=400, detail="Empty file")
-        
-        if len(pdf_content) > 50 * 1024 * 1024:  # 50MB limit
-            raise HTTPException(status_code=400, detail="File too large (max 50MB)")
+        # Принимаем файл потоком (размер, сигнатура и %%EOF проверяются по ходу)
+        # Файл открыт до ответа: сервис получает его отображение в память
+        upload = await receive_pdf_upload(file)
+        pdf_content = upload.view
         
         # Парсим QR данные
         qr_data_list = [data.strip() for data in qr_data.split(',') if data.strip()]
@@ -70,12 +72,25 @@ async def upload_pdf_with_qr_codes_v2(
         if not qr_data_list:
             raise HTTPException(status_code=400, detail="No QR data provided")
         
+        if render_mode is not None and render_mode not in RENDER_MODES:
+            raise HTTPException(
+                status_code=400,
+                detail=f"render_mode must be one of: {', '.join(RENDER_MODES)}"
+            )
+
         debug_logger.info("Processing PDF with QR codes", 
                          content_size=len(pdf_content),
                          qr_count=len(qr_data_list))
         
-        # Обрабатываем PDF
-        result_pdf_content = pdf_service.add_qr_codes_to_pdf(pdf_content, qr_data_list)
+        # Обрабатываем PDF в пределах бюджета памяти воркера
+        # (оценка разбирает документ, поэтому тоже выполняется вне event loop)
+        job_memory = await pdf_executor.run(
+            pdf_service.estimate_job_memory, pdf_content
+        )
+        async with pdf_memory_budget.reserve(job_memory):
+            result_pdf_content = await pdf_executor.run(
+                pdf_service.add_qr_codes_to_pdf, pdf_content, qr_data_list, render_mode
+            )
         
         processing_time = time.time() - start_time
         
@@ -101,6 +116,15 @@ async def upload_pdf_with_qr_codes_v2(
         
     except HTTPException:
         raise
+    except ExecutorOverloadedError as e:
+        debug_logger.warning(
+            "PDF executor overloaded", error=str(e), user_id=str(current_user.id)
+        )
+        raise HTTPException(
+            status_code=503,
+            detail="Server is busy processing other documents, try again later",
+            headers={"Retry-After": "10"}
+        )
     except PDFAnalysisError as e:
         debug_logger.error("PDF analysis error", 
                          error=str(e),
@@ -130,6 +154,9 @@ async def upload_pdf_with_qr_codes_v2(
             status_code=500,
             detail=f"Internal server error: {str(e)}"
         )
+    finally:
+        if upload is not None:
+            upload.close()
 
 
 @router.post("/analyze-layout", 
@@ -139,11 +166,12 @@ async def analyze_pdf_layout_v2(
     file: UploadFile = File(..., description="PDF file to analyze"),
     page_number: int = Form(0, description="Page number to analyze (0-based)"),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Анализ макета страницы PDF
     """
+    upload = None
     try:
         debug_logger.info("Starting PDF layout analysis", 
                          user_id=str(current_user.id),
@@ -154,14 +182,18 @@ async def analyze_pdf_layout_v2(
         if not file.filename or not file.filename.lower().endswith('.pdf'):
             raise HTTPException(status_code=400, detail="File must be a PDF")
         
-        # Читаем содержимое файла
-        pdf_content = await file.read()
-        
-        if not pdf_content:
-            raise HTTPException(status_code=400, detail="Empty file")
+        # Принимаем файл потоком (размер, сигнатура и %%EOF проверяются по ходу)
+        upload = await receive_pdf_upload(file)
+        pdf_content = upload.view
         
-        # Анализируем макет
-        layout_info = pdf_service.analyze_pdf_layout(pdf_content, page_number)
+        # Анализируем макет в пределах бюджета памяти воркера
+        job_memory = await pdf_executor.run(
+            pdf_service.estimate_job_memory, pdf_content, [page_number]
+        )
+        async with pdf_memory_budget.reserve(job_memory):
+            layout_info = await pdf_executor.run(
+                pdf_service.analyze_pdf_layout, pdf_content, page_number
+            )
         
         debug_logger.info("PDF layout analysis completed", 
                          user_id=str(current_user.id),
@@ -176,6 +208,15 @@ async def analyze_pdf_layout_v2(
         
     except HTTPException:
         raise
+    except ExecutorOverloadedError as e:
+        debug_logger.warning(
+            "PDF executor overloaded", error=str(e), user_id=str(current_user.id)
+        )
+        raise HTTPException(
+            status_code=503,
+            detail="Server is busy processing other documents, try again later",
+            headers={"Retry-After": "10"}
+        )
     except PDFAnalysisError as e:
         debug_logger.error("PDF analysis error", 
                          error=str(e),
@@ -194,6 +235,9 @@ async def analyze_pdf_layout_v2(
             status_code=500,
             detail=f"Internal server error: {str(e)}"
         )
+    finally:
+        if upload is not None:
+            upload.close()
 
 
 @router.get("/service-stats", 
@@ -8,9 +8,12 @@ import structlog
 from fastapi import APIRouter, Depends, HTTPException, Request
 
 from app.api.dependencies import get_current_user
+from app.core.executor import ExecutorOverloadedError, pdf_executor, qr_executor
+from app.models.qr_code import QRCodeFormatEnum
 from app.models.user import User
 from app.services.metrics_service import metrics_service
 from app.services.qr_service import qr_service
+from app.utils.qr_generator import DEFAULT_FORMATS
 
 router = APIRouter()
 logger = structlog.get_logger()
@@ -33,6 +36,7 @@ async def generate_qr_codes(
         style = request.get("style", "BLACK")
         dpi = request.get("dpi", 300)
         mode = request.get("mode", "qr-only")
+        formats = request.get("formats", list(DEFAULT_FORMATS))
 
         if not doc_uid:
             raise HTTPException(status_code=422, detail="doc_uid is required")
@@ -48,34 +52,40 @@ async def generate_qr_codes(
             )
         if len(pages) > 1000:
             raise HTTPException(status_code=422, detail="Too many pages (max 1000)")
+        supported_formats = [f.value for f in QRCodeFormatEnum]
+        if (
+            not isinstance(formats, list)
+            or not formats
+            or any(f not in supported_formats for f in formats)
+        ):
+            raise HTTPException(
+                status_code=422,
+                detail=f"formats must be a list of: {', '.join(supported_formats)}",
+            )
 
         # Generate QR codes
-        qr_results = qr_service.generate_qr_codes(
-            doc_uid=doc_uid, revision=revision, pages=pages, style=style, dpi=dpi
+        qr_results = await qr_executor.run(
+            qr_service.generate_qr_codes,
+            doc_uid=doc_uid,
+            revision=revision,
+            pages=pages,
+            style=style,
+            dpi=dpi,
+            formats=formats,
         )
 
-        # Prepare response items
+        # Prepare response items (one per page and requested format)
         items = []
         for qr_result in qr_results:
-            # Add PNG format
-            items.append(
-                {
-                    "page": qr_result["page"],
-                    "format": "PNG",
-                    "data_base64": qr_result["data"]["png"],
-                    "url": qr_result["url"],
-                }
-            )
-
-            # Add SVG format
-            items.append(
-                {
-                    "page": qr_result["page"],
-                    "format": "SVG",
-                    "data_base64": qr_result["data"]["svg"],
-                    "url": qr_result["url"],
-                }
-            )
+            for qr_format in formats:
+                items.append(
+                    {
+                        "page": qr_result["page"],
+                        "format": qr_format.upper(),
+                        "data_base64": qr_result["data"][qr_format],
+                        "url": qr_result["url"],
+                    }
+                )
 
         # Record metrics
         for page in pages:
@@ -100,6 +110,15 @@ async def generate_qr_codes(
         duration = time.time() - start_time
         metrics_service.record_api_request("POST", "/qrcodes/", 422, duration)
         raise
+    except ExecutorOverloadedError as e:
+        duration = time.time() - start_time
+        metrics_service.record_api_request("POST", "/qrcodes/", 503, duration)
+        logger.warning("QR executor overloaded", error=str(e))
+        raise HTTPException(
+            status_code=503,
+            detail="Server is busy, try again later",
+            headers={"Retry-After": "5"},
+        )
     except Exception as e:
         duration = time.time() - start_time
         metrics_service.record_api_request("POST", "/qrcodes/", 500, duration)
@@ -141,7 +160,8 @@ async def generate_pdf_with_qr_codes(
             )
 
         # Generate PDF with QR codes
-        pdf_data = pdf_service.create_pdf_with_qr_codes(
+        pdf_data = await pdf_executor.run(
+            pdf_service.create_pdf_with_qr_codes,
             doc_uid=doc_uid,
             revision=revision,
             pages=pages,
@@ -181,6 +201,15 @@ async def generate_pdf_with_qr_codes(
         duration = time.time() - start_time
         metrics_service.record_api_request("POST", "/qrcodes/pdf-stamp", 422, duration)
         raise
+    except ExecutorOverloadedError as e:
+        duration = time.time() - start_time
+        metrics_service.record_api_request("POST", "/qrcodes/pdf-stamp", 503, duration)
+        logger.warning("PDF executor overloaded", error=str(e))
+        raise HTTPException(
+            status_code=503,
+            detail="Server is busy processing other documents, try again later",
+            headers={"Retry-After": "10"},
+        )
     except Exception as e:
         duration = time.time() - start_time
         metrics_service.record_api_request("POST", "/qrcodes/pdf-stamp", 500, duration)
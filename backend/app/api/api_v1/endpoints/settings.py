@@ -4,8 +4,8 @@ Settings API endpoints
 
 from typing import Dict, Any
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from app.core.database import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.database import get_async_db
 from app.api.dependencies import get_current_user
 from app.models.user import User
 from app.models.schemas import UserResponse
@@ -16,7 +16,7 @@ router = APIRouter()
 @router.get("/settings", response_model=Dict[str, Any])
 async def get_settings(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get system settings
@@ -36,7 +36,7 @@ async def get_settings(
 async def update_settings(
     settings: Dict[str, Any],
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Update system settings
@@ -0,0 +1,154 @@
+"""
+API endpoints for asynchronous QR stamping jobs
+"""
+
+import json
+import os
+
+from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile, status
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
+
+from app.api.dependencies import get_current_user, receive_pdf_upload
+from app.core.executor import ExecutorOverloadedError
+from app.services.pdf_service import pdf_service
+from app.services.principal_cache import Principal
+from app.services.stamping_jobs import JobStatus, StampingJob, stamping_jobs
+
+router = APIRouter()
+
+
+async def get_owned_job(job_id: str, current_user: Principal) -> StampingJob:
+    """Job visible to the current user (its creator or a superuser)"""
+    job = await stamping_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Job not found"
+        )
+    if job.created_by != current_user.id and not current_user.is_superuser:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Job not found"
+        )
+    return job
+
+
+@router.post(
+    "",
+    summary="Submit a stamping job",
+    description="Upload PDF and stamp QR codes in the background",
+)
+async def submit_stamping_job(
+    file: UploadFile = File(..., description="PDF file to stamp"),
+    enovia_id: str = Form(..., description="ENOVIA document ID"),
+    title: str = Form(..., description="Document title"),
+    revision: str = Form(..., description="Document revision"),
+    current_user: Principal = Depends(get_current_user),
+):
+    """
+    Queue a PDF for stamping and return the job at once
+
+    A submission of the same file for the same ENOVIA ID and revision returns
+    the job already queued or running (200) instead of creating one (202).
+    """
+    if not current_user.is_superuser:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only administrators can upload PDF files",
+        )
+
+    if not file.filename.lower().endswith(".pdf"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Only PDF files are allowed"
+        )
+
+    if not enovia_id.strip() or not title.strip() or not revision.strip():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="All fields (enovia_id, title, revision) are required",
+        )
+
+    upload = await receive_pdf_upload(file)
+    try:
+        job, created = await stamping_jobs.submit(
+            upload,
+            enovia_id=enovia_id.strip(),
+            title=title.strip(),
+            revision=revision.strip(),
+            created_by=current_user.id,
+        )
+    except ExecutorOverloadedError:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server is busy processing other documents, try again later",
+            headers={"Retry-After": "10"},
+        )
+
+    return JSONResponse(
+        status_code=status.HTTP_202_ACCEPTED if created else status.HTTP_200_OK,
+        content={**job.to_dict(), "created": created},
+        headers={"Location": f"/api/v1/pdf/jobs/{job.id}"},
+    )
+
+
+@router.get("/{job_id}", summary="Get stamping job status")
+async def get_stamping_job(
+    job_id: str,
+    current_user: Principal = Depends(get_current_user),
+):
+    """
+    Status of a stamping job with per-page progress
+    """
+    job = await get_owned_job(job_id, current_user)
+    return job.to_dict()
+
+
+@router.get("/{job_id}/events", summary="Stream stamping job progress")
+async def stream_stamping_job(
+    job_id: str,
+    current_user: Principal = Depends(get_current_user),
+):
+    """
+    Server-sent events with the job state on every change until it finishes
+    """
+    await get_owned_job(job_id, current_user)
+
+    async def events():
+        async for state in stamping_jobs.events(job_id):
+            yield f"event: {state['status']}\ndata: {json.dumps(state)}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/{job_id}/result", summary="Download stamped PDF of a job")
+async def download_stamping_job_result(
+    job_id: str,
+    current_user: Principal = Depends(get_current_user),
+):
+    """
+    Stamped PDF of a finished job
+    """
+    job = await get_owned_job(job_id, current_user)
+    if job.status == JobStatus.FAILED:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT, detail=f"Job failed: {job.error}"
+        )
+    if job.status != JobStatus.SUCCEEDED:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Job is {job.status.value}",
+            headers={"Retry-After": "5"},
+        )
+
+    output_file = job.result["output_file"]
+    file_path = os.path.join(pdf_service.output_dir, output_file)
+    if not os.path.exists(file_path):
+        raise HTTPException(
+            status_code=status.HTTP_410_GONE, detail="Result is no longer available"
+        )
+
+    return FileResponse(
+        path=file_path, filename=output_file, media_type="application/pdf"
+    )
@@ -1,23 +1,45 @@
 """
-API dependencies for authentication and authorization
+API dependencies for authentication, authorization and file uploads
 """
 
 from typing import Optional
 
 import structlog
-from fastapi import Depends, HTTPException, Request
-from sqlalchemy.orm import Session
+from fastapi import Depends, HTTPException, Request, UploadFile, status
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.database import get_db
-from app.models.user import User
+from app.core.database import get_async_db
 from app.services.auth_service import get_auth_service
+from app.services.principal_cache import Principal, principal_cache
+from app.utils.pdf_exceptions import PDFFileError, PDFFileTooLargeError
+from app.utils.upload_spool import SpooledUpload, spool_upload
 
 logger = structlog.get_logger()
 
 
-async def get_current_user(request: Request, db: Session = Depends(get_db)) -> User:
+async def load_principal(username: str, db: AsyncSession) -> Optional[Principal]:
+    """
+    Get the principal of a token subject from the cache or from the database
+
+    The session is not used on a cache hit, so no connection is checked out.
+    """
+    principal = await principal_cache.get(username)
+    if principal is not None:
+        return principal
+
+    user = await get_auth_service().get_user_by_username(username, db)
+    if not user:
+        return None
+    return await principal_cache.put(username, user)
+
+
+async def get_current_user(
+    request: Request, db: AsyncSession = Depends(get_async_db)
+) -> Principal:
     """
     Get current authenticated user from JWT token
+
+    Returns a cached read-only Principal; load the User row to modify it.
     """
     try:
         # Extract token from Authorization header
@@ -37,7 +59,7 @@ async def get_current_user(request: Request, db: Session = Depends(get_db)) -> U
 
         # Get user
         username = payload.get("sub")
-        user = await auth_service.get_user_by_username(username, db)
+        user = await load_principal(username, db)
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
 
@@ -54,8 +76,8 @@ async def get_current_user(request: Request, db: Session = Depends(get_db)) -> U
 
 
 async def get_current_user_optional(
-    request: Request, db: Session = Depends(get_db)
-) -> Optional[User]:
+    request: Request, db: AsyncSession = Depends(get_async_db)
+) -> Optional[Principal]:
     """
     Get current authenticated user from JWT token (optional)
     Returns None if no valid token is provided
@@ -76,7 +98,7 @@ async def get_current_user_optional(
 
         # Get user
         username = payload.get("sub")
-        user = await auth_service.get_user_by_username(username, db)
+        user = await load_principal(username, db)
         if not user or not user.is_active:
             return None
 
@@ -87,12 +109,38 @@ async def get_current_user_optional(
         return None
 
 
-def require_auth() -> User:
+def require_auth() -> Principal:
     """
     Dependency that requires authentication
     """
 
-    def _require_auth(current_user: User = Depends(get_current_user)) -> User:
+    def _require_auth(current_user: Principal = Depends(get_current_user)) -> Principal:
         return current_user
 
     return _require_auth
+
+
+async def receive_pdf_upload(
+    file: UploadFile, max_size: Optional[int] = None
+) -> SpooledUpload:
+    """
+    Stream an uploaded PDF to the spool, validating it on the way
+
+    The caller owns the returned upload and must close it (``async with``).
+    """
+    try:
+        upload = await spool_upload(file, max_size=max_size)
+    except PDFFileTooLargeError as e:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e)
+        )
+    except PDFFileError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    logger.info(
+        "PDF upload received",
+        filename=upload.filename,
+        size=upload.size,
+        sha256=upload.sha256,
+    )
+    return upload
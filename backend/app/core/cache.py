@@ -4,16 +4,111 @@ Redis cache management
 
 import asyncio
 import json
-from typing import Any, Dict, List, Optional
+import uuid
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional
 
 import redis.asyncio as redis
 import structlog
+from redis.exceptions import ResponseError
 
 from app.core.config import settings
 
 logger = structlog.get_logger()
 
 
+async def scan_keys(
+    client: redis.Redis, pattern: str, batch_size: Optional[int] = None
+) -> AsyncIterator[List[str]]:
+    """
+    Iterate keys matching pattern in batches with incremental SCAN
+
+    Unlike KEYS, every SCAN call does a bounded amount of work, so Redis keeps
+    serving other clients while a large keyspace is walked.
+    """
+    batch_size = batch_size or settings.CACHE_SCAN_BATCH_SIZE
+    batch = []
+    async for key in client.scan_iter(match=pattern, count=batch_size):
+        batch.append(key)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def unlink_matching(
+    client: redis.Redis, pattern: str, batch_size: Optional[int] = None
+) -> int:
+    """
+    Delete keys matching pattern with SCAN + UNLINK batches
+
+    Returns:
+        Number of keys deleted
+    """
+    deleted_count = 0
+    async for batch in scan_keys(client, pattern, batch_size):
+        deleted_count += await client.unlink(*batch)
+    return deleted_count
+
+
+def tag_key(tag: str) -> str:
+    """Redis set holding the cache keys registered under a tag"""
+    return f"tag:{tag}"
+
+
+def add_to_tags(pipe, key: str, tags: Iterable[str]) -> None:
+    """
+    Queue registration of a cache key in its tag sets
+
+    Tag sets get CACHE_TAG_TTL_SECONDS on every write, tagged entries must not
+    live longer (see clamp_tagged_ttl), so a tag set never expires before its keys.
+    """
+    for tag in tags:
+        pipe.sadd(tag_key(tag), key)
+        pipe.expire(tag_key(tag), settings.CACHE_TAG_TTL_SECONDS)
+
+
+def clamp_tagged_ttl(ttl: Optional[int]) -> int:
+    """TTL of a tagged entry, bounded by the lifetime of its tag sets"""
+    if not ttl:
+        return settings.CACHE_TAG_TTL_SECONDS
+    return min(ttl, settings.CACHE_TAG_TTL_SECONDS)
+
+
+async def invalidate_tag(
+    client: redis.Redis, tag: str, batch_size: Optional[int] = None
+) -> int:
+    """
+    Delete every cache key registered under a tag
+
+    The tag set is renamed first, so keys cached while it is drained register
+    in a fresh set and are not lost. Members are read with SSCAN and deleted
+    with UNLINK in batches: O(keys of the tag), never O(keyspace).
+
+    Returns:
+        Number of keys deleted
+    """
+    batch_size = batch_size or settings.CACHE_SCAN_BATCH_SIZE
+    draining_key = f"{tag_key(tag)}:invalidating:{uuid.uuid4().hex}"
+    try:
+        await client.rename(tag_key(tag), draining_key)
+    except ResponseError:
+        # No such tag set: nothing is cached under the tag
+        return 0
+
+    deleted_count = 0
+    batch = []
+    async for key in client.sscan_iter(draining_key, count=batch_size):
+        batch.append(key)
+        if len(batch) >= batch_size:
+            deleted_count += await client.unlink(*batch)
+            batch = []
+    if batch:
+        deleted_count += await client.unlink(*batch)
+    await client.unlink(draining_key)
+    return deleted_count
+
+
 class CacheManager:
     """Redis cache manager"""
 
@@ -108,6 +203,73 @@ class CacheManager:
             logger.error("Failed to set cache", key=key, error=str(e))
             return False
 
+    async def get_many(self, keys: List[str]) -> Dict[str, Any]:
+        """
+        Get several values from cache in one round trip
+
+        Args:
+            keys: Cache keys
+
+        Returns:
+            Mapping of found keys to cached values (missing keys are omitted)
+        """
+        if not keys:
+            return {}
+
+        try:
+            client = await self._get_redis_client()
+            values = await client.mget(keys)
+
+            result = {}
+            for key, value in zip(keys, values):
+                if value is None:
+                    continue
+                try:
+                    result[key] = json.loads(value)
+                except (json.JSONDecodeError, TypeError):
+                    result[key] = value
+            return result
+
+        except Exception as e:
+            logger.error("Failed to get many from cache", count=len(keys), error=str(e))
+            return {}
+
+    async def set_many(self, values: Dict[str, Any], ttl: Optional[int] = None) -> bool:
+        """
+        Set several values in cache in one pipeline
+
+        Args:
+            values: Mapping of cache keys to values
+            ttl: Time to live in seconds
+
+        Returns:
+            True if successful, False otherwise
+        """
+        if not values:
+            return True
+
+        try:
+            client = await self._get_redis_client()
+
+            async with client.pipeline(transaction=False) as pipe:
+                for key, value in values.items():
+                    if isinstance(value, (dict, list)):
+                        serialized_value = json.dumps(value, default=str)
+                    else:
+                        serialized_value = str(value)
+
+                    if ttl:
+                        pipe.setex(key, ttl, serialized_value)
+                    else:
+                        pipe.set(key, serialized_value)
+                await pipe.execute()
+
+            return True
+
+        except Exception as e:
+            logger.error("Failed to set many in cache", count=len(values), error=str(e))
+            return False
+
     async def delete(self, key: str) -> bool:
         """
         Delete key from cache
@@ -139,21 +301,7 @@ class CacheManager:
         """
         try:
             client = await self._get_redis_client()
-
-            # Find keys matching pattern
-            keys = await client.keys(pattern)
-
-            if not keys:
-                return 0
-
-            # Delete keys in batches
-            deleted_count = 0
-            batch_size = 1000
-
-            for i in range(0, len(keys), batch_size):
-                batch = keys[i : i + batch_size]
-                result = await client.delete(*batch)
-                deleted_count += result
+            deleted_count = await unlink_matching(client, pattern)
 
             logger.info("Deleted cache keys", pattern=pattern, count=deleted_count)
             return deleted_count
@@ -256,7 +404,10 @@ class CacheManager:
         """
         try:
             client = await self._get_redis_client()
-            return await client.keys(pattern)
+            keys = []
+            async for batch in scan_keys(client, pattern):
+                keys.extend(batch)
+            return keys
 
         except Exception as e:
             logger.error("Failed to get cache keys", pattern=pattern, error=str(e))
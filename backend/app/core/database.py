@@ -2,26 +2,116 @@
 Database configuration and session management
 """
 
+import time
+from typing import Any, AsyncIterator, Dict, Optional
+
 import redis
 from sqlalchemy import create_engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
 from sqlalchemy.orm import declarative_base, sessionmaker
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool, StaticPool
 
 from app.core.config import settings
+from app.core.metrics import metrics_collector
+
+# Async driver per database dialect
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+class InstrumentedPoolMixin:
+    """Records checkout wait time and saturation of a queue pool"""
+
+    metrics_label = "sync"
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            connection = super().connect()
+        except PoolTimeoutError:
+            metrics_collector.record_db_pool_checkout(
+                self.metrics_label, time.perf_counter() - start, timed_out=True
+            )
+            raise
+        metrics_collector.record_db_pool_checkout(
+            self.metrics_label, time.perf_counter() - start
+        )
+        self._record_usage()
+        return connection
+
+    def _do_return_conn(self, record) -> None:
+        super()._do_return_conn(record)
+        self._record_usage()
+
+    def _record_usage(self) -> None:
+        capacity = self.size() + max(self._max_overflow, 0)
+        metrics_collector.set_db_pool_usage(
+            self.metrics_label, self.checkedout(), capacity
+        )
+
+
+class InstrumentedQueuePool(InstrumentedPoolMixin, QueuePool):
+    """QueuePool of the sync engine with pool metrics"""
+
+    metrics_label = "sync"
+
+
+class InstrumentedAsyncQueuePool(InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    """QueuePool of the async engine with pool metrics"""
+
+    metrics_label = "async"
 
-# PostgreSQL database engine
-engine = create_engine(
-    settings.DATABASE_URL,
-    poolclass=StaticPool,
-    connect_args=(
-        {"check_same_thread": False} if "sqlite" in settings.DATABASE_URL else {}
-    ),
-    echo=settings.LOG_LEVEL == "DEBUG",
-)
+
+def _pool_options() -> Dict[str, Any]:
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+
+def async_database_url(url: str) -> str:
+    """Database URL with the async driver of its dialect"""
+    scheme, _, rest = url.partition("://")
+    driver = ASYNC_DRIVERS.get(scheme.split("+")[0])
+    if driver is None:
+        raise ValueError(f"No async driver for database URL scheme: {scheme}")
+    return f"{driver}://{rest}"
+
+
+# Sync engine (remaining sync endpoints, scripts)
+if settings.DATABASE_URL.startswith("sqlite"):
+    engine = create_engine(
+        settings.DATABASE_URL,
+        poolclass=StaticPool,
+        connect_args={"check_same_thread": False},
+        echo=settings.LOG_LEVEL == "DEBUG",
+    )
+else:
+    engine = create_engine(
+        settings.DATABASE_URL,
+        poolclass=InstrumentedQueuePool,
+        echo=settings.LOG_LEVEL == "DEBUG",
+        **_pool_options(),
+    )
 
 # Session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine and session factory (created on first use)
+_async_engine: Optional[AsyncEngine] = None
+_async_session_factory: Optional[async_sessionmaker] = None
+
 # Base class for models
 Base = declarative_base()
 
@@ -29,6 +119,36 @@ Base = declarative_base()
 redis_client = redis.from_url(settings.REDIS_URL, decode_responses=True)
 
 
+def get_async_engine() -> AsyncEngine:
+    """Async engine (asyncpg), created on first use"""
+    global _async_engine
+    if _async_engine is None:
+        url = settings.DATABASE_ASYNC_URL or async_database_url(settings.DATABASE_URL)
+        if url.startswith("sqlite"):
+            _async_engine = create_async_engine(
+                url, poolclass=StaticPool, echo=settings.LOG_LEVEL == "DEBUG"
+            )
+        else:
+            _async_engine = create_async_engine(
+                url,
+                poolclass=InstrumentedAsyncQueuePool,
+                echo=settings.LOG_LEVEL == "DEBUG",
+                **_pool_options(),
+            )
+    return _async_engine
+
+
+def get_async_session_factory() -> async_sessionmaker:
+    """Factory of async sessions bound to the async engine"""
+    global _async_session_factory
+    if _async_session_factory is None:
+        # Objects stay usable after commit without lazy reloads
+        _async_session_factory = async_sessionmaker(
+            get_async_engine(), expire_on_commit=False, autoflush=False
+        )
+    return _async_session_factory
+
+
 def get_db():
     """Dependency to get database session"""
     db = SessionLocal()
@@ -38,6 +158,22 @@ def get_db():
         db.close()
 
 
+async def get_async_db() -> AsyncIterator[AsyncSession]:
+    """Dependency to get async database session"""
+    async with get_async_session_factory()() as db:
+        yield db
+
+
+async def dispose_engines() -> None:
+    """Close pooled database connections"""
+    global _async_engine, _async_session_factory
+    if _async_engine is not None:
+        await _async_engine.dispose()
+        _async_engine = None
+        _async_session_factory = None
+    engine.dispose()
+
+
 def get_redis():
     """Dependency to get Redis client"""
     return redis_client
@@ -0,0 +1,328 @@
+"""
+Bounded executors for CPU-bound work called from async endpoints
+"""
+
+import asyncio
+import contextvars
+import functools
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Deque, Dict, Optional, Tuple, TypeVar
+
+from app.core.config import settings
+from app.services.metrics_service import metrics_service
+
+T = TypeVar("T")
+
+
+class ExecutorOverloadedError(Exception):
+    """Raised when an executor queue is full and new work is rejected"""
+
+    def __init__(self, name: str, queued: int, max_queue: int):
+        self.name = name
+        self.queued = queued
+        self.max_queue = max_queue
+        super().__init__(
+            f"Executor '{name}' is overloaded: {queued} tasks queued (max {max_queue})"
+        )
+
+
+class BoundedExecutor:
+    """
+    Thread pool with a concurrency limit and a bounded wait queue.
+
+    Synchronous PDF and QR work (PyMuPDF, OpenCV, PIL, zlib) runs in worker
+    threads, so the event loop keeps serving cheap requests such as /health
+    and QR verification. At most ``max_workers`` tasks run at once; further
+    tasks wait in the queue, and once ``max_queue`` tasks are waiting new
+    work is rejected with ExecutorOverloadedError (0 disables the limit).
+    """
+
+    def __init__(self, name: str, max_workers: int, max_queue: int = 0):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._active = 0
+
+    @property
+    def queued(self) -> int:
+        """Number of tasks waiting for a worker"""
+        return self._queued
+
+    @property
+    def active(self) -> int:
+        """Number of tasks currently running"""
+        return self._active
+
+    async def run(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """
+        Run a synchronous function in the executor and await its result
+
+        Args:
+            func: Synchronous callable
+            *args, **kwargs: Arguments for the callable
+
+        Returns:
+            Result of the callable
+
+        Raises:
+            ExecutorOverloadedError: If the wait queue is full
+
+        If the awaiting coroutine is cancelled, a task that has not started is
+        dropped; a task already running is waited for before the cancellation
+        propagates, so objects passed to it may be closed right after.
+        """
+        with self._lock:
+            if self.max_queue and self._queued >= self.max_queue:
+                metrics_service.record_executor_rejected(self.name)
+                raise ExecutorOverloadedError(self.name, self._queued, self.max_queue)
+            self._queued += 1
+            self._update_metrics()
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix=f"pte-qr-{self.name}",
+                )
+            executor = self._executor
+
+        submitted_at = time.monotonic()
+        # Keep structlog/contextvars context (request id etc.) in the worker thread
+        context = contextvars.copy_context()
+        call = functools.partial(context.run, func, *args, **kwargs)
+
+        def task() -> T:
+            with self._lock:
+                self._queued -= 1
+                self._active += 1
+                self._update_metrics()
+            metrics_service.record_executor_wait(
+                self.name, time.monotonic() - submitted_at
+            )
+            try:
+                return call()
+            finally:
+                with self._lock:
+                    self._active -= 1
+                    self._update_metrics()
+
+        loop = asyncio.get_running_loop()
+        try:
+            future = executor.submit(task)
+        except Exception:
+            with self._lock:
+                self._queued -= 1
+                self._update_metrics()
+            raise
+        future.add_done_callback(self._on_done)
+        result = asyncio.wrap_future(future, loop=loop)
+        try:
+            return await asyncio.shield(result)
+        except asyncio.CancelledError:
+            if not future.cancel():
+                await self._wait_finished(result)
+            raise
+
+    @staticmethod
+    async def _wait_finished(result: asyncio.Future) -> None:
+        # A running thread cannot be interrupted. The caller cleans up after
+        # run() (closes documents, releases memory), so the cancellation is
+        # held back until the task no longer uses what it was given.
+        while not result.done():
+            try:
+                await asyncio.wait([result])
+            except asyncio.CancelledError:
+                pass
+        if not result.cancelled():
+            result.exception()
+
+    def _on_done(self, future) -> None:
+        # A task cancelled while still queued (client went away) never ran
+        if future.cancelled():
+            with self._lock:
+                self._queued -= 1
+                self._update_metrics()
+
+    def _update_metrics(self) -> None:
+        metrics_service.record_executor_state(self.name, self._queued, self._active)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get executor statistics"""
+        return {
+            "name": self.name,
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "queued": self._queued,
+            "active": self._active,
+        }
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop worker threads (a new pool is started on next use)"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
+
+
+class MemoryBudget:
+    """
+    Per-worker memory budget for PDF jobs.
+
+    A job reserves its estimated peak memory (page rasters, parsed and output
+    document) before it starts and releases it when it ends. Jobs are admitted
+    strictly in arrival order: while the job at the head of the queue does not
+    fit, later jobs wait behind it, so a large sheet is not starved by a stream
+    of small ones. A job estimated above the whole budget is clamped to it and
+    runs alone. Once ``max_queue`` jobs are waiting, or a job has waited
+    ``timeout`` seconds, new work is rejected with ExecutorOverloadedError.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        budget_bytes: int,
+        max_queue: int = 0,
+        timeout: Optional[float] = None,
+    ):
+        self.name = name
+        self.budget_bytes = budget_bytes
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._reserved = 0
+        self._waiters: Deque[Tuple[int, asyncio.Future]] = deque()
+
+    @property
+    def reserved(self) -> int:
+        """Bytes reserved by running jobs"""
+        return self._reserved
+
+    @property
+    def queued(self) -> int:
+        """Number of jobs waiting for memory"""
+        return len(self._waiters)
+
+    @asynccontextmanager
+    async def reserve(self, nbytes: int) -> AsyncIterator[int]:
+        """
+        Hold ``nbytes`` of the budget for the duration of the block
+
+        Args:
+            nbytes: Estimated peak memory of the job
+
+        Yields:
+            The reserved amount (clamped to the budget)
+
+        Raises:
+            ExecutorOverloadedError: If the queue is full or the wait timed out
+        """
+        reserved = await self.acquire(nbytes)
+        try:
+            yield reserved
+        finally:
+            self.release(reserved)
+
+    async def acquire(self, nbytes: int) -> int:
+        """
+        Wait until ``nbytes`` fit into the budget and reserve them
+
+        Returns:
+            The reserved amount (clamped to the budget), to be passed to release()
+
+        Raises:
+            ExecutorOverloadedError: If the queue is full or the wait timed out
+        """
+        nbytes = min(max(int(nbytes), 0), self.budget_bytes)
+        if not self._waiters and self._reserved + nbytes <= self.budget_bytes:
+            self._reserved += nbytes
+            self._update_metrics()
+            return nbytes
+
+        if self.max_queue and len(self._waiters) >= self.max_queue:
+            metrics_service.record_executor_rejected(self.name)
+            raise ExecutorOverloadedError(self.name, len(self._waiters), self.max_queue)
+
+        waiter = (nbytes, asyncio.get_running_loop().create_future())
+        self._waiters.append(waiter)
+        self._update_metrics()
+        submitted_at = time.monotonic()
+        try:
+            await asyncio.wait_for(waiter[1], self.timeout)
+        except BaseException as e:
+            if waiter[1].done() and not waiter[1].cancelled():
+                # Granted just as the wait ended
+                self.release(nbytes)
+            else:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                # The head may have been the job blocking the others
+                self._grant()
+                self._update_metrics()
+            if isinstance(e, asyncio.TimeoutError):
+                metrics_service.record_executor_rejected(self.name)
+                raise ExecutorOverloadedError(
+                    self.name, len(self._waiters), self.max_queue
+                )
+            raise
+        metrics_service.record_executor_wait(self.name, time.monotonic() - submitted_at)
+        return nbytes
+
+    def release(self, nbytes: int) -> None:
+        """Return memory reserved by acquire() and admit waiting jobs"""
+        self._reserved -= nbytes
+        self._grant()
+        self._update_metrics()
+
+    def _grant(self) -> None:
+        while (
+            self._waiters and self._reserved + self._waiters[0][0] <= self.budget_bytes
+        ):
+            nbytes, future = self._waiters.popleft()
+            if not future.done():
+                self._reserved += nbytes
+                future.set_result(None)
+
+    def _update_metrics(self) -> None:
+        metrics_service.record_memory_budget_state(
+            self.name, self._reserved, len(self._waiters)
+        )
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get memory budget statistics"""
+        return {
+            "name": self.name,
+            "budget_bytes": self.budget_bytes,
+            "reserved_bytes": self._reserved,
+            "queued": len(self._waiters),
+            "max_queue": self.max_queue,
+        }
+
+
+# Heavy PDF analysis and stamping
+pdf_executor = BoundedExecutor(
+    "pdf", settings.PDF_EXECUTOR_WORKERS, settings.PDF_EXECUTOR_MAX_QUEUE
+)
+
+# QR image generation (cheap, must not wait behind PDF stamping)
+qr_executor = BoundedExecutor(
+    "qr", settings.QR_EXECUTOR_WORKERS, settings.QR_EXECUTOR_MAX_QUEUE
+)
+
+
+# Memory of PDF jobs in this worker, estimated from page geometry
+pdf_memory_budget = MemoryBudget(
+    "pdf_memory",
+    settings.PDF_MEMORY_BUDGET_MB * 1024 * 1024,
+    settings.PDF_MEMORY_MAX_QUEUE,
+    settings.PDF_MEMORY_QUEUE_TIMEOUT_SECONDS or None,
+)
+
+
+def shutdown_executors() -> None:
+    """Shut down all executors"""
+    for executor in (pdf_executor, qr_executor):
+        executor.shutdown()
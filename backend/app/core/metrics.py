@@ -101,6 +101,51 @@ REDIS_CONNECTIONS = Gauge(
     "pte_qr_redis_connections", "Number of Redis connections", registry=registry
 )
 
+# Database connection pool metrics
+DB_POOL_CHECKOUT_WAIT = Histogram(
+    "pte_qr_db_pool_checkout_wait_seconds",
+    "Time spent waiting for a database connection from the pool",
+    ["pool"],
+    buckets=(
+        0.0005,
+        0.001,
+        0.005,
+        0.01,
+        0.025,
+        0.05,
+        0.1,
+        0.25,
+        0.5,
+        1,
+        2.5,
+        5,
+        10,
+        30,
+    ),
+    registry=registry,
+)
+
+DB_POOL_CHECKOUT_TIMEOUTS = Counter(
+    "pte_qr_db_pool_checkout_timeouts_total",
+    "Total number of database connection checkouts that timed out",
+    ["pool"],
+    registry=registry,
+)
+
+DB_POOL_CHECKED_OUT = Gauge(
+    "pte_qr_db_pool_checked_out",
+    "Number of database connections checked out of the pool",
+    ["pool"],
+    registry=registry,
+)
+
+DB_POOL_SATURATION = Gauge(
+    "pte_qr_db_pool_saturation",
+    "Checked out connections relative to pool capacity (size + overflow)",
+    ["pool"],
+    registry=registry,
+)
+
 # PDF processing metrics
 PDF_STAMPING_OPERATIONS = Counter(
     "pte_qr_pdf_stamping_operations_total",
@@ -216,6 +261,19 @@ class MetricsCollector:
         """Set Redis connections count"""
         REDIS_CONNECTIONS.set(count)
 
+    def record_db_pool_checkout(self, pool: str, wait: float, timed_out: bool = False):
+        """Record time spent waiting for a pooled database connection"""
+        DB_POOL_CHECKOUT_WAIT.labels(pool=pool).observe(wait)
+        if timed_out:
+            DB_POOL_CHECKOUT_TIMEOUTS.labels(pool=pool).inc()
+
+    def set_db_pool_usage(self, pool: str, checked_out: int, capacity: int):
+        """Set checked out connections and pool saturation"""
+        DB_POOL_CHECKED_OUT.labels(pool=pool).set(checked_out)
+        DB_POOL_SATURATION.labels(pool=pool).set(
+            checked_out / capacity if capacity > 0 else 0.0
+        )
+
     def get_metrics(self) -> str:
         """Get metrics in Prometheus format"""
         return generate_latest(self.registry).decode("utf-8")
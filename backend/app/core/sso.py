@@ -6,7 +6,8 @@ from typing import Any, Dict, Optional
 from urllib.parse import urlencode
 
 import httpx
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import settings
 from app.models.user import User
@@ -140,7 +141,7 @@ def get_sso_provider() -> SSOProvider:
         raise ValueError(f"Unsupported SSO provider: {provider_type}")
 
 
-async def authenticate_user(db: Session, user_info: Dict[str, Any]) -> User:
+async def authenticate_user(db: AsyncSession, user_info: Dict[str, Any]) -> User:
     """Authenticate user and create/update user record"""
     # Extract user information from SSO response
     username = (
@@ -157,7 +158,7 @@ async def authenticate_user(db: Session, user_info: Dict[str, Any]) -> User:
         raise ValueError("Username not found in SSO response")
 
     # Check if user exists
-    user = db.query(User).filter(User.username == username).first()
+    user = await db.scalar(select(User).where(User.username == username))
 
     if user:
         # Update existing user
@@ -175,12 +176,12 @@ async def authenticate_user(db: Session, user_info: Dict[str, Any]) -> User:
         )
         db.add(user)
 
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
     return user
 
 
-async def get_user_by_token(db: Session, access_token: str) -> Optional[User]:
+async def get_user_by_token(db: AsyncSession, access_token: str) -> Optional[User]:
     """Get user by access token"""
     try:
         provider = get_sso_provider()
@@ -6,6 +6,7 @@ import os
 import tempfile
 
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import declarative_base, sessionmaker
 from sqlalchemy.pool import StaticPool
 
@@ -14,6 +15,7 @@ from sqlalchemy.pool import StaticPool
 # Create a temporary SQLite database for tests
 test_db_path = tempfile.mktemp(suffix=".db")
 test_database_url = f"sqlite:///{test_db_path}"
+test_async_database_url = f"sqlite+aiosqlite:///{test_db_path}"
 
 # SQLite database engine for tests
 test_engine = create_engine(
@@ -26,6 +28,9 @@ test_engine = create_engine(
 # Test session factory
 TestSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=test_engine)
 
+# Async test session factory (created on first use)
+_test_async_session_factory = None
+
 # Test base class
 TestBase = declarative_base()
 
@@ -39,6 +44,28 @@ def get_test_db():
         db.close()
 
 
+def get_test_async_session_factory():
+    """Factory of async sessions on the test database"""
+    global _test_async_session_factory
+    if _test_async_session_factory is None:
+        test_async_engine = create_async_engine(
+            test_async_database_url,
+            connect_args={"check_same_thread": False},
+            poolclass=StaticPool,
+            echo=False,
+        )
+        _test_async_session_factory = async_sessionmaker(
+            test_async_engine, expire_on_commit=False, autoflush=False
+        )
+    return _test_async_session_factory
+
+
+async def get_test_async_db():
+    """Get async test database session"""
+    async with get_test_async_session_factory()() as db:
+        yield db
+
+
 def create_test_tables():
     """Create test tables"""
     from app.models.audit import Base as AuditBase
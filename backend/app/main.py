@@ -12,7 +12,15 @@ from fastapi.middleware.cors import CORSMiddleware
 
 from app.api.api_v1.api import api_router
 from app.core.config import settings
+from app.core.database import dispose_engines
+from app.core.executor import shutdown_executors
 from app.core.logging import configure_logging, get_logger
+from app.services.enovia_service import enovia_service
+from app.services.principal_cache import principal_cache
+from app.services.stamping_jobs import stamping_jobs
+from app.services.tiered_cache import status_cache
+from app.utils.layout_pool import layout_pool
+from app.utils.resource_monitor import resource_monitor
 
 # Configure enhanced logging
 configure_logging()
@@ -25,9 +33,21 @@ async def lifespan(app: FastAPI):
     """Application lifespan manager"""
     # Startup
     logger.info("PTE-QR Backend API starting up", version="1.0.0")
+    await status_cache.start()
+    await principal_cache.start()
+    resource_monitor.start()
+    await stamping_jobs.start()
     yield
     # Shutdown
     logger.info("PTE-QR Backend API shutting down")
+    await status_cache.stop()
+    await principal_cache.stop()
+    await stamping_jobs.stop()
+    await enovia_service.close()
+    layout_pool.shutdown()
+    shutdown_executors()
+    resource_monitor.stop()
+    await dispose_engines()
 
 
 # Initialize FastAPI app
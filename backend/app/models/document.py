@@ -4,7 +4,7 @@ Document model
 
 import uuid
 import enum
-from sqlalchemy import Column, String, Integer, Boolean, DateTime, Text, ForeignKey, Enum
+from sqlalchemy import Column, String, Integer, Boolean, DateTime, Text, ForeignKey, Enum, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -31,9 +31,18 @@ class Document(Base):
     Document model for storing document information
     """
     __tablename__ = "documents"
+    __table_args__ = (
+        # Status checks of scanned documents are answered from the index alone
+        Index(
+            "uq_documents_enovia_id_status",
+            "enovia_id",
+            unique=True,
+            postgresql_include=["id", "revision", "is_actual"],
+        ),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True)
-    enovia_id = Column(String(100), unique=True, nullable=False, index=True)
+    enovia_id = Column(String(100), nullable=False)
     title = Column(String(255), nullable=False)
     description = Column(Text, nullable=True)
     document_type = Column(String(50), nullable=True)
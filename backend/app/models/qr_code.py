@@ -4,7 +4,7 @@ QR Code model
 
 import uuid
 import enum
-from sqlalchemy import Column, String, Integer, DateTime, Text, ForeignKey, Enum
+from sqlalchemy import Column, String, Integer, DateTime, Text, ForeignKey, Enum, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -29,9 +29,19 @@ class QRCode(Base):
     QR Code model for storing QR code information
     """
     __tablename__ = "qr_codes"
+    __table_args__ = (
+        # One QR code per page of a revision (target of bulk upserts); covers
+        # the page lookup of scanned QR codes
+        Index(
+            "uq_qr_codes_enovia_revision_page_doc",
+            "enovia_id", "revision", "page_number",
+            unique=True,
+            postgresql_include=["document_id"],
+        ),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True)
-    enovia_id = Column(String(100), nullable=False, index=True)
+    enovia_id = Column(String(100), nullable=False)
     document_id = Column(UUID(as_uuid=True), ForeignKey("documents.id", ondelete="CASCADE"), nullable=False)
     revision = Column(String(50), nullable=False)
     page_number = Column(Integer, nullable=False)
@@ -8,9 +8,13 @@ from typing import Any, Dict, List, Optional
 import jwt
 import structlog
 from passlib.context import CryptContext
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 
 from app.core.config import settings
 from app.models.user import User, UserRole
+from app.services.principal_cache import principal_cache
 from app.core.logging import DebugLogger, log_function_call, log_function_result, log_database_operation
 
 logger = structlog.get_logger()
@@ -98,13 +102,13 @@ class AuthService:
             return None
 
     async def authenticate_user(
-        self, username: str, password: str, db
+        self, username: str, password: str, db: AsyncSession
     ) -> Optional[User]:
         """Authenticate user with username and password"""
         logger.info("Starting user authentication", username=username)
 
         try:
-            user = db.query(User).filter(User.username == username).first()
+            user = await self.get_user_by_username(username, db)
             if not user:
                 logger.warning("User not found", username=username)
                 return None
@@ -135,12 +139,13 @@ class AuthService:
             return None
 
     async def create_user(
-        self, username: str, email: str, password: str, roles: List[str] = None, db=None
+        self, username: str, email: str, password: str, roles: List[str] = None,
+        db: AsyncSession = None
     ) -> Optional[User]:
         """Create new user"""
         try:
             # Check if user already exists
-            existing_user = db.query(User).filter(User.username == username).first()
+            existing_user = await self.get_user_by_username(username, db)
             if existing_user:
                 return None
 
@@ -156,17 +161,18 @@ class AuthService:
             )
 
             db.add(user)
-            db.commit()
-            db.refresh(user)
+            await db.commit()
+            await db.refresh(user)
 
             # Add roles
             if roles:
-                for role_name in roles:
-                    role = db.query(UserRole).filter(UserRole.name == role_name).first()
-                    if role:
-                        user.roles.append(role)
+                await db.refresh(user, attribute_names=["roles"])
+                found_roles = await db.scalars(
+                    select(UserRole).where(UserRole.name.in_(roles))
+                )
+                user.roles.extend(found_roles)
 
-                db.commit()
+                await db.commit()
 
             logger.info("User created", username=username, email=email)
             return user
@@ -175,25 +181,33 @@ class AuthService:
             logger.error("User creation failed", username=username, error=str(e))
             return None
 
-    async def get_user_by_username(self, username: str, db) -> Optional[User]:
+    async def get_user_by_username(self, username: str, db: AsyncSession) -> Optional[User]:
         """Get user by username"""
         try:
-            return db.query(User).filter(User.username == username).first()
+            # Roles are loaded eagerly: lazy loading is not available on AsyncSession
+            return await db.scalar(
+                select(User)
+                .where(User.username == username)
+                .options(selectinload(User.roles))
+                .limit(1)
+            )
         except Exception as e:
             logger.error(
                 "Failed to get user by username", username=username, error=str(e)
             )
             return None
 
-    async def get_user_by_id(self, user_id: int, db) -> Optional[User]:
+    async def get_user_by_id(self, user_id: int, db: AsyncSession) -> Optional[User]:
         """Get user by ID"""
         try:
-            return db.query(User).filter(User.id == user_id).first()
+            return await db.get(User, user_id, options=[selectinload(User.roles)])
         except Exception as e:
             logger.error("Failed to get user by ID", user_id=user_id, error=str(e))
             return None
 
-    async def update_user_password(self, user_id: int, new_password: str, db) -> bool:
+    async def update_user_password(
+        self, user_id: int, new_password: str, db: AsyncSession
+    ) -> bool:
         """Update user password"""
         try:
             user = await self.get_user_by_id(user_id, db)
@@ -201,7 +215,8 @@ class AuthService:
                 return False
 
             user.hashed_password = self.get_password_hash(new_password)
-            db.commit()
+            await db.commit()
+            await principal_cache.invalidate_user(user.username)
 
             logger.info("User password updated", user_id=user_id)
             return True
@@ -212,7 +227,7 @@ class AuthService:
             )
             return False
 
-    async def deactivate_user(self, user_id: int, db) -> bool:
+    async def deactivate_user(self, user_id: int, db: AsyncSession) -> bool:
         """Deactivate user"""
         try:
             user = await self.get_user_by_id(user_id, db)
@@ -220,7 +235,8 @@ class AuthService:
                 return False
 
             user.is_active = False
-            db.commit()
+            await db.commit()
+            await principal_cache.invalidate_user(user.username)
 
             logger.info("User deactivated", user_id=user_id)
             return True
@@ -4,11 +4,17 @@ Cache service for Redis operations
 
 import json
 import os
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterable, List, Optional
 
 import redis.asyncio as redis
 import structlog
 
+from app.core.cache import (
+    add_to_tags,
+    clamp_tagged_ttl,
+    invalidate_tag,
+    unlink_matching,
+)
 from app.core.config import settings
 
 logger = structlog.get_logger()
@@ -17,19 +23,44 @@ logger = structlog.get_logger()
 TESTING = os.getenv("TESTING", "false").lower() == "true"
 
 
+def document_cache_tag(doc_uid: str) -> str:
+    """Tag of every cached status/QR entry of a document"""
+    return f"document:{doc_uid}"
+
+
 class MockCacheService:
     """Mock cache service for tests"""
 
+    supports_pubsub = False
+
     def __init__(self):
         self._cache = {}
+        self._tags = {}
 
     async def get(self, key: str) -> Optional[Any]:
         """Get value from cache"""
         return self._cache.get(key)
 
-    async def set(self, key: str, value: Any, ttl: Optional[int] = None) -> bool:
+    async def set(
+        self,
+        key: str,
+        value: Any,
+        ttl: Optional[int] = None,
+        tags: Iterable[str] = (),
+    ) -> bool:
         """Set value in cache"""
         self._cache[key] = value
+        for tag in tags:
+            self._tags.setdefault(tag, set()).add(key)
+        return True
+
+    async def set_if_absent(
+        self, key: str, value: Any, ttl: Optional[int] = None
+    ) -> Optional[bool]:
+        """Set value only if the key does not exist"""
+        if key in self._cache:
+            return False
+        self._cache[key] = value
         return True
 
     async def delete(self, key: str) -> bool:
@@ -75,6 +106,15 @@ class MockCacheService:
             del self._cache[key]
         return len(keys_to_delete)
 
+    async def invalidate_tags(self, tags: Iterable[str]) -> int:
+        """Delete all keys registered under tags"""
+        count = 0
+        for tag in tags:
+            for key in self._tags.pop(tag, set()):
+                if self._cache.pop(key, None) is not None:
+                    count += 1
+        return count
+
     async def increment(self, key: str, amount: int = 1) -> Optional[int]:
         """Increment counter in cache"""
         current = self._cache.get(key, 0)
@@ -89,6 +129,10 @@ class MockCacheService:
         self._cache[key] = new_value
         return new_value
 
+    async def publish(self, channel: str, message: str) -> int:
+        """Publish message (no subscribers in tests)"""
+        return 0
+
     async def health_check(self) -> Dict[str, Any]:
         """Check cache health"""
         return {"status": "healthy", "type": "mock", "keys_count": len(self._cache)}
@@ -101,6 +145,8 @@ class MockCacheService:
 class CacheService:
     """Redis cache service"""
 
+    supports_pubsub = True
+
     def __init__(self):
         self.redis_url = settings.REDIS_URL
         self.default_ttl = settings.CACHE_TTL_SECONDS
@@ -126,18 +172,51 @@ class CacheService:
             logger.error("Cache get failed", key=key, error=str(e))
             return None
 
-    async def set(self, key: str, value: Any, ttl: Optional[int] = None) -> bool:
-        """Set value in cache"""
+    async def set(
+        self,
+        key: str,
+        value: Any,
+        ttl: Optional[int] = None,
+        tags: Iterable[str] = (),
+    ) -> bool:
+        """Set value in cache, registering the key in the given tag sets"""
         try:
             redis_client = await self._get_redis()
             ttl = ttl or self.default_ttl
             serialized_value = json.dumps(value, default=str)
-            await redis_client.setex(key, ttl, serialized_value)
+            tags = list(tags)
+            if not tags:
+                await redis_client.setex(key, ttl, serialized_value)
+                return True
+
+            async with redis_client.pipeline(transaction=True) as pipe:
+                pipe.setex(key, clamp_tagged_ttl(ttl), serialized_value)
+                add_to_tags(pipe, key, tags)
+                await pipe.execute()
             return True
         except Exception as e:
             logger.error("Cache set failed", key=key, error=str(e))
             return False
 
+    async def set_if_absent(
+        self, key: str, value: Any, ttl: Optional[int] = None
+    ) -> Optional[bool]:
+        """
+        Set value only if the key does not exist (SET NX)
+
+        Returns True if the value was set, False if the key exists and None
+        if Redis is unavailable.
+        """
+        try:
+            redis_client = await self._get_redis()
+            result = await redis_client.set(
+                key, json.dumps(value, default=str), ex=ttl or self.default_ttl, nx=True
+            )
+            return bool(result)
+        except Exception as e:
+            logger.error("Cache set_if_absent failed", key=key, error=str(e))
+            return None
+
     async def delete(self, key: str) -> bool:
         """Delete value from cache"""
         try:
@@ -221,18 +300,40 @@ class CacheService:
             return 0
 
     async def clear_pattern(self, pattern: str) -> int:
-        """Clear all keys matching pattern"""
+        """Clear all keys matching pattern (incremental SCAN + UNLINK)"""
         try:
             redis_client = await self._get_redis()
-            keys = await redis_client.keys(pattern)
-            if keys:
-                result = await redis_client.delete(*keys)
-                return result
-            return 0
+            return await unlink_matching(redis_client, pattern)
         except Exception as e:
             logger.error("Cache clear_pattern failed", pattern=pattern, error=str(e))
             return 0
 
+    async def invalidate_tags(self, tags: Iterable[str]) -> int:
+        """Delete all keys registered under tags"""
+        deleted_count = 0
+        try:
+            redis_client = await self._get_redis()
+            for tag in tags:
+                deleted_count += await invalidate_tag(redis_client, tag)
+            return deleted_count
+        except Exception as e:
+            logger.error("Cache invalidate_tags failed", error=str(e))
+            return deleted_count
+
+    async def publish(self, channel: str, message: str) -> int:
+        """Publish message to a pub/sub channel, returns number of receivers"""
+        try:
+            redis_client = await self._get_redis()
+            return await redis_client.publish(channel, message)
+        except Exception as e:
+            logger.error("Cache publish failed", channel=channel, error=str(e))
+            return 0
+
+    async def pubsub(self):
+        """Pub/sub object on a dedicated Redis connection"""
+        redis_client = await self._get_redis()
+        return redis_client.pubsub()
+
     async def increment(self, key: str, amount: int = 1) -> Optional[int]:
         """Increment counter in cache"""
         try:
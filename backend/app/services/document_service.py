@@ -3,21 +3,72 @@ Service for document management
 """
 
 import uuid
-from typing import Optional, Dict, Any
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, func
+from typing import Optional, Dict, Any, List
+from sqlalchemy import and_, delete, func, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
 import structlog
 
 from app.models.document import Document
 from app.models.qr_code import QRCode
 from app.models.user import User
+from app.services.cache_service import document_cache_tag
+from app.services.tiered_cache import status_cache
 
 logger = structlog.get_logger()
 
+# Rows per INSERT statement (PostgreSQL allows at most 65535 bind parameters)
+QR_UPSERT_BATCH_SIZE = 1000
+
+
+def build_qr_codes_upsert(rows: List[Dict[str, Any]]):
+    """
+    Build INSERT ... ON CONFLICT (enovia_id, revision, page_number) DO UPDATE
+    for QR code rows (requires the uq_qr_codes_enovia_revision_page_doc index)
+    """
+    statement = insert(QRCode).values(rows)
+    return statement.on_conflict_do_update(
+        index_elements=[QRCode.enovia_id, QRCode.revision, QRCode.page_number],
+        set_={
+            "qr_data": statement.excluded.qr_data,
+            "document_id": statement.excluded.document_id,
+            "created_by": statement.excluded.created_by,
+        },
+    )
+
+
+def document_status_query(enovia_id: str):
+    """
+    Status lookup of a scanned document
+    (index-only scan on uq_documents_enovia_id_status)
+    """
+    return (
+        select(Document.id, Document.revision, Document.is_actual)
+        .where(Document.enovia_id == enovia_id)
+        .limit(1)
+    )
+
+
+def qr_code_page_query(enovia_id: str, revision: str, page_number: int):
+    """
+    Document of a QR code issued for a revision page
+    (index-only scan on uq_qr_codes_enovia_revision_page_doc)
+    """
+    return (
+        select(QRCode.document_id)
+        .where(
+            QRCode.enovia_id == enovia_id,
+            QRCode.revision == revision,
+            QRCode.page_number == page_number,
+        )
+        .limit(1)
+    )
+
+
 class DocumentService:
     """Service for document management"""
 
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
 
     async def create_or_update_document(
@@ -34,15 +85,17 @@ class DocumentService:
         """
         try:
             # Check if document with same enovia_id exists
-            existing_document = self.db.query(Document).filter(
-                Document.enovia_id == enovia_id
-            ).first()
+            existing_document = await self.db.scalar(
+                select(Document).where(Document.enovia_id == enovia_id).limit(1)
+            )
 
             if existing_document:
                 # Mark all existing documents with this enovia_id as not actual
-                self.db.query(Document).filter(
-                    Document.enovia_id == enovia_id
-                ).update({"is_actual": False})
+                await self.db.execute(
+                    update(Document)
+                    .where(Document.enovia_id == enovia_id)
+                    .values(is_actual=False)
+                )
                 
                 logger.info(f"Marked existing documents as not actual", 
                            enovia_id=enovia_id)
@@ -58,8 +111,9 @@ class DocumentService:
             )
             
             self.db.add(document)
-            self.db.commit()
-            self.db.refresh(document)
+            await self.db.commit()
+            await self.db.refresh(document)
+            await self._invalidate_cached_status(enovia_id)
             
             logger.info(f"Created new document", 
                        document_id=str(document.id),
@@ -69,7 +123,7 @@ class DocumentService:
             return document
             
         except Exception as e:
-            self.db.rollback()
+            await self.db.rollback()
             logger.error(f"Error creating/updating document", error=str(e))
             raise
 
@@ -87,21 +141,23 @@ class DocumentService:
         """
         try:
             # Check if QR code already exists for this page
-            existing_qr = self.db.query(QRCode).filter(
-                and_(
-                    QRCode.enovia_id == enovia_id,
-                    QRCode.revision == revision,
-                    QRCode.page_number == page_number
-                )
-            ).first()
+            existing_qr = await self.db.scalar(
+                select(QRCode).where(
+                    and_(
+                        QRCode.enovia_id == enovia_id,
+                        QRCode.revision == revision,
+                        QRCode.page_number == page_number
+                    )
+                ).limit(1)
+            )
 
             if existing_qr:
                 # Update existing QR code
                 existing_qr.qr_data = qr_data
                 existing_qr.document_id = document_id
                 existing_qr.created_by = created_by
-                self.db.commit()
-                self.db.refresh(existing_qr)
+                await self.db.commit()
+                await self.db.refresh(existing_qr)
                 
                 logger.info(f"Updated existing QR code", 
                            enovia_id=enovia_id,
@@ -121,8 +177,8 @@ class DocumentService:
                 )
                 
                 self.db.add(qr_code)
-                self.db.commit()
-                self.db.refresh(qr_code)
+                await self.db.commit()
+                await self.db.refresh(qr_code)
                 
                 logger.info(f"Created new QR code", 
                            qr_id=str(qr_code.id),
@@ -133,10 +189,59 @@ class DocumentService:
                 return qr_code
                 
         except Exception as e:
-            self.db.rollback()
+            await self.db.rollback()
             logger.error(f"Error creating QR code", error=str(e))
             raise
 
+    async def upsert_qr_codes(
+        self,
+        document_id: uuid.UUID,
+        enovia_id: str,
+        revision: str,
+        qr_codes_data: List[Dict[str, Any]],
+        created_by: uuid.UUID
+    ) -> int:
+        """
+        Create or update QR code records of a revision in a single transaction
+
+        Args:
+            qr_codes_data: Items with "page_number" and "qr_data"
+
+        Returns:
+            Number of upserted records
+        """
+        rows = [
+            {
+                "id": uuid.uuid4(),
+                "document_id": document_id,
+                "enovia_id": enovia_id,
+                "revision": revision,
+                "page_number": item["page_number"],
+                "qr_data": item["qr_data"],
+                "created_by": created_by,
+            }
+            for item in qr_codes_data
+        ]
+        if not rows:
+            return 0
+
+        try:
+            for start in range(0, len(rows), QR_UPSERT_BATCH_SIZE):
+                await self.db.execute(build_qr_codes_upsert(rows[start:start + QR_UPSERT_BATCH_SIZE]))
+            await self.db.commit()
+
+            logger.info("Upserted QR codes",
+                       enovia_id=enovia_id,
+                       revision=revision,
+                       qr_codes_count=len(rows))
+
+            return len(rows)
+
+        except Exception as e:
+            await self.db.rollback()
+            logger.error("Error upserting QR codes", error=str(e))
+            raise
+
     async def get_document_by_enovia_id(
         self, 
         enovia_id: str, 
@@ -146,20 +251,37 @@ class DocumentService:
         Get document by ENOVIA ID and optionally by revision
         """
         try:
-            query = self.db.query(Document).filter(Document.enovia_id == enovia_id)
+            query = select(Document).where(Document.enovia_id == enovia_id)
             
             if revision:
-                query = query.filter(Document.revision == revision)
+                query = query.where(Document.revision == revision)
             else:
                 # Get the most recent actual document
-                query = query.filter(Document.is_actual == True)
+                query = query.where(Document.is_actual == True)
             
-            return query.first()
+            return await self.db.scalar(query.limit(1))
             
         except Exception as e:
             logger.error(f"Error getting document", error=str(e))
             return None
 
+    async def get_document_status(self, enovia_id: str):
+        """
+        Get id, revision and actuality of a document without loading the row
+        """
+        return (await self.db.execute(document_status_query(enovia_id))).first()
+
+    async def get_qr_code_document_id(
+        self,
+        enovia_id: str,
+        revision: str,
+        page_number: int
+    ) -> Optional[uuid.UUID]:
+        """
+        Get document id of the QR code issued for a revision page
+        """
+        return await self.db.scalar(qr_code_page_query(enovia_id, revision, page_number))
+
     async def get_qr_codes_by_document(
         self, 
         document_id: uuid.UUID
@@ -168,9 +290,12 @@ class DocumentService:
         Get all QR codes for a document
         """
         try:
-            return self.db.query(QRCode).filter(
-                QRCode.document_id == document_id
-            ).order_by(QRCode.page_number).all()
+            result = await self.db.scalars(
+                select(QRCode).where(
+                    QRCode.document_id == document_id
+                ).order_by(QRCode.page_number)
+            )
+            return list(result)
             
         except Exception as e:
             logger.error(f"Error getting QR codes", error=str(e))
@@ -186,13 +311,15 @@ class DocumentService:
         Get QR code by its data components
         """
         try:
-            return self.db.query(QRCode).filter(
-                and_(
-                    QRCode.enovia_id == enovia_id,
-                    QRCode.revision == revision,
-                    QRCode.page_number == page_number
-                )
-            ).first()
+            return await self.db.scalar(
+                select(QRCode).where(
+                    and_(
+                        QRCode.enovia_id == enovia_id,
+                        QRCode.revision == revision,
+                        QRCode.page_number == page_number
+                    )
+                ).limit(1)
+            )
             
         except Exception as e:
             logger.error(f"Error getting QR code by data", error=str(e))
@@ -207,16 +334,19 @@ class DocumentService:
         Mark specific document revision as obsolete
         """
         try:
-            document = self.db.query(Document).filter(
-                and_(
-                    Document.enovia_id == enovia_id,
-                    Document.revision == revision
-                )
-            ).first()
+            document = await self.db.scalar(
+                select(Document).where(
+                    and_(
+                        Document.enovia_id == enovia_id,
+                        Document.revision == revision
+                    )
+                ).limit(1)
+            )
             
             if document:
                 document.is_actual = False
-                self.db.commit()
+                await self.db.commit()
+                await self._invalidate_cached_status(enovia_id)
                 
                 logger.info(f"Marked document as obsolete", 
                            enovia_id=enovia_id,
@@ -227,13 +357,13 @@ class DocumentService:
             return False
             
         except Exception as e:
-            self.db.rollback()
+            await self.db.rollback()
             logger.error(f"Error marking document as obsolete", error=str(e))
             return False
 
     async def create_document_with_qr_codes(
         self,
-        db: Session,
+        db: AsyncSession,
         enovia_id: str,
         title: str,
         revision: str,
@@ -247,9 +377,9 @@ class DocumentService:
         """
         try:
             # 1. Check if document with same enovia_id exists
-            existing_document = db.query(Document).filter(
-                Document.enovia_id == enovia_id
-            ).first()
+            existing_document = await db.scalar(
+                select(Document).where(Document.enovia_id == enovia_id).limit(1)
+            )
 
             if existing_document:
                 # Mark all existing documents with this enovia_id as not actual
@@ -263,12 +393,12 @@ class DocumentService:
                 existing_document.created_by = creator_id
                 
                 # Delete old QR codes for this document
-                db.query(QRCode).filter(
-                    QRCode.document_id == existing_document.id
-                ).delete()
+                await db.execute(
+                    delete(QRCode).where(QRCode.document_id == existing_document.id)
+                )
                 
                 document = existing_document
-                db.flush()  # Flush to get the document.id
+                await db.flush()  # Flush to get the document.id
                 
                 logger.info(
                     "Updated existing document with new revision",
@@ -291,7 +421,7 @@ class DocumentService:
                     released_at=None,
                 )
                 db.add(new_document)
-                db.flush()  # Flush to get the new_document.id
+                await db.flush()  # Flush to get the new_document.id
                 document = new_document
                 
                 logger.info(
@@ -314,8 +444,9 @@ class DocumentService:
                 )
                 db.add(new_qr_code)
 
-            db.commit()
-            db.refresh(document)
+            await db.commit()
+            await db.refresh(document)
+            await self._invalidate_cached_status(enovia_id)
             logger.info(
                 "Document and QR codes processed successfully",
                 document_id=document.id,
@@ -325,7 +456,7 @@ class DocumentService:
             )
             return document
         except Exception as e:
-            db.rollback()
+            await db.rollback()
             logger.error(
                 "Error processing document with QR codes",
                 enovia_id=enovia_id,
@@ -334,15 +465,26 @@ class DocumentService:
             )
             raise
 
-    async def _supersede_previous_revisions(self, db: Session, enovia_id: str):
+    async def _invalidate_cached_status(self, enovia_id: str) -> None:
+        """
+        Drop cached status/QR responses of a document after its revisions change
+        """
+        deleted_count = await status_cache.invalidate_tags([document_cache_tag(enovia_id)])
+        logger.info("Invalidated cached document status",
+                   enovia_id=enovia_id,
+                   deleted_keys=deleted_count)
+
+    async def _supersede_previous_revisions(self, db: AsyncSession, enovia_id: str):
         """
         Marks all previous revisions of a document with the given enovia_id as not actual.
         """
         try:
-            db.query(Document).filter(Document.enovia_id == enovia_id).update(
-                {"is_actual": False}
+            await db.execute(
+                update(Document)
+                .where(Document.enovia_id == enovia_id)
+                .values(is_actual=False)
             )
-            db.flush()
+            await db.flush()
             logger.info(
                 "Superseded previous document revisions", enovia_id=enovia_id
             )
@@ -2,8 +2,22 @@
 ENOVIA PLM integration service
 """
 
+import asyncio
+import importlib.util
+import time
+from collections import OrderedDict
 from datetime import datetime
-from typing import Any, Dict, Optional
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Hashable,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+)
 
 import httpx
 import structlog
@@ -14,36 +28,232 @@ from app.models.document import DocumentStatusEnum
 logger = structlog.get_logger()
 
 
+def http2_available() -> bool:
+    """HTTP/2 is enabled and the h2 package is installed"""
+    if not settings.ENOVIA_HTTP2:
+        return False
+    if importlib.util.find_spec("h2") is None:
+        logger.warning("h2 package not installed, ENOVIA client falls back to HTTP/1.1")
+        return False
+    return True
+
+
+class MetadataCache:
+    """
+    Bounded stale-while-revalidate cache of ENOVIA metadata
+
+    Entries younger than ttl are fresh; until stale_ttl they are still served
+    but must be revalidated; older entries are not served.
+    """
+
+    def __init__(self, ttl: float, stale_ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+
+    def get(self, key: Hashable) -> Tuple[Optional[Any], bool]:
+        """(value, fresh); value is None for a missing or expired entry"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None, False
+        age = time.monotonic() - entry[0]
+        if age >= self.stale_ttl:
+            del self._entries[key]
+            return None, False
+        self._entries.move_to_end(key)
+        return entry[1], age < self.ttl
+
+    def set(self, key: Hashable, value: Any) -> None:
+        self._entries[key] = (time.monotonic(), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+class BatchResolver:
+    """
+    Batches lookups issued by concurrent callers
+
+    Keys requested within window seconds (or until max_batch keys are pending)
+    form one batch; its lookups run with at most `concurrency` requests in
+    flight and every caller gets the result of its own key. Duplicate keys in
+    a batch are looked up once.
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[Hashable], Awaitable[Any]],
+        window: float,
+        max_batch: int,
+        concurrency: int,
+    ):
+        self.fetch = fetch
+        self.window = window
+        self.max_batch = max_batch
+        self.concurrency = concurrency
+        self._pending: Dict[Hashable, asyncio.Future] = {}
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._batches: set = set()
+
+    async def resolve(self, key: Hashable) -> Any:
+        """Result of the lookup of key, batched with concurrent callers"""
+        future = self._pending.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            self._pending[key] = future
+            if len(self._pending) >= self.max_batch:
+                self._flush()
+            elif self._timer is None:
+                self._timer = loop.call_later(self.window, self._flush)
+        # A cancelled caller must not cancel the lookup shared with others
+        return await asyncio.shield(future)
+
+    async def resolve_many(self, keys: Iterable[Hashable]) -> Dict[Hashable, Any]:
+        """Results of several lookups (exceptions are returned as values)"""
+        keys = list(dict.fromkeys(keys))
+        results = await asyncio.gather(
+            *(self.resolve(key) for key in keys), return_exceptions=True
+        )
+        return dict(zip(keys, results))
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, {}
+        if not batch:
+            return
+        task = asyncio.create_task(self._run(batch))
+        self._batches.add(task)
+        task.add_done_callback(self._batches.discard)
+
+    async def _run(self, batch: Dict[Hashable, asyncio.Future]) -> None:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        start = time.perf_counter()
+
+        async def lookup(key: Hashable, future: asyncio.Future) -> None:
+            async with self._semaphore:
+                try:
+                    result = await self.fetch(key)
+                except Exception as e:
+                    if not future.done():
+                        future.set_exception(e)
+                else:
+                    if not future.done():
+                        future.set_result(result)
+
+        await asyncio.gather(*(lookup(key, future) for key, future in batch.items()))
+        logger.debug(
+            "ENOVIA batch resolved",
+            size=len(batch),
+            duration=time.perf_counter() - start,
+        )
+
+    def cancel(self) -> None:
+        """Cancel pending and running batches"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        for future in self._pending.values():
+            future.cancel()
+        self._pending = {}
+        for task in list(self._batches):
+            task.cancel()
+        self._semaphore = None
+
+
 class ENOVIAClient:
-    """ENOVIA PLM client"""
+    """
+    ENOVIA PLM client
 
-    def __init__(self):
-        self.base_url = settings.ENOVIA_BASE_URL
+    One pooled keep-alive (HTTP/2 when available) connection pool per process,
+    single-flight token refresh, coalescing of identical in-flight metadata
+    requests and a stale-while-revalidate metadata cache.
+    """
+
+    def __init__(self, base_url: Optional[str] = None):
+        self.base_url = base_url or settings.ENOVIA_BASE_URL
         self.client_id = settings.ENOVIA_CLIENT_ID
         self.client_secret = settings.ENOVIA_CLIENT_SECRET
-        self.access_token = None
-        self.token_expires_at = None
+        self.access_token: Optional[str] = None
+        self.token_expires_at: Optional[float] = None  # time.monotonic()
+        self.metadata_cache = MetadataCache(
+            settings.ENOVIA_META_TTL_SECONDS,
+            settings.ENOVIA_META_STALE_SECONDS,
+            settings.ENOVIA_META_CACHE_MAX_ENTRIES,
+        )
+        self._client: Optional[httpx.AsyncClient] = None
+        self._token_lock: Optional[asyncio.Lock] = None
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self._revalidations: set = set()
+        self.resolver = BatchResolver(
+            self._resolve_key,
+            settings.ENOVIA_BATCH_WINDOW_MS / 1000,
+            settings.ENOVIA_BATCH_MAX_SIZE,
+            settings.ENOVIA_MAX_CONCURRENCY,
+        )
 
-    async def _get_access_token(self) -> str:
-        """Get OAuth2 access token"""
-        if (
+    def _get_client(self) -> httpx.AsyncClient:
+        """Long-lived pooled HTTP client, created on first use"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                http2=http2_available(),
+                timeout=settings.ENOVIA_TIMEOUT_SECONDS,
+                limits=httpx.Limits(
+                    max_connections=settings.ENOVIA_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.ENOVIA_MAX_KEEPALIVE_CONNECTIONS,
+                    keepalive_expiry=settings.ENOVIA_KEEPALIVE_EXPIRY_SECONDS,
+                ),
+            )
+        return self._client
+
+    async def close(self) -> None:
+        """Close pooled connections and cancel background revalidations"""
+        self.resolver.cancel()
+        for task in list(self._revalidations):
+            task.cancel()
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        self._token_lock = None
+        self._inflight.clear()
+
+    def _token_valid(self) -> bool:
+        return bool(
             self.access_token
             and self.token_expires_at
-            and datetime.now() < self.token_expires_at
-        ):
+            and time.monotonic() < self.token_expires_at
+        )
+
+    async def _get_access_token(self) -> str:
+        """Get OAuth2 access token (concurrent callers share one refresh)"""
+        if self._token_valid():
             return self.access_token
 
-        try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.base_url}/oauth2/token",
+        if self._token_lock is None:
+            self._token_lock = asyncio.Lock()
+        async with self._token_lock:
+            # Another caller may have refreshed the token while we waited
+            if self._token_valid():
+                return self.access_token
+
+            try:
+                response = await self._get_client().post(
+                    "/oauth2/token",
                     data={
                         "grant_type": "client_credentials",
                         "client_id": self.client_id,
                         "client_secret": self.client_secret,
                         "scope": "read",
                     },
-                    timeout=30.0,
                 )
                 response.raise_for_status()
 
@@ -51,33 +261,42 @@ class ENOVIAClient:
                 self.access_token = token_data["access_token"]
                 expires_in = token_data.get("expires_in", 3600)
                 self.token_expires_at = (
-                    datetime.now().timestamp() + expires_in - 60
+                    time.monotonic() + expires_in - 60
                 )  # 1 minute buffer
 
                 logger.info("ENOVIA access token obtained")
                 return self.access_token
 
-        except Exception as e:
-            logger.error("Failed to get ENOVIA access token", error=str(e))
-            raise
+            except Exception as e:
+                logger.error("Failed to get ENOVIA access token", error=str(e))
+                raise
+
+    def _invalidate_token(self, token: str) -> None:
+        """Drop a rejected token unless it has already been replaced"""
+        if self.access_token == token:
+            self.access_token = None
+            self.token_expires_at = None
 
     async def _make_request(
         self, method: str, endpoint: str, **kwargs
     ) -> Dict[str, Any]:
         """Make authenticated request to ENOVIA"""
+        extra_headers = kwargs.pop("headers", {})
         try:
-            token = await self._get_access_token()
-            headers = {
-                "Authorization": f"Bearer {token}",
-                "Content-Type": "application/json",
-                **kwargs.get("headers", {}),
-            }
-            kwargs["headers"] = headers
-
-            async with httpx.AsyncClient() as client:
-                response = await client.request(
-                    method, f"{self.base_url}{endpoint}", timeout=30.0, **kwargs
+            for attempt in range(2):
+                token = await self._get_access_token()
+                headers = {
+                    "Authorization": f"Bearer {token}",
+                    "Content-Type": "application/json",
+                    **extra_headers,
+                }
+                response = await self._get_client().request(
+                    method, endpoint, headers=headers, **kwargs
                 )
+                if response.status_code == 401 and attempt == 0:
+                    # Token revoked or expired early: refresh once and retry
+                    self._invalidate_token(token)
+                    continue
                 response.raise_for_status()
                 return response.json()
 
@@ -96,8 +315,57 @@ class ENOVIAClient:
             )
             raise
 
+    def _start_fetch(
+        self, key: Hashable, fetch: Callable[[], Awaitable[Optional[Dict[str, Any]]]]
+    ) -> asyncio.Task:
+        """In-flight fetch for key, started if there is none"""
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(fetch())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return task
+
+    async def _coalesce(
+        self, key: Hashable, fetch: Callable[[], Awaitable[Optional[Dict[str, Any]]]]
+    ) -> Optional[Dict[str, Any]]:
+        """Run fetch once for all concurrent callers with the same key"""
+        # A cancelled caller must not cancel the fetch shared with others
+        return await asyncio.shield(self._start_fetch(key, fetch))
+
+    async def _cached_meta(
+        self, key: Hashable, fetch: Callable[[], Awaitable[Optional[Dict[str, Any]]]]
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Metadata through the stale-while-revalidate cache
+
+        Fresh entries are returned as is; stale entries are returned at once
+        and refreshed in the background; misses are fetched (coalesced).
+        Failed fetches (None) are not cached.
+        """
+
+        async def fetch_and_store():
+            value = await fetch()
+            if value is not None:
+                self.metadata_cache.set(key, value)
+            return value
+
+        value, fresh = self.metadata_cache.get(key)
+        if value is None:
+            return await self._coalesce(key, fetch_and_store)
+        if not fresh and key not in self._inflight:
+            task = self._start_fetch(key, fetch_and_store)
+            self._revalidations.add(task)
+            task.add_done_callback(self._revalidations.discard)
+        return value
+
     async def get_document_meta(self, doc_uid: str) -> Optional[Dict[str, Any]]:
-        """Get document metadata from ENOVIA"""
+        """Get document metadata from ENOVIA (cached, coalesced)"""
+        return await self._cached_meta(
+            ("document", doc_uid), lambda: self._fetch_document_meta(doc_uid)
+        )
+
+    async def _fetch_document_meta(self, doc_uid: str) -> Optional[Dict[str, Any]]:
         try:
             data = await self._make_request("GET", f"/api/v1/documents/{doc_uid}")
 
@@ -119,7 +387,15 @@ class ENOVIAClient:
     async def get_revision_meta(
         self, doc_uid: str, revision: str
     ) -> Optional[Dict[str, Any]]:
-        """Get revision metadata from ENOVIA"""
+        """Get revision metadata from ENOVIA (cached, coalesced)"""
+        return await self._cached_meta(
+            ("revision", doc_uid, revision),
+            lambda: self._fetch_revision_meta(doc_uid, revision),
+        )
+
+    async def _fetch_revision_meta(
+        self, doc_uid: str, revision: str
+    ) -> Optional[Dict[str, Any]]:
         try:
             data = await self._make_request(
                 "GET", f"/api/v1/documents/{doc_uid}/revisions/{revision}"
@@ -165,6 +441,43 @@ class ENOVIAClient:
             )
             return None
 
+    async def _resolve_key(self, key: Tuple[str, ...]) -> Optional[Dict[str, Any]]:
+        if key[0] == "latest":
+            return await self.get_latest_released(key[1])
+        return await self.get_revision_meta(key[1], key[2])
+
+    async def get_revisions_meta(
+        self, revisions: Iterable[Tuple[str, str]]
+    ) -> Dict[Tuple[str, str], Optional[Dict[str, Any]]]:
+        """
+        Get metadata of many (doc_uid, revision) pairs
+
+        Lookups are batched with concurrent callers and run in parallel
+        (ENOVIA_MAX_CONCURRENCY) over the pooled connections instead of one
+        round trip after another.
+        """
+        pairs: List[Tuple[str, str]] = list(dict.fromkeys(revisions))
+        results = await self.resolver.resolve_many(
+            ("revision", doc_uid, revision) for doc_uid, revision in pairs
+        )
+        return {
+            pair: result if not isinstance(result, Exception) else None
+            for pair, result in zip(pairs, results.values())
+        }
+
+    async def get_latest_released_many(
+        self, doc_uids: Iterable[str]
+    ) -> Dict[str, Optional[Dict[str, Any]]]:
+        """Get latest released revisions of many documents (batched)"""
+        doc_uids = list(dict.fromkeys(doc_uids))
+        results = await self.resolver.resolve_many(
+            ("latest", doc_uid) for doc_uid in doc_uids
+        )
+        return {
+            doc_uid: result if not isinstance(result, Exception) else None
+            for doc_uid, result in zip(doc_uids, results.values())
+        }
+
     def map_enovia_state_to_business_status(
         self, enovia_state: str
     ) -> DocumentStatusEnum:
@@ -9,6 +9,8 @@ import psutil
 import structlog
 from prometheus_client import Counter, Gauge, Histogram, generate_latest
 
+from app.utils.resource_monitor import resource_monitor
+
 logger = structlog.get_logger()
 
 
@@ -71,6 +73,64 @@ class MetricsService:
             "pte_qr_cache_misses_total", "Total number of cache misses", ["cache_type"]
         )
 
+        self.cache_tier_requests_total = Counter(
+            "pte_qr_cache_tier_requests_total",
+            "Total number of lookups per tier of a two-tier cache",
+            ["cache_type", "tier", "result"],
+        )
+
+        self.cache_tier_hit_ratio = Gauge(
+            "pte_qr_cache_tier_hit_ratio",
+            "Hit ratio of a tier of a two-tier cache since process start",
+            ["cache_type", "tier"],
+        )
+
+        # Executor metrics (CPU-bound work offloaded from the event loop)
+        self.executor_queue_depth = Gauge(
+            "pte_qr_executor_queue_depth",
+            "Number of tasks waiting for an executor worker",
+            ["executor"],
+        )
+
+        self.executor_active_tasks = Gauge(
+            "pte_qr_executor_active_tasks",
+            "Number of tasks running in an executor",
+            ["executor"],
+        )
+
+        self.executor_wait_duration = Histogram(
+            "pte_qr_executor_wait_duration_seconds",
+            "Time tasks spend waiting for an executor worker",
+            ["executor"],
+        )
+
+        self.executor_rejected_total = Counter(
+            "pte_qr_executor_rejected_total",
+            "Total number of tasks rejected because the executor queue was full",
+            ["executor"],
+        )
+
+        # Memory budget of PDF jobs (admission by page geometry)
+        self.memory_budget_reserved = Gauge(
+            "pte_qr_memory_budget_reserved_bytes",
+            "Memory reserved by admitted jobs",
+            ["budget"],
+        )
+
+        self.memory_budget_queued = Gauge(
+            "pte_qr_memory_budget_queued_jobs",
+            "Number of jobs waiting for memory budget",
+            ["budget"],
+        )
+
+        # PDF job metrics
+        self.pdf_document_parses = Histogram(
+            "pte_qr_pdf_document_parses",
+            "Number of times the input PDF was parsed during one job",
+            ["parser"],
+            buckets=(0, 1, 2, 3, 5, 10, 25, 50, 100, 250),
+        )
+
         # System metrics
         self.system_cpu_usage = Gauge(
             "pte_qr_system_cpu_usage_percent", "System CPU usage percentage"
@@ -137,16 +197,46 @@ class MetricsService:
         """Record cache miss"""
         self.cache_misses_total.labels(cache_type=cache_type).inc()
 
+    def record_cache_tier_lookup(
+        self, cache_type: str, tier: str, hit: bool, hit_ratio: float
+    ):
+        """Record a lookup in one tier (l1/l2) of a two-tier cache"""
+        self.cache_tier_requests_total.labels(
+            cache_type=cache_type, tier=tier, result="hit" if hit else "miss"
+        ).inc()
+        self.cache_tier_hit_ratio.labels(cache_type=cache_type, tier=tier).set(
+            hit_ratio
+        )
+
+    def record_executor_state(self, executor: str, queued: int, active: int):
+        """Record executor queue depth and running tasks"""
+        self.executor_queue_depth.labels(executor=executor).set(queued)
+        self.executor_active_tasks.labels(executor=executor).set(active)
+
+    def record_executor_wait(self, executor: str, duration: float):
+        """Record time a task waited for an executor worker"""
+        self.executor_wait_duration.labels(executor=executor).observe(duration)
+
+    def record_executor_rejected(self, executor: str):
+        """Record a task rejected by a full executor queue"""
+        self.executor_rejected_total.labels(executor=executor).inc()
+
+    def record_memory_budget_state(self, budget: str, reserved: int, queued: int):
+        """Record reserved memory and waiting jobs of a memory budget"""
+        self.memory_budget_reserved.labels(budget=budget).set(reserved)
+        self.memory_budget_queued.labels(budget=budget).set(queued)
+
+    def record_document_parses(self, parser: str, count: int):
+        """Record how many times a job parsed its input PDF with a parser"""
+        self.pdf_document_parses.labels(parser=parser).observe(count)
+
     def update_system_metrics(self):
         """Update system metrics"""
         try:
-            # CPU usage
-            cpu_percent = psutil.cpu_percent(interval=1)
-            self.system_cpu_usage.set(cpu_percent)
-
-            # Memory usage
-            memory = psutil.virtual_memory()
-            self.system_memory_usage.set(memory.percent)
+            # CPU and memory usage from the background sampler (non-blocking)
+            snapshot = resource_monitor.snapshot
+            self.system_cpu_usage.set(snapshot.cpu_percent)
+            self.system_memory_usage.set(snapshot.memory_percent)
 
             # Disk usage
             disk = psutil.disk_usage("/")
@@ -196,6 +286,19 @@ class MetricsService:
             "cache": {
                 "hits_total": self._get_counter_value(self.cache_hits_total),
                 "misses_total": self._get_counter_value(self.cache_misses_total),
+                "tier_hit_ratio": self._get_gauge_value(self.cache_tier_hit_ratio),
+            },
+            "executor": {
+                "queue_depth": self._get_gauge_value(self.executor_queue_depth),
+                "active_tasks": self._get_gauge_value(self.executor_active_tasks),
+                "rejected_total": self._get_counter_value(self.executor_rejected_total),
+                "memory_reserved_bytes": self._get_gauge_value(
+                    self.memory_budget_reserved
+                ),
+                "memory_queued_jobs": self._get_gauge_value(self.memory_budget_queued),
+            },
+            "pdf": {
+                "document_parses": self._get_histogram_value(self.pdf_document_parses),
             },
             "system": {
                 "cpu_usage_percent": self.system_cpu_usage._value._value,
@@ -214,6 +317,15 @@ class MetricsService:
                 result[labels or "total"] = sample.value
         return result
 
+    def _get_gauge_value(self, gauge: Gauge) -> Dict[str, float]:
+        """Get labelled gauge value as dictionary"""
+        result = {}
+        for metric in gauge.collect():
+            for sample in metric.samples:
+                labels = "_".join(str(v) for v in sample.labels.values())
+                result[labels or "total"] = sample.value
+        return result
+
     def _get_histogram_value(self, histogram: Histogram) -> Dict[str, Any]:
         """Get histogram value as dictionary"""
         result = {}
@@ -5,21 +5,24 @@ Service for PDF processing and QR code integration
 import os
 import tempfile
 import uuid
-from copy import deepcopy
-from typing import Dict, Any, List
-from PyPDF2 import PdfReader, PdfWriter
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter
+from typing import Awaitable, Callable, Dict, Any, List, Optional, Union
+from PyPDF2 import PdfReader
 from reportlab.lib.units import inch
 from io import BytesIO
 import structlog
-from PIL import Image
 
 from app.services.qr_service import QRService
 from app.services.document_service import DocumentService
 from app.core.config import settings
+from app.core.executor import pdf_executor, pdf_memory_budget
 from app.core.logging import DebugLogger, log_function_call, log_function_result, log_file_operation
+from app.utils.document_handle import DocumentHandle
+from app.utils.incremental_pdf import create_output_writer
+from app.utils.layout_pool import layout_pool
+from app.utils.page_raster import estimate_job_memory
 from app.utils.pdf_analyzer import PDFAnalyzer
+from app.utils.qr_overlay import QROverlay
+from app.utils.upload_spool import SpooledUpload
 
 logger = structlog.get_logger()
 debug_logger = DebugLogger(__name__)
@@ -56,10 +59,13 @@ class PDFService:
         revision: str,
         created_by: uuid.UUID,
         qr_service: QRService,
-        document_service: DocumentService
+        document_service: DocumentService,
+        progress: Optional[Callable[[int, int], Awaitable[None]]] = None
     ) -> Dict[str, Any]:
         """
         Process PDF file and add QR codes to each page
+
+        ``progress`` is awaited with (pages done, total pages) as pages are stamped.
         """
         log_function_call(
             "PDFService.process_pdf_with_qr_codes",
@@ -70,6 +76,8 @@ class PDFService:
             created_by=str(created_by)
         )
         
+        pdf_document = None
+        reserved_memory = None
         try:
             debug_logger.info(
                 "Starting PDF processing with QR codes",
@@ -87,10 +95,22 @@ class PDFService:
             
             log_file_operation("read", pdf_path, file_size=os.path.getsize(pdf_path))
             
-            # Read the PDF
-            reader = PdfReader(pdf_path)
+            # Map the PDF into memory instead of reading it; parsed once for the
+            # whole job, shared by positioning and analysis
+            pdf_document = DocumentHandle(pdf_path)
+            pdf_content = pdf_document.pdf_content
+            reader = pdf_document.reader
             total_pages = len(reader.pages)
             
+            # Wait for this job's share of the worker memory budget; the estimate
+            # opens the document with PyMuPDF, so it runs off the event loop too
+            job_memory = await pdf_executor.run(
+                self._estimate_job_memory,
+                pdf_document,
+                self._landscape_page_indexes(reader),
+            )
+            reserved_memory = await pdf_memory_budget.acquire(job_memory)
+
             debug_logger.info(
                 "PDF loaded successfully",
                 total_pages=total_pages,
@@ -110,14 +130,23 @@ class PDFService:
             )
             debug_logger.info("Document created/updated", document_id=str(document.id))
 
-            # Create output PDF writer
-            writer = PdfWriter()
+            # Create output PDF writer (full rewrite or incremental update)
+            writer = create_output_writer(reader, pdf_content)
+            overlay = QROverlay(writer)
             qr_codes_created = 0
+            qr_codes_data = []
 
             debug_logger.info("Starting page processing", total_pages=total_pages)
 
+            # Analyze landscape pages in parallel before stamping them one by one
+            layouts = await self._analyze_layouts_parallel(
+                pdf_content, self._landscape_page_indexes(reader)
+            )
+
             # Process each page
             for page_num in range(total_pages):
+                if progress is not None:
+                    await progress(page_num, total_pages)
                 debug_logger.debug("Processing page", page_number=page_num + 1, total_pages=total_pages)
                 page = reader.pages[page_num]
                 
@@ -140,29 +169,34 @@ class PDFService:
                     page_number=page_num + 1
                 )
                 
-                # Create QR code image
-                debug_logger.debug("Creating QR code image", page_number=page_num + 1)
-                qr_image = qr_service.generate_qr_code_image(qr_data)
-                
                 # Add QR code to page
                 debug_logger.debug("Adding QR code to page", page_number=page_num + 1)
-                page_with_qr = self._add_qr_code_to_page(page, qr_image, page_num + 1, pdf_path)
-                writer.add_page(page_with_qr)
-                
-                # Save QR code to database
-                debug_logger.debug("Saving QR code to database", page_number=page_num + 1)
-                await document_service.create_qr_code(
-                    document_id=document.id,
-                    enovia_id=enovia_id,
-                    revision=revision,
-                    page_number=page_num + 1,
-                    qr_data=qr_data,
-                    created_by=created_by
+                writer_page = writer.add_page(page)
+                await pdf_executor.run(
+                    self._add_qr_code_to_page,
+                    writer_page, overlay, qr_data, page_num + 1, pdf_content,
+                    layouts.get(page_num), pdf_document=pdf_document
                 )
                 
+                qr_codes_data.append({"page_number": page_num + 1, "qr_data": qr_data})
                 qr_codes_created += 1
                 debug_logger.debug("Page processed successfully", page_number=page_num + 1, qr_codes_created=qr_codes_created)
 
+            if progress is not None:
+                await progress(total_pages, total_pages)
+
+            # Save QR codes of all pages in one transaction
+            debug_logger.debug(
+                "Saving QR codes to database", qr_codes_count=len(qr_codes_data)
+            )
+            await document_service.upsert_qr_codes(
+                document_id=document.id,
+                enovia_id=enovia_id,
+                revision=revision,
+                qr_codes_data=qr_codes_data,
+                created_by=created_by
+            )
+
             # Save the output PDF
             output_filename = f"{enovia_id}_{revision}_{uuid.uuid4().hex[:8]}.pdf"
             output_path = os.path.join(self.output_dir, output_filename)
@@ -210,25 +244,35 @@ class PDFService:
                 pdf_path=pdf_path
             )
             raise
+        finally:
+            if reserved_memory is not None:
+                pdf_memory_budget.release(reserved_memory)
+            if pdf_document is not None:
+                pdf_document.close()
 
-    def _add_qr_code_to_page(self, page, qr_image, page_number: int, pdf_content: bytes = None):
+    def _add_qr_code_to_page(
+        self, page, overlay: QROverlay, qr_data: str, page_number: int,
+        pdf_content: bytes = None, layout_info: Optional[Dict[str, Any]] = None,
+        render_mode: Optional[str] = None,
+        pdf_document: Optional[DocumentHandle] = None
+    ):
         """
         Add QR code to a PDF page with intelligent positioning
         
         Args:
-            page: PDF page object
-            qr_image: QR code image
+            page: Page of the output writer (returned by writer.add_page)
+            overlay: QR overlay bound to the output writer
+            qr_data: Data encoded in the QR code
             page_number: Page number (1-based)
             pdf_content: Original PDF content for analysis
+            layout_info: Precomputed page layout (analyzed in-process if None)
+            render_mode: QR rendering, "image" or "vector" (settings default if None)
+            pdf_document: Source document parsed once for the job
         """
         log_function_call("PDFService._add_qr_code_to_page", page_number=page_number)
         
         try:
             debug_logger.debug("Adding QR code to page", page_number=page_number)
-            # Create a new page with QR code overlay
-            packet = BytesIO()
-            can = canvas.Canvas(packet, pagesize=letter)
-            
             # QR code size: 3.5 cm x 3.5 cm as per requirements
             # Convert cm to points: 1 cm = 28.35 points
             qr_size_cm = 3.5
@@ -237,7 +281,7 @@ class PDFService:
             # Use new unified positioning system
             # Анализируем исходный документ с правильным индексом страницы (0-based)
             x_position, y_position, position_info = self._calculate_unified_qr_position(
-                page, qr_size, pdf_content, page_number - 1
+                page, qr_size, pdf_content, page_number - 1, layout_info, pdf_document
             )
             
             # Get page dimensions for audit (используем MediaBox для консистентности)
@@ -264,22 +308,12 @@ class PDFService:
                             base=position_info.get('base', 'UNKNOWN'),
                             final=(x_position, y_position))
             
-            # Draw QR code
-            can.drawImage(qr_image, x_position, y_position, 
-                         width=qr_size, height=qr_size)
-            
-            # Add page number text
-            can.setFont("Helvetica", 8)
-            can.drawString(x_position, y_position - 15, f"Page {page_number}")
-            
-            can.save()
-            
-            # Move to beginning of StringIO buffer
-            packet.seek(0)
-            new_pdf = PdfReader(packet)
-            
-            # Merge the QR code page with the original page
-            page.merge_page(new_pdf.pages[0])
+            # Draw QR code with the page number below it
+            overlay.stamp(
+                page, qr_data, x_position, y_position, qr_size,
+                label=f"Page {page_number}",
+                mode=render_mode or settings.QR_STAMP_RENDER_MODE,
+            )
             
             return page
             
@@ -589,161 +623,343 @@ class PDFService:
             raise
 
     async def add_qr_codes_to_pdf(
-        self, pdf_content: bytes, enovia_id: str, revision: str, base_url_prefix: str
+        self, pdf_content: Union[bytes, SpooledUpload], enovia_id: str, revision: str,
+        base_url_prefix: str, render_mode: Optional[str] = None
     ) -> tuple[bytes, list[dict]]:
         """
         Adds QR codes to each page of a PDF document.
 
         Args:
-            pdf_content: The content of the PDF file as bytes.
+            pdf_content: The content of the PDF file as bytes, or a spooled upload
+                (read through its memory map, without a copy in memory).
             enovia_id: The ENOVIA ID of the document.
             revision: The revision of the document.
             base_url_prefix: The base URL prefix for QR code data.
+            render_mode: QR rendering, "image" or "vector" (settings default if None).
 
         Returns:
             A tuple containing:
             - The processed PDF content with QR codes as bytes.
             - A list of dictionaries, each containing QR code data (page_number, qr_data, hmac_signature).
         """ 
+        # Parsed once for the whole job, shared by positioning and analysis
+        pdf_document = DocumentHandle(pdf_content)
+        pdf_content = pdf_document.pdf_content
+        reserved_memory = None
         try:
             logger.debug("Adding QR codes to PDF", enovia_id=enovia_id, revision=revision, base_url_prefix=base_url_prefix)
-            reader = PdfReader(BytesIO(pdf_content))
-            writer = PdfWriter()
-            qr_codes_data_list = []
+            reader = pdf_document.reader
             logger.info(f"ADD QR CODES TO PDF. Total pages: {len(reader.pages)}")
-            for i, page in enumerate(reader.pages):
-                page_number = i + 1
-                
-                # Calculate position based on page orientation
-                # Get actual page dimensions from the PDF page (используем MediaBox для консистентности)
-                page_width = float(page.mediabox.width)
-                page_height = float(page.mediabox.height)
-                logger.info(f"ADD QR CODES TO PDF. Page {page_number}: width={page_width}, height={page_height}")
-                
-                # Determine page orientation
-                is_landscape = page_width > page_height
-                
-                if not is_landscape:
-                    # For Portrait pages: Skip QR code placement
-                    logger.info(f"ADD QR CODES TO PDF. Portrait page detected - skipping QR code placement (portrait pages not supported)")
-                    writer.add_page(page)  # Add original page without QR code
-                    continue
-                
-                # Generate QR code data with HMAC signature (only for landscape pages)
-                qr_data_payload = {
-                    "enovia_id": enovia_id,
-                    "revision": revision,
-                    "page": page_number,
-                }
-                
-                # Generate QR code data with HMAC signature
-                qr_service = QRService()
-                qr_data, hmac_signature = qr_service.generate_qr_data_with_hmac(
-                    qr_data_payload, base_url_prefix
-                )
-                qr_codes_data_list.append(
-                    {
-                        "page_number": page_number,
-                        "qr_data": qr_data,
-                        "hmac_signature": hmac_signature,
-                    }
-                )
 
-                # Generate QR code image
-                # QR code size: 3.5 cm x 3.5 cm as per requirements
-                # Convert cm to points: 1 cm = 28.35 points
-                qr_size_cm = 3.5
-                qr_size_points = qr_size_cm * 28.35  # 99.225 points
-                
-                qr_image_bytes = qr_service.generate_qr_code_image(
-                    qr_data,
-                    size=int(qr_size_points),  # 3.5 cm in points
-                    border=4,  # Default border
-                    error_correction='M',  # Default error correction
+            # Wait for this job's share of the worker memory budget; the estimate
+            # opens the document with PyMuPDF, so it runs off the event loop too
+            job_memory = await pdf_executor.run(
+                self._estimate_job_memory,
+                pdf_document,
+                self._landscape_page_indexes(reader),
+            )
+            reserved_memory = await pdf_memory_budget.acquire(job_memory)
+
+            # Результаты анализа неизменённых листов (прошлые ревизии) берём из кэша
+            cache_keys = await self._prefetch_layout_cache(pdf_content, pdf_document)
+            # Остальные landscape страницы анализируем параллельно в пуле процессов
+            layouts = await self._analyze_layouts_parallel(
+                pdf_content, self._landscape_page_indexes(reader), cache_keys
+            )
+
+            # Stamping is CPU-bound: run it off the event loop
+            output_pdf, qr_codes_data_list = await pdf_executor.run(
+                self._stamp_pages, pdf_document, enovia_id, revision,
+                base_url_prefix, layouts, render_mode
+            )
+
+            await self._flush_layout_cache()
+
+            return output_pdf, qr_codes_data_list
+        except Exception as e:
+            logger.error("Error adding QR codes to PDF", error=str(e))
+            raise
+        finally:
+            # pdf_executor.run() returns only once the worker thread is done with
+            # the document, also when this coroutine is cancelled
+            if reserved_memory is not None:
+                pdf_memory_budget.release(reserved_memory)
+            pdf_document.close()
+
+    def _stamp_pages(
+        self, pdf_document: DocumentHandle, enovia_id: str, revision: str,
+        base_url_prefix: str, layouts: Dict[int, Dict[str, Any]],
+        render_mode: Optional[str] = None
+    ) -> tuple[bytes, list[dict]]:
+        """
+        Places QR codes on the document pages and writes the output PDF.
+
+        Synchronous and CPU-bound: called through pdf_executor.
+
+        Args:
+            pdf_document: The original document, parsed once for the job.
+            enovia_id: The ENOVIA ID of the document.
+            revision: The revision of the document.
+            base_url_prefix: The base URL prefix for QR code data.
+            layouts: Precomputed page layouts by page index (0-based).
+            render_mode: QR rendering, "image" or "vector" (settings default if None).
+
+        Returns:
+            The processed PDF content and the list of QR code data.
+        """
+        reader = pdf_document.reader
+        pdf_content = pdf_document.pdf_content
+        writer = create_output_writer(reader, pdf_content)
+        overlay = QROverlay(writer)
+        qr_codes_data_list = []
+        for i, page in enumerate(reader.pages):
+            page_number = i + 1
+
+            # Calculate position based on page orientation
+            # Get actual page dimensions from the PDF page
+            # (используем MediaBox для консистентности)
+            page_width = float(page.mediabox.width)
+            page_height = float(page.mediabox.height)
+            logger.info(
+                "ADD QR CODES TO PDF. Page size",
+                page=page_number, width=page_width, height=page_height
+            )
+
+            # Determine page orientation
+            is_landscape = page_width > page_height
+
+            if not is_landscape:
+                # For Portrait pages: Skip QR code placement
+                # Portrait pages are not supported
+                logger.info(
+                    "ADD QR CODES TO PDF. Portrait page skipped", page=page_number
                 )
+                writer.add_page(page)  # Add original page without QR code
+                continue
 
-                # Create a copy of the original page for modification
-                modified_page = deepcopy(page)
-                
-                # Convert PIL Image to ReportLab Image
-                pil_image = Image.open(BytesIO(qr_image_bytes))
-                
-                if is_landscape:
-                    # For Landscape pages: Use intelligent positioning with PDF analysis
-                    logger.info(f"Landscape page detected - using intelligent positioning with PDF analysis")
-                    
-                    try:
-                        # Use intelligent positioning with PDF analysis
-                        # Анализируем исходный документ с правильным индексом страницы
-                        total_pages = len(reader.pages)
-                        logger.info(f"INTELIGENT POSITIONING. ANALYZE PDF. Find Main note stamp for QR code position: src=original, tmp=NO, total_pages={total_pages}, requested_page={page_number}")
-                        x_position, y_position, position_info = self._calculate_unified_qr_position(
-                            page, qr_size_points, pdf_content, page_number - 1
-                        )
-                        logger.info(f"INTELIGENT POSITIONING. Landscape page detected - QR positioned intelligently at ({x_position:.1f}, {y_position:.1f}), position_info={position_info}")
-                    except Exception as e:
-                        logger.warning(f"Intelligent positioning failed, using fallback: {e}")
-                        # Fallback: используем правильный якорь bottom-right
-                        # Используем MediaBox границы для landscape
-                        x0 = 0.0  # Предполагаем x0=0 для landscape
-                        y0 = 0.0  # Предполагаем y0=0 для landscape
-                        x1 = page_width
-                        y1 = page_height
-                        
-                        base_x, base_y = self.compute_anchor_xy(
-                            x0=x0, y0=y0, x1=x1, y1=y1,
-                            qr_w=qr_size_points,
-                            qr_h=qr_size_points,
-                            margin_pt=settings.QR_MARGIN_PT,
-                            stamp_clearance_pt=settings.QR_STAMP_CLEARANCE_PT,
-                            rotation=0
+            # Generate QR code data with HMAC signature (only for landscape pages)
+            qr_data_payload = {
+                "enovia_id": enovia_id,
+                "revision": revision,
+                "page": page_number,
+            }
+
+            # Generate QR code data with HMAC signature
+            qr_service = QRService()
+            qr_data, hmac_signature = qr_service.generate_qr_data_with_hmac(
+                qr_data_payload, base_url_prefix
+            )
+            qr_codes_data_list.append(
+                {
+                    "page_number": page_number,
+                    "qr_data": qr_data,
+                    "hmac_signature": hmac_signature,
+                }
+            )
+
+            # Generate QR code image
+            # QR code size: 3.5 cm x 3.5 cm as per requirements
+            # Convert cm to points: 1 cm = 28.35 points
+            qr_size_cm = 3.5
+            qr_size_points = qr_size_cm * 28.35  # 99.225 points
+
+            if is_landscape:
+                # For Landscape pages: Use intelligent positioning with PDF analysis
+                logger.info("Landscape page - intelligent positioning with analysis")
+                # MediaBox bounds for the QR FINAL log below
+                x0, y0, x1, y1 = (float(v) for v in page.mediabox)
+
+                try:
+                    # Use intelligent positioning with PDF analysis
+                    # Анализируем исходный документ с правильным индексом страницы
+                    total_pages = len(reader.pages)
+                    logger.info(
+                        "INTELIGENT POSITIONING. Find main stamp for QR position",
+                        src="original", total_pages=total_pages,
+                        requested_page=page_number
+                    )
+                    x_position, y_position, position_info = (
+                        self._calculate_unified_qr_position(
+                            page, qr_size_points, pdf_content, page_number - 1,
+                            layouts.get(i), pdf_document
                         )
-                        
-                        x_position = base_x
-                        y_position = base_y
-                        
-                        logger.info(f"Landscape page detected - QR positioned at bottom-right (fallback): x={x_position:.1f}, y={y_position:.1f}")
-
-                    # QR FINAL: page=i, box=media, rot=0, x0=...,y0=...,x1=...,y1=..., qr=(w=...,h=...), margin=..., clearance=..., stamp_bbox=(sx0,sy0,sx1,sy1) FOUND|NOT_FOUND, base=(x_anchor,y_anchor), final=(x,y)
-                    logger.info(f"QR FINAL: page={page_number}, box=media, rot=0, x0={x0:.1f},y0={y0:.1f},x1={x1:.1f},y1={y1:.1f}, qr=(w={qr_size_points:.1f},h={qr_size_points:.1f}), margin={settings.QR_MARGIN_PT:.1f}, clearance={settings.QR_STAMP_CLEARANCE_PT:.1f}, stamp_bbox=(sx0,sy0,sx1,sy1) FOUND|NOT_FOUND, base=(x_anchor,y_anchor), final=(x,y)")
-
-                # Save PIL image to temporary file for ReportLab
-                with tempfile.NamedTemporaryFile(suffix='.png', delete=False) as temp_img:
-                    pil_image.save(temp_img.name, format='PNG')
-                    
-                    # Create a new PDF with the QR code using the same page size as original
-                    qr_pdf_buffer = BytesIO()
-                    c = canvas.Canvas(qr_pdf_buffer, pagesize=(page_width, page_height))
-                    
-                    c.drawImage(
-                        temp_img.name,
-                        x_position,  # Draw at calculated position
-                        y_position,  # Draw at calculated position
-                        width=qr_size_points,
-                        height=qr_size_points,
-                        mask="auto",
                     )
-                    
-                    # Clean up temp file
-                    os.unlink(temp_img.name)
-                c.save()
+                    logger.info(
+                        "INTELIGENT POSITIONING. QR positioned intelligently",
+                        x=round(x_position, 1), y=round(y_position, 1),
+                        position_info=position_info
+                    )
+                except Exception as e:
+                    logger.warning(
+                        "Intelligent positioning failed, using fallback", error=str(e)
+                    )
+                    # Fallback: используем правильный якорь bottom-right
+                    # Используем MediaBox границы для landscape
+                    x0 = 0.0  # Предполагаем x0=0 для landscape
+                    y0 = 0.0  # Предполагаем y0=0 для landscape
+                    x1 = page_width
+                    y1 = page_height
+
+                    base_x, base_y = self.compute_anchor_xy(
+                        x0=x0, y0=y0, x1=x1, y1=y1,
+                        qr_w=qr_size_points,
+                        qr_h=qr_size_points,
+                        margin_pt=settings.QR_MARGIN_PT,
+                        stamp_clearance_pt=settings.QR_STAMP_CLEARANCE_PT,
+                        rotation=0
+                    )
+
+                    x_position = base_x
+                    y_position = base_y
+
+                    logger.info(
+                        "Landscape page - QR positioned at bottom-right (fallback)",
+                        x=round(x_position, 1), y=round(y_position, 1)
+                    )
 
-                qr_pdf_buffer.seek(0)
-                qr_pdf_reader = PdfReader(qr_pdf_buffer)
-                qr_page = qr_pdf_reader.pages[0]
+                logger.info(
+                    "QR FINAL",
+                    page=page_number, box="media", rot=0,
+                    x0=round(x0, 1), y0=round(y0, 1), x1=round(x1, 1), y1=round(y1, 1),
+                    qr_size=round(qr_size_points, 1),
+                    margin=settings.QR_MARGIN_PT,
+                    clearance=settings.QR_STAMP_CLEARANCE_PT,
+                    x=round(x_position, 1), y=round(y_position, 1)
+                )
+
+            # Draw the QR code straight into the page content stream
+            writer_page = writer.add_page(page)
+            overlay.stamp(
+                writer_page, qr_data, x_position, y_position, qr_size_points,
+                error_correction='M', border=4,
+                mode=render_mode or settings.QR_STAMP_RENDER_MODE,
+            )
 
-                # Merge the QR code page onto the modified page
-                modified_page.merge_page(qr_page)
-                writer.add_page(modified_page)
+        output_pdf_buffer = BytesIO()
+        writer.write(output_pdf_buffer)
+        output_pdf_buffer.seek(0)
 
-            output_pdf_buffer = BytesIO()
-            writer.write(output_pdf_buffer)
-            output_pdf_buffer.seek(0)
+        return output_pdf_buffer.getvalue(), qr_codes_data_list
 
-            return output_pdf_buffer.getvalue(), qr_codes_data_list
+    async def _prefetch_layout_cache(
+        self, pdf_content: bytes, pdf_document: Optional[DocumentHandle] = None
+    ) -> List[str]:
+        """
+        Loads cached layout analysis results of the document pages from Redis.
+
+        Pages are keyed by a hash of their content, so sheets that did not change
+        between revisions are not analyzed again. Page keys are read from the
+        job's already opened document when it is given.
+
+        Returns:
+            Cache keys of the document pages (empty if the cache is disabled).
+        """
+        cache = self.pdf_analyzer.layout_cache
+        if cache is None:
+            return []
+
+        try:
+            # The PyMuPDF document opens lazily, so it is resolved in the worker
+            keys = await pdf_executor.run(
+                lambda: cache.document_keys(
+                    pdf_document.doc if pdf_document else pdf_content
+                )
+            )
         except Exception as e:
-            logger.error(f"Error adding QR codes to PDF", error=str(e))
-            raise
+            logger.warning("Layout cache keys could not be computed", error=str(e))
+            return []
+
+        try:
+            loaded = await cache.prefetch(keys)
+            logger.info("Layout cache prefetched", pages=len(keys), loaded=loaded)
+        except Exception as e:
+            logger.warning("Layout cache prefetch failed", error=str(e))
+        return keys
+
+    def _estimate_job_memory(
+        self, pdf_document: DocumentHandle, page_indexes: List[int]
+    ) -> int:
+        """
+        Estimates the peak memory of a job from the boxes of its analyzed pages.
+
+        Pages analyzed in the process pool are rasterized concurrently, one per
+        pool worker; otherwise one page raster is alive at a time.
+        """
+        concurrent_pages = 1
+        if settings.LAYOUT_POOL_ENABLED and layout_pool.should_use(len(page_indexes)):
+            concurrent_pages = layout_pool.max_workers
+        try:
+            return estimate_job_memory(
+                pdf_document.doc, page_indexes, concurrent_pages,
+                document_size=len(pdf_document.pdf_content)
+            )
+        except Exception as e:
+            # An unreadable document fails in the job itself
+            logger.warning("Job memory could not be estimated", error=str(e))
+            return 0
+
+    @staticmethod
+    def _landscape_page_indexes(reader: PdfReader) -> List[int]:
+        """Indexes (0-based) of the pages that get a QR code."""
+        return [
+            i for i, page in enumerate(reader.pages)
+            if float(page.mediabox.width) > float(page.mediabox.height)
+        ]
+
+    async def _analyze_layouts_parallel(
+        self, pdf_content: bytes, page_indexes: List[int], cache_keys: List[str] = None
+    ) -> Dict[int, Dict[str, Any]]:
+        """
+        Analyzes page layouts in the process pool.
+
+        Pages already in the layout cache are skipped (they are answered from the
+        cache in-process). New results are added to the cache. Documents with
+        few pages, or any pool failure, leave analysis to the in-process path.
+
+        Args:
+            pdf_content: PDF content as bytes.
+            page_indexes: Pages to analyze (0-based).
+            cache_keys: Layout cache keys of all document pages.
+
+        Returns:
+            Layouts by page index (0-based); missing pages are analyzed in-process.
+        """
+        if not settings.LAYOUT_POOL_ENABLED:
+            return {}
+
+        cache = self.pdf_analyzer.layout_cache
+        if cache is not None and cache_keys:
+            page_indexes = [i for i in page_indexes if cache_keys[i] not in cache]
+
+        if not layout_pool.should_use(len(page_indexes)):
+            return {}
+
+        try:
+            layouts = await layout_pool.analyze(pdf_content, page_indexes)
+        except Exception as e:
+            logger.warning(
+                "Parallel layout analysis failed, analyzing in-process", error=str(e)
+            )
+            return {}
+
+        if cache is not None and cache_keys:
+            for i, layout in layouts.items():
+                self.pdf_analyzer.cache_layout(cache_keys[i], layout)
+
+        # Empty results (analysis errors) are retried in-process
+        return {i: layout for i, layout in layouts.items() if layout}
+
+    async def _flush_layout_cache(self) -> None:
+        """Writes layout analysis results computed for this document to Redis."""
+        cache = self.pdf_analyzer.layout_cache
+        if cache is None:
+            return
+
+        try:
+            written = await cache.flush()
+            logger.info("Layout cache flushed", written=written)
+        except Exception as e:
+            logger.warning("Layout cache flush failed", error=str(e))
 
     def compute_anchor_xy(self, x0: float, y0: float, x1: float, y1: float, 
                          qr_w: float, qr_h: float, margin_pt: float, 
@@ -813,7 +1029,11 @@ class PDFService:
             y = max(0.0, min(0.0 + margin_pt + stamp_clearance_pt, 100.0 - qr_h))
             return x, y
 
-    def _calculate_unified_qr_position(self, page, qr_size: float, pdf_content: bytes, page_number: int) -> tuple[float, float, dict]:
+    def _calculate_unified_qr_position(
+        self, page, qr_size: float, pdf_content: bytes, page_number: int,
+        layout_info: Optional[Dict[str, Any]] = None,
+        pdf_document: Optional[DocumentHandle] = None
+    ) -> tuple[float, float, dict]:
         """
         Вычисляет позицию QR кода с использованием единой системы позиционирования
         
@@ -822,14 +1042,49 @@ class PDFService:
             qr_size: Размер QR кода в точках
             pdf_content_or_path: Содержимое PDF (bytes)
             page_number: Номер страницы (0-based)
+            layout_info: Готовый результат анализа макета (из пула процессов)
+            pdf_document: Документ задания, разобранный один раз (если None,
+                документ открывается на время вызова)
             
         Returns:
             Tuple (x, y) координаты в PDF-СК
         """
+        if pdf_document is not None:
+            return self._unified_qr_position(
+                page, qr_size, pdf_content, page_number, layout_info, pdf_document
+            )
+
+        pdf_document = DocumentHandle(pdf_content)
         try:
-            reader = PdfReader(BytesIO(pdf_content))
+            return self._unified_qr_position(
+                page, qr_size, pdf_content, page_number, layout_info, pdf_document
+            )
+        finally:
+            pdf_document.close()
 
-            total_pages = len(reader.pages)
+    def _page_layout_info(
+        self, pdf_content: bytes, page_number: int,
+        layout_info: Optional[Dict[str, Any]], pdf_document: DocumentHandle
+    ) -> Optional[Dict[str, Any]]:
+        """Готовый результат анализа макета или анализ страницы на месте."""
+        if layout_info is not None:
+            return layout_info
+        logger.info(
+            "INTELIGENT POSITIONING. _Calculate Unified QR position. "
+            "Call analyze_page_layout",
+            page_number=page_number
+        )
+        return self.pdf_analyzer.analyze_page_layout(
+            pdf_content, page_number, document=pdf_document
+        )
+
+    def _unified_qr_position(
+        self, page, qr_size: float, pdf_content: bytes, page_number: int,
+        layout_info: Optional[Dict[str, Any]], pdf_document: DocumentHandle
+    ) -> tuple[float, float, dict]:
+        """Тело _calculate_unified_qr_position для уже открытого документа."""
+        try:
+            total_pages = pdf_document.page_count
             logger.info(f"INTELIGENT POSITIONING. _Calculate Unified QR position: src=original, tmp=NO, total_pages={total_pages}, requested_page={page_number}")
             # Получаем границы активного бокса
             x0 = float(page.mediabox[0])  # left
@@ -837,7 +1092,6 @@ class PDFService:
             x1 = float(page.mediabox[2])  # right
             y1 = float(page.mediabox[3])  # top
             
-            layout_info = None
             rotation = 0
             stamp_top_edge = None
             dx, dy = 0.0, 0.0
@@ -853,9 +1107,9 @@ class PDFService:
             )
 
             try:
-                logger.info(f"INTELIGENT POSITIONING. _Calculate Unified QR position. Call analyze_page_layout to calculate Unified QR position: page_number={page_number}")
-                layout_info = self.pdf_analyzer.analyze_page_layout(pdf_content, page_number)
-
+                layout_info = self._page_layout_info(
+                    pdf_content, page_number, layout_info, pdf_document
+                )
                 if layout_info:
                     coordinate_info = layout_info.get("coordinate_info", {})
                     active_box = coordinate_info.get("active_box", {})
@@ -886,12 +1140,17 @@ class PDFService:
                     f"INTELIGENT POSITIONING. Calculate Unified QR position: base_x={base_x}, base_y={base_y}, rotation={rotation}, stamp_top_edge={stamp_top_edge}"
                 )
 
-                # Вычисляем дельту эвристик (если доступно)
-                try:
-                    dx, dy = self.pdf_analyzer.compute_heuristics_delta(pdf_content, page_number)
-                except Exception as e:
-                    debug_logger.warning("Could not compute heuristics delta", error=str(e))
-                    dx, dy = 0.0, 0.0
+                # Вычисляем дельту эвристик (если включено)
+                if settings.QR_HEURISTICS_DELTA:
+                    try:
+                        dx, dy = self.pdf_analyzer.compute_heuristics_delta(
+                            pdf_content, page_number, document=pdf_document
+                        )
+                    except Exception as e:
+                        debug_logger.warning(
+                            "Could not compute heuristics delta", error=str(e)
+                        )
+                        dx, dy = 0.0, 0.0
             except Exception as e:
                 debug_logger.error("❌ INTELIGENT POSITIONING. Error calculating heuristics delta", 
                                  error=str(e), page_number=page_number)
@@ -11,7 +11,7 @@ from typing import Dict, Any, List, Optional, Tuple
 
 import structlog
 from PIL import Image
-from PyPDF2 import PdfReader, PdfWriter
+from PyPDF2 import PdfReader
 from reportlab.lib.pagesizes import letter, A4
 from reportlab.pdfgen import canvas
 from sqlalchemy.orm import Session
@@ -22,7 +22,9 @@ from app.models.document import Document
 from app.models.qr_code import QRCode
 from app.services.document_service import DocumentService
 from app.services.qr_service import QRService
+from app.utils.incremental_pdf import create_output_writer
 from app.utils.pdf_analyzer_optimized import OptimizedPDFAnalyzer
+from app.utils.upload_spool import pdf_stream
 
 logger = structlog.get_logger()
 debug_logger = DebugLogger(__name__)
@@ -69,7 +71,7 @@ class OptimizedPDFService:
                             enovia_id=enovia_id, title=title, revision=revision)
             
             # Анализируем PDF без создания временных файлов
-            pdf_reader = PdfReader(BytesIO(pdf_content))
+            pdf_reader = PdfReader(pdf_stream(pdf_content))
             total_pages = len(pdf_reader.pages)
             
             debug_logger.info("PDF analysis completed", 
@@ -126,7 +128,7 @@ class OptimizedPDFService:
                     processed_pages.append(pdf_reader.pages[page_number])
             
             # Создаем итоговый PDF
-            output_pdf = self._create_output_pdf(processed_pages)
+            output_pdf = self._create_output_pdf(processed_pages, pdf_reader, pdf_content)
             
             # Сохраняем результат
             output_filename = f"{enovia_id}_rev{revision}_with_qr.pdf"
@@ -289,13 +291,16 @@ class OptimizedPDFService:
             # Fallback позиция
             return page_width - qr_size - settings.QR_MARGIN_PT, settings.QR_MARGIN_PT
 
-    def _create_output_pdf(self, pages: List[Any]) -> bytes:
+    def _create_output_pdf(self, pages: List[Any], pdf_reader: PdfReader, pdf_content: bytes) -> bytes:
         """
         Создание итогового PDF из обработанных страниц
+
+        В режиме PDF_OUTPUT_MODE=incremental к исходному pdf_content
+        дописываются только страницы с QR кодами.
         """
         try:
             output_buffer = BytesIO()
-            pdf_writer = PdfWriter()
+            pdf_writer = create_output_writer(pdf_reader, pdf_content)
             
             for page in pages:
                 pdf_writer.add_page(page)
@@ -312,7 +317,7 @@ class OptimizedPDFService:
         Оптимизированное получение информации о PDF без создания временных файлов
         """
         try:
-            pdf_reader = PdfReader(BytesIO(pdf_content))
+            pdf_reader = PdfReader(pdf_stream(pdf_content))
             
             info = {
                 "total_pages": len(pdf_reader.pages),
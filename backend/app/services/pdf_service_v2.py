@@ -7,7 +7,7 @@ import structlog
 import time
 from typing import Dict, Any, List, Optional, Tuple
 from io import BytesIO
-from PyPDF2 import PdfReader, PdfWriter
+from PyPDF2 import PdfReader
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import letter, A4
 from reportlab.lib.units import cm
@@ -16,8 +16,12 @@ from reportlab.graphics.shapes import Drawing, Rect
 from reportlab.lib.colors import black, white
 
 from app.core.config import settings
+from app.utils.incremental_pdf import create_output_writer
+from app.utils.page_raster import DOCUMENT_COPIES, estimate_job_memory
 from app.utils.pdf_analyzer_v2 import PDFAnalyzerV2
 from app.utils.pdf_exceptions import PDFAnalysisError, PDFFileError
+from app.utils.qr_overlay import QROverlay
+from app.utils.upload_spool import open_pdf_document, pdf_stream
 from app.services.qr_service import QRService
 
 logger = structlog.get_logger()
@@ -58,13 +62,13 @@ class PDFServiceV2:
                 file_size=len(pdf_content)
             )
         
-        if not pdf_content.startswith(b'%PDF'):
+        if pdf_content[:4] != b'%PDF':
             raise PDFFileError("Invalid PDF file format")
     
     def _get_page_info(self, pdf_content: bytes) -> Dict[str, Any]:
         """Получение информации о страницах PDF"""
         try:
-            doc = PdfReader(BytesIO(pdf_content))
+            doc = PdfReader(pdf_stream(pdf_content))
             pages_info = []
             
             for i, page in enumerate(doc.pages):
@@ -85,110 +89,56 @@ class PDFServiceV2:
         except Exception as e:
             raise PDFAnalysisError(f"Failed to get page info: {str(e)}")
     
-    def _generate_qr_image_data(self, qr_data: str, size_cm: float = 3.5) -> bytes:
-        """Генерация QR кода в виде PNG данных"""
-        try:
-            qr_image = self.qr_service.generate_qr_code(qr_data, size_cm=size_cm)
-            
-            # Конвертируем PIL Image в PNG bytes
-            img_buffer = BytesIO()
-            qr_image.save(img_buffer, format='PNG')
-            img_buffer.seek(0)
-            
-            return img_buffer.getvalue()
-            
-        except Exception as e:
-            self.logger.error("Failed to generate QR code", error=str(e), qr_data=qr_data)
-            raise PDFAnalysisError(f"Failed to generate QR code: {str(e)}")
-    
-    def _add_qr_to_page_memory(self, pdf_content: bytes, page_number: int, 
-                              qr_data: str, position: Dict[str, float]) -> bytes:
+    def _stamp_pages(self, pdf_content: bytes, qr_positions: List[Dict[str, Any]],
+                     render_mode: Optional[str] = None) -> bytes:
         """
-        Добавление QR кода к странице PDF в памяти
+        Добавление QR кодов ко всем страницам за один проход
+        
+        Документ разбирается один раз, QR коды вписываются в потоки содержимого
+        страниц по мере копирования в writer, результат сериализуется один раз.
+        Стоимость линейна по числу страниц.
         """
-        try:
-            # Генерируем QR код
-            qr_image_data = self._generate_qr_image_data(qr_data, size_cm=3.5)
-            
-            # Открываем PDF
-            doc = PdfReader(BytesIO(pdf_content))
-            if page_number >= len(doc.pages):
-                raise PDFAnalysisError(f"Page {page_number} out of range")
-            
-            page = doc.pages[page_number]
-            page_width = float(page.mediabox.width)
-            page_height = float(page.mediabox.height)
-            
-            # Создаем новый PDF с QR кодом
-            output_buffer = BytesIO()
-            writer = PdfWriter()
-            
-            # Копируем все страницы
-            for i, src_page in enumerate(doc.pages):
-                if i == page_number:
-                    # Добавляем QR код к целевой странице
-                    new_page = self._add_qr_to_single_page(src_page, qr_image_data, position)
-                    writer.add_page(new_page)
-                else:
-                    writer.add_page(src_page)
-            
-            # Записываем результат
-            writer.write(output_buffer)
-            output_buffer.seek(0)
-            
-            return output_buffer.getvalue()
-            
-        except Exception as e:
-            self.logger.error("Failed to add QR to page", 
-                            error=str(e), page_number=page_number)
-            raise PDFAnalysisError(f"Failed to add QR to page: {str(e)}")
+        doc = PdfReader(pdf_stream(pdf_content))
+        writer = create_output_writer(doc, pdf_content)
+        overlay = QROverlay(writer)
+        
+        qr_by_page = {qr_info["page_number"]: qr_info for qr_info in qr_positions}
+        out_of_range = [n for n in qr_by_page if n >= len(doc.pages)]
+        if out_of_range:
+            raise PDFAnalysisError(f"Page {out_of_range[0]} out of range")
+        
+        for i, page in enumerate(doc.pages):
+            writer_page = writer.add_page(page)
+            qr_info = qr_by_page.get(i)
+            if qr_info is not None:
+                try:
+                    self._add_qr_to_single_page(
+                        writer_page, overlay, qr_info["qr_data"], qr_info["position"],
+                        render_mode
+                    )
+                except Exception as e:
+                    self.logger.error("Failed to add QR to page", 
+                                    error=str(e), page_number=i)
+                    raise PDFAnalysisError(f"Failed to add QR to page: {str(e)}")
+        
+        output_buffer = BytesIO()
+        writer.write(output_buffer)
+        return output_buffer.getvalue()
     
-    def _add_qr_to_single_page(self, page, qr_image_data: bytes, 
-                              position: Dict[str, float]) -> Any:
+    def _add_qr_to_single_page(self, page, overlay: QROverlay, qr_data: str,
+                              position: Dict[str, float],
+                              render_mode: Optional[str] = None) -> Any:
         """
-        Добавление QR кода к одной странице
+        Добавление QR кода к одной странице writer
+        
+        QR код рисуется как изображение (XObject) прямо в содержимом страницы,
+        без промежуточного PDF и merge_page.
         """
         try:
-            from reportlab.pdfgen import canvas
-            from reportlab.lib.pagesizes import letter
-            from reportlab.lib.units import cm
-            from reportlab.graphics import renderPDF
-            from reportlab.graphics.shapes import Drawing, Rect
-            from reportlab.lib.colors import black, white
-            from PIL import Image
-            import io
-            
-            # Создаем временный PDF с QR кодом
-            qr_buffer = BytesIO()
-            c = canvas.Canvas(qr_buffer, pagesize=letter)
-            
-            # Получаем размеры страницы
-            page_width = float(page.mediabox.width)
-            page_height = float(page.mediabox.height)
-            
-            # Создаем изображение QR кода
-            qr_image = Image.open(io.BytesIO(qr_image_data))
-            
-            # Сохраняем QR код как временный файл для ReportLab
-            temp_qr_buffer = BytesIO()
-            qr_image.save(temp_qr_buffer, format='PNG')
-            temp_qr_buffer.seek(0)
-            
-            # Добавляем QR код на страницу
-            c.drawImage(temp_qr_buffer, 
-                       position["x"], position["y"],
-                       width=position["width"], height=position["height"])
-            
-            c.save()
-            qr_buffer.seek(0)
-            
-            # Создаем PDF с QR кодом
-            qr_pdf = PdfReader(qr_buffer)
-            qr_page = qr_pdf.pages[0]
-            
-            # Объединяем страницы
-            page.merge_page(qr_page)
-            
+            overlay.stamp(
+                page, qr_data, position["x"], position["y"], position["width"],
+                mode=render_mode or settings.QR_STAMP_RENDER_MODE,
+            )
             return page
             
         except Exception as e:
@@ -239,9 +189,13 @@ class PDFServiceV2:
             self.logger.error("Failed to calculate QR positions", error=str(e))
             raise PDFAnalysisError(f"Failed to calculate QR positions: {str(e)}")
     
-    def add_qr_codes_to_pdf(self, pdf_content: bytes, qr_data_list: List[str]) -> bytes:
+    def add_qr_codes_to_pdf(self, pdf_content: bytes, qr_data_list: List[str],
+                            render_mode: Optional[str] = None) -> bytes:
         """
         Добавление QR кодов к PDF документу
+        
+        render_mode: способ отрисовки QR кода, "image" или "vector"
+        (по умолчанию settings.QR_STAMP_RENDER_MODE)
         """
         start_time = time.time()
         operation_success = False
@@ -269,19 +223,11 @@ class PDFServiceV2:
             # Рассчитываем позиции QR кодов
             qr_positions = self._calculate_qr_positions(pdf_content, qr_data_list)
             
-            # Добавляем QR коды к страницам
-            result_pdf_content = pdf_content
+            # Добавляем QR коды ко всем страницам за один проход
+            result_pdf_content = self._stamp_pages(pdf_content, qr_positions, render_mode)
             
-            for qr_info in qr_positions:
-                result_pdf_content = self._add_qr_to_page_memory(
-                    result_pdf_content,
-                    qr_info["page_number"],
-                    qr_info["qr_data"],
-                    qr_info["position"]
-                )
-                
-                self.service_stats["qr_codes_generated"] += 1
-                self.service_stats["pages_processed"] += 1
+            self.service_stats["qr_codes_generated"] += len(qr_positions)
+            self.service_stats["pages_processed"] += len(qr_positions)
             
             operation_success = True
             operation_time = time.time() - start_time
@@ -316,6 +262,23 @@ class PDFServiceV2:
                     (current_avg * (total_successful - 1) + operation_time) / total_successful
                 )
     
+    def estimate_job_memory(self, pdf_content: bytes, page_numbers: Optional[List[int]] = None) -> int:
+        """
+        Оценка пиковой памяти задания по боксам страниц
+
+        Страницы обрабатываются по одной, поэтому учитывается самый большой
+        растр. Повреждённый документ оценивается по размеру, ошибку вернёт
+        само задание.
+        """
+        scale = self.pdf_analyzer.analysis_config["image_scale_factor"]
+        try:
+            with open_pdf_document(pdf_content) as doc:
+                return estimate_job_memory(doc, page_numbers, scale=scale,
+                                           document_size=len(pdf_content))
+        except Exception as e:
+            self.logger.warning("Failed to estimate job memory", error=str(e))
+            return len(pdf_content) * DOCUMENT_COPIES
+    
     def analyze_pdf_layout(self, pdf_content: bytes, page_number: int = 0) -> Dict[str, Any]:
         """
         Анализ макета PDF страницы
@@ -0,0 +1,150 @@
+"""
+Cache of authenticated principals (immutable user snapshots with roles)
+"""
+
+import uuid
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Optional, Tuple
+
+import structlog
+
+from app.core.config import settings
+from app.models.user import User
+from app.services.tiered_cache import TieredCache
+
+logger = structlog.get_logger()
+
+
+@dataclass(frozen=True)
+class RoleSnapshot:
+    """Role of a principal"""
+
+    id: int
+    name: str
+    permissions: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class Principal:
+    """
+    Identity of an authenticated request
+
+    Read-only stand-in for the User row with the attributes endpoints use
+    (id, username, email, is_active, is_superuser, roles). It is not attached
+    to a session; load the User when it has to be modified.
+    """
+
+    id: uuid.UUID
+    username: str
+    email: str
+    full_name: Optional[str] = None
+    is_active: bool = True
+    is_superuser: bool = False
+    roles: Tuple[RoleSnapshot, ...] = ()
+
+    @classmethod
+    def from_user(cls, user: User) -> "Principal":
+        return cls(
+            id=user.id,
+            username=user.username,
+            email=user.email,
+            full_name=user.full_name,
+            is_active=bool(user.is_active),
+            is_superuser=bool(user.is_superuser),
+            roles=tuple(
+                RoleSnapshot(id=role.id, name=role.name, permissions=role.permissions)
+                for role in user.roles
+            ),
+        )
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Principal":
+        fields = {
+            key: value for key, value in data.items() if key not in ("id", "roles")
+        }
+        return cls(
+            id=uuid.UUID(str(data["id"])),
+            roles=tuple(RoleSnapshot(**role) for role in data.get("roles", ())),
+            **fields,
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data["id"] = str(self.id)
+        return data
+
+
+def principal_tag(username: str) -> str:
+    """Tag of the cached principal of a user"""
+    return f"user:{username}"
+
+
+class PrincipalCache:
+    """
+    Short-TTL cache of principals keyed by token subject (username)
+
+    Snapshots live in the two-tier cache (process memory + Redis), so
+    authenticated requests resolve their identity without a database query.
+    Tokens carry no jti, so entries are per user rather than per token; changes
+    of a user (activation, deactivation, password) invalidate the user's tag in
+    every worker, and the TTL bounds staleness of anything else (roles).
+    """
+
+    def __init__(self, ttl_seconds: Optional[int] = None):
+        self.enabled = settings.PRINCIPAL_CACHE_ENABLED
+        self.ttl_seconds = ttl_seconds or settings.PRINCIPAL_CACHE_TTL_SECONDS
+        self.cache = TieredCache("principal", ttl_seconds=self.ttl_seconds)
+
+    @staticmethod
+    def key(subject: str) -> str:
+        return f"principal:{subject}"
+
+    async def get(self, subject: str) -> Optional[Principal]:
+        """Cached principal of a token subject or None"""
+        if not self.enabled or not subject:
+            return None
+        data = await self.cache.get(self.key(subject), tags=[principal_tag(subject)])
+        if not isinstance(data, dict):
+            return None
+        try:
+            return Principal.from_dict(data)
+        except (KeyError, TypeError, ValueError) as e:
+            logger.warning("Malformed cached principal", subject=subject, error=str(e))
+            return None
+
+    async def put(self, subject: str, user: User) -> Principal:
+        """Snapshot a user loaded from the database and cache it"""
+        principal = Principal.from_user(user)
+        if self.enabled and subject:
+            await self.cache.set(
+                self.key(subject),
+                principal.to_dict(),
+                ttl=self.ttl_seconds,
+                tags=[principal_tag(subject)],
+            )
+        return principal
+
+    async def invalidate_user(self, username: str) -> None:
+        """Drop the cached principal of a user in all workers"""
+        if not self.enabled:
+            return
+        try:
+            await self.cache.invalidate_tags([principal_tag(username)])
+        except Exception as e:
+            logger.error(
+                "Failed to invalidate cached principal", username=username, error=str(e)
+            )
+
+    def clear(self) -> None:
+        """Drop principals cached in this process"""
+        self.cache.local.clear()
+
+    async def start(self) -> None:
+        await self.cache.start()
+
+    async def stop(self) -> None:
+        await self.cache.stop()
+
+
+# Global principal cache instance
+principal_cache = PrincipalCache()
@@ -3,6 +3,7 @@ Service for QR code generation
 """
 
 import qrcode
+from qrcode.image.svg import SvgPathImage
 import hmac
 import hashlib
 import json
@@ -13,6 +14,7 @@ import structlog
 
 from app.core.config import settings
 from app.core.logging import DebugLogger, log_function_call, log_function_result
+from app.utils.qr_overlay import qr_vector_pdf
 
 logger = structlog.get_logger()
 debug_logger = DebugLogger(__name__)
@@ -263,21 +265,24 @@ class QRService:
         size: int = None,
         border: int = None,
         error_correction: str = None,
+        output_format: str = "png",
     ) -> bytes:
         """
         Generates a QR code image for the given data.
 
         Args:
             data: The data to encode in the QR code.
-            size: The size of the QR code in pixels.
+            size: The size of the QR code in pixels (in points for "pdf").
             border: The border size around the QR code.
             error_correction: Error correction level (L, M, Q, H).
+            output_format: "png" (raster), "svg" or "pdf" (vector, module
+                runs drawn as filled rectangles, no raster round trip).
 
         Returns:
             The QR code image as bytes.
         """
         try:
-            logger.debug("Generating QR code image", data=data, size=size, border=border, error_correction=error_correction)
+            logger.debug("Generating QR code image", data=data, size=size, border=border, error_correction=error_correction, output_format=output_format)
             # Use defaults if not provided
             if size is None:
                 size = self.qr_size
@@ -297,6 +302,11 @@ class QRService:
             else:
                 error_correction_level = qrcode.constants.ERROR_CORRECT_M
 
+            if output_format == "pdf":
+                return qr_vector_pdf(data, float(size), error_correction, border)
+            if output_format not in ("png", "svg"):
+                raise ValueError(f"Unsupported QR code format: {output_format}")
+
             qr = qrcode.QRCode(
                 version=None,
                 error_correction=error_correction_level,
@@ -306,6 +316,9 @@ class QRService:
             qr.add_data(data)
             qr.make(fit=True)
 
+            if output_format == "svg":
+                return qr.make_image(image_factory=SvgPathImage).to_string()
+
             img = qr.make_image(fill_color="black", back_color="white")
 
             img_buffer = BytesIO()
@@ -4,12 +4,12 @@ Settings service for managing system configuration
 
 import json
 from typing import Dict, Any
-from sqlalchemy.orm import Session
-from app.core.database import get_db
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.settings import SystemSettings
 
 class SettingsService:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
 
     async def get_settings(self) -> Dict[str, Any]:
@@ -17,7 +17,7 @@ class SettingsService:
         Get current system settings
         """
         # Получаем настройки из базы данных
-        settings = self.db.query(SystemSettings).first()
+        settings = await self.db.scalar(select(SystemSettings).limit(1))
         
         if not settings:
             # Если настроек нет, создаем дефолтные
@@ -26,8 +26,8 @@ class SettingsService:
                 settings_data=json.dumps(default_settings)
             )
             self.db.add(settings)
-            self.db.commit()
-            self.db.refresh(settings)
+            await self.db.commit()
+            await self.db.refresh(settings)
         
         # Парсим JSON данные
         settings_data = json.loads(settings.settings_data) if settings.settings_data else {}
@@ -46,7 +46,7 @@ class SettingsService:
         validated_settings = self._validate_settings(new_settings)
         
         # Получаем существующие настройки
-        settings = self.db.query(SystemSettings).first()
+        settings = await self.db.scalar(select(SystemSettings).limit(1))
         
         if settings:
             # Обновляем существующие настройки
@@ -58,8 +58,8 @@ class SettingsService:
             )
             self.db.add(settings)
         
-        self.db.commit()
-        self.db.refresh(settings)
+        await self.db.commit()
+        await self.db.refresh(settings)
         
         return validated_settings
 
@@ -0,0 +1,412 @@
+"""
+Asynchronous QR stamping jobs with progress polling and idempotent submission
+"""
+
+import asyncio
+import hashlib
+import time
+import uuid
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import structlog
+
+from app.core.config import settings
+from app.core.database import get_async_session_factory
+from app.core.executor import ExecutorOverloadedError
+from app.services.cache_service import cache_service
+from app.services.document_service import DocumentService
+from app.services.metrics_service import metrics_service
+from app.services.pdf_service import pdf_service
+from app.services.qr_service import QRService
+from app.utils.upload_spool import SpooledUpload
+
+logger = structlog.get_logger()
+
+ProgressCallback = Callable[[int, int], Awaitable[None]]
+
+
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+
+FINISHED_STATUSES = (JobStatus.SUCCEEDED, JobStatus.FAILED)
+
+
+def stamping_job_key(sha256: str, enovia_id: str, revision: str) -> str:
+    """Idempotency key of a stamping job: input hash + ENOVIA id + revision"""
+    return hashlib.sha256(f"{sha256}:{enovia_id}:{revision}".encode()).hexdigest()
+
+
+@dataclass
+class StampingJob:
+    """State of a stamping job, as returned to clients"""
+
+    id: str
+    key: str
+    enovia_id: str
+    title: str
+    revision: str
+    created_by: uuid.UUID
+    status: JobStatus = JobStatus.QUEUED
+    pages_done: int = 0
+    total_pages: int = 0
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    updated_at: float = field(default_factory=time.time)
+    # Spooled input; owned by the worker that runs the job
+    upload: Optional[SpooledUpload] = field(default=None, repr=False, compare=False)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATUSES
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "key": self.key,
+            "enovia_id": self.enovia_id,
+            "title": self.title,
+            "revision": self.revision,
+            "created_by": str(self.created_by),
+            "status": self.status.value,
+            "pages_done": self.pages_done,
+            "total_pages": self.total_pages,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "StampingJob":
+        return cls(
+            id=data["id"],
+            key=data["key"],
+            enovia_id=data["enovia_id"],
+            title=data["title"],
+            revision=data["revision"],
+            created_by=uuid.UUID(str(data["created_by"])),
+            status=JobStatus(data["status"]),
+            pages_done=data.get("pages_done", 0),
+            total_pages=data.get("total_pages", 0),
+            result=data.get("result"),
+            error=data.get("error"),
+            created_at=data.get("created_at", 0.0),
+            updated_at=data.get("updated_at", 0.0),
+        )
+
+
+class StampingJobQueue:
+    """
+    Bounded in-process queue of stamping jobs
+
+    Submission returns at once with a job id; ``workers`` asyncio tasks take
+    jobs from the queue and run PDFService.process_pdf_with_qr_codes on the
+    spooled upload, so the HTTP request does not stay open for the analysis.
+    Job state is kept in process memory and mirrored to Redis: any API worker
+    can answer a status poll, and the idempotency key (input hash + ENOVIA id
+    + revision) is claimed with SET NX, so a duplicate submission attaches to
+    the job already queued or running instead of stamping the package again.
+    A failed job releases its key and may be resubmitted.
+    """
+
+    name = "stamping_jobs"
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        max_queue: Optional[int] = None,
+        ttl_seconds: Optional[int] = None,
+        runner: Optional[
+            Callable[[StampingJob, ProgressCallback], Awaitable[Dict[str, Any]]]
+        ] = None,
+    ):
+        self.workers = workers or settings.STAMPING_JOB_WORKERS
+        self.max_queue = (
+            settings.STAMPING_JOB_MAX_QUEUE if max_queue is None else max_queue
+        )
+        self.ttl_seconds = ttl_seconds or settings.STAMPING_JOB_TTL_SECONDS
+        self.poll_interval = settings.STAMPING_JOB_POLL_SECONDS
+        self.runner = runner or self._stamp
+        self._jobs: Dict[str, StampingJob] = {}
+        self._by_key: Dict[str, str] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._changed: Optional[asyncio.Condition] = None
+        self._active = 0
+
+    @staticmethod
+    def job_cache_key(job_id: str) -> str:
+        return f"stamping_job:{job_id}"
+
+    @staticmethod
+    def claim_cache_key(key: str) -> str:
+        return f"stamping_job_key:{key}"
+
+    async def start(self) -> None:
+        """Start the worker tasks"""
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue()
+        self._changed = asyncio.Condition()
+        self._tasks = [
+            asyncio.create_task(self._worker(), name=f"pte-qr-{self.name}-{i}")
+            for i in range(self.workers)
+        ]
+        logger.info("Stamping job workers started", workers=self.workers)
+
+    async def stop(self) -> None:
+        """Cancel the workers and drop the inputs of jobs that did not run"""
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for job in self._jobs.values():
+            if job.upload is not None:
+                job.upload.close()
+                job.upload = None
+
+    async def submit(
+        self,
+        upload: SpooledUpload,
+        enovia_id: str,
+        title: str,
+        revision: str,
+        created_by: uuid.UUID,
+    ) -> Tuple[StampingJob, bool]:
+        """
+        Queue a stamping job for a spooled upload
+
+        The queue takes ownership of ``upload``. Returns the job and whether it
+        was created; an existing job with the same key is returned as is.
+
+        Raises:
+            ExecutorOverloadedError: If the queue is full
+        """
+        await self.start()
+        self._prune()
+        key = stamping_job_key(upload.sha256, enovia_id, revision)
+
+        existing = self._live_job(self._jobs.get(self._by_key.get(key, "")))
+        if existing is None:
+            existing = await self._find_remote(key)
+        if existing is not None:
+            upload.close()
+            logger.info(
+                "Stamping job resubmitted",
+                job_id=existing.id,
+                status=existing.status.value,
+            )
+            return existing, False
+
+        if self.max_queue and self._queue.qsize() >= self.max_queue:
+            upload.close()
+            metrics_service.record_executor_rejected(self.name)
+            raise ExecutorOverloadedError(
+                self.name, self._queue.qsize(), self.max_queue
+            )
+
+        job = StampingJob(
+            id=uuid.uuid4().hex,
+            key=key,
+            enovia_id=enovia_id,
+            title=title,
+            revision=revision,
+            created_by=created_by,
+            upload=upload,
+        )
+        # Registered before the first await: concurrent local duplicates see it
+        self._jobs[job.id] = job
+        self._by_key[key] = job.id
+        # Published before the key is claimed, so a worker losing the claim
+        # finds the job
+        await self._publish(job)
+
+        claimed = await cache_service.set_if_absent(
+            self.claim_cache_key(key), job.id, ttl=self.ttl_seconds
+        )
+        if claimed is False:
+            existing = await self._find_remote(key)
+            if existing is not None and existing.id != job.id:
+                del self._jobs[job.id]
+                self._by_key[key] = existing.id
+                upload.close()
+                return existing, False
+            # The claimed job failed or expired: take the key over
+            await cache_service.set(
+                self.claim_cache_key(key), job.id, ttl=self.ttl_seconds
+            )
+
+        self._queue.put_nowait(job)
+        self._update_metrics()
+        logger.info(
+            "Stamping job queued",
+            job_id=job.id,
+            enovia_id=enovia_id,
+            revision=revision,
+            sha256=upload.sha256,
+            size=upload.size,
+        )
+        return job, True
+
+    async def get(self, job_id: str) -> Optional[StampingJob]:
+        """Job of this worker, or its last published state from Redis"""
+        job = self._jobs.get(job_id)
+        if job is not None:
+            return job
+        data = await cache_service.get(self.job_cache_key(job_id))
+        if not isinstance(data, dict):
+            return None
+        try:
+            return StampingJob.from_dict(data)
+        except (KeyError, TypeError, ValueError) as e:
+            logger.warning("Malformed stamping job state", job_id=job_id, error=str(e))
+            return None
+
+    async def events(self, job_id: str) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Job states from now until the job finishes
+
+        Jobs of this worker are streamed on every change; jobs run by another
+        worker are polled from Redis every STAMPING_JOB_POLL_SECONDS.
+        """
+        last_update = None
+        while True:
+            job = await self.get(job_id)
+            if job is None:
+                return
+            if job.updated_at != last_update:
+                last_update = job.updated_at
+                yield job.to_dict()
+            if job.finished:
+                return
+            if job_id in self._jobs and self._changed is not None:
+                async with self._changed:
+                    try:
+                        await asyncio.wait_for(self._changed.wait(), self.poll_interval)
+                    except asyncio.TimeoutError:
+                        pass
+            else:
+                await asyncio.sleep(self.poll_interval)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get queue statistics"""
+        return {
+            "name": self.name,
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "active": self._active,
+            "jobs": len(self._jobs),
+        }
+
+    @staticmethod
+    def _live_job(job: Optional[StampingJob]) -> Optional[StampingJob]:
+        """Job a duplicate submission can attach to (not failed)"""
+        if job is None or job.status == JobStatus.FAILED:
+            return None
+        return job
+
+    async def _find_remote(self, key: str) -> Optional[StampingJob]:
+        """Job that claimed the key in Redis (this or another API worker)"""
+        job_id = await cache_service.get(self.claim_cache_key(key))
+        if not job_id:
+            return None
+        return self._live_job(await self.get(str(job_id)))
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self._queue.get()
+            self._active += 1
+            self._update_metrics()
+            try:
+                await self._execute(job)
+            finally:
+                self._active -= 1
+                self._update_metrics()
+                self._queue.task_done()
+
+    async def _execute(self, job: StampingJob) -> None:
+        async def progress(pages_done: int, total_pages: int) -> None:
+            job.pages_done = pages_done
+            job.total_pages = total_pages
+            await self._changed_state(job)
+
+        job.status = JobStatus.RUNNING
+        await self._changed_state(job)
+        try:
+            job.result = await self.runner(job, progress)
+            job.status = JobStatus.SUCCEEDED
+            logger.info("Stamping job finished", job_id=job.id, pages=job.total_pages)
+        except asyncio.CancelledError:
+            job.status = JobStatus.FAILED
+            job.error = "Job cancelled on shutdown"
+            await self._release(job)
+            raise
+        except Exception as e:
+            job.status = JobStatus.FAILED
+            job.error = str(e)
+            await self._release(job)
+            logger.error("Stamping job failed", job_id=job.id, error=str(e))
+        finally:
+            if job.upload is not None:
+                job.upload.close()
+                job.upload = None
+        await self._changed_state(job)
+
+    async def _stamp(
+        self, job: StampingJob, progress: ProgressCallback
+    ) -> Dict[str, Any]:
+        async with get_async_session_factory()() as db:
+            result = await pdf_service.process_pdf_with_qr_codes(
+                pdf_path=job.upload.path,
+                enovia_id=job.enovia_id,
+                title=job.title,
+                revision=job.revision,
+                created_by=job.created_by,
+                qr_service=QRService(),
+                document_service=DocumentService(db),
+                progress=progress,
+            )
+        return {**result, "document_id": str(result["document_id"])}
+
+    async def _changed_state(self, job: StampingJob) -> None:
+        job.updated_at = time.time()
+        async with self._changed:
+            self._changed.notify_all()
+        await self._publish(job)
+
+    async def _publish(self, job: StampingJob) -> None:
+        await cache_service.set(
+            self.job_cache_key(job.id), job.to_dict(), ttl=self.ttl_seconds
+        )
+
+    async def _release(self, job: StampingJob) -> None:
+        """Free the idempotency key of a failed job so it can be resubmitted"""
+        if self._by_key.get(job.key) == job.id:
+            del self._by_key[job.key]
+        await cache_service.delete(self.claim_cache_key(job.key))
+
+    def _prune(self) -> None:
+        """Forget finished jobs past the TTL (their Redis state expires on its own)"""
+        deadline = time.time() - self.ttl_seconds
+        for job_id, job in list(self._jobs.items()):
+            if job.finished and job.updated_at < deadline:
+                del self._jobs[job_id]
+                if self._by_key.get(job.key) == job_id:
+                    del self._by_key[job.key]
+
+    def _update_metrics(self) -> None:
+        metrics_service.record_executor_state(
+            self.name, self._queue.qsize(), self._active
+        )
+
+
+# Global stamping job queue instance
+stamping_jobs = StampingJobQueue()
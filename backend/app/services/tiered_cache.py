@@ -0,0 +1,241 @@
+"""
+Two-tier cache: in-process LRU/TTL (L1) in front of the Redis cache service (L2)
+"""
+
+import asyncio
+import json
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Set, Tuple
+
+import structlog
+
+from app.core.config import settings
+from app.services.cache_service import cache_service
+from app.services.metrics_service import metrics_service
+
+logger = structlog.get_logger()
+
+
+class LocalCache:
+    """Bounded in-process LRU cache with TTL and tag index"""
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, Any, Tuple[str, ...]]]" = (
+            OrderedDict()
+        )
+        self._tags: Dict[str, Set[str]] = {}
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        """(found, value) for a key that has not expired"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        if entry[0] < time.monotonic():
+            self._discard(key)
+            return False, None
+        self._entries.move_to_end(key)
+        return True, entry[1]
+
+    def set(
+        self,
+        key: str,
+        value: Any,
+        ttl: Optional[float] = None,
+        tags: Iterable[str] = (),
+    ) -> None:
+        """Store value for min(ttl, L1 TTL) seconds"""
+        self._discard(key)
+        ttl = min(ttl, self.ttl_seconds) if ttl else self.ttl_seconds
+        tags = tuple(tags)
+        self._entries[key] = (time.monotonic() + ttl, value, tags)
+        for tag in tags:
+            self._tags.setdefault(tag, set()).add(key)
+        while len(self._entries) > self.max_entries:
+            self._discard(next(iter(self._entries)))
+
+    def invalidate_tags(self, tags: Iterable[str]) -> int:
+        """Drop entries registered under tags"""
+        count = 0
+        for tag in tags:
+            for key in list(self._tags.get(tag, ())):
+                self._discard(key)
+                count += 1
+        return count
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._tags.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _discard(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[2]:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+
+class TieredCache:
+    """
+    L1 (process memory) + L2 (Redis) cache kept coherent through pub/sub
+
+    Tag invalidations are applied to L2, to the local L1 and published on
+    CACHE_INVALIDATION_CHANNEL; every worker subscribed with start() drops the
+    tagged entries from its own L1. While the subscription is down L1 is
+    bypassed, and it is cleared on every (re)subscribe because messages may
+    have been missed in between. The short L1 TTL bounds staleness otherwise.
+    """
+
+    def __init__(
+        self,
+        cache_type: str,
+        l2=None,
+        max_entries: Optional[int] = None,
+        ttl_seconds: Optional[float] = None,
+        channel: Optional[str] = None,
+        l1_enabled: Optional[bool] = None,
+    ):
+        self.cache_type = cache_type
+        self.l2 = l2 or cache_service
+        self.local = LocalCache(
+            max_entries or settings.CACHE_L1_MAX_ENTRIES,
+            ttl_seconds or settings.CACHE_L1_TTL_SECONDS,
+        )
+        self.channel = channel or settings.CACHE_INVALIDATION_CHANNEL
+        self.l1_enabled = (
+            settings.CACHE_L1_ENABLED if l1_enabled is None else l1_enabled
+        )
+        self.instance_id = uuid.uuid4().hex
+        self.stats = {"l1_hits": 0, "l1_misses": 0, "l2_hits": 0, "l2_misses": 0}
+        self._listener: Optional[asyncio.Task] = None
+        self._subscribed = False
+
+    @property
+    def l1_active(self) -> bool:
+        """L1 is served only while invalidations can reach it"""
+        return self.l1_enabled and (self._listener is None or self._subscribed)
+
+    async def get(self, key: str, tags: Iterable[str] = ()) -> Optional[Any]:
+        """
+        Get value from L1, then from L2
+
+        An L2 hit fills L1 under the given tags, the ones the value was stored
+        with, so that invalidations reach the L1 copy.
+        """
+        l1_active = self.l1_active
+        if l1_active:
+            found, value = self.local.get(key)
+            self._record("l1", found)
+            if found:
+                return value
+
+        value = await self.l2.get(key)
+        self._record("l2", value is not None)
+        if value is not None and l1_active:
+            self.local.set(key, value, tags=tags)
+        return value
+
+    async def set(
+        self, key: str, value: Any, ttl: Optional[int] = None, tags: Iterable[str] = ()
+    ) -> bool:
+        """Set value in L2 and L1"""
+        tags = list(tags)
+        stored = await self.l2.set(key, value, ttl=ttl, tags=tags)
+        if self.l1_active:
+            self.local.set(key, value, ttl=ttl, tags=tags)
+        return stored
+
+    async def invalidate_tags(self, tags: Iterable[str]) -> int:
+        """Invalidate tags in L2, in this worker's L1 and in L1 of all other workers"""
+        tags = list(tags)
+        deleted_count = await self.l2.invalidate_tags(tags)
+        self.local.invalidate_tags(tags)
+        await self.l2.publish(
+            self.channel, json.dumps({"origin": self.instance_id, "tags": tags})
+        )
+        return deleted_count
+
+    def apply_invalidation(self, message: str) -> int:
+        """Apply an invalidation message received from the channel"""
+        try:
+            payload = json.loads(message)
+            tags = payload["tags"]
+        except (ValueError, KeyError, TypeError):
+            logger.warning("Malformed cache invalidation message", message=message)
+            return 0
+        if payload.get("origin") == self.instance_id:
+            return 0
+        return self.local.invalidate_tags(tags)
+
+    async def start(self) -> None:
+        """Subscribe to the invalidation channel"""
+        if not self.l1_enabled or self._listener is not None:
+            return
+        if not getattr(self.l2, "supports_pubsub", False):
+            # No pub/sub (test cache): L1 stays local to this process
+            return
+        self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        """Unsubscribe from the invalidation channel"""
+        if self._listener is None:
+            return
+        self._listener.cancel()
+        try:
+            await self._listener
+        except asyncio.CancelledError:
+            pass
+        self._listener = None
+        self._subscribed = False
+
+    async def _listen(self) -> None:
+        while True:
+            pubsub = None
+            try:
+                pubsub = await self.l2.pubsub()
+                await pubsub.subscribe(self.channel)
+                # Invalidations published while unsubscribed are lost
+                self.local.clear()
+                self._subscribed = True
+                logger.info("Subscribed to cache invalidations", channel=self.channel)
+                async for message in pubsub.listen():
+                    if message.get("type") == "message":
+                        self.apply_invalidation(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(
+                    "Cache invalidation subscription lost",
+                    channel=self.channel,
+                    error=str(e),
+                )
+            finally:
+                self._subscribed = False
+                if pubsub is not None:
+                    try:
+                        await pubsub.close()
+                    except Exception:
+                        pass
+            await asyncio.sleep(settings.CACHE_INVALIDATION_RETRY_SECONDS)
+
+    def _record(self, tier: str, hit: bool) -> None:
+        self.stats[f"{tier}_{'hits' if hit else 'misses'}"] += 1
+        hits = self.stats[f"{tier}_hits"]
+        total = hits + self.stats[f"{tier}_misses"]
+        metrics_service.record_cache_tier_lookup(
+            self.cache_type, tier, hit, hits / total
+        )
+
+
+# Global document status cache instance
+status_cache = TieredCache("document_status")
@@ -0,0 +1,111 @@
+"""
+Входной PDF документ задания простановки QR кодов
+
+Один разбор документа на задание: ``DocumentHandle`` держит один ``PdfReader``
+(PyPDF2) и один ``fitz.Document`` (PyMuPDF) и передаётся всему коду
+позиционирования и анализа страниц вместо байтов PDF. Оба объекта создаются
+лениво при первом обращении и закрываются детерминированно в ``close()``
+(или при выходе из ``with``), число разборов документа за задание
+публикуется метрикой ``pte_qr_pdf_document_parses``.
+
+Объект не потокобезопасен: задание использует его последовательно (в том
+числе из потоков pdf_executor, но не параллельно).
+"""
+
+from typing import Dict, Optional, Union
+
+import fitz  # PyMuPDF
+import structlog
+from PyPDF2 import PdfReader
+
+from app.services.metrics_service import metrics_service
+from app.utils.page_raster import PageRaster
+from app.utils.upload_spool import (
+    PDFMapping,
+    SpooledUpload,
+    map_pdf_file,
+    open_pdf_document,
+    pdf_stream,
+)
+
+logger = structlog.get_logger(__name__)
+
+PARSER_PYPDF2 = "pypdf2"
+PARSER_PYMUPDF = "pymupdf"
+
+
+class DocumentHandle:
+    """Разобранный входной PDF одного задания (PyPDF2 + PyMuPDF)"""
+
+    def __init__(self, pdf_content: Union[bytes, PDFMapping, SpooledUpload, str]):
+        # Отображение файла по пути принадлежит handle и закрывается в close()
+        self._mapping: Optional[PDFMapping] = None
+        if isinstance(pdf_content, SpooledUpload):
+            pdf_content = pdf_content.view
+        elif isinstance(pdf_content, str):
+            pdf_content = self._mapping = map_pdf_file(pdf_content)
+        self.pdf_content = pdf_content
+        self._reader: Optional[PdfReader] = None
+        self._doc: Optional[fitz.Document] = None
+        self.parse_counts: Dict[str, int] = {PARSER_PYPDF2: 0, PARSER_PYMUPDF: 0}
+        self.closed = False
+
+    def _check_open(self) -> None:
+        if self.closed:
+            raise ValueError("DocumentHandle is closed")
+
+    @property
+    def reader(self) -> PdfReader:
+        """PdfReader PyPDF2 (разбирается один раз)"""
+        self._check_open()
+        if self._reader is None:
+            self._reader = PdfReader(pdf_stream(self.pdf_content))
+            self.parse_counts[PARSER_PYPDF2] += 1
+        return self._reader
+
+    @property
+    def doc(self) -> fitz.Document:
+        """Документ PyMuPDF (открывается один раз)"""
+        self._check_open()
+        if self._doc is None:
+            self._doc = open_pdf_document(self.pdf_content)
+            self.parse_counts[PARSER_PYMUPDF] += 1
+        return self._doc
+
+    @property
+    def page_count(self) -> int:
+        """Число страниц (из уже открытого документа, без повторного разбора)"""
+        if self._reader is not None or self._doc is None:
+            return len(self.reader.pages)
+        return len(self._doc)
+
+    def page_raster(self, page_number: int) -> PageRaster:
+        """
+        Растр страницы поверх общего документа PyMuPDF
+
+        Документ принадлежит handle и при закрытии растра не закрывается.
+        """
+        return PageRaster(self.doc, page_number)
+
+    def close(self) -> None:
+        """Закрывает документ PyMuPDF и публикует число разборов за задание"""
+        if self.closed:
+            return
+        self.closed = True
+        if self._doc is not None:
+            self._doc.close()
+            self._doc = None
+        self._reader = None
+        if self._mapping is not None:
+            self._mapping.close()
+            self._mapping = None
+
+        for parser, count in self.parse_counts.items():
+            metrics_service.record_document_parses(parser, count)
+        logger.debug("Document handle closed", parses=self.parse_counts)
+
+    def __enter__(self) -> "DocumentHandle":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
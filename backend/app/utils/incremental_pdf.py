@@ -0,0 +1,403 @@
+"""
+Выходной PDF в виде инкрементального обновления исходного документа
+
+Вместо пересборки документа через ``PdfWriter`` (все объекты, включая
+растровые подложки сканов и шрифты, читаются и сериализуются заново) к
+исходным байтам дописывается секция обновления: изменённые словари страниц,
+новые объекты (изображения QR, потоки содержимого, шрифт подписи), таблица
+xref и trailer с ``/Prev`` на предыдущую таблицу. Время и объём записи
+зависят от числа проштампованных страниц, а не от размера документа;
+исходная ревизия остаётся байт-в-байт, поэтому цифровые подписи на ней
+сохраняются.
+
+``IncrementalWriter`` повторяет часть интерфейса ``PdfWriter``, которую
+использует код простановки (``add_page``, ``_add_object``, ``write``), и
+работает с ``QROverlay`` и ``merge_page`` без изменений вызывающего кода.
+"""
+
+import shutil
+from io import BytesIO
+from typing import IO, Any, Dict, List, Optional, Tuple, Union
+
+import structlog
+
+from app.core.config import settings
+
+logger = structlog.get_logger(__name__)
+
+OUTPUT_MODE_REWRITE = "rewrite"
+OUTPUT_MODE_INCREMENTAL = "incremental"
+OUTPUT_MODES = (OUTPUT_MODE_REWRITE, OUTPUT_MODE_INCREMENTAL)
+
+# Окно в конце файла, где ищется startxref
+STARTXREF_WINDOW = 1024
+
+Original = Union[bytes, bytearray, memoryview, IO[bytes]]
+
+
+def _library(reader: Any) -> str:
+    """Библиотека (PyPDF2 или pypdf), которой создан reader"""
+    return type(reader).__module__.split(".")[0]
+
+
+def _original_size(original: Original) -> int:
+    if hasattr(original, "seek"):
+        original.seek(0, 2)
+        return original.tell()
+    return len(original)
+
+
+def _original_tail(original: Original, size: int) -> bytes:
+    start = max(0, size - STARTXREF_WINDOW)
+    if hasattr(original, "seek"):
+        original.seek(start)
+        return original.read(size - start)
+    return bytes(original[start:size])
+
+
+def previous_xref(original: Original) -> Tuple[int, bool]:
+    """
+    Смещение последней секции xref и её вид
+
+    Returns:
+        (смещение, True если это поток перекрёстных ссылок /XRef)
+    """
+    size = _original_size(original)
+    tail = _original_tail(original, size)
+    position = tail.rfind(b"startxref")
+    if position < 0:
+        raise ValueError("startxref not found")
+    offset = int(tail[position + len(b"startxref") :].split()[0])
+    head = _original_slice(original, offset, 4)
+    return offset, head != b"xref"
+
+
+def _original_slice(original: Original, offset: int, length: int) -> bytes:
+    if hasattr(original, "seek"):
+        original.seek(offset)
+        return original.read(length)
+    return bytes(original[offset : offset + length])
+
+
+def next_object_number(reader: Any, original: Original) -> int:
+    """
+    Первый свободный номер объекта исходного документа
+
+    PyPDF2 не переносит /Size из словаря потока xref в trailer, поэтому
+    номер считается и по прочитанным таблицам xref, и по номеру самого
+    потока xref.
+    """
+    size = int(dict.get(reader.trailer, "/Size", 0))
+    numbers = [number for entries in reader.xref.values() for number in entries]
+    numbers.extend(getattr(reader, "xref_objStm", {}))
+    offset, xref_stream = previous_xref(original)
+    if xref_stream:
+        numbers.append(int(_original_slice(original, offset, 32).split()[0]))
+    return max([size] + [number + 1 for number in numbers])
+
+
+class IncrementalWriter:
+    """
+    Инкрементальное обновление документа, открытого PdfReader
+
+    Страницы, переданные в ``add_page``, изменяются на месте; при записи
+    в обновление попадают только страницы, словарь которых изменился, и
+    объекты, добавленные через ``_add_object``. Объекты других документов
+    (например, страница ReportLab после ``merge_page``) копируются в
+    обновление, прямые потоки становятся косвенными объектами.
+    """
+
+    def __init__(self, reader: Any, original: Original):
+        if reader.is_encrypted:
+            raise ValueError(
+                "Incremental update of encrypted documents is not supported"
+            )
+        self.reader = reader
+        self.original = original
+        self.pdf_library = _library(reader)
+        self._generic = __import__(f"{self.pdf_library}.generic", fromlist=["generic"])
+        self._first_number = next_object_number(reader, original)
+        self._objects: List[Any] = []
+        self._pages: List[Any] = []
+
+    # ------------------------------------------------------------------
+    # Интерфейс PdfWriter
+    # ------------------------------------------------------------------
+
+    def add_page(self, page: Any) -> Any:
+        """Регистрирует страницу исходного документа и возвращает её для изменения"""
+        if (
+            page.indirect_reference is None
+            or page.indirect_reference.pdf is not self.reader
+        ):
+            raise ValueError("IncrementalWriter accepts pages of its own reader only")
+        self._pages.append(page)
+        return page
+
+    def _add_object(self, obj: Any) -> Any:
+        """Добавляет новый объект и возвращает косвенную ссылку на него"""
+        self._objects.append(obj)
+        return self._generic.IndirectObject(
+            self._first_number + len(self._objects) - 1, 0, self
+        )
+
+    def get_object(self, reference: Any) -> Any:
+        idnum = reference if isinstance(reference, int) else reference.idnum
+        if idnum >= self._first_number:
+            return self._objects[idnum - self._first_number]
+        return self.reader.get_object(reference)
+
+    @property
+    def modified_pages(self) -> List[Any]:
+        """
+        Страницы, словарь которых отличается от прочитанного из документа
+
+        Сравнение идёт с объектом страницы в кэше reader, а не со снимком при
+        add_page: страница может быть изменена (``merge_page``) до передачи
+        в writer. Сравниваются сырые значения, так как ``__getitem__``
+        словарей PDF разыменовывает ссылки.
+        """
+        modified = []
+        for page in self._pages:
+            parsed = self.reader.get_object(page.indirect_reference)
+            if dict.keys(page) != dict.keys(parsed) or any(
+                dict.get(page, key) is not value for key, value in dict.items(parsed)
+            ):
+                modified.append(page)
+        return modified
+
+    def write(self, stream: IO[bytes]) -> None:
+        """Записывает исходный документ и секцию обновления"""
+        self._copy_original(stream)
+        base = _original_size(self.original)
+        prev_offset, xref_stream = previous_xref(self.original)
+
+        update = BytesIO()
+        if not self._original_ends_with_newline(base):
+            update.write(b"\n")
+
+        pages = self.modified_pages
+        localized = {}
+        page_objects = [
+            (page.indirect_reference, self._localize_dict(page, localized))
+            for page in pages
+        ]
+
+        offsets: Dict[int, Tuple[int, int]] = {}
+        for reference, page_dict in page_objects:
+            offsets[reference.idnum] = (base + update.tell(), reference.generation)
+            self._write_object(update, reference.idnum, reference.generation, page_dict)
+        # Объекты могут добавляться при локализации, поэтому обход по индексу
+        index = 0
+        while index < len(self._objects):
+            number = self._first_number + index
+            obj = self._localize(self._objects[index], localized, top_level=True)
+            offsets[number] = (base + update.tell(), 0)
+            self._write_object(update, number, 0, obj)
+            index += 1
+
+        if xref_stream:
+            self._write_xref_stream(update, base, offsets, prev_offset)
+        else:
+            self._write_xref_table(update, base, offsets, prev_offset)
+
+        stream.write(update.getvalue())
+        logger.debug(
+            "Incremental update written",
+            pages=len(pages),
+            new_objects=len(self._objects),
+            original_size=base,
+            update_size=update.tell(),
+        )
+
+    # ------------------------------------------------------------------
+    # Сериализация
+    # ------------------------------------------------------------------
+
+    def _copy_original(self, stream: IO[bytes]) -> None:
+        if hasattr(self.original, "seek"):
+            self.original.seek(0)
+            shutil.copyfileobj(self.original, stream)
+        else:
+            stream.write(self.original)
+
+    def _original_ends_with_newline(self, size: int) -> bool:
+        return _original_tail(self.original, size)[-1:] in (b"\n", b"\r")
+
+    def _write_object(
+        self, stream: IO[bytes], number: int, generation: int, obj: Any
+    ) -> None:
+        stream.write(f"{number} {generation} obj\n".encode())
+        obj.write_to_stream(stream, None)
+        stream.write(b"\nendobj\n")
+
+    def _localize_dict(self, page: Any, localized: Dict[Tuple[int, int], Any]) -> Any:
+        g = self._generic
+        page_dict = g.DictionaryObject()
+        for key, value in dict.items(page):
+            page_dict[key] = self._localize(value, localized)
+        return page_dict
+
+    def _localize(
+        self, obj: Any, localized: Dict[Tuple[int, int], Any], top_level: bool = False
+    ) -> Any:
+        """
+        Объект, пригодный для записи в обновление
+
+        Ссылки на исходный документ и на новые объекты остаются как есть;
+        объекты других документов копируются (один раз на объект), прямые
+        потоки внутри словарей и массивов выносятся в косвенные объекты.
+        """
+        g = self._generic
+        if isinstance(obj, g.IndirectObject):
+            if obj.pdf is self.reader or obj.pdf is self:
+                return obj
+            key = (id(obj.pdf), obj.idnum)
+            if key not in localized:
+                localized[key] = self._add_object(None)
+                copied = self._localize(obj.get_object(), localized, top_level=True)
+                self._objects[localized[key].idnum - self._first_number] = copied
+            return localized[key]
+        if isinstance(obj, g.StreamObject):
+            stream = g.StreamObject()
+            # Сжатые потоки копируются как есть, ContentStream сериализует операции
+            encoded = obj.get("/Filter") or not hasattr(obj, "get_data")
+            stream._data = obj._data if encoded else obj.get_data()
+            for key, value in dict.items(obj):
+                if key != "/Length":
+                    stream[key] = self._localize(value, localized)
+            return stream if top_level else self._add_object(stream)
+        if isinstance(obj, g.DictionaryObject):
+            copied = g.DictionaryObject()
+            for key, value in dict.items(obj):
+                copied[key] = self._localize(value, localized)
+            return copied
+        if isinstance(obj, g.ArrayObject):
+            return g.ArrayObject(
+                self._localize(item, localized) for item in list.__iter__(obj)
+            )
+        return obj
+
+    def _trailer_entries(self) -> Dict[str, Any]:
+        # Ссылки /Root и /Info без разыменования
+        trailer = self.reader.trailer
+        return {
+            key: dict.get(trailer, key)
+            for key in ("/Root", "/Info", "/ID")
+            if key in trailer
+        }
+
+    @staticmethod
+    def _subsections(numbers: List[int]) -> List[Tuple[int, int]]:
+        """Непрерывные диапазоны номеров: (первый, количество)"""
+        ranges: List[Tuple[int, int]] = []
+        for number in numbers:
+            if ranges and ranges[-1][0] + ranges[-1][1] == number:
+                ranges[-1] = (ranges[-1][0], ranges[-1][1] + 1)
+            else:
+                ranges.append((number, 1))
+        return ranges
+
+    def _size(self, offsets: Dict[int, Tuple[int, int]]) -> int:
+        return max(self._first_number + len(self._objects), max(offsets, default=0) + 1)
+
+    def _write_xref_table(
+        self,
+        stream: BytesIO,
+        base: int,
+        offsets: Dict[int, Tuple[int, int]],
+        prev_offset: int,
+    ) -> None:
+        g = self._generic
+        xref_offset = base + stream.tell()
+        numbers = sorted(offsets)
+        # Голова списка свободных объектов: без неё часть читателей считает
+        # таблицу не нумерованной с нуля и сдвигает номера объектов
+        stream.write(b"xref\n0 1\n0000000000 65535 f\r\n")
+        for first, count in self._subsections(numbers):
+            stream.write(f"{first} {count}\n".encode())
+            for number in range(first, first + count):
+                offset, generation = offsets[number]
+                stream.write(f"{offset:010d} {generation:05d} n\r\n".encode())
+
+        trailer = g.DictionaryObject()
+        for key, value in self._trailer_entries().items():
+            trailer[g.NameObject(key)] = value
+        trailer[g.NameObject("/Size")] = g.NumberObject(self._size(offsets))
+        trailer[g.NameObject("/Prev")] = g.NumberObject(prev_offset)
+        stream.write(b"trailer\n")
+        trailer.write_to_stream(stream, None)
+        stream.write(f"\nstartxref\n{xref_offset}\n%%EOF\n".encode())
+
+    def _write_xref_stream(
+        self,
+        stream: BytesIO,
+        base: int,
+        offsets: Dict[int, Tuple[int, int]],
+        prev_offset: int,
+    ) -> None:
+        """Секция xref в виде потока /XRef (исходный документ использует потоки xref)"""
+        g = self._generic
+        xref_number = self._size(offsets)
+        xref_offset = base + stream.tell()
+        entries = dict(offsets)
+        entries[xref_number] = (xref_offset, 0)
+        numbers = sorted(entries)
+
+        offset_width = max(
+            4, (max(offset for offset, _ in entries.values()).bit_length() + 7) // 8
+        )
+        rows = bytearray()
+        for number in numbers:
+            offset, generation = entries[number]
+            rows += (
+                b"\x01"
+                + offset.to_bytes(offset_width, "big")
+                + generation.to_bytes(2, "big")
+            )
+
+        xref = g.StreamObject()
+        xref._data = bytes(rows)
+        for key, value in self._trailer_entries().items():
+            xref[g.NameObject(key)] = value
+        xref[g.NameObject("/Type")] = g.NameObject("/XRef")
+        xref[g.NameObject("/Size")] = g.NumberObject(xref_number + 1)
+        xref[g.NameObject("/Prev")] = g.NumberObject(prev_offset)
+        xref[g.NameObject("/W")] = g.ArrayObject(
+            [g.NumberObject(1), g.NumberObject(offset_width), g.NumberObject(2)]
+        )
+        xref[g.NameObject("/Index")] = g.ArrayObject(
+            g.NumberObject(value)
+            for first, count in self._subsections(numbers)
+            for value in (first, count)
+        )
+        self._write_object(stream, xref_number, 0, xref)
+        stream.write(f"startxref\n{xref_offset}\n%%EOF\n".encode())
+
+
+def create_output_writer(
+    reader: Any, original: Optional[Original], mode: Optional[str] = None
+) -> Any:
+    """
+    Writer выходного PDF для выбранного режима
+
+    Args:
+        reader: PdfReader исходного документа (PyPDF2 или pypdf)
+        original: Исходные байты (или файл) документа
+        mode: ``rewrite`` - новый PdfWriter, ``incremental`` - обновление
+            исходного документа (по умолчанию PDF_OUTPUT_MODE)
+
+    Returns:
+        IncrementalWriter либо PdfWriter той же библиотеки, что и reader.
+        Зашифрованные документы и документы без исходных байтов
+        пересобираются целиком.
+    """
+    mode = mode or settings.PDF_OUTPUT_MODE
+    if mode not in OUTPUT_MODES:
+        raise ValueError(f"Unknown PDF output mode: {mode}")
+    if mode == OUTPUT_MODE_INCREMENTAL and original is not None:
+        if not reader.is_encrypted:
+            return IncrementalWriter(reader, original)
+        logger.info("Encrypted document is rewritten instead of updated incrementally")
+    library = __import__(_library(reader), fromlist=["PdfWriter"])
+    return library.PdfWriter()
@@ -0,0 +1,242 @@
+"""
+Content-addressed кэш результатов анализа макета страниц
+
+Ключ - SHA-256 содержимого страницы (потоки содержимого, ресурсы, геометрия)
+плюс версия конфигурации анализатора. Одинаковые листы разных ревизий
+документа получают одинаковый ключ, поэтому при перештамповке новой ревизии
+анализируются только изменившиеся листы.
+
+Два уровня:
+- память процесса: LRU с TTL, синхронный доступ из анализатора;
+- Redis через ``CacheManager``: общий для воркеров и переживает рестарт.
+  Анализатор синхронный, поэтому Redis-уровень подгружается перед обработкой
+  документа (``prefetch``) и дописывается после неё (``flush``) из async кода
+  сервиса.
+"""
+
+import copy
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+import fitz  # PyMuPDF
+import structlog
+
+from app.core.config import settings
+from app.utils.page_raster import RENDER_SCALE
+from app.utils.upload_spool import PDFMapping, open_pdf_document
+
+logger = structlog.get_logger(__name__)
+
+# Увеличивать при любом изменении логики детекторов, влияющем на результат
+LAYOUT_CACHE_VERSION = 1
+
+
+def layout_config_version() -> str:
+    """Версия конфигурации анализатора, входящая в ключ кэша"""
+    parts = (
+        LAYOUT_CACHE_VERSION,
+        RENDER_SCALE,
+        settings.QR_VECTOR_DETECTION,
+        settings.QR_POSITION_BOX,
+    )
+    return hashlib.sha256(repr(parts).encode()).hexdigest()[:12]
+
+
+def page_fingerprint(page: fitz.Page) -> str:
+    """
+    SHA-256 содержимого страницы
+
+    Учитываются потоки содержимого, геометрия (MediaBox, CropBox, поворот) и
+    ресурсы: потоки XObject (включая вложенные), изображения и шрифты. Номера
+    объектов в хэш не входят, поэтому пересохранение документа с другой
+    нумерацией объектов не меняет отпечаток неизменённого листа.
+    """
+    doc = page.parent
+    digest = hashlib.sha256()
+
+    def update(*values: Any) -> None:
+        for value in values:
+            digest.update(value if isinstance(value, bytes) else repr(value).encode())
+            digest.update(b"\0")
+
+    update(tuple(page.mediabox), tuple(page.cropbox), page.rotation)
+    update(page.read_contents())
+
+    for xref, name, _invoker, bbox in sorted(page.get_xobjects(), key=lambda x: x[1]):
+        update(b"xobject", name, tuple(bbox), doc.xref_get_key(xref, "Matrix"))
+        update(hashlib.sha256(doc.xref_stream_raw(xref) or b"").digest())
+
+    for image in sorted(page.get_images(full=True), key=lambda x: x[7]):
+        xref, _smask, width, height, bpc, colorspace, _alt, name = image[:8]
+        update(b"image", name, width, height, bpc, colorspace)
+        update(hashlib.sha256(doc.xref_stream_raw(xref) or b"").digest())
+
+    for font in sorted(page.get_fonts(full=True), key=lambda x: x[4]):
+        _xref, ext, font_type, basefont, name, encoding = font[:6]
+        update(b"font", name, basefont, font_type, ext, encoding)
+
+    return digest.hexdigest()
+
+
+class LayoutCache:
+    """Двухуровневый (память + Redis) кэш результатов анализа макета"""
+
+    def __init__(
+        self,
+        namespace: str = "layout",
+        max_entries: int = None,
+        ttl_seconds: int = None,
+        cache_manager=None,
+        redis_enabled: bool = True,
+    ):
+        self.namespace = namespace
+        self.max_entries = max_entries or settings.LAYOUT_CACHE_MAX_ENTRIES
+        self.ttl_seconds = ttl_seconds or settings.LAYOUT_CACHE_TTL_SECONDS
+        self.redis_enabled = redis_enabled
+        self._cache_manager = cache_manager
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._pending: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "redis_hits": 0, "evictions": 0}
+
+    @property
+    def cache_manager(self):
+        if self._cache_manager is None:
+            from app.core.cache import cache_manager
+
+            self._cache_manager = cache_manager
+        return self._cache_manager
+
+    def key(self, fingerprint: str) -> str:
+        """Ключ кэша для отпечатка страницы"""
+        return f"{self.namespace}:{layout_config_version()}:{fingerprint}"
+
+    def page_key(self, page: fitz.Page) -> str:
+        """Ключ кэша для страницы PyMuPDF"""
+        return self.key(page_fingerprint(page))
+
+    def document_keys(
+        self, source: Union[bytes, PDFMapping, fitz.Document]
+    ) -> List[str]:
+        """Ключи кэша всех страниц документа (байты PDF или уже открытый документ)"""
+        if isinstance(source, fitz.Document):
+            return [self.page_key(page) for page in source]
+        with open_pdf_document(source) as doc:
+            return [self.page_key(page) for page in doc]
+
+    # ------------------------------------------------------------------
+    # Уровень памяти (синхронный)
+    # ------------------------------------------------------------------
+
+    def get(self, key: str) -> Optional[Any]:
+        """Значение из памяти процесса (копия) или None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return copy.deepcopy(entry[1])
+
+    def set(self, key: str, value: Any) -> None:
+        """Сохраняет значение в памяти и ставит его в очередь записи в Redis"""
+        with self._lock:
+            self._store(key, copy.deepcopy(value))
+            if self.redis_enabled:
+                self._pending[key] = value
+                # Без flush (синхронные вызовы вне сервиса) очередь не растёт бесконечно
+                while len(self._pending) > self.max_entries:
+                    self._pending.pop(next(iter(self._pending)))
+
+    def _store(self, key: str, value: Any) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def clear(self) -> None:
+        """Очищает уровень памяти"""
+        with self._lock:
+            self._entries.clear()
+            self._pending.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        """Есть ли в памяти действующее значение (без учёта в статистике)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and entry[0] >= time.monotonic()
+
+    # ------------------------------------------------------------------
+    # Уровень Redis (асинхронный)
+    # ------------------------------------------------------------------
+
+    async def prefetch(self, keys: Iterable[str]) -> int:
+        """
+        Подгружает из Redis в память значения, которых там ещё нет
+
+        Returns:
+            Количество подгруженных значений
+        """
+        if not self.redis_enabled:
+            return 0
+
+        with self._lock:
+            now = time.monotonic()
+            missing = [
+                key
+                for key in dict.fromkeys(keys)
+                if key not in self._entries or self._entries[key][0] < now
+            ]
+        if not missing:
+            return 0
+
+        values = await self.cache_manager.get_many(missing)
+
+        loaded = 0
+        with self._lock:
+            for key, value in values.items():
+                if isinstance(value, dict):
+                    self._store(key, value)
+                    loaded += 1
+            self.stats["redis_hits"] += loaded
+
+        logger.debug(
+            "Layout cache prefetched from Redis",
+            requested=len(missing),
+            loaded=loaded,
+        )
+        return loaded
+
+    async def flush(self) -> int:
+        """
+        Записывает в Redis значения, добавленные с последнего flush
+
+        Returns:
+            Количество записанных значений
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+
+        stored = await self.cache_manager.set_many(pending, ttl=self.ttl_seconds)
+        written = len(pending) if stored else 0
+
+        logger.debug(
+            "Layout cache flushed to Redis", pending=len(pending), written=written
+        )
+        return written
+
+
+# Global layout cache instance
+layout_cache = LayoutCache()
@@ -0,0 +1,160 @@
+"""
+Пул процессов для параллельного анализа макета страниц
+
+Анализ макета (PyMuPDF + OpenCV) занимает CPU и держит GIL, поэтому страницы
+документа распределяются между процессами-воркерами. Содержимое документа
+один раз записывается во временный файл в разделяемой памяти (``/dev/shm``,
+если доступно; для принятой загрузки используется её файл): воркеры читают
+его из page cache ОС вместо передачи байтов через pickle. Каждая задача
+получает набор страниц и открывает документ один раз на весь набор.
+"""
+
+import asyncio
+import multiprocessing
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional, Union
+
+import structlog
+
+from app.core.config import settings
+from app.utils.upload_spool import PDFMapping
+
+logger = structlog.get_logger(__name__)
+
+SHARED_MEMORY_DIR = "/dev/shm"
+
+# Анализатор воркера (создаётся инициализатором процесса)
+_worker_analyzer = None
+
+
+def _init_worker() -> None:
+    """Инициализация процесса-воркера"""
+    global _worker_analyzer
+    from app.utils.layout_cache import LayoutCache
+    from app.utils.pdf_analyzer import PDFAnalyzer
+
+    # Кэш воркера только в памяти: запись в Redis выполняет основной процесс
+    _worker_analyzer = PDFAnalyzer(
+        cache=LayoutCache(namespace="worker", redis_enabled=False)
+    )
+
+
+def _analyze_pages(path: str, page_numbers: List[int]) -> Dict[int, dict]:
+    """Анализирует набор страниц документа (выполняется в воркере)"""
+    from app.utils.document_handle import DocumentHandle
+
+    # Документ разбирается один раз на задачу, а не на каждую страницу;
+    # файл отображается в память, а не читается в байты
+    with DocumentHandle(path) as document:
+        return {
+            page_number: _worker_analyzer.analyze_page_layout(
+                document.pdf_content, page_number, document=document
+            )
+            for page_number in page_numbers
+        }
+
+
+def _shared_temp_dir() -> Optional[str]:
+    if os.path.isdir(SHARED_MEMORY_DIR) and os.access(SHARED_MEMORY_DIR, os.W_OK):
+        return SHARED_MEMORY_DIR
+    return None
+
+
+class LayoutAnalysisPool:
+    """Пул процессов для анализа макета страниц документа"""
+
+    def __init__(self, max_workers: int = None, min_pages: int = None):
+        self.max_workers = (
+            max_workers or settings.LAYOUT_POOL_WORKERS or os.cpu_count() or 1
+        )
+        self.min_pages = (
+            min_pages if min_pages is not None else settings.LAYOUT_POOL_MIN_PAGES
+        )
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        """Пул создаётся при первом использовании и живёт до shutdown()"""
+        with self._lock:
+            if self._executor is None:
+                # spawn: fork процесса с event loop и потоками небезопасен
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                )
+                logger.info("Layout analysis pool started", workers=self.max_workers)
+            return self._executor
+
+    def should_use(self, page_count: int) -> bool:
+        """Стоит ли распараллеливать анализ указанного числа страниц"""
+        return self.max_workers > 1 and page_count >= self.min_pages
+
+    async def analyze(
+        self, pdf_content: Union[bytes, PDFMapping], page_numbers: Iterable[int]
+    ) -> Dict[int, dict]:
+        """
+        Анализирует страницы документа параллельно
+
+        Args:
+            pdf_content: Содержимое PDF файла в байтах или отображение загрузки
+            page_numbers: Номера страниц (начиная с 0)
+
+        Returns:
+            Словарь {номер страницы: результат analyze_page_layout}
+        """
+        pages = sorted(set(page_numbers))
+        if not pages:
+            return {}
+
+        # Чередование страниц выравнивает нагрузку, если сложные листы идут подряд
+        chunk_count = min(self.max_workers, len(pages))
+        chunks = [pages[i::chunk_count] for i in range(chunk_count)]
+
+        # Принятая загрузка уже лежит в файле: воркеры открывают его напрямую
+        if isinstance(pdf_content, PDFMapping):
+            return await self._analyze_chunks(pdf_content.path, chunks, len(pages))
+
+        fd, path = tempfile.mkstemp(suffix=".pdf", dir=_shared_temp_dir())
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(pdf_content)
+            return await self._analyze_chunks(path, chunks, len(pages))
+        finally:
+            os.unlink(path)
+
+    async def _analyze_chunks(
+        self, path: str, chunks: List[List[int]], page_count: int
+    ) -> Dict[int, dict]:
+        """Раздаёт наборы страниц файла ``path`` воркерам пула"""
+        loop = asyncio.get_running_loop()
+        results = await asyncio.gather(
+            *(
+                loop.run_in_executor(self.executor, _analyze_pages, path, chunk)
+                for chunk in chunks
+            )
+        )
+
+        layouts: Dict[int, dict] = {}
+        for result in results:
+            layouts.update(result)
+
+        logger.info(
+            "Layout analysis pool finished", pages=page_count, tasks=len(chunks)
+        )
+        return layouts
+
+    def shutdown(self) -> None:
+        """Останавливает процессы пула"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True, cancel_futures=True)
+                self._executor = None
+
+
+# Global layout analysis pool instance
+layout_pool = LayoutAnalysisPool()
@@ -0,0 +1,317 @@
+"""
+Контекст растра страницы PDF, общий для всех детекторов анализатора
+"""
+
+import ctypes
+from typing import Dict, Iterable, Optional, Tuple, Union
+
+import fitz  # PyMuPDF
+import numpy as np
+import structlog
+
+from app.utils.pdf_exceptions import PDFPageOutOfRangeError
+from app.utils.resource_monitor import estimate_raster_bytes
+from app.utils.upload_spool import PDFMapping, open_pdf_document
+from app.utils.vector_layout import VectorLayout
+
+logger = structlog.get_logger(__name__)
+
+# Масштаб рендеринга страницы для детекторов (1 pt PDF = 2 px)
+RENDER_SCALE = 2.0
+
+# Копии документа в памяти задания: входные байты, разобранные PyPDF2 и
+# PyMuPDF объекты, выходной PDF
+DOCUMENT_COPIES = 3
+
+
+def pixmap_to_array(pix: fitz.Pixmap) -> np.ndarray:
+    """
+    Оборачивает буфер samples pixmap в numpy массив без копирования
+
+    Массив ссылается на память pixmap через ctypes буфер, который держит
+    pixmap живым, пока жив сам массив (``samples_mv`` такой гарантии не даёт).
+
+    Args:
+        pix: Pixmap PyMuPDF
+
+    Returns:
+        Массив формы (height, width) для одного канала или (height, width, n)
+    """
+    buffer = (ctypes.c_ubyte * (pix.stride * pix.height)).from_address(pix.samples_ptr)
+    buffer._pixmap = pix
+
+    rows = np.frombuffer(buffer, dtype=np.uint8).reshape(pix.height, pix.stride)
+    array = rows[:, : pix.width * pix.n]
+    if pix.n > 1:
+        array = array.reshape(pix.height, pix.width, pix.n)
+    return array
+
+
+def render_gray(
+    page: fitz.Page,
+    scale: float = RENDER_SCALE,
+    clip: Optional[fitz.Rect] = None,
+) -> np.ndarray:
+    """
+    Рендерит страницу сразу в grayscale без PNG кодирования/декодирования
+
+    Args:
+        page: Страница PyMuPDF
+        scale: Масштаб рендеринга
+        clip: Область страницы в точках PDF (по умолчанию вся страница)
+
+    Returns:
+        Grayscale массив uint8 формы (height, width)
+    """
+    pix = page.get_pixmap(
+        matrix=fitz.Matrix(scale, scale),
+        colorspace=fitz.csGRAY,
+        alpha=False,
+        clip=clip,
+    )
+    return pixmap_to_array(pix)
+
+
+def estimate_job_memory(
+    doc: fitz.Document,
+    page_numbers: Optional[Iterable[int]] = None,
+    concurrent_pages: int = 1,
+    scale: float = RENDER_SCALE,
+    document_size: int = 0,
+) -> int:
+    """
+    Оценка пиковой памяти задания по геометрии страниц
+
+    Боксы страниц читаются из дерева страниц (``page_cropbox``) без загрузки
+    страниц и разбора их содержимого. Одновременно живут растры
+    ``concurrent_pages`` страниц, поэтому берутся самые большие из них.
+
+    Args:
+        doc: Документ PyMuPDF
+        page_numbers: Анализируемые страницы (0-based), по умолчанию все
+        concurrent_pages: Число страниц, растрируемых одновременно
+        scale: Масштаб рендеринга
+        document_size: Размер входного PDF в байтах
+
+    Returns:
+        Оценка в байтах
+    """
+    if page_numbers is None:
+        page_numbers = range(doc.page_count)
+    rasters = sorted(
+        (
+            estimate_raster_bytes(box.width, box.height, scale)
+            for box in (doc.page_cropbox(i) for i in page_numbers)
+        ),
+        reverse=True,
+    )
+    return sum(rasters[: max(1, concurrent_pages)]) + document_size * DOCUMENT_COPIES
+
+
+class RasterWindow:
+    """
+    Прямоугольная область растра страницы
+
+    Хранит grayscale фрагмент и его смещение в пикселях полного растра, чтобы
+    детекторы переводили координаты найденных объектов обратно в координаты
+    страницы в одном месте.
+    """
+
+    def __init__(self, gray: np.ndarray, left: int, top: int, scale: float):
+        self.gray = gray
+        self.left = left
+        self.top = top
+        self.scale = scale
+
+    @property
+    def width(self) -> int:
+        """Ширина окна в пикселях"""
+        return int(self.gray.shape[1])
+
+    @property
+    def height(self) -> int:
+        """Высота окна в пикселях"""
+        return int(self.gray.shape[0])
+
+    def to_page_pixels(self, x: float, y: float) -> Tuple[float, float]:
+        """Пиксели окна -> пиксели полного растра страницы"""
+        return self.left + x, self.top + y
+
+    def to_page_points(self, x: float, y: float) -> Tuple[float, float]:
+        """Пиксели окна -> точки PDF в image-СК (origin верх-лево)"""
+        page_x, page_y = self.to_page_pixels(x, y)
+        return page_x / self.scale, page_y / self.scale
+
+
+class PageRaster:
+    """
+    Контекст анализа одной страницы PDF
+
+    Документ открывается один раз, страница рендерится один раз (лениво, при
+    первом обращении к ``gray``), после чего grayscale массив переиспользуется
+    всеми детекторами ``PDFAnalyzer``.
+
+    Детекторам, которым нужна только часть листа (штамп, рамки), достаточно
+    ``window()``: рендерится только запрошенная область (``clip``), поэтому
+    стоимость не зависит от формата листа. Если полный растр уже есть, окно
+    вырезается из него без повторного рендеринга.
+    """
+
+    def __init__(
+        self,
+        doc: fitz.Document,
+        page_number: int,
+        scale: float = RENDER_SCALE,
+        owns_document: bool = False,
+    ):
+        if page_number < 0 or page_number >= len(doc):
+            raise PDFPageOutOfRangeError(page_number, len(doc))
+
+        self.doc = doc
+        self.page_number = page_number
+        self.page = doc[page_number]
+        self.scale = scale
+        self.render_count = 0
+        self.rendered_pixels = 0
+        self._owns_document = owns_document
+        self._gray: Optional[np.ndarray] = None
+        self._windows: Dict[Tuple[int, int, int, int], RasterWindow] = {}
+        self._vectors: Optional[VectorLayout] = None
+
+        pixel_rect = (self.page.rect * fitz.Matrix(scale, scale)).irect
+        self.width_px = pixel_rect.width
+        self.height_px = pixel_rect.height
+
+    @classmethod
+    def open(
+        cls,
+        source: Union[bytes, PDFMapping, str],
+        page_number: int,
+        scale: float = RENDER_SCALE,
+    ) -> "PageRaster":
+        """
+        Открывает документ из байтов или пути к файлу
+
+        Args:
+            source: Содержимое PDF в байтах, отображение файла загрузки
+                или путь к PDF файлу
+            page_number: Номер страницы (начиная с 0)
+            scale: Масштаб рендеринга
+
+        Returns:
+            PageRaster, владеющий открытым документом
+        """
+        if isinstance(source, str):
+            doc = fitz.open(source)
+        else:
+            doc = open_pdf_document(source)
+
+        try:
+            return cls(doc, page_number, scale, owns_document=True)
+        except Exception:
+            doc.close()
+            raise
+
+    @property
+    def page_width(self) -> float:
+        """Ширина страницы в точках PDF"""
+        return float(self.page.rect.width)
+
+    @property
+    def page_height(self) -> float:
+        """Высота страницы в точках PDF"""
+        return float(self.page.rect.height)
+
+    @property
+    def gray(self) -> np.ndarray:
+        """Grayscale изображение страницы (рендерится один раз)"""
+        if self._gray is None:
+            self._gray = self._render()
+        return self._gray
+
+    @property
+    def vectors(self) -> VectorLayout:
+        """Векторная геометрия страницы (извлекается один раз, без рендеринга)"""
+        if self._vectors is None:
+            self._vectors = VectorLayout(self.page)
+        return self._vectors
+
+    def window(self, x0: int, y0: int, x1: int, y1: int) -> RasterWindow:
+        """
+        Grayscale область страницы в пикселях полного растра (origin верх-лево)
+
+        Args:
+            x0, y0: Левый верхний угол области в пикселях
+            x1, y1: Правый нижний угол области в пикселях (не включая)
+
+        Returns:
+            RasterWindow с фрагментом и его смещением
+        """
+        x0, x1 = max(0, int(x0)), min(self.width_px, int(x1))
+        y0, y1 = max(0, int(y0)), min(self.height_px, int(y1))
+        key = (x0, y0, x1, y1)
+
+        if key not in self._windows:
+            if x1 <= x0 or y1 <= y0:
+                window = RasterWindow(
+                    np.zeros((max(0, y1 - y0), max(0, x1 - x0)), dtype=np.uint8),
+                    x0,
+                    y0,
+                    self.scale,
+                )
+            elif self._gray is not None:
+                window = RasterWindow(self._gray[y0:y1, x0:x1], x0, y0, self.scale)
+            else:
+                window = self._render_window(x0, y0, x1, y1)
+            self._windows[key] = window
+        return self._windows[key]
+
+    def _render_window(self, x0: int, y0: int, x1: int, y1: int) -> RasterWindow:
+        """Рендеринг только области страницы (get_pixmap с clip)"""
+        clip = fitz.Rect(x0, y0, x1, y1) * (1.0 / self.scale)
+        pix = self.page.get_pixmap(
+            matrix=fitz.Matrix(self.scale, self.scale),
+            colorspace=fitz.csGRAY,
+            alpha=False,
+            clip=clip,
+        )
+        # Смещение берём из самого pixmap: MuPDF округляет clip до целых пикселей
+        window = RasterWindow(pixmap_to_array(pix), pix.x, pix.y, self.scale)
+        self.render_count += 1
+        self.rendered_pixels += pix.width * pix.height
+
+        logger.debug(
+            "🖼️ Page region rasterized",
+            page_number=self.page_number,
+            scale=self.scale,
+            region=(pix.x, pix.y, pix.width, pix.height),
+        )
+        return window
+
+    def _render(self) -> np.ndarray:
+        """Рендеринг страницы в grayscale массив"""
+        gray = render_gray(self.page, self.scale)
+        self.render_count += 1
+        self.rendered_pixels += gray.size
+
+        logger.debug(
+            "🖼️ Page rasterized",
+            page_number=self.page_number,
+            scale=self.scale,
+            pixmap_size=(gray.shape[1], gray.shape[0]),
+        )
+        return gray
+
+    def close(self) -> None:
+        """Освобождает растр и закрывает документ, если он принадлежит контексту"""
+        self._gray = None
+        self._windows.clear()
+        self._vectors = None
+        if self._owns_document and not self.doc.is_closed:
+            self.doc.close()
+
+    def __enter__(self) -> "PageRaster":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
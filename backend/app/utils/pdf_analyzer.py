@@ -4,15 +4,14 @@ PDF analyzer for detecting stamp and frame positions
 
 import structlog
 import time
-import psutil
 from typing import Dict, Any, Tuple, Optional, List
-from PyPDF2 import PdfReader
 from PIL import Image
-import io
-from io import BytesIO
-import fitz  # PyMuPDF
 import numpy as np
 from app.core.config import settings
+from app.utils.document_handle import DocumentHandle
+from app.utils.layout_cache import LayoutCache, layout_cache
+from app.utils.page_raster import PageRaster, RENDER_SCALE
+from app.utils.resource_monitor import estimate_raster_bytes, resource_monitor
 from app.utils.pdf_exceptions import (
     PDFAnalysisError, PDFFileError, PDFCorruptedError, PDFPageError, 
     PDFPageOutOfRangeError, PDFPageCorruptedError, PDFImageProcessingError,
@@ -46,14 +45,27 @@ except ImportError as e:
         )
     )
 
+# Элементы макета, которые определяет analyze_page_layout (и которые кэшируются)
+LAYOUT_ELEMENTS = (
+    "stamp_top_edge",
+    "right_frame_edge",
+    "bottom_frame_edge",
+    "horizontal_line_18cm",
+    "free_space_3_5cm",
+)
+
 class PDFAnalyzer:
     """PDF analyzer for detecting stamp and frame positions"""
-    
-    def __init__(self):
+
+    def __init__(self, cache: Optional[LayoutCache] = None):
         self.logger = structlog.get_logger(__name__)
+        # Content-addressed кэш результатов анализа (память + Redis)
+        if cache is None and settings.LAYOUT_CACHE_ENABLED:
+            cache = layout_cache
+        self.layout_cache = cache
         self.analysis_timeout = 30.0  # Таймаут анализа в секундах
         self.max_memory_usage = 1024 * 1024 * 1024  # 1GB максимальное использование памяти
-        
+
         # Статистика анализа
         self.analysis_stats = {
             "total_analyses": 0,
@@ -63,60 +75,59 @@ class PDFAnalyzer:
             "average_analysis_time": 0.0,
             "memory_usage_history": []
         }
-    
-    def _check_system_resources(self) -> None:
-        """Проверка доступности системных ресурсов"""
-        try:
-            # Проверка доступной памяти
-            memory = psutil.virtual_memory()
-            available_memory = memory.available
-            
-            if available_memory < self.max_memory_usage:
-                raise PDFMemoryError(
-                    f"Insufficient memory for PDF analysis. Available: {available_memory / (1024*1024):.1f}MB, Required: {self.max_memory_usage / (1024*1024):.1f}MB",
-                    required_memory=self.max_memory_usage,
-                    available_memory=available_memory
-                )
-            
-            # Проверка загрузки CPU
-            cpu_percent = psutil.cpu_percent(interval=0.1)
-            if cpu_percent > 90:
-                import warnings
-                warnings.warn(
-                    PDFPerformanceWarning(
-                        f"High CPU usage detected: {cpu_percent:.1f}%. PDF analysis may be slow.",
-                        performance_metric="cpu_usage",
-                        metric_value=cpu_percent
-                    )
+
+    def _check_system_resources(
+        self, required_memory: int, page_number: Optional[int] = None
+    ) -> None:
+        """
+        Проверка доступности системных ресурсов
+
+        Показатели берутся из последнего замера фонового монитора, без
+        блокирующих вызовов psutil. Если после выделения растра страницы
+        свободной памяти останется меньше резерва, задание ждёт освобождения
+        памяти и затем отклоняется с PDFMemoryError.
+
+        Args:
+            required_memory: Оценка пиковой памяти растра страницы в байтах
+            page_number: Номер страницы (для диагностики)
+        """
+        snapshot = resource_monitor.admit(required_memory, page_number=page_number)
+
+        if snapshot.cpu_percent > 90:
+            import warnings
+            warnings.warn(
+                PDFPerformanceWarning(
+                    f"High CPU usage detected: {snapshot.cpu_percent:.1f}%. "
+                    "PDF analysis may be slow.",
+                    performance_metric="cpu_usage",
+                    metric_value=snapshot.cpu_percent
                 )
-                
-        except Exception as e:
-            self.logger.warning("Failed to check system resources", error=str(e))
-    
+            )
+
     def _validate_pdf_content(self, pdf_content: bytes) -> None:
         """Валидация содержимого PDF"""
         if not pdf_content:
             raise PDFFileError("PDF content is empty", file_size=0)
-        
+
         if len(pdf_content) < 100:  # Минимальный размер PDF
             raise PDFFileError(
                 f"PDF file is too small: {len(pdf_content)} bytes. Minimum size is 100 bytes.",
                 file_size=len(pdf_content)
             )
-        
-        if not pdf_content.startswith(b'%PDF'):
+
+        if pdf_content[:4] != b'%PDF':
             raise PDFCorruptedError(
                 "Invalid PDF file format. File does not start with PDF signature.",
                 corruption_type="invalid_signature"
             )
-        
+
         # Проверка на повреждение файла
         if b'%%EOF' not in pdf_content[-1000:]:  # Проверяем последние 1000 байт
             raise PDFCorruptedError(
                 "PDF file appears to be truncated. EOF marker not found.",
                 corruption_type="truncated_file"
             )
-    
+
     def _validate_page_number(self, page_number: int, total_pages: int) -> None:
         """Валидация номера страницы"""
         if page_number < 0:
@@ -125,10 +136,10 @@ class PDFAnalyzer:
                 page_number=page_number,
                 total_pages=total_pages
             )
-        
+
         if page_number >= total_pages:
             raise PDFPageOutOfRangeError(page_number, total_pages)
-    
+
     def _check_analysis_timeout(self, start_time: float, stage: str) -> None:
         """Проверка таймаута анализа"""
         elapsed_time = time.time() - start_time
@@ -138,19 +149,90 @@ class PDFAnalyzer:
                 timeout_seconds=elapsed_time,
                 analysis_stage=stage
             )
-    
+
+    def _page_raster(
+        self, pdf_path: str, page_number: int, raster: Optional[PageRaster] = None
+    ) -> Tuple[PageRaster, Optional[PageRaster]]:
+        """
+        Возвращает общий растр страницы, либо открывает собственный
+        для одиночного вызова детектора
+
+        Args:
+            pdf_path: Путь к PDF файлу или содержимое PDF в байтах
+            page_number: Номер страницы (начиная с 0)
+            raster: Уже подготовленный растр страницы (из analyze_page_layout)
+
+        Returns:
+            (растр, собственный растр или None) - собственный растр закрывает вызывающий
+        """
+        if raster is not None:
+            return raster, None
+
+        own_raster = PageRaster.open(pdf_path, page_number)
+        return own_raster, own_raster
+
+    def _detect_from_vectors(
+        self,
+        pdf_path: str,
+        page_number: int,
+        raster: Optional[PageRaster],
+        detector: str,
+    ) -> Optional[Any]:
+        """
+        Детекция по векторной геометрии страницы (операторы рисования CAD)
+
+        Args:
+            pdf_path: Путь к PDF файлу или содержимое PDF в байтах
+            page_number: Номер страницы (начиная с 0)
+            raster: Общий растр страницы (если None, открывается собственный)
+            detector: Имя метода VectorLayout
+
+        Returns:
+            Результат детектора, или None если пригодной векторной геометрии нет
+            (тогда используются растровые детекторы)
+        """
+        if not settings.QR_VECTOR_DETECTION:
+            return None
+
+        own_raster = None
+        try:
+            raster, own_raster = self._page_raster(pdf_path, page_number, raster)
+            vectors = raster.vectors
+            result = getattr(vectors, detector)()
+        except Exception as e:
+            self.logger.warning(
+                "⚠️ Vector detection failed, falling back to raster",
+                detector=detector,
+                error=str(e),
+                page_number=page_number,
+            )
+            return None
+        finally:
+            if own_raster is not None:
+                own_raster.close()
+
+        if result is not None:
+            self.logger.info(
+                "✅ Detected from vector geometry",
+                detector=detector,
+                result=result,
+                source=vectors.source,
+                page_number=page_number,
+            )
+        return result
+
     def _update_analysis_stats(self, success: bool, analysis_time: float, fallback_used: bool = False) -> None:
         """Обновление статистики анализа"""
         self.analysis_stats["total_analyses"] += 1
-        
+
         if success:
             self.analysis_stats["successful_analyses"] += 1
         else:
             self.analysis_stats["failed_analyses"] += 1
-        
+
         if fallback_used:
             self.analysis_stats["fallback_analyses"] += 1
-        
+
         # Обновляем среднее время анализа
         total_successful = self.analysis_stats["successful_analyses"]
         if total_successful > 0:
@@ -158,22 +240,22 @@ class PDFAnalyzer:
             self.analysis_stats["average_analysis_time"] = (
                 (current_avg * (total_successful - 1) + analysis_time) / total_successful
             )
-        
+
         # Записываем использование памяти
         try:
-            memory_usage = psutil.Process().memory_info().rss
+            memory_usage = resource_monitor.snapshot.rss_bytes
             self.analysis_stats["memory_usage_history"].append({
                 "timestamp": time.time(),
                 "memory_mb": memory_usage / (1024 * 1024)
             })
-            
+
             # Ограничиваем историю последними 100 записями
             if len(self.analysis_stats["memory_usage_history"]) > 100:
                 self.analysis_stats["memory_usage_history"] = self.analysis_stats["memory_usage_history"][-100:]
-                
+
         except Exception as e:
             self.logger.warning("Failed to record memory usage", error=str(e))
-    
+
     def get_analysis_stats(self) -> Dict[str, Any]:
         """Получение статистики анализа"""
         return {
@@ -184,7 +266,7 @@ class PDFAnalyzer:
             "analysis_timeout": self.analysis_timeout,
             "max_memory_usage_mb": self.max_memory_usage / (1024 * 1024)
         }
-    
+
     def to_pdf_point(self, x_img: float, y_img: float, page_h: float) -> Tuple[float, float]:
         """
         Конвертирует точку из image-СК (origin верх-лево) в PDF-СК (origin низ-лево)
@@ -201,13 +283,13 @@ class PDFAnalyzer:
         x_pdf = x_img
         # Для точки: y_pdf = page_height - y_img
         y_pdf = page_h - y_img
-        
+
         self.logger.debug("🔄 Point conversion: image -> PDF", 
                         x_img=x_img, y_img=y_img, page_h=page_h,
                         x_pdf=x_pdf, y_pdf=y_pdf)
-        
+
         return x_pdf, y_pdf
-    
+
     def to_pdf_bbox(self, x_img: float, y_img: float, obj_w: float, obj_h: float, page_h: float) -> Tuple[float, float, float, float]:
         """
         Конвертирует bbox из image-СК (origin верх-лево) в PDF-СК (origin низ-лево)
@@ -226,13 +308,13 @@ class PDFAnalyzer:
         x_pdf = x_img
         # Для bbox (верхний левый угол): y_pdf = page_height - (y_img + obj_h)
         y_pdf = page_h - (y_img + obj_h)
-        
+
         self.logger.debug("🔄 Bbox conversion: image -> PDF", 
                         x_img=x_img, y_img=y_img, obj_w=obj_w, obj_h=obj_h, page_h=page_h,
                         x_pdf=x_pdf, y_pdf=y_pdf)
-        
+
         return x_pdf, y_pdf, obj_w, obj_h
-    
+
     def _audit_page_coordinates(self, page, page_number: int = 0) -> Dict[str, Any]:
         """
         Аудит координат и юнитов страницы PDF
@@ -249,11 +331,11 @@ class PDFAnalyzer:
             mediabox = page.mediabox
             cropbox = page.cropbox if hasattr(page, 'cropbox') else None
             rotation = getattr(page, 'rotation', 0) % 360
-            
+
             # Основные размеры
             mediabox_width = float(mediabox.width)
             mediabox_height = float(mediabox.height)
-            
+
             # CropBox (если есть)
             cropbox_info = None
             if cropbox:
@@ -267,7 +349,7 @@ class PDFAnalyzer:
                     "x1": float(cropbox[2]),  # right
                     "y1": float(cropbox[3])   # top
                 }
-            
+
             # Определяем какой бокс использовать для позиционирования
             position_box = settings.QR_POSITION_BOX.lower()
             if position_box == "crop" and cropbox_info:
@@ -285,7 +367,7 @@ class PDFAnalyzer:
                     "y1": float(mediabox[3])   # top
                 }
                 active_box_type = "mediabox"
-            
+
             # Информация о координатной системе
             coordinate_info = {
                 "page_number": page_number,
@@ -313,7 +395,7 @@ class PDFAnalyzer:
                     "respect_rotation": settings.QR_RESPECT_ROTATION
                 }
             }
-            
+
             # Логируем детальную информацию
             self.logger.debug("📐 Page coordinate audit", 
                             page_number=page_number,
@@ -332,14 +414,14 @@ class PDFAnalyzer:
                             respect_rotation_config=settings.QR_RESPECT_ROTATION,
                             orientation=coordinate_info["orientation"],
                             aspect_ratio=coordinate_info["aspect_ratio"])
-            
+
             return coordinate_info
-            
+
         except Exception as e:
             self.logger.error("❌ Error auditing page coordinates", 
                             error=str(e), page_number=page_number)
             return {}
-    
+
     def compute_simple_anchor(self, page_box: Dict[str, float], qr_size: float, margin: float = None, 
                              anchor: str = None) -> Tuple[float, float]:
         """
@@ -357,13 +439,13 @@ class PDFAnalyzer:
         try:
             width = page_box["width"]
             height = page_box["height"]
-            
+
             # Используем значения из конфига если не указаны
             if margin is None:
                 margin = settings.QR_MARGIN_PT
             if anchor is None:
                 anchor = settings.QR_ANCHOR
-            
+
             # Жёсткая геометрия для разных якорей
             if anchor == 'bottom-right':
                 x = width - qr_size - margin
@@ -381,11 +463,11 @@ class PDFAnalyzer:
                 self.logger.warning(f"Unknown anchor '{anchor}', using 'bottom-right'")
                 x = width - qr_size - margin
                 y = margin
-            
+
             # Клэмп координат: x = clamp(x, 0, W - qr_w), y = clamp(y, 0, H - qr_h)
             x = max(0, min(x, width - qr_size))
             y = max(0, min(y, height - qr_size))
-            
+
             self.logger.debug("🎯 Hard anchor calculation", 
                             anchor=anchor,
                             page_width=width,
@@ -394,9 +476,9 @@ class PDFAnalyzer:
                             margin=margin,
                             x=x, y=y,
                             clamped=True)
-            
+
             return x, y
-            
+
         except Exception as e:
             self.logger.error("❌ Error computing hard anchor", 
                             error=str(e), anchor=anchor)
@@ -429,17 +511,17 @@ class PDFAnalyzer:
         try:
             # Сначала вычисляем жёсткую геометрию якоря
             base_x, base_y = self.compute_simple_anchor(page_box, qr_size, margin, anchor)
-            
+
             # Нормализуем поворот
             rotation = rotation % 360
-            
+
             # Проверяем, нужно ли учитывать поворот
             if not settings.QR_RESPECT_ROTATION:
                 rotation = 0
-            
+
             width = page_box["width"]
             height = page_box["height"]
-            
+
             # Применяем поворот по правильной таблице
             if rotation == 0:
                 final_x, final_y = base_x, base_y
@@ -458,11 +540,11 @@ class PDFAnalyzer:
             else:
                 self.logger.warning(f"Unsupported rotation {rotation}, using 0°")
                 final_x, final_y = base_x, base_y
-            
+
             # Клэмп координат после поворота
             final_x = max(0, min(final_x, width - qr_size))
             final_y = max(0, min(final_y, height - qr_size))
-            
+
             self.logger.debug("🎯 QR anchor calculation with rotation", 
                             anchor=anchor,
                             rotation=rotation,
@@ -476,15 +558,15 @@ class PDFAnalyzer:
                             final_x=final_x,
                             final_y=final_y,
                             clamped=True)
-            
+
             return final_x, final_y
-            
+
         except Exception as e:
             self.logger.error("❌ Error computing QR anchor", 
                             error=str(e), anchor=anchor, rotation=rotation)
             # Fallback к жёсткому якорю без поворота
             return self.compute_simple_anchor(page_box, qr_size, margin, anchor)
-    
+
     def _draw_debug_frame(self, pdf_path: str, page_number: int, x: float, y: float, 
                          width: float, height: float) -> Optional[str]:
         """
@@ -501,236 +583,297 @@ class PDFAnalyzer:
         """
         if not settings.QR_DEBUG_FRAME:
             return None
-            
+
         try:
             import fitz
             from PIL import Image, ImageDraw
             import io
-            
+
             # Открываем PDF
             doc = fitz.open(pdf_path)
             if page_number >= len(doc):
                 return None
-                
+
             page = doc[page_number]
-            
+
             # Конвертируем страницу в изображение
             mat = fitz.Matrix(2.0, 2.0)
             pix = page.get_pixmap(matrix=mat)
             img_data = pix.tobytes("png")
-            
+
             # Создаем PIL изображение
             pil_image = Image.open(io.BytesIO(img_data))
             draw = ImageDraw.Draw(pil_image)
-            
+
             # Конвертируем координаты в пиксели
             scale_factor = 2.0
             x_pixels = int(x * scale_factor)
             y_pixels = int(y * scale_factor)
             width_pixels = int(width * scale_factor)
             height_pixels = int(height * scale_factor)
-            
+
             # Конвертируем Y координату (PDF origin снизу-слева -> PIL origin сверху-слева)
             img_height = pil_image.height
             y_pixels_pil = img_height - y_pixels - height_pixels
-            
+
             # Рисуем debug рамку (красная, толщина 2 пикселя)
             debug_color = (255, 0, 0)  # Красный
             debug_thickness = 2
-            
+
             # Рисуем прямоугольник
             draw.rectangle([
                 x_pixels, y_pixels_pil,
                 x_pixels + width_pixels, y_pixels_pil + height_pixels
             ], outline=debug_color, width=debug_thickness)
-            
+
             # Добавляем текст с координатами
             text = f"QR: ({x:.1f}, {y:.1f})"
             draw.text((x_pixels, y_pixels_pil - 20), text, fill=debug_color)
-            
+
             # Сохраняем debug изображение
             debug_filename = f"/app/tmp/debug_qr_frame_page_{page_number}.png"
             pil_image.save(debug_filename)
-            
+
             self.logger.debug("🎨 Debug frame drawn", 
                             debug_filename=debug_filename,
                             qr_x=x, qr_y=y,
                             qr_width=width, qr_height=height,
                             x_pixels=x_pixels, y_pixels_pil=y_pixels_pil)
-            
+
             doc.close()
             return debug_filename
-            
+
         except Exception as e:
             self.logger.error("❌ Error drawing debug frame", 
                             error=str(e), pdf_path=pdf_path, page_number=page_number)
             return None
-        
-    def detect_stamp_top_edge_landscape(self, pdf_path: str, page_number: int = 0) -> Optional[float]:
+
+    def _save_stamp_region_debug(
+        self, stamp_region: np.ndarray, page_number: int
+    ) -> None:
+        """
+        Сохраняет область поиска штампа в файл для отладки
+
+        Только в отладочном режиме: в рабочем режиме анализ не пишет на диск.
+        """
+        if not settings.QR_DEBUG_FRAME:
+            return
+
+        try:
+            # Создаем PIL изображение из области поиска штампа
+            stamp_pil = Image.fromarray(stamp_region)
+
+            # Сохраняем в файл для отладки
+            debug_filename = f"/app/tmp/stamp_region_debug_page_{page_number}.png"
+            stamp_pil.save(debug_filename)
+
+            height, width = stamp_region.shape[:2]
+            self.logger.debug(
+                "💾 Saved stamp region for debugging",
+                filename=debug_filename,
+                region_size=(width, height),
+                region_size_cm=(
+                    round(width / (28.35 * 2.0), 2),
+                    round(height / (28.35 * 2.0), 2),
+                ),
+            )
+        except Exception as e:
+            self.logger.warning(
+                "⚠️ Failed to save stamp region for debugging", error=str(e)
+            )
+
+    def detect_stamp_top_edge_landscape(
+        self, pdf_path: str, page_number: int = 0, raster: Optional[PageRaster] = None
+    ) -> Optional[float]:
         """
         Определяет верхний край штампа основной надписи на landscape странице
         Detect top edge of main note stamp on landscape page
         Args:
             pdf_content: Содержимое PDF файла в байтах
             page_number: Номер страницы (начиная с 0)
-            
+            raster: Общий растр страницы (если None, открывается собственный)
+
         Returns:
             Y-координата верхнего края штампа в точках PDF, или None если не найден
         """
-        self.logger.info(f"INTELIGENT POSITIONING. Detect top edge of main note stamp on landscape page: src=original, tmp=NO, requested_page={page_number}")
+        self.logger.info(
+            "INTELIGENT POSITIONING. Detect top edge of main note stamp on landscape "
+            f"page: src=original, tmp=NO, requested_page={page_number}"
+        )
+        stamp_top_y = self._detect_from_vectors(
+            pdf_path, page_number, raster, "stamp_top_y"
+        )
+        if stamp_top_y is not None:
+            return stamp_top_y
+
         if not CV_AVAILABLE:
             self.logger.warning("OpenCV not available, using fallback stamp detection")
-            return self._fallback_stamp_detection(pdf_path, page_number)
-            
+            return self._fallback_stamp_detection(pdf_path, page_number, raster)
+
+        own_raster = None
         try:
-            self.logger.debug("🔍 INTELIGENT POSITIONING. Starting stamp detection for landscape page", 
-                            pdf_path=pdf_path, page_number=page_number)
-            
-            # Открываем PDF с помощью PyMuPDF для анализа изображения
-            doc = fitz.open(pdf_path)
-            if page_number >= len(doc):
-                self.logger.error("❌ Page number out of range", 
-                                page_number=page_number, total_pages=len(doc))
-                return None
-                
-            page = doc[page_number]
-            
+            self.logger.debug(
+                "🔍 INTELIGENT POSITIONING. Starting stamp detection for landscape page",
+                pdf_path=pdf_path,
+                page_number=page_number,
+            )
+
+            # Используем общий растр страницы (документ открывается и рендерится один
+            # раз)
+            raster, own_raster = self._page_raster(pdf_path, page_number, raster)
+            page = raster.page
+
             # Аудит координат страницы
             coordinate_info = self._audit_page_coordinates(page, page_number)
-            
+
             # Получаем размеры страницы из активного бокса
             page_width = coordinate_info["active_box"]["width"]
             page_height = coordinate_info["active_box"]["height"]
             rotation = coordinate_info["rotation"]
-            
-            self.logger.debug("📄 Page dimensions (audited)", 
-                            page_width=page_width, page_height=page_height,
-                            rotation=rotation,
-                            aspect_ratio=coordinate_info["aspect_ratio"],
-                            orientation=coordinate_info["orientation"])
-            
+
+            self.logger.debug(
+                "📄 Page dimensions (audited)",
+                page_width=page_width,
+                page_height=page_height,
+                rotation=rotation,
+                aspect_ratio=coordinate_info["aspect_ratio"],
+                orientation=coordinate_info["orientation"],
+            )
+
             # Проверяем, что страница в landscape ориентации
             if page_width <= page_height:
-                self.logger.warning("⚠️ Page is not in landscape orientation", 
-                                  page_width=page_width, page_height=page_height,
-                                  aspect_ratio=page_width/page_height)
+                self.logger.warning(
+                    "⚠️ Page is not in landscape orientation",
+                    page_width=page_width,
+                    page_height=page_height,
+                    aspect_ratio=page_width / page_height,
+                )
                 return None
-            
-            # Конвертируем страницу в изображение с высоким разрешением
-            mat = fitz.Matrix(2.0, 2.0)  # Увеличиваем разрешение в 2 раза
-            pix = page.get_pixmap(matrix=mat)
-            img_data = pix.tobytes("png")
-            
-            self.logger.debug("🖼️ Image conversion", 
-                            matrix_scale=2.0, 
-                            pixmap_size=(pix.width, pix.height))
-            
-            # Конвертируем в PIL Image
-            pil_image = Image.open(io.BytesIO(img_data))
-            img_array = np.array(pil_image.convert('L'))  # Конвертируем в grayscale
-            
-            self.logger.debug("📊 Image processing", 
-                            original_size=(pil_image.width, pil_image.height),
-                            grayscale_shape=img_array.shape,
-                            pixel_range=(img_array.min(), img_array.max()))
-            
-            # Ищем штамп в правом нижнем углу листа в области 20 см по горизонтали и 8 см по вертикали
-            # Увеличили область для учета отступов от края листа до рамки (0.5+ мм) + толщина рамки
+
+            # Ищем штамп в правом нижнем углу листа в области 20 см по горизонтали и 8
+            # см по вертикали
+            # Увеличили область для учета отступов от края листа до рамки (0.5+ мм) +
+            # толщина рамки
             # Конвертируем см в пиксели (1 см = 28.35 точек, масштаб 2.0)
-            stamp_detection_area_width_cm = 20.0  # Увеличили с 15 до 20 см для учета отступов и рамки
-            stamp_detection_area_height_cm = 10.0  # Увеличили с 6 до 10 см для учета отступов и рамки
-            stamp_width_pixels = int(stamp_detection_area_width_cm * 28.35 * 2.0)  # 20 см в пикселях
-            stamp_height_pixels = int(stamp_detection_area_height_cm * 28.35 * 2.0)  # 10 см в пикселях
-            
+            stamp_detection_area_width_cm = (
+                20.0  # Увеличили с 15 до 20 см для учета отступов и рамки
+            )
+            stamp_detection_area_height_cm = (
+                10.0  # Увеличили с 6 до 10 см для учета отступов и рамки
+            )
+            stamp_width_pixels = int(
+                stamp_detection_area_width_cm * 28.35 * 2.0
+            )  # 20 см в пикселях
+            stamp_height_pixels = int(
+                stamp_detection_area_height_cm * 28.35 * 2.0
+            )  # 10 см в пикселях
+
             # Определяем область поиска в правом нижнем углу
-            right_start = max(0, img_array.shape[1] - stamp_width_pixels)
-            bottom_start = max(0, img_array.shape[0] - stamp_height_pixels)
-            
-            # Извлекаем область поиска штампа
-            stamp_region = img_array[bottom_start:, right_start:]
-            
-            # В данном месте, в целях отладки выделяем и сохраняем в файл область поиска штампа
-            try:
-                # Создаем PIL изображение из области поиска штампа
-                stamp_pil = Image.fromarray(stamp_region)
-                
-                # Сохраняем в файл для отладки
-                debug_filename = f"/app/tmp/stamp_region_debug_page_{page_number}.png"
-                stamp_pil.save(debug_filename)
-                
-                self.logger.debug("💾 Saved stamp region for debugging", 
-                                filename=debug_filename,
-                                region_size=(stamp_region.shape[1], stamp_region.shape[0]),
-                                region_size_cm=(round(stamp_region.shape[1] / (28.35 * 2.0), 2), 
-                                              round(stamp_region.shape[0] / (28.35 * 2.0), 2)))
-            except Exception as e:
-                self.logger.warning("⚠️ Failed to save stamp region for debugging", error=str(e))
-
-            self.logger.debug("🔍 Stamp region analysis", 
-                            total_height=img_array.shape[0],
-                            total_width=img_array.shape[1],
-                            stamp_region_height=stamp_region.shape[0],
-                            stamp_region_width=stamp_region.shape[1],
-                            stamp_width_cm=stamp_detection_area_width_cm,
-                            stamp_height_cm=stamp_detection_area_height_cm,
-                            right_start=right_start,
-                            bottom_start=bottom_start)
-            
+            right_start = max(0, raster.width_px - stamp_width_pixels)
+            bottom_start = max(0, raster.height_px - stamp_height_pixels)
+
+            # Рендерим только область поиска штампа (clip), а не весь лист
+            stamp_window = raster.window(
+                right_start, bottom_start, raster.width_px, raster.height_px
+            )
+            stamp_region = stamp_window.gray
+            right_start, bottom_start = stamp_window.left, stamp_window.top
+
+            self.logger.debug(
+                "📊 Image processing",
+                matrix_scale=raster.scale,
+                grayscale_shape=stamp_region.shape,
+                pixel_range=(stamp_region.min(), stamp_region.max()),
+            )
+
+            # В целях отладки выделяем и сохраняем в файл область поиска штампа
+            self._save_stamp_region_debug(stamp_region, page_number)
+
+            self.logger.debug(
+                "🔍 Stamp region analysis",
+                total_height=raster.height_px,
+                total_width=raster.width_px,
+                stamp_region_height=stamp_region.shape[0],
+                stamp_region_width=stamp_region.shape[1],
+                stamp_width_cm=stamp_detection_area_width_cm,
+                stamp_height_cm=stamp_detection_area_height_cm,
+                right_start=right_start,
+                bottom_start=bottom_start,
+            )
+
             # Ищем позицию правой рамки в области поиска штампа
-            right_frame_x = self._find_right_frame_in_stamp_region(stamp_region, right_start, bottom_start)
+            right_frame_x = self._find_right_frame_in_stamp_region(
+                stamp_region, right_start, bottom_start
+            )
             if right_frame_x is not None:
-                self.logger.info("✅ Right frame found in stamp region", 
-                               right_frame_x=right_frame_x,
-                               right_frame_x_cm=round(right_frame_x / 28.35, 2))
-            
+                self.logger.info(
+                    "✅ Right frame found in stamp region",
+                    right_frame_x=right_frame_x,
+                    right_frame_x_cm=round(right_frame_x / 28.35, 2),
+                )
 
             # Ищем позицию горизонтальной линии 18 см+ в области поиска штампа
-            self.logger.info("🔍 Поиск горизонтальной линии 18 см+ в области поиска штампа")
-            horizontal_line = self._find_horizontal_line_18cm_in_stamp_region(stamp_region, right_frame_x, right_start, bottom_start)
+            self.logger.info(
+                "🔍 Поиск горизонтальной линии 18 см+ в области поиска штампа"
+            )
+            horizontal_line = self._find_horizontal_line_18cm_in_stamp_region(
+                stamp_region, right_frame_x, right_start, bottom_start
+            )
             if horizontal_line is not None:
-                self.logger.info("✅ Horizontal line 18cm+ found in stamp region", 
-                               horizontal_line_y=horizontal_line["y"],
-                               horizontal_line_y_cm=round(horizontal_line["y"] / 28.35, 2))
+                self.logger.info(
+                    "✅ Horizontal line 18cm+ found in stamp region",
+                    horizontal_line_y=horizontal_line["y"],
+                    horizontal_line_y_cm=round(horizontal_line["y"] / 28.35, 2),
+                )
 
             # Ищем позицию нижней рамки в области поиска штампа
-            bottom_frame_y = self._find_bottom_frame_in_stamp_region(stamp_region, right_start, bottom_start)
+            bottom_frame_y = self._find_bottom_frame_in_stamp_region(
+                stamp_region, right_start, bottom_start
+            )
             if bottom_frame_y is not None:
-                self.logger.info("✅ Bottom frame found in stamp region", 
-                               bottom_frame_y=bottom_frame_y,
-                               bottom_frame_y_cm=round(bottom_frame_y / 28.35, 2))
+                self.logger.info(
+                    "✅ Bottom frame found in stamp region",
+                    bottom_frame_y=bottom_frame_y,
+                    bottom_frame_y_cm=round(bottom_frame_y / 28.35, 2),
+                )
 
-            
             # Применяем детекцию краев для поиска прямоугольных областей
             # Используем более мягкие параметры для лучшей детекции
             edges = cv2.Canny(stamp_region, 30, 100)
-            
-            self.logger.debug("🔍 Edge detection", 
-                            canny_low=30, canny_high=100,
-                            edges_shape=edges.shape,
-                            edges_nonzero=np.count_nonzero(edges),
-                            edges_percentage=np.count_nonzero(edges) / edges.size * 100)
-            
+
+            self.logger.debug(
+                "🔍 Edge detection",
+                canny_low=30,
+                canny_high=100,
+                edges_shape=edges.shape,
+                edges_nonzero=np.count_nonzero(edges),
+                edges_percentage=np.count_nonzero(edges) / edges.size * 100,
+            )
+
             # Ищем контуры
-            contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-            
-            self.logger.debug("📐 Contour detection", 
-                            total_contours=len(contours))
-            
+            contours, _ = cv2.findContours(
+                edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE
+            )
+
+            self.logger.debug("📐 Contour detection", total_contours=len(contours))
+
             # Фильтруем контуры по размеру и форме (ищем прямоугольные области)
             stamp_contours = []
             filtered_contours = []
-            
+
             for i, contour in enumerate(contours):
                 # Вычисляем площадь контура
                 area = cv2.contourArea(contour)
                 if area < 100:  # Еще больше уменьшили минимальную площадь
-                    filtered_contours.append(f"contour_{i}: area={area:.0f} (too small)")
+                    filtered_contours.append(
+                        f"contour_{i}: area={area:.0f} (too small)"
+                    )
                     continue
-                    
+
                 # Аппроксимируем контур с более мягкими параметрами
                 epsilon = 0.05 * cv2.arcLength(contour, True)  # Увеличили epsilon
                 approx = cv2.approxPolyDP(contour, epsilon, True)
-                
+
                 # Проверяем, что это прямоугольник (4 угла) или близко к нему
                 if len(approx) >= 4:  # Разрешаем больше углов
                     # Проверяем соотношение сторон (штамп обычно не очень широкий)
@@ -738,197 +881,253 @@ class PDFAnalyzer:
                     aspect_ratio = w / h
                     if 0.3 < aspect_ratio < 5.0:  # Расширили диапазон соотношений
                         stamp_contours.append((contour, x, y, w, h))
-                        filtered_contours.append(f"contour_{i}: area={area:.0f}, bbox=({x},{y},{w},{h}), aspect={aspect_ratio:.2f}, corners={len(approx)} ✅")
+                        filtered_contours.append(
+                            f"contour_{i}: area={area:.0f}, bbox=({x},{y},{w},{h}), "
+                            f"aspect={aspect_ratio:.2f}, corners={len(approx)} ✅"
+                        )
                     else:
-                        filtered_contours.append(f"contour_{i}: area={area:.0f}, bbox=({x},{y},{w},{h}), aspect={aspect_ratio:.2f} (bad aspect)")
+                        filtered_contours.append(
+                            f"contour_{i}: area={area:.0f}, bbox=({x},{y},{w},{h}), "
+                            f"aspect={aspect_ratio:.2f} (bad aspect)"
+                        )
                 else:
-                    filtered_contours.append(f"contour_{i}: area={area:.0f}, corners={len(approx)} (not rectangular)")
-            
-            self.logger.debug("🔍 Contour filtering", 
-                            valid_stamp_contours=len(stamp_contours),
-                            filtered_details=filtered_contours[:20])  # Показываем первые 20
-            
+                    filtered_contours.append(
+                        f"contour_{i}: area={area:.0f}, corners={len(approx)} (not "
+                        "rectangular)"
+                    )
+
+            self.logger.debug(
+                "🔍 Contour filtering",
+                valid_stamp_contours=len(stamp_contours),
+                filtered_details=filtered_contours[:20],
+            )  # Показываем первые 20
+
             if not stamp_contours:
                 self.logger.warning("❌ No stamp contours found on landscape page")
                 return None
-            
+
             # Выбираем контур, который наиболее вероятно является штампом
-            # Приоритет: 1) Позиция (правый нижний угол), 2) Размер, 3) Соотношение сторон
+            # Приоритет: 1) Позиция (правый нижний угол), 2) Размер, 3) Соотношение
+            # сторон
             def stamp_score(contour_data):
                 _, x, y, w, h = contour_data
                 area = w * h
                 aspect_ratio = w / h
-                
+
                 # Бонус за позицию в правом нижнем углу области поиска
                 position_score = 0
-                if x > stamp_region.shape[1] * 0.6:  # В правой части области поиска (увеличили с 0.5 до 0.6)
+                if (
+                    x > stamp_region.shape[1] * 0.6
+                ):  # В правой части области поиска (увеличили с 0.5 до 0.6)
                     position_score += 4  # Увеличили бонус
-                if y > stamp_region.shape[0] * 0.4:  # В нижней части области поиска (увеличили с 0.3 до 0.4)
+                if (
+                    y > stamp_region.shape[0] * 0.4
+                ):  # В нижней части области поиска (увеличили с 0.3 до 0.4)
                     position_score += 4  # Увеличили бонус
-                
+
                 # Бонус за подходящее соотношение сторон (штамп обычно не очень широкий)
                 aspect_score = 0
                 if 1.5 < aspect_ratio < 4.0:  # Оптимальное соотношение для штампа
                     aspect_score += 3
                 elif 1.0 < aspect_ratio < 6.0:  # Приемлемое соотношение
                     aspect_score += 1
-                
+
                 # Бонус за размер (не слишком маленький, не слишком большой)
                 size_score = 0
                 if 1000 < area < 50000:  # Оптимальный размер
                     size_score += 2
                 elif 500 < area < 100000:  # Приемлемый размер
                     size_score += 1
-                
+
                 total_score = position_score + aspect_score + size_score
                 return total_score
-            
+
             # Сортируем по оценке штампа
             stamp_contours.sort(key=stamp_score, reverse=True)
-            
-            self.logger.debug("📊 Stamp selection", 
-                            total_candidates=len(stamp_contours),
-                            areas=[x[3] * x[4] for x in stamp_contours])
-            
+
+            self.logger.debug(
+                "📊 Stamp selection",
+                total_candidates=len(stamp_contours),
+                areas=[x[3] * x[4] for x in stamp_contours],
+            )
+
             # Берем контур с наивысшей оценкой
             _, x, y, w, h = stamp_contours[0]
-            
+
             # Логируем детали выбора штампа
             selected_score = stamp_score(stamp_contours[0])
-            self.logger.debug("🎯 Selected stamp", 
-                            bbox=(x, y, w, h),
-                            area=w * h,
-                            aspect_ratio=w / h,
-                            score=selected_score)
-            
+            self.logger.debug(
+                "🎯 Selected stamp",
+                bbox=(x, y, w, h),
+                area=w * h,
+                aspect_ratio=w / h,
+                score=selected_score,
+            )
+
             # Логируем топ-3 кандидатов для отладки
             top_candidates = []
             for i, (_, cx, cy, cw, ch) in enumerate(stamp_contours[:3]):
                 score = stamp_score(stamp_contours[i])
-                top_candidates.append(f"#{i+1}: bbox=({cx},{cy},{cw},{ch}), area={cw*ch}, aspect={cw/ch:.2f}, score={score}")
-            
-            self.logger.debug("🏆 Top stamp candidates", 
-                            candidates=top_candidates)
-            
+                top_candidates.append(
+                    f"#{i+1}: bbox=({cx},{cy},{cw},{ch}), area={cw*ch}, "
+                    f"aspect={cw/ch:.2f}, score={score}"
+                )
+
+            self.logger.debug("🏆 Top stamp candidates", candidates=top_candidates)
+
             # Конвертируем координаты обратно в PDF точки
-            # x, y - это координаты относительно области поиска штампа
-            # Нужно пересчитать относительно всей страницы
-            actual_x = right_start + x
-            actual_y = bottom_start + y
+            # x, y - это координаты относительно области поиска штампа,
+            # пересчёт относительно всей страницы и масштаба делает окно растра
+            actual_x, actual_y = stamp_window.to_page_pixels(x, y)
             stamp_top_y = actual_y - h  # Верхний край штампа
-            
-            # Конвертируем из пикселей изображения в PDF точки
-            # Учитываем масштаб (mat = 2.0)
-            scale_factor = 2.0
-            
+            scale_factor = raster.scale
+
             # Нормализация координат: используем новую функцию конверсии
             # stamp_top_y в image-СК (от верха), нужно в PDF-СК (от низа)
-            x_img_points = actual_x / scale_factor
-            y_img_points = stamp_top_y / scale_factor
-            
+            x_img_points, y_img_points = stamp_window.to_page_points(x, y - h)
+
             x_pdf, y_pdf = self.to_pdf_point(x_img_points, y_img_points, page_height)
             stamp_top_y_points = y_pdf
-            
-            self.logger.debug("🔄 Coordinate conversion", 
-                            right_start=right_start,
-                            bottom_start=bottom_start,
-                            actual_x=actual_x,
-                            actual_y=actual_y,
-                            stamp_top_y=stamp_top_y,
-                            scale_factor=scale_factor,
-                            final_y_points=stamp_top_y_points)
-            
-            self.logger.info("✅ Stamp top edge detected successfully", 
-                           stamp_top_y_points=stamp_top_y_points,
-                           stamp_bbox=(x, y, w, h),
-                           confidence="high" if len(stamp_contours) == 1 else "medium")
-            
-            doc.close()
+
+            self.logger.debug(
+                "🔄 Coordinate conversion",
+                right_start=right_start,
+                bottom_start=bottom_start,
+                actual_x=actual_x,
+                actual_y=actual_y,
+                stamp_top_y=stamp_top_y,
+                scale_factor=scale_factor,
+                final_y_points=stamp_top_y_points,
+            )
+
+            self.logger.info(
+                "✅ Stamp top edge detected successfully",
+                stamp_top_y_points=stamp_top_y_points,
+                stamp_bbox=(x, y, w, h),
+                confidence="high" if len(stamp_contours) == 1 else "medium",
+            )
+
             return stamp_top_y_points
-            
+
         except Exception as e:
-            self.logger.error("Error detecting stamp top edge", 
-                            error=str(e), pdf_path=pdf_path, page_number=page_number)
+            self.logger.error(
+                "Error detecting stamp top edge",
+                error=str(e),
+                pdf_path=pdf_path,
+                page_number=page_number,
+            )
             return None
-    
-    def compute_heuristics_delta(self, pdf_path: str, page_number: int = 0) -> tuple[float, float]:
+        finally:
+            if own_raster is not None:
+                own_raster.close()
+
+    def compute_heuristics_delta(
+        self,
+        pdf_content: bytes,
+        page_number: int = 0,
+        document: Optional[DocumentHandle] = None,
+    ) -> tuple[float, float]:
         """
         Вычисляет дельту (dx, dy) для коррекции якоря на основе эвристик
-        
+
+        Анализ выполняется в памяти: по растру страницы общего документа задания
+        (или собственного документа, открытого из байтов на время вызова).
+
         Args:
             pdf_content: Содержимое PDF файла в байтах
             page_number: Номер страницы (начиная с 0)
-            
+            document: Уже разобранный документ задания (без повторного открытия)
+
         Returns:
             Tuple (dx, dy) - дельта для коррекции якоря в точках PDF
         """
+        own_document = document is None
+        if own_document:
+            document = DocumentHandle(pdf_content)
+
+        raster = None
         try:
+            if page_number >= document.page_count:
+                return 0.0, 0.0
+
             # Получаем полную позицию от эвристик
-            self.logger.info(f"INTELIGENT POSITIONING. Compute Heuristics Delta. Find QR code position in stamp region: src=original, tmp=NO, requested_page={page_number}")
-            # Создаем временный файл для совместимости
-            import tempfile
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as temp_file:
-                temp_file.write(pdf_content)
-                temp_pdf_path = temp_file.name
-            
-            try:
-                position = self.detect_qr_position_in_stamp_region(temp_pdf_path, page_number)
-            finally:
-                os.unlink(temp_pdf_path)
-            self.logger.info(f"INTELIGENT POSITIONING. Compute Heuristics Delta. QR code position in stamp region: {position}")
+            self.logger.info(
+                "INTELIGENT POSITIONING. Compute Heuristics Delta. Find QR code "
+                "position in stamp region: src=original, tmp=NO, "
+                f"requested_page={page_number}"
+            )
+            raster = document.page_raster(page_number)
+            position = self.detect_qr_position_in_stamp_region(
+                document.pdf_content, page_number, raster
+            )
+            coordinate_info = self._audit_page_coordinates(raster.page, page_number)
+            self.logger.info(
+                "INTELIGENT POSITIONING. Compute Heuristics Delta. QR code position "
+                f"in stamp region: {position}"
+            )
             if position is None:
                 # Если эвристики не сработали, возвращаем нулевую дельту
-                self.logger.info(f"INTELIGENT POSITIONING. Compute Heuristics Delta. QR code position in stamp region not found, return zero delta")
-                return 0.0, 0.0
-            
-            # Получаем базовый якорь для сравнения
-            doc = fitz.open(pdf_path)
-            if page_number >= len(doc):
+                self.logger.info(
+                    "INTELIGENT POSITIONING. Compute Heuristics Delta. QR code "
+                    "position in stamp region not found, return zero delta"
+                )
                 return 0.0, 0.0
-                
-            page = doc[page_number]
-            coordinate_info = self._audit_page_coordinates(page, page_number)
-            page_width = coordinate_info["active_box"]["width"]
-            page_height = coordinate_info["active_box"]["height"]
-            rotation = coordinate_info["rotation"]
-            
-            # Вычисляем базовый якорь
-            from app.services.pdf_service import PDFService
-            pdf_service = PDFService()
-            base_x, base_y = pdf_service.compute_anchor_xy(
-                page_width, page_height, 
-                position["width"], position["height"],
-                settings.QR_MARGIN_PT, rotation, settings.QR_ANCHOR
+
+            # Базовый якорь для сравнения
+            base_x, base_y = self.compute_qr_anchor(
+                coordinate_info["active_box"],
+                position["width"],
+                settings.QR_MARGIN_PT,
+                settings.QR_ANCHOR,
+                coordinate_info["rotation"],
             )
-            
+
             # Вычисляем дельту
             dx = position["x"] - base_x
             dy = position["y"] - base_y
-            
+
             # Ограничиваем дельту для предотвращения "поднятия" QR в верх
             max_delta = 50.0  # Максимальная дельта в точках
             dx = max(-max_delta, min(dx, max_delta))
             dy = max(-max_delta, min(dy, max_delta))  # НЕ поднимаем в верх!
-            
-            self.logger.debug("🔍 Heuristics delta calculation", 
-                            base_x=base_x, base_y=base_y,
-                            heuristic_x=position["x"], heuristic_y=position["y"],
-                            raw_dx=position["x"] - base_x, raw_dy=position["y"] - base_y,
-                            clamped_dx=dx, clamped_dy=dy,
-                            max_delta=max_delta)
-            
-            doc.close()
+
+            self.logger.debug(
+                "🔍 Heuristics delta calculation",
+                base_x=base_x,
+                base_y=base_y,
+                heuristic_x=position["x"],
+                heuristic_y=position["y"],
+                raw_dx=position["x"] - base_x,
+                raw_dy=position["y"] - base_y,
+                clamped_dx=dx,
+                clamped_dy=dy,
+                max_delta=max_delta,
+            )
+
             return dx, dy
-            
+
         except Exception as e:
-            self.logger.error("❌ Error computing heuristics delta", 
-                            error=str(e), pdf_path=pdf_path, page_number=page_number)
+            self.logger.error(
+                "❌ Error computing heuristics delta",
+                error=str(e),
+                page_number=page_number,
+            )
             return 0.0, 0.0
+        finally:
+            if raster is not None:
+                raster.close()
+            if own_document:
+                document.close()
 
-    def detect_qr_position_in_stamp_region(self, pdf_content: bytes, page_number: int = 0) -> Optional[Dict[str, float]]:
+    def detect_qr_position_in_stamp_region(
+        self,
+        pdf_content: bytes,
+        page_number: int = 0,
+        raster: Optional[PageRaster] = None,
+    ) -> Optional[Dict[str, float]]:
         """
         Находит позицию для QR кода в области поиска штампа
-        
+
         Алгоритм:
         1. В области поиска штампа находим правую рамку (крайнюю правую вертикальную линию)
         2. Ставим QR код слева от правой рамки
@@ -937,449 +1136,508 @@ class PDFAnalyzer:
         5. Ставим QR над этой линией
         6. Если fallback - ищем нижнюю горизонтальную линию и ставим QR над ней
         7. Если fallback - ставим QR на 1 см выше нижнего края листа
-        
+
         Args:
             pdf_content: Содержимое PDF файла в байтах
             page_number: Номер страницы (начиная с 0)
-            
+            raster: Общий растр страницы (если None, открывается собственный)
+
         Returns:
             Словарь с координатами позиции QR кода или None
             {"x": float, "y": float, "width": float, "height": float}
         """
         if not CV_AVAILABLE:
             self.logger.warning("OpenCV not available, using fallback QR positioning")
-            return self._fallback_qr_position_in_stamp_region(pdf_path, page_number)
-            
+            return self._fallback_qr_position_in_stamp_region(
+                pdf_content, page_number, raster
+            )
+
+        own_raster = None
         try:
-            self.logger.debug("🔍 Starting QR position detection in stamp region", 
-                            page_number=page_number)
-            
-            # Открываем PDF
-            doc = PdfReader(BytesIO(pdf_content))
-            if page_number >= len(doc):
-                self.logger.error("❌ Page number out of range", 
-                                page_number=page_number, total_pages=len(doc))
-                return None
-                
-            page = doc[page_number]
-            
+            self.logger.debug(
+                "🔍 Starting QR position detection in stamp region",
+                page_number=page_number,
+            )
+
+            raster, own_raster = self._page_raster(pdf_content, page_number, raster)
+            page = raster.page
+
             # Аудит координат страницы
             coordinate_info = self._audit_page_coordinates(page, page_number)
             page_width = coordinate_info["active_box"]["width"]
             page_height = coordinate_info["active_box"]["height"]
             rotation = coordinate_info["rotation"]
-            
-            # Конвертируем страницу в изображение
-            mat = fitz.Matrix(2.0, 2.0)
-            pix = page.get_pixmap(matrix=mat)
-            img_data = pix.tobytes("png")
-            pil_image = Image.open(io.BytesIO(img_data))
-            img_array = np.array(pil_image.convert('L'))
-            
+
             # Определяем область поиска штампа (правый нижний угол)
             stamp_width_cm = 20.0
             stamp_height_cm = 10.0
             stamp_width_pixels = int(stamp_width_cm * 28.35 * 2.0)
             stamp_height_pixels = int(stamp_height_cm * 28.35 * 2.0)
-            
-            right_start = max(0, img_array.shape[1] - stamp_width_pixels)
-            bottom_start = max(0, img_array.shape[0] - stamp_height_pixels)
-            
-            # Извлекаем область поиска штампа
-            stamp_region = img_array[bottom_start:, right_start:]
-            
-            self.logger.debug("🔍 Analyzing stamp region for QR positioning", 
-                            region_size=(stamp_region.shape[1], stamp_region.shape[0]),
-                            region_size_cm=(round(stamp_region.shape[1] / (28.35 * 2.0), 2), 
-                                          round(stamp_region.shape[0] / (28.35 * 2.0), 2)))
-            
+
+            right_start = max(0, raster.width_px - stamp_width_pixels)
+            bottom_start = max(0, raster.height_px - stamp_height_pixels)
+
+            # Рендерим только область поиска штампа (clip)
+            stamp_window = raster.window(
+                right_start, bottom_start, raster.width_px, raster.height_px
+            )
+            stamp_region = stamp_window.gray
+            right_start, bottom_start = stamp_window.left, stamp_window.top
+
+            self.logger.debug(
+                "🔍 Analyzing stamp region for QR positioning",
+                region_size=(stamp_region.shape[1], stamp_region.shape[0]),
+                region_size_cm=(
+                    round(stamp_region.shape[1] / (28.35 * 2.0), 2),
+                    round(stamp_region.shape[0] / (28.35 * 2.0), 2),
+                ),
+            )
+
             # Размер QR кода
             qr_size_cm = 3.5
             qr_size_points = qr_size_cm * 28.35
             margin_cm = 0.5
             margin_points = margin_cm * 28.35
-            
+
             # Шаг 1: Находим правую рамку в области поиска штампа
-            right_frame_x = self._find_right_frame_in_stamp_region(stamp_region, right_start, bottom_start)
-            
+            right_frame_x = self._find_right_frame_in_stamp_region(
+                stamp_region, right_start, bottom_start
+            )
+
             if right_frame_x is not None:
-                self.logger.info("✅ Right frame found in stamp region", 
-                               right_frame_x=right_frame_x,
-                               right_frame_x_cm=round(right_frame_x / 28.35, 2))
-                
-                # Шаг 2: Находим горизонтальную линию длиной не менее 18 см, соприкасающуюся с правой рамкой
+                self.logger.info(
+                    "✅ Right frame found in stamp region",
+                    right_frame_x=right_frame_x,
+                    right_frame_x_cm=round(right_frame_x / 28.35, 2),
+                )
+
+                # Шаг 2: Находим горизонтальную линию длиной не менее 18 см,
+                # соприкасающуюся с правой рамкой
                 horizontal_line = self._find_horizontal_line_18cm_in_stamp_region(
-                    stamp_region, right_frame_x, right_start, bottom_start)
-                
+                    stamp_region, right_frame_x, right_start, bottom_start
+                )
+
                 if horizontal_line:
-                    self.logger.info("✅ Horizontal line 18cm+ found in stamp region", 
-                                   line_y=horizontal_line["y"],
-                                   line_length_cm=horizontal_line["length_cm"])
-                    
-                    # Позиционируем QR код слева от правой рамки и над горизонтальной линией
+                    self.logger.info(
+                        "✅ Horizontal line 18cm+ found in stamp region",
+                        line_y=horizontal_line["y"],
+                        line_length_cm=horizontal_line["length_cm"],
+                    )
+
+                    # Позиционируем QR код слева от правой рамки и над горизонтальной
+                    # линией
                     x_position = right_frame_x - qr_size_points - margin_points
                     y_position = horizontal_line["y"] - qr_size_points - margin_points
-                    
+
                     # Проверяем, что QR код помещается в области
                     if x_position >= right_start and y_position >= bottom_start:
                         result = {
                             "x": x_position,
                             "y": y_position,
                             "width": qr_size_points,
-                            "height": qr_size_points
+                            "height": qr_size_points,
                         }
-                        
-                        self.logger.info("✅ QR position calculated using right frame and horizontal line", 
-                                       x=result["x"], y=result["y"],
-                                       x_cm=round(result["x"] / 28.35, 2),
-                                       y_cm=round(result["y"] / 28.35, 2))
-                        
-                        doc.close()
+
+                        self.logger.info(
+                            "✅ QR position calculated using right frame and "
+                            "horizontal line",
+                            x=result["x"],
+                            y=result["y"],
+                            x_cm=round(result["x"] / 28.35, 2),
+                            y_cm=round(result["y"] / 28.35, 2),
+                        )
+
                         return result
-                
+
                 # Fallback: ищем нижнюю горизонтальную линию
-                self.logger.warning("⚠️ No suitable horizontal line found, trying bottom line fallback")
+                self.logger.warning(
+                    "⚠️ No suitable horizontal line found, trying bottom line fallback"
+                )
                 bottom_line = self._find_bottom_horizontal_line_in_stamp_region(
-                    stamp_region, right_frame_x, right_start, bottom_start)
-                
+                    stamp_region, right_frame_x, right_start, bottom_start
+                )
+
                 if bottom_line:
-                    self.logger.info("✅ Bottom horizontal line found in stamp region", 
-                                   line_y=bottom_line["y"],
-                                   line_length_cm=bottom_line["length_cm"])
-                    
+                    self.logger.info(
+                        "✅ Bottom horizontal line found in stamp region",
+                        line_y=bottom_line["y"],
+                        line_length_cm=bottom_line["length_cm"],
+                    )
+
                     # Позиционируем QR код слева от правой рамки и над нижней линией
                     x_position = right_frame_x - qr_size_points - margin_points
                     y_position = bottom_line["y"] - qr_size_points - margin_points
-                    
+
                     if x_position >= right_start and y_position >= bottom_start:
                         result = {
                             "x": x_position,
                             "y": y_position,
                             "width": qr_size_points,
-                            "height": qr_size_points
+                            "height": qr_size_points,
                         }
-                        
-                        self.logger.info("✅ QR position calculated using right frame and bottom line", 
-                                       x=result["x"], y=result["y"],
-                                       x_cm=round(result["x"] / 28.35, 2),
-                                       y_cm=round(result["y"] / 28.35, 2))
-                        
-                        doc.close()
+
+                        self.logger.info(
+                            "✅ QR position calculated using right frame and bottom "
+                            "line",
+                            x=result["x"],
+                            y=result["y"],
+                            x_cm=round(result["x"] / 28.35, 2),
+                            y_cm=round(result["y"] / 28.35, 2),
+                        )
+
                         return result
-                
+
                 # Fallback: ставим QR на 1 см выше нижнего края листа
-                self.logger.warning("⚠️ No horizontal lines found, using bottom edge fallback")
+                self.logger.warning(
+                    "⚠️ No horizontal lines found, using bottom edge fallback"
+                )
                 x_position = right_frame_x - qr_size_points - margin_points
-                y_position = page_height - qr_size_points - (1.0 * 28.35)  # 1 см от нижнего края
-                
+                y_position = (
+                    page_height - qr_size_points - (1.0 * 28.35)
+                )  # 1 см от нижнего края
+
                 result = {
                     "x": x_position,
                     "y": y_position,
                     "width": qr_size_points,
-                    "height": qr_size_points
+                    "height": qr_size_points,
                 }
-                
-                self.logger.info("✅ QR position calculated using right frame and bottom edge fallback", 
-                               x=result["x"], y=result["y"],
-                               x_cm=round(result["x"] / 28.35, 2),
-                               y_cm=round(result["y"] / 28.35, 2))
-                
-                doc.close()
+
+                self.logger.info(
+                    "✅ QR position calculated using right frame and bottom edge "
+                    "fallback",
+                    x=result["x"],
+                    y=result["y"],
+                    x_cm=round(result["x"] / 28.35, 2),
+                    y_cm=round(result["y"] / 28.35, 2),
+                )
+
                 return result
-            
+
             else:
                 # Fallback: правую рамку не нашли, ставим на 1 см от правого края листа
-                self.logger.warning("⚠️ Right frame not found in stamp region, using right edge fallback")
-                x_position = page_width - qr_size_points - (1.0 * 28.35)  # 1 см от правого края
-                y_position = page_height - qr_size_points - (1.0 * 28.35)  # 1 см от нижнего края
-                
+                self.logger.warning(
+                    "⚠️ Right frame not found in stamp region, using right edge "
+                    "fallback"
+                )
+                x_position = (
+                    page_width - qr_size_points - (1.0 * 28.35)
+                )  # 1 см от правого края
+                y_position = (
+                    page_height - qr_size_points - (1.0 * 28.35)
+                )  # 1 см от нижнего края
+
                 result = {
                     "x": x_position,
                     "y": y_position,
                     "width": qr_size_points,
-                    "height": qr_size_points
+                    "height": qr_size_points,
                 }
-                
-                self.logger.info("✅ QR position calculated using right edge fallback", 
-                               x=result["x"], y=result["y"],
-                               x_cm=round(result["x"] / 28.35, 2),
-                               y_cm=round(result["y"] / 28.35, 2))
-                
-                doc.close()
+
+                self.logger.info(
+                    "✅ QR position calculated using right edge fallback",
+                    x=result["x"],
+                    y=result["y"],
+                    x_cm=round(result["x"] / 28.35, 2),
+                    y_cm=round(result["y"] / 28.35, 2),
+                )
+
                 return result
-                
+
         except Exception as e:
-            self.logger.error("Error detecting QR position in stamp region", 
-                            error=str(e), pdf_path=pdf_path, page_number=page_number)
+            self.logger.error(
+                "Error detecting QR position in stamp region",
+                error=str(e),
+                page_number=page_number,
+            )
             return None
-    
-    def detect_right_frame_edge(self, pdf_path: str, page_number: int = 0) -> Optional[float]:
+        finally:
+            if own_raster is not None:
+                own_raster.close()
+
+    def detect_right_frame_edge(
+        self, pdf_path: str, page_number: int = 0, raster: Optional[PageRaster] = None
+    ) -> Optional[float]:
         """
         Определяет край рамки на правой стороне листа
-        
+
         Args:
             pdf_content: Содержимое PDF файла в байтах
             page_number: Номер страницы (начиная с 0)
-            
+            raster: Общий растр страницы (если None, открывается собственный)
+
         Returns:
             X-координата правого края рамки в точках PDF, или None если не найден
         """
+        frame_right_x = self._detect_from_vectors(
+            pdf_path, page_number, raster, "right_frame_x"
+        )
+        if frame_right_x is not None:
+            return frame_right_x
+
         if not CV_AVAILABLE:
             self.logger.warning("OpenCV not available, using fallback frame detection")
-            return self._fallback_frame_detection(pdf_path, page_number, "right")
-            
+            return self._fallback_frame_detection(
+                pdf_path, page_number, "right", raster
+            )
+
+        own_raster = None
         try:
-            self.logger.debug("Detecting right frame edge", 
-                            pdf_path=pdf_path, page_number=page_number)
-            
-            # Открываем PDF с помощью PyMuPDF
-            doc = fitz.open(pdf_path)
-            if page_number >= len(doc):
-                self.logger.error("Page number out of range", 
-                                page_number=page_number, total_pages=len(doc))
-                return None
-                
-            page = doc[page_number]
-            
+            self.logger.debug(
+                "Detecting right frame edge", pdf_path=pdf_path, page_number=page_number
+            )
+
+            raster, own_raster = self._page_raster(pdf_path, page_number, raster)
+            page = raster.page
+
             # Получаем размеры страницы
             page_rect = page.rect
             page_width = page_rect.width
             page_height = page_rect.height
-            
-            # Конвертируем страницу в изображение
-            mat = fitz.Matrix(2.0, 2.0)
-            pix = page.get_pixmap(matrix=mat)
-            img_data = pix.tobytes("png")
-            
-            # Конвертируем в PIL Image
-            pil_image = Image.open(io.BytesIO(img_data))
-            img_array = np.array(pil_image.convert('L'))
-            
+
             # Ищем вертикальные линии в правой части страницы
+            # Рендерим только правую полосу листа (clip)
             right_region_width = int(page_width * 0.2)  # Правые 20% страницы
-            right_region = img_array[:, -right_region_width:]
-            
+            right_window = raster.window(
+                raster.width_px - right_region_width,
+                0,
+                raster.width_px,
+                raster.height_px,
+            )
+            right_region = right_window.gray
+
             # Применяем детекцию краев
             edges = cv2.Canny(right_region, 50, 150)
-            
+
             # Ищем вертикальные линии
             # Используем морфологические операции для выделения вертикальных линий
             vertical_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (1, 15))
             vertical_lines = cv2.morphologyEx(edges, cv2.MORPH_OPEN, vertical_kernel)
-            
+
             # Находим контуры вертикальных линий
-            contours, _ = cv2.findContours(vertical_lines, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-            
+            contours, _ = cv2.findContours(
+                vertical_lines, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE
+            )
+
             # Ищем самую правую вертикальную линию
             rightmost_x = 0
             for contour in contours:
                 x, y, w, h = cv2.boundingRect(contour)
                 # Проверяем, что это достаточно длинная вертикальная линия
-                if h > img_array.shape[0] * 0.3:  # Линия должна быть не менее 30% высоты страницы
+                if (
+                    h > raster.height_px * 0.3
+                ):  # Линия должна быть не менее 30% высоты страницы
                     rightmost_x = max(rightmost_x, x + w)
-            
+
             if rightmost_x == 0:
                 self.logger.warning("No right frame edge found")
-                doc.close()
                 return None
-            
+
             # Конвертируем координаты обратно в PDF точки
             # rightmost_x - это координата относительно правой области
-            actual_x = (img_array.shape[1] - right_region_width) + rightmost_x
-            
-            # Нормализация координат: используем новую функцию конверсии
-            scale_factor = 2.0
-            x_img_points = actual_x / scale_factor
+            x_img_points, _ = right_window.to_page_points(rightmost_x, 0)
             y_img_points = 0  # Y не важен для правой рамки
-            
+
             x_pdf, y_pdf = self.to_pdf_point(x_img_points, y_img_points, page_height)
             frame_right_x_points = x_pdf
-            
-            self.logger.info("Right frame edge detected", 
-                           frame_right_x_points=frame_right_x_points,
-                           rightmost_x=rightmost_x)
-            
-            doc.close()
+
+            self.logger.info(
+                "Right frame edge detected",
+                frame_right_x_points=frame_right_x_points,
+                rightmost_x=rightmost_x,
+            )
+
             return frame_right_x_points
-            
+
         except Exception as e:
-            self.logger.error("Error detecting right frame edge", 
-                            error=str(e), pdf_path=pdf_path, page_number=page_number)
+            self.logger.error(
+                "Error detecting right frame edge",
+                error=str(e),
+                pdf_path=pdf_path,
+                page_number=page_number,
+            )
             return None
-    
-    def detect_bottom_frame_edge(self, pdf_path: str, page_number: int = 0) -> Optional[float]:
+        finally:
+            if own_raster is not None:
+                own_raster.close()
+
+    def detect_bottom_frame_edge(
+        self, pdf_path: str, page_number: int = 0, raster: Optional[PageRaster] = None
+    ) -> Optional[float]:
         """
         Определяет край нижней рамки листа
-        
+
         Args:
             pdf_content: Содержимое PDF файла в байтах
             page_number: Номер страницы (начиная с 0)
-            
+            raster: Общий растр страницы (если None, открывается собственный)
+
         Returns:
             Y-координата нижнего края рамки в точках PDF, или None если не найден
         """
+        frame_bottom_y = self._detect_from_vectors(
+            pdf_path, page_number, raster, "bottom_frame_y"
+        )
+        if frame_bottom_y is not None:
+            return frame_bottom_y
+
         if not CV_AVAILABLE:
             self.logger.warning("OpenCV not available, using fallback frame detection")
-            return self._fallback_frame_detection(pdf_path, page_number, "bottom")
-            
+            return self._fallback_frame_detection(
+                pdf_path, page_number, "bottom", raster
+            )
+
+        own_raster = None
         try:
-            self.logger.debug("Detecting bottom frame edge", 
-                            pdf_path=pdf_path, page_number=page_number)
-            
-            # Открываем PDF с помощью PyMuPDF
-            doc = fitz.open(pdf_path)
-            if page_number >= len(doc):
-                self.logger.error("Page number out of range", 
-                                page_number=page_number, total_pages=len(doc))
-                return None
-                
-            page = doc[page_number]
-            
+            self.logger.debug(
+                "Detecting bottom frame edge",
+                pdf_path=pdf_path,
+                page_number=page_number,
+            )
+
+            raster, own_raster = self._page_raster(pdf_path, page_number, raster)
+            page = raster.page
+
             # Получаем размеры страницы
             page_rect = page.rect
             page_width = page_rect.width
             page_height = page_rect.height
-            
-            # Конвертируем страницу в изображение
-            mat = fitz.Matrix(2.0, 2.0)
-            pix = page.get_pixmap(matrix=mat)
-            img_data = pix.tobytes("png")
-            
-            # Конвертируем в PIL Image
-            pil_image = Image.open(io.BytesIO(img_data))
-            img_array = np.array(pil_image.convert('L'))
-            
+
             # Ищем горизонтальные линии в нижней части страницы
+            # Рендерим только нижнюю полосу листа (clip)
             bottom_region_height = int(page_height * 0.2)  # Нижние 20% страницы
-            bottom_region = img_array[-bottom_region_height:, :]
-            
+            bottom_window = raster.window(
+                0,
+                raster.height_px - bottom_region_height,
+                raster.width_px,
+                raster.height_px,
+            )
+            bottom_region = bottom_window.gray
+
             # Применяем детекцию краев
             edges = cv2.Canny(bottom_region, 50, 150)
-            
+
             # Ищем горизонтальные линии
             # Используем морфологические операции для выделения горизонтальных линий
             horizontal_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (15, 1))
-            horizontal_lines = cv2.morphologyEx(edges, cv2.MORPH_OPEN, horizontal_kernel)
-            
+            horizontal_lines = cv2.morphologyEx(
+                edges, cv2.MORPH_OPEN, horizontal_kernel
+            )
+
             # Находим контуры горизонтальных линий
-            contours, _ = cv2.findContours(horizontal_lines, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-            
+            contours, _ = cv2.findContours(
+                horizontal_lines, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE
+            )
+
             # Ищем самую нижнюю горизонтальную линию
             bottommost_y = 0
             for contour in contours:
                 x, y, w, h = cv2.boundingRect(contour)
                 # Проверяем, что это достаточно длинная горизонтальная линия
-                if w > img_array.shape[1] * 0.3:  # Линия должна быть не менее 30% ширины страницы
+                if (
+                    w > raster.width_px * 0.3
+                ):  # Линия должна быть не менее 30% ширины страницы
                     bottommost_y = max(bottommost_y, y + h)
-            
+
             if bottommost_y == 0:
                 self.logger.warning("No bottom frame edge found")
-                doc.close()
                 return None
-            
+
             # Конвертируем координаты обратно в PDF точки
             # bottommost_y - это координата относительно нижней области
-            actual_y = (img_array.shape[0] - bottom_region_height) + bottommost_y
-            
-            # Нормализация координат: используем новую функцию конверсии
-            scale_factor = 2.0
             x_img_points = 0  # X не важен для нижней рамки
-            y_img_points = actual_y / scale_factor
-            
+            _, y_img_points = bottom_window.to_page_points(0, bottommost_y)
+
             x_pdf, y_pdf = self.to_pdf_point(x_img_points, y_img_points, page_height)
             frame_bottom_y_points = y_pdf
-            
-            self.logger.info("Bottom frame edge detected", 
-                           frame_bottom_y_points=frame_bottom_y_points,
-                           bottommost_y=bottommost_y)
-            
-            doc.close()
+
+            self.logger.info(
+                "Bottom frame edge detected",
+                frame_bottom_y_points=frame_bottom_y_points,
+                bottommost_y=bottommost_y,
+            )
+
             return frame_bottom_y_points
-            
+
         except Exception as e:
-            self.logger.error("Error detecting bottom frame edge", 
-                            error=str(e), pdf_path=pdf_path, page_number=page_number)
+            self.logger.error(
+                "Error detecting bottom frame edge",
+                error=str(e),
+                pdf_path=pdf_path,
+                page_number=page_number,
+            )
             return None
-    
-    def analyze_page_layout(self, pdf_content: bytes, page_number: int = 0) -> Dict[str, Any]:
+        finally:
+            if own_raster is not None:
+                own_raster.close()
+
+    def cache_layout(self, cache_key: str, layout: Dict[str, Any]) -> bool:
+        """
+        Сохраняет найденные элементы макета в кэш
+
+        Кэшируется только полный результат (без ошибок и таймаутов).
+
+        Returns:
+            True, если результат сохранён
+        """
+        if self.layout_cache is None or not layout:
+            return False
+
+        metadata = layout.get("analysis_metadata", {})
+        if metadata.get("errors") or metadata.get("warnings"):
+            return False
+
+        self.layout_cache.set(
+            cache_key, {name: layout.get(name) for name in LAYOUT_ELEMENTS}
+        )
+        return True
+
+    def analyze_page_layout(
+        self,
+        pdf_content: bytes,
+        page_number: int = 0,
+        document: Optional[DocumentHandle] = None,
+    ) -> Dict[str, Any]:
         """
         Анализирует макет страницы и возвращает информацию о позициях элементов
-        
+
         Args:
             pdf_content: Содержимое PDF файла в байтах
             page_number: Номер страницы (начиная с 0)
-            
+            document: Уже разобранный документ задания; если не передан,
+                документ открывается на время вызова
+
         Returns:
             Словарь с информацией о макете страницы
         """
         start_time = time.time()
         analysis_success = False
         fallback_used = False
-        
+        own_document = document is None
+        if own_document:
+            document = DocumentHandle(pdf_content)
+
+        raster = None
         try:
-            self.logger.debug("Starting page layout analysis", 
-                            page_number=page_number, 
-                            content_size=len(pdf_content))
-            
-            # Проверка системных ресурсов
-            self._check_system_resources()
-            
+            self.logger.debug(
+                "Starting page layout analysis",
+                page_number=page_number,
+                content_size=len(pdf_content),
+            )
+
             # Валидация входных данных
             self._validate_pdf_content(pdf_content)
-            
-            # Открываем PDF с детальной обработкой ошибок
-            try:
-                doc = PdfReader(BytesIO(pdf_content))
-                total_pages = len(doc.pages)
-                self.logger.debug("PDF opened successfully", 
-                                total_pages=total_pages, 
-                                page_number=page_number)
-            except Exception as e:
-                raise PDFCorruptedError(
-                    f"Failed to open PDF file: {str(e)}",
-                    corruption_type="read_error"
-                )
-            
-            # Валидация номера страницы
-            self._validate_page_number(page_number, total_pages)
-            
-            # Проверка таймаута
-            self._check_analysis_timeout(start_time, "page_validation")
-            
-            # Получаем страницу с обработкой ошибок
-            try:
-                page = doc.pages[page_number]
-                self.logger.debug("Page retrieved successfully", page_number=page_number)
-            except Exception as e:
-                raise PDFPageCorruptedError(
-                    page_number, 
-                    f"Failed to retrieve page: {str(e)}"
-                )
-            
+
+            page = self._open_layout_page(document, page_number, start_time)
+
             # Аудит координат страницы
-            try:
-                coordinate_info = self._audit_page_coordinates(page, page_number)
-                self.logger.debug("Page coordinates audited", 
-                                coordinate_info=coordinate_info)
-            except Exception as e:
-                self.logger.warning("Failed to audit page coordinates, using defaults", 
-                                  error=str(e), page_number=page_number)
-                # Fallback координаты
-                coordinate_info = {
-                    "page_number": page_number,
-                    "rotation": 0,
-                    "active_box": {
-                        "width": float(page.mediabox.width),
-                        "height": float(page.mediabox.height)
-                    },
-                    "orientation": "landscape" if float(page.mediabox.width) > float(page.mediabox.height) else "portrait",
-                    "active_box_type": "mediabox"
-                }
-                fallback_used = True
-            
+            coordinate_info, fallback_used = self._page_coordinate_info(
+                page, page_number
+            )
+
             # Определяем ориентацию страницы
             is_landscape = coordinate_info.get("orientation") == "landscape"
-            
+
             result = {
                 "page_number": page_number,
                 "page_width": coordinate_info["active_box"]["width"],
@@ -1397,787 +1655,1122 @@ class PDFAnalyzer:
                     "fallback_used": fallback_used,
                     "cv_available": CV_AVAILABLE,
                     "errors": [],
-                    "warnings": []
-                }
+                    "warnings": [],
+                },
             }
-            
+
             # Проверка таймаута перед анализом элементов
             self._check_analysis_timeout(start_time, "coordinate_analysis")
-            
-            # Создаем временный файл для методов, которые требуют pdf_path
-            import tempfile
-            import os
-            
-            temp_pdf_path = None
-            try:
-                with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as temp_file:
-                    temp_file.write(pdf_content)
-                    temp_pdf_path = temp_file.name
-                
-                self.logger.debug("Temporary PDF file created", 
-                                temp_path=temp_pdf_path)
-                
-                # Анализ элементов страницы с детальной обработкой ошибок
-                analysis_methods = [
-                    ("stamp_top_edge", lambda: self._analyze_stamp_top_edge(temp_pdf_path, page_number, is_landscape)),
-                    ("right_frame_edge", lambda: self._analyze_right_frame_edge(temp_pdf_path, page_number)),
-                    ("bottom_frame_edge", lambda: self._analyze_bottom_frame_edge(temp_pdf_path, page_number)),
-                    ("horizontal_line_18cm", lambda: self._analyze_horizontal_line(temp_pdf_path, page_number)),
-                    ("free_space_3_5cm", lambda: self._analyze_free_space(temp_pdf_path, page_number))
-                ]
-                
-                for element_name, analysis_func in analysis_methods:
-                    try:
-                        self._check_analysis_timeout(start_time, f"{element_name}_analysis")
-                        element_result = analysis_func()
-                        result[element_name] = element_result
-                        
-                        if element_result is not None:
-                            self.logger.debug(f"Element analysis successful", 
-                                            element=element_name, 
-                                            result=element_result)
-                        else:
-                            self.logger.debug(f"Element not found", element=element_name)
-                            
-                    except PDFAnalysisTimeoutError:
-                        self.logger.warning(f"Analysis timeout for {element_name}", 
-                                          page_number=page_number)
-                        result["analysis_metadata"]["warnings"].append(
-                            f"Timeout during {element_name} analysis"
-                        )
-                        result[element_name] = None
-                        
-                    except PDFOpenCVError as e:
-                        self.logger.warning(f"OpenCV error during {element_name} analysis", 
-                                          error=str(e), page_number=page_number)
-                        result["analysis_metadata"]["warnings"].append(
-                            f"OpenCV error during {element_name} analysis: {str(e)}"
-                        )
-                        result[element_name] = None
-                        fallback_used = True
-                        
-                    except Exception as e:
-                        self.logger.warning(f"Error during {element_name} analysis", 
-                                          error=str(e), page_number=page_number)
-                        result["analysis_metadata"]["errors"].append(
-                            f"Error during {element_name} analysis: {str(e)}"
-                        )
-                        result[element_name] = None
-                
-            finally:
-                # Удаляем временный файл
-                if temp_pdf_path and os.path.exists(temp_pdf_path):
-                    try:
-                        os.unlink(temp_pdf_path)
-                        self.logger.debug("Temporary PDF file cleaned up")
-                    except OSError as e:
-                        self.logger.warning("Failed to clean up temporary file", 
-                                          error=str(e), temp_path=temp_pdf_path)
-            
+
+            # Открываем документ и рендерим страницу один раз:
+            # растр общий для всех детекторов
+            raster = document.page_raster(page_number)
+            # Неизменённые листы (по хэшу содержимого) не анализируются повторно
+            cache_key, cached_elements = self._cached_page_layout(raster, page_number)
+            result["analysis_metadata"]["cache_hit"] = cached_elements is not None
+            if cached_elements is not None:
+                result.update(cached_elements)
+            else:
+                fallback_used = (
+                    self._analyze_page_elements(
+                        result, raster, page_number, is_landscape, start_time
+                    )
+                    or fallback_used
+                )
+                if cache_key:
+                    self.cache_layout(cache_key, result)
+
+            result["analysis_metadata"]["render_count"] = raster.render_count
+            result["analysis_metadata"]["rendered_pixels"] = raster.rendered_pixels
+
             # Завершаем анализ
             analysis_time = time.time() - start_time
             result["analysis_metadata"]["analysis_time"] = analysis_time
             result["analysis_metadata"]["fallback_used"] = fallback_used
-            
+
             analysis_success = True
-            
-            self.logger.info("Page layout analysis completed successfully", 
-                           page_number=page_number,
-                           is_landscape=is_landscape,
-                           rotation=coordinate_info.get("rotation", 0),
-                           page_width=coordinate_info["active_box"]["width"],
-                           page_height=coordinate_info["active_box"]["height"],
-                           active_box_type=coordinate_info.get("active_box_type", "mediabox"),
-                           analysis_time=analysis_time,
-                           fallback_used=fallback_used,
-                           elements_found={
-                               "stamp_top_edge": result["stamp_top_edge"] is not None,
-                               "right_frame_edge": result["right_frame_edge"] is not None,
-                               "bottom_frame_edge": result["bottom_frame_edge"] is not None,
-                               "horizontal_line_18cm": result["horizontal_line_18cm"] is not None,
-                               "free_space_3_5cm": result["free_space_3_5cm"] is not None
-                           })
-            
+
+            self.logger.info(
+                "Page layout analysis completed successfully",
+                page_number=page_number,
+                is_landscape=is_landscape,
+                rotation=coordinate_info.get("rotation", 0),
+                page_width=coordinate_info["active_box"]["width"],
+                page_height=coordinate_info["active_box"]["height"],
+                active_box_type=coordinate_info.get("active_box_type", "mediabox"),
+                analysis_time=analysis_time,
+                fallback_used=fallback_used,
+                elements_found={
+                    "stamp_top_edge": result["stamp_top_edge"] is not None,
+                    "right_frame_edge": result["right_frame_edge"] is not None,
+                    "bottom_frame_edge": result["bottom_frame_edge"] is not None,
+                    "horizontal_line_18cm": result["horizontal_line_18cm"] is not None,
+                    "free_space_3_5cm": result["free_space_3_5cm"] is not None,
+                },
+            )
+
             # PdfReader не имеет метода close()
             return result
-            
-        except (PDFFileError, PDFCorruptedError, PDFPageError, PDFPageOutOfRangeError, 
-                PDFPageCorruptedError, PDFMemoryError, PDFAnalysisTimeoutError) as e:
+
+        except (
+            PDFFileError,
+            PDFCorruptedError,
+            PDFPageError,
+            PDFPageOutOfRangeError,
+            PDFPageCorruptedError,
+            PDFMemoryError,
+            PDFAnalysisTimeoutError,
+        ) as e:
             # Специфичные ошибки PDF анализа
             analysis_time = time.time() - start_time
-            self.logger.error("PDF analysis failed with specific error", 
-                            error_type=type(e).__name__,
-                            error_code=getattr(e, 'error_code', 'UNKNOWN'),
-                            error_message=str(e),
-                            page_number=page_number,
-                            analysis_time=analysis_time,
-                            error_details=getattr(e, 'details', {}))
-            
+            self.logger.error(
+                "PDF analysis failed with specific error",
+                error_type=type(e).__name__,
+                error_code=getattr(e, "error_code", "UNKNOWN"),
+                error_message=str(e),
+                page_number=page_number,
+                analysis_time=analysis_time,
+                error_details=getattr(e, "details", {}),
+            )
+
             self._update_analysis_stats(False, analysis_time, fallback_used)
             raise
-            
+
         except Exception as e:
             # Общие ошибки
             analysis_time = time.time() - start_time
-            self.logger.error("PDF analysis failed with unexpected error", 
-                            error=str(e),
-                            error_type=type(e).__name__,
-                            page_number=page_number,
-                            analysis_time=analysis_time,
-                            exc_info=True)
-            
+            self.logger.error(
+                "PDF analysis failed with unexpected error",
+                error=str(e),
+                error_type=type(e).__name__,
+                page_number=page_number,
+                analysis_time=analysis_time,
+                exc_info=True,
+            )
+
             self._update_analysis_stats(False, analysis_time, fallback_used)
             raise PDFAnalysisError(
                 f"Unexpected error during PDF analysis: {str(e)}",
-                details={"original_error": str(e), "error_type": type(e).__name__}
+                details={"original_error": str(e), "error_type": type(e).__name__},
             )
-            
+
         finally:
+            if raster is not None:
+                raster.close()
+            if own_document:
+                document.close()
             # Обновляем статистику
             analysis_time = time.time() - start_time
             self._update_analysis_stats(analysis_success, analysis_time, fallback_used)
-    
-    def _analyze_stamp_top_edge(self, pdf_path: str, page_number: int, is_landscape: bool) -> Optional[float]:
+
+    def _open_layout_page(
+        self, document: DocumentHandle, page_number: int, start_time: float
+    ):
+        """Открывает страницу документа для анализа макета (pypdf)"""
+        # Открываем PDF с детальной обработкой ошибок
+        try:
+            doc = document.reader
+            total_pages = len(doc.pages)
+            self.logger.debug(
+                "PDF opened successfully",
+                total_pages=total_pages,
+                page_number=page_number,
+            )
+        except Exception as e:
+            raise PDFCorruptedError(
+                f"Failed to open PDF file: {str(e)}", corruption_type="read_error"
+            )
+
+        # Валидация номера страницы
+        self._validate_page_number(page_number, total_pages)
+
+        # Проверка таймаута
+        self._check_analysis_timeout(start_time, "page_validation")
+
+        # Получаем страницу с обработкой ошибок
+        try:
+            page = doc.pages[page_number]
+            self.logger.debug("Page retrieved successfully", page_number=page_number)
+        except Exception as e:
+            raise PDFPageCorruptedError(
+                page_number, f"Failed to retrieve page: {str(e)}"
+            )
+        return page
+
+    def _page_coordinate_info(
+        self, page, page_number: int
+    ) -> Tuple[Dict[str, Any], bool]:
+        """
+        Аудит координат страницы с fallback на MediaBox
+
+        Returns:
+            Информация о координатах и признак использования fallback
+        """
+        try:
+            coordinate_info = self._audit_page_coordinates(page, page_number)
+            self.logger.debug(
+                "Page coordinates audited", coordinate_info=coordinate_info
+            )
+            return coordinate_info, False
+        except Exception as e:
+            self.logger.warning(
+                "Failed to audit page coordinates, using defaults",
+                error=str(e),
+                page_number=page_number,
+            )
+        # Fallback координаты
+        width = float(page.mediabox.width)
+        height = float(page.mediabox.height)
+        coordinate_info = {
+            "page_number": page_number,
+            "rotation": 0,
+            "active_box": {"width": width, "height": height},
+            "orientation": "landscape" if width > height else "portrait",
+            "active_box_type": "mediabox",
+        }
+        return coordinate_info, True
+
+    def _cached_page_layout(
+        self, raster: PageRaster, page_number: int
+    ) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+        """
+        Ищет элементы макета страницы в кэше по хэшу её содержимого
+
+        Returns:
+            Ключ кэша (None, если кэш отключён) и найденные элементы
+        """
+        if self.layout_cache is None:
+            return None, None
+        cache_key = self.layout_cache.page_key(raster.page)
+        cached_elements = self.layout_cache.get(cache_key)
+        if cached_elements is not None:
+            self.logger.debug("Page layout taken from cache", page_number=page_number)
+        return cache_key, cached_elements
+
+    def _analyze_page_elements(
+        self,
+        result: Dict[str, Any],
+        raster: PageRaster,
+        page_number: int,
+        is_landscape: bool,
+        start_time: float,
+    ) -> bool:
+        """
+        Анализирует элементы страницы по общему растру и заполняет result
+
+        Returns:
+            True, если при анализе использовался fallback
+        """
+        fallback_used = False
+        # Проверка системных ресурсов под растр этой страницы
+        self._check_system_resources(
+            estimate_raster_bytes(
+                result["page_width"], result["page_height"], RENDER_SCALE
+            ),
+            page_number=page_number,
+        )
+
+        # Анализ элементов страницы с детальной обработкой ошибок
+        # pdf_path не нужен: документ уже открыт в общем растре
+        analysis_methods = [
+            (
+                "stamp_top_edge",
+                lambda: self._analyze_stamp_top_edge(
+                    None, page_number, is_landscape, raster
+                ),
+            ),
+            (
+                "right_frame_edge",
+                lambda: self._analyze_right_frame_edge(None, page_number, raster),
+            ),
+            (
+                "bottom_frame_edge",
+                lambda: self._analyze_bottom_frame_edge(None, page_number, raster),
+            ),
+            (
+                "horizontal_line_18cm",
+                lambda: self._analyze_horizontal_line(None, page_number, raster),
+            ),
+            (
+                "free_space_3_5cm",
+                lambda: self._analyze_free_space(None, page_number, raster),
+            ),
+        ]
+
+        for element_name, analysis_func in analysis_methods:
+            try:
+                self._check_analysis_timeout(start_time, f"{element_name}_analysis")
+                element_result = analysis_func()
+                result[element_name] = element_result
+
+                if element_result is not None:
+                    self.logger.debug(
+                        "Element analysis successful",
+                        element=element_name,
+                        result=element_result,
+                    )
+                else:
+                    self.logger.debug("Element not found", element=element_name)
+
+            except PDFAnalysisTimeoutError:
+                self.logger.warning(
+                    f"Analysis timeout for {element_name}", page_number=page_number
+                )
+                result["analysis_metadata"]["warnings"].append(
+                    f"Timeout during {element_name} analysis"
+                )
+                result[element_name] = None
+
+            except PDFOpenCVError as e:
+                self.logger.warning(
+                    f"OpenCV error during {element_name} analysis",
+                    error=str(e),
+                    page_number=page_number,
+                )
+                result["analysis_metadata"]["warnings"].append(
+                    f"OpenCV error during {element_name} analysis: {str(e)}"
+                )
+                result[element_name] = None
+                fallback_used = True
+
+            except Exception as e:
+                self.logger.warning(
+                    f"Error during {element_name} analysis",
+                    error=str(e),
+                    page_number=page_number,
+                )
+                result["analysis_metadata"]["errors"].append(
+                    f"Error during {element_name} analysis: {str(e)}"
+                )
+                result[element_name] = None
+        return fallback_used
+
+    def _analyze_stamp_top_edge(
+        self,
+        pdf_path: str,
+        page_number: int,
+        is_landscape: bool,
+        raster: Optional[PageRaster] = None,
+    ) -> Optional[float]:
         """Анализ верхнего края штампа с обработкой ошибок"""
         try:
             if not is_landscape:
-                self.logger.debug("Skipping stamp analysis for portrait page", page_number=page_number)
+                self.logger.debug(
+                    "Skipping stamp analysis for portrait page", page_number=page_number
+                )
                 return None
-            
-            if not CV_AVAILABLE:
-                self.logger.warning("OpenCV not available for stamp analysis", page_number=page_number)
-                return self._fallback_stamp_detection(pdf_path, page_number)
-            
-            return self.detect_stamp_top_edge_landscape(pdf_path, page_number)
-            
+
+            # Векторная детекция и fallback без OpenCV выполняются внутри детектора
+            return self.detect_stamp_top_edge_landscape(pdf_path, page_number, raster)
+
         except Exception as e:
-            self.logger.warning("Error during stamp analysis", error=str(e), page_number=page_number)
-            return self._fallback_stamp_detection(pdf_path, page_number)
-    
-    def _analyze_right_frame_edge(self, pdf_path: str, page_number: int) -> Optional[float]:
+            self.logger.warning(
+                "Error during stamp analysis", error=str(e), page_number=page_number
+            )
+            return self._fallback_stamp_detection(pdf_path, page_number, raster)
+
+    def _analyze_right_frame_edge(
+        self, pdf_path: str, page_number: int, raster: Optional[PageRaster] = None
+    ) -> Optional[float]:
         """Анализ правого края рамки с обработкой ошибок"""
         try:
-            if not CV_AVAILABLE:
-                self.logger.warning("OpenCV not available for frame analysis", page_number=page_number)
-                return self._fallback_frame_detection(pdf_path, page_number, "right")
-            
-            return self.detect_right_frame_edge(pdf_path, page_number)
-            
+            # Векторная детекция и fallback без OpenCV выполняются внутри детектора
+            return self.detect_right_frame_edge(pdf_path, page_number, raster)
+
         except Exception as e:
-            self.logger.warning("Error during right frame analysis", error=str(e), page_number=page_number)
-            return self._fallback_frame_detection(pdf_path, page_number, "right")
-    
-    def _analyze_bottom_frame_edge(self, pdf_path: str, page_number: int) -> Optional[float]:
+            self.logger.warning(
+                "Error during right frame analysis",
+                error=str(e),
+                page_number=page_number,
+            )
+            return self._fallback_frame_detection(
+                pdf_path, page_number, "right", raster
+            )
+
+    def _analyze_bottom_frame_edge(
+        self, pdf_path: str, page_number: int, raster: Optional[PageRaster] = None
+    ) -> Optional[float]:
         """Анализ нижнего края рамки с обработкой ошибок"""
         try:
-            if not CV_AVAILABLE:
-                self.logger.warning("OpenCV not available for frame analysis", page_number=page_number)
-                return self._fallback_frame_detection(pdf_path, page_number, "bottom")
-            
-            return self.detect_bottom_frame_edge(pdf_path, page_number)
-            
+            # Векторная детекция и fallback без OpenCV выполняются внутри детектора
+            return self.detect_bottom_frame_edge(pdf_path, page_number, raster)
+
         except Exception as e:
-            self.logger.warning("Error during bottom frame analysis", error=str(e), page_number=page_number)
-            return self._fallback_frame_detection(pdf_path, page_number, "bottom")
-    
-    def _analyze_horizontal_line(self, pdf_path: str, page_number: int) -> Optional[Dict[str, float]]:
+            self.logger.warning(
+                "Error during bottom frame analysis",
+                error=str(e),
+                page_number=page_number,
+            )
+            return self._fallback_frame_detection(
+                pdf_path, page_number, "bottom", raster
+            )
+
+    def _analyze_horizontal_line(
+        self, pdf_path: str, page_number: int, raster: Optional[PageRaster] = None
+    ) -> Optional[Dict[str, float]]:
         """Анализ горизонтальной линии с обработкой ошибок"""
         try:
-            if not CV_AVAILABLE:
-                self.logger.warning("OpenCV not available for line analysis", page_number=page_number)
-                return self._fallback_horizontal_line_detection(pdf_path, page_number)
-            
-            return self.detect_horizontal_line_18cm(pdf_path, page_number)
-            
+            # Векторная детекция и fallback без OpenCV выполняются внутри детектора
+            return self.detect_horizontal_line_18cm(pdf_path, page_number, raster)
+
         except Exception as e:
-            self.logger.warning("Error during horizontal line analysis", error=str(e), page_number=page_number)
-            return self._fallback_horizontal_line_detection(pdf_path, page_number)
-    
-    def _analyze_free_space(self, pdf_path: str, page_number: int) -> Optional[Dict[str, float]]:
+            self.logger.warning(
+                "Error during horizontal line analysis",
+                error=str(e),
+                page_number=page_number,
+            )
+            return self._fallback_horizontal_line_detection(
+                pdf_path, page_number, raster
+            )
+
+    def _analyze_free_space(
+        self, pdf_path: str, page_number: int, raster: Optional[PageRaster] = None
+    ) -> Optional[Dict[str, float]]:
         """Анализ свободного места с обработкой ошибок"""
         try:
             if not CV_AVAILABLE:
-                self.logger.warning("OpenCV not available for free space analysis", page_number=page_number)
-                return self._fallback_qr_position_in_stamp_region(pdf_path, page_number)
-            
-            return self.detect_free_space_3_5cm(pdf_path, page_number)
-            
+                self.logger.warning(
+                    "OpenCV not available for free space analysis",
+                    page_number=page_number,
+                )
+                return self._fallback_qr_position_in_stamp_region(
+                    pdf_path, page_number, raster
+                )
+
+            return self.detect_free_space_3_5cm(pdf_path, page_number, raster)
+
         except Exception as e:
-            self.logger.warning("Error during free space analysis", error=str(e), page_number=page_number)
-            return self._fallback_qr_position_in_stamp_region(pdf_path, page_number)
-    
-    def _fallback_stamp_detection(self, pdf_path: str, page_number: int = 0) -> Optional[float]:
+            self.logger.warning(
+                "Error during free space analysis",
+                error=str(e),
+                page_number=page_number,
+            )
+            return self._fallback_qr_position_in_stamp_region(
+                pdf_path, page_number, raster
+            )
+
+    def _fallback_stamp_detection(
+        self, pdf_path: str, page_number: int = 0, raster: Optional[PageRaster] = None
+    ) -> Optional[float]:
         """
         Fallback метод для детекции штампа без OpenCV
         Использует простую эвристику на основе размеров страницы
         """
+        own_raster = None
         try:
             self.logger.debug("🔄 Using fallback stamp detection (no OpenCV)")
-            
-            doc = fitz.open(pdf_path)
-            if page_number >= len(doc):
-                self.logger.error("❌ Page number out of range in fallback", 
-                                page_number=page_number, total_pages=len(doc))
-                return None
-                
-            page = doc[page_number]
+
+            raster, own_raster = self._page_raster(pdf_path, page_number, raster)
+            page = raster.page
             page_rect = page.rect
-            
-            self.logger.debug("📄 Fallback page analysis", 
-                            page_width=page_rect.width, 
-                            page_height=page_rect.height,
-                            aspect_ratio=page_rect.width/page_rect.height)
-            
+
+            self.logger.debug(
+                "📄 Fallback page analysis",
+                page_width=page_rect.width,
+                page_height=page_rect.height,
+                aspect_ratio=page_rect.width / page_rect.height,
+            )
+
             # Простая эвристика: штамп обычно находится в нижней части страницы
             # Для landscape страниц - примерно на 10% от высоты страницы от низа
             if page_rect.width > page_rect.height:  # Landscape
                 estimated_stamp_y = page_rect.height * 0.1  # 10% от высоты
-                self.logger.info("✅ Fallback stamp detection (landscape)", 
-                               estimated_y=estimated_stamp_y,
-                               percentage=0.1,
-                               method="heuristic")
-                doc.close()
+                self.logger.info(
+                    "✅ Fallback stamp detection (landscape)",
+                    estimated_y=estimated_stamp_y,
+                    percentage=0.1,
+                    method="heuristic",
+                )
                 return estimated_stamp_y
             else:
-                self.logger.warning("⚠️ Fallback: page is not landscape", 
-                                  page_width=page_rect.width, 
-                                  page_height=page_rect.height)
-            
-            doc.close()
+                self.logger.warning(
+                    "⚠️ Fallback: page is not landscape",
+                    page_width=page_rect.width,
+                    page_height=page_rect.height,
+                )
+
             return None
-            
+
         except Exception as e:
             self.logger.error("❌ Error in fallback stamp detection", error=str(e))
             return None
-    
-    def detect_horizontal_line_18cm(self, pdf_path: str, page_number: int = 0) -> Optional[Dict[str, float]]:
+        finally:
+            if own_raster is not None:
+                own_raster.close()
+
+    def detect_horizontal_line_18cm(
+        self, pdf_path: str, page_number: int = 0, raster: Optional[PageRaster] = None
+    ) -> Optional[Dict[str, float]]:
         """
         Определяет верхнюю горизонтальную линию длиной не менее 15 см в верхней части листа
-        
+
         Args:
             pdf_content: Содержимое PDF файла в байтах
             page_number: Номер страницы (начиная с 0)
-            
+            raster: Общий растр страницы (если None, открывается собственный)
+
         Returns:
             Словарь с информацией о найденной горизонтальной линии или None
             {"start_x": float, "end_x": float, "y": float, "length_cm": float}
         """
+        line_info = self._detect_from_vectors(
+            pdf_path, page_number, raster, "top_horizontal_line"
+        )
+        if line_info is not None:
+            return line_info
+
         if not CV_AVAILABLE:
-            self.logger.warning("OpenCV not available, using fallback horizontal line detection")
-            return self._fallback_horizontal_line_detection(pdf_path, page_number)
-            
+            self.logger.warning(
+                "OpenCV not available, using fallback horizontal line detection"
+            )
+            return self._fallback_horizontal_line_detection(
+                pdf_path, page_number, raster
+            )
+
+        own_raster = None
         try:
-            self.logger.debug("🔍 Detecting horizontal line 18cm+ in top area", 
-                            pdf_path=pdf_path, page_number=page_number)
-            
-            # Открываем PDF с помощью PyMuPDF
-            doc = fitz.open(pdf_path)
-            if page_number >= len(doc):
-                self.logger.error("❌ Page number out of range", 
-                                page_number=page_number, total_pages=len(doc))
-                return None
-                
-            page = doc[page_number]
-            
+            self.logger.debug(
+                "🔍 Detecting horizontal line 18cm+ in top area",
+                pdf_path=pdf_path,
+                page_number=page_number,
+            )
+
+            raster, own_raster = self._page_raster(pdf_path, page_number, raster)
+            page = raster.page
+
             # Получаем размеры страницы
             page_rect = page.rect
             page_width = page_rect.width
             page_height = page_rect.height
-            
-            # Конвертируем страницу в изображение
-            mat = fitz.Matrix(2.0, 2.0)
-            pix = page.get_pixmap(matrix=mat)
-            img_data = pix.tobytes("png")
-            
-            # Конвертируем в PIL Image
-            pil_image = Image.open(io.BytesIO(img_data))
-            img_array = np.array(pil_image.convert('L'))
-            
+
             # Ищем горизонтальные линии в верхней части страницы (верхние 30%)
+            # Рендерим только верхнюю полосу листа (clip)
             top_region_height = int(page_height * 0.3)
-            top_region = img_array[:top_region_height, :]
-            
-            self.logger.debug("📊 Top region analysis", 
-                            total_height=img_array.shape[0],
-                            top_region_height=top_region.shape[0],
-                            top_region_width=top_region.shape[1])
-            
+            top_region = raster.window(0, 0, raster.width_px, top_region_height).gray
+
+            self.logger.debug(
+                "📊 Top region analysis",
+                total_height=raster.height_px,
+                top_region_height=top_region.shape[0],
+                top_region_width=top_region.shape[1],
+            )
+
             # Применяем детекцию краев
             edges = cv2.Canny(top_region, 30, 100)
-            
+
             # Ищем горизонтальные линии
             horizontal_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (20, 1))
-            horizontal_lines = cv2.morphologyEx(edges, cv2.MORPH_OPEN, horizontal_kernel)
-            
+            horizontal_lines = cv2.morphologyEx(
+                edges, cv2.MORPH_OPEN, horizontal_kernel
+            )
+
             # Находим контуры горизонтальных линий
-            contours, _ = cv2.findContours(horizontal_lines, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-            
-            # Минимальная длина линии: 15 см в пикселях (снижено с 18 см для лучшего обнаружения)
-            min_length_pixels = int(15.0 * 28.35 * 2.0)  # 15 см в пикселях с масштабом 2.0
-            
-            self.logger.debug("📏 Line length requirements", 
-                            min_length_cm=15.0,
-                            min_length_pixels=min_length_pixels)
-            
+            contours, _ = cv2.findContours(
+                horizontal_lines, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE
+            )
+
+            # Минимальная длина линии: 15 см в пикселях (снижено с 18 см для лучшего
+            # обнаружения)
+            min_length_pixels = int(
+                15.0 * 28.35 * 2.0
+            )  # 15 см в пикселях с масштабом 2.0
+
+            self.logger.debug(
+                "📏 Line length requirements",
+                min_length_cm=15.0,
+                min_length_pixels=min_length_pixels,
+            )
+
             # Ищем самую верхнюю горизонтальную линию длиной не менее 15 см
             valid_lines = []
-            
+
             for contour in contours:
                 x, y, w, h = cv2.boundingRect(contour)
-                
+
                 # Проверяем, что это горизонтальная линия достаточной длины
-                if w >= min_length_pixels and h <= 5:  # Горизонтальная линия не должна быть слишком толстой
+                if (
+                    w >= min_length_pixels and h <= 5
+                ):  # Горизонтальная линия не должна быть слишком толстой
                     line_length_cm = w / (28.35 * 2.0)  # Конвертируем в см
-                    
-                    valid_lines.append({
-                        "start_x": x,
-                        "end_x": x + w,
-                        "y": y,
-                        "length_cm": line_length_cm
-                    })
-                    
-                    self.logger.debug("🎯 Found candidate horizontal line in top area", 
-                                    bbox=(x, y, w, h),
-                                    length_cm=line_length_cm)
-            
+
+                    valid_lines.append(
+                        {
+                            "start_x": x,
+                            "end_x": x + w,
+                            "y": y,
+                            "length_cm": line_length_cm,
+                        }
+                    )
+
+                    self.logger.debug(
+                        "🎯 Found candidate horizontal line in top area",
+                        bbox=(x, y, w, h),
+                        length_cm=line_length_cm,
+                    )
+
             if not valid_lines:
                 self.logger.warning("❌ No horizontal line 15cm+ found in top area")
-                doc.close()
                 return None
-            
+
             # Сортируем линии по Y-позиции (от низа к верху) и выбираем самую нижнюю
-            valid_lines.sort(key=lambda line: line["y"], reverse=True)  # Сортируем от низа к верху
-            
-            self.logger.debug("📊 Found horizontal lines in top area", 
-                            total_lines=len(valid_lines),
-                            lines_info=[f"Y={line['y']}, length={line['length_cm']:.1f}cm" 
-                                       for line in valid_lines[:5]])  # Показываем первые 5
-            
+            valid_lines.sort(
+                key=lambda line: line["y"], reverse=True
+            )  # Сортируем от низа к верху
+
+            self.logger.debug(
+                "📊 Found horizontal lines in top area",
+                total_lines=len(valid_lines),
+                lines_info=[
+                    f"Y={line['y']}, length={line['length_cm']:.1f}cm"
+                    for line in valid_lines[:5]
+                ],
+            )  # Показываем первые 5
+
             # Выбираем самую нижнюю линию (ближе к базовому якорю)
             best_line = valid_lines[0]
-            self.logger.info("✅ Selected bottommost horizontal line (closest to anchor)", 
-                           y_position=best_line["y"],
-                           length_cm=best_line["length_cm"],
-                           total_candidates=len(valid_lines))
-            
+            self.logger.info(
+                "✅ Selected bottommost horizontal line (closest to anchor)",
+                y_position=best_line["y"],
+                length_cm=best_line["length_cm"],
+                total_candidates=len(valid_lines),
+            )
+
             # Конвертируем координаты обратно в PDF точки
             # best_line координаты относительно top_region
             actual_y = best_line["y"]
-            
+
             # Нормализация координат: используем новую функцию конверсии
             scale_factor = 2.0
             x_img_points = best_line["start_x"] / scale_factor
             y_img_points = actual_y / scale_factor
-            
+
             x_pdf, y_pdf = self.to_pdf_point(x_img_points, y_img_points, page_height)
-            
+
             line_info = {
                 "start_x": best_line["start_x"] / scale_factor,
                 "end_x": best_line["end_x"] / scale_factor,
                 "y": y_pdf,  # Используем нормализованную Y координату
-                "length_cm": best_line["length_cm"]
+                "length_cm": best_line["length_cm"],
             }
-            
-            self.logger.info("✅ Top horizontal line 15cm+ detected", 
-                           start_x=line_info["start_x"],
-                           end_x=line_info["end_x"],
-                           y=line_info["y"],
-                           length_cm=line_info["length_cm"])
-            
-            doc.close()
+
+            self.logger.info(
+                "✅ Top horizontal line 15cm+ detected",
+                start_x=line_info["start_x"],
+                end_x=line_info["end_x"],
+                y=line_info["y"],
+                length_cm=line_info["length_cm"],
+            )
+
             return line_info
-            
+
         except Exception as e:
-            self.logger.error("❌ Error detecting top horizontal line 15cm+", 
-                            error=str(e), pdf_path=pdf_path, page_number=page_number)
+            self.logger.error(
+                "❌ Error detecting top horizontal line 15cm+",
+                error=str(e),
+                pdf_path=pdf_path,
+                page_number=page_number,
+            )
             return None
-    
-    def detect_free_space_3_5cm(self, pdf_path: str, page_number: int = 0) -> Optional[Dict[str, float]]:
+        finally:
+            if own_raster is not None:
+                own_raster.close()
+
+    def detect_free_space_3_5cm(
+        self, pdf_path: str, page_number: int = 0, raster: Optional[PageRaster] = None
+    ) -> Optional[Dict[str, float]]:
         """
         Ищет свободное место размером 3.5x3.5 см для QR кода
-        
+
         Новый алгоритм:
         1. Сначала пытается найти позицию в области поиска штампа (правый нижний угол)
         2. Если не удается, использует старый алгоритм поиска в верхней части листа
-        
+
         Args:
             pdf_content: Содержимое PDF файла в байтах
             page_number: Номер страницы (начиная с 0)
-            
+            raster: Общий растр страницы (если None, открывается собственный)
+
         Returns:
             Словарь с координатами свободного места или None
             {"x": float, "y": float, "width": float, "height": float}
         """
+        own_raster = None
         try:
-            self.logger.debug("🔍 Searching for free space 3.5x3.5cm with new algorithm", 
-                            pdf_path=pdf_path, page_number=page_number)
-            
+            self.logger.debug(
+                "🔍 Searching for free space 3.5x3.5cm with new algorithm",
+                pdf_path=pdf_path,
+                page_number=page_number,
+            )
+
+            raster, own_raster = self._page_raster(pdf_path, page_number, raster)
             # Шаг 1: Пытаемся найти позицию в области поиска штампа
             self.logger.debug("🔍 Step 1: Trying to find QR position in stamp region")
-            # Создаем временный файл для совместимости
-            import tempfile
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as temp_file:
-                temp_file.write(pdf_content)
-                temp_pdf_path = temp_file.name
-            
-            try:
-                stamp_region_position = self.detect_qr_position_in_stamp_region(temp_pdf_path, page_number)
-            finally:
-                os.unlink(temp_pdf_path)
-            
+            stamp_region_position = self.detect_qr_position_in_stamp_region(
+                pdf_path, page_number, raster
+            )
+
             if stamp_region_position:
-                self.logger.info("✅ QR position found in stamp region", 
-                               x=stamp_region_position["x"], y=stamp_region_position["y"],
-                               x_cm=round(stamp_region_position["x"] / 28.35, 2),
-                               y_cm=round(stamp_region_position["y"] / 28.35, 2))
+                self.logger.info(
+                    "✅ QR position found in stamp region",
+                    x=stamp_region_position["x"],
+                    y=stamp_region_position["y"],
+                    x_cm=round(stamp_region_position["x"] / 28.35, 2),
+                    y_cm=round(stamp_region_position["y"] / 28.35, 2),
+                )
                 return stamp_region_position
-            
+
             # Шаг 2: Fallback к старому алгоритму поиска в верхней части листа
-            self.logger.warning("⚠️ No position found in stamp region, falling back to top area algorithm")
-            return self._detect_free_space_3_5cm_top_area(pdf_path, page_number)
-            
+            self.logger.warning(
+                "⚠️ No position found in stamp region, falling back to top area "
+                "algorithm"
+            )
+            return self._detect_free_space_3_5cm_top_area(pdf_path, page_number, raster)
+
         except Exception as e:
-            self.logger.error("❌ Error detecting free space 3.5x3.5cm", 
-                            error=str(e), pdf_path=pdf_path, page_number=page_number)
+            self.logger.error(
+                "❌ Error detecting free space 3.5x3.5cm",
+                error=str(e),
+                pdf_path=pdf_path,
+                page_number=page_number,
+            )
             return None
-    
-    def _detect_free_space_3_5cm_top_area(self, pdf_path: str, page_number: int = 0) -> Optional[Dict[str, float]]:
+        finally:
+            if own_raster is not None:
+                own_raster.close()
+
+    def _detect_free_space_3_5cm_top_area(
+        self, pdf_path: str, page_number: int = 0, raster: Optional[PageRaster] = None
+    ) -> Optional[Dict[str, float]]:
         """
         Старый алгоритм поиска свободного места в верхней части листа
         (переименованный оригинальный метод detect_free_space_3_5cm)
-        
+
         Args:
             pdf_content: Содержимое PDF файла в байтах
             page_number: Номер страницы (начиная с 0)
-            
+            raster: Общий растр страницы (если None, открывается собственный)
+
         Returns:
             Словарь с координатами свободного места или None
             {"x": float, "y": float, "width": float, "height": float}
         """
+        own_raster = None
         try:
-            self.logger.debug("🔍 Searching for free space 3.5x3.5cm in top area with alternative positioning", 
-                            pdf_path=pdf_path, page_number=page_number)
-            
+            self.logger.debug(
+                "🔍 Searching for free space 3.5x3.5cm in top area with alternative "
+                "positioning",
+                pdf_path=pdf_path,
+                page_number=page_number,
+            )
+
+            # Все детекторы ниже работают с одним растром страницы
+            raster, own_raster = self._page_raster(pdf_path, page_number, raster)
             # Получаем информацию о правой рамке
-            right_frame = self.detect_right_frame_edge(pdf_path, page_number)
-            
+            right_frame = self.detect_right_frame_edge(pdf_path, page_number, raster)
+
             # Получаем все горизонтальные линии
-            horizontal_lines = self._find_all_horizontal_lines(pdf_path, page_number)
-            
+            horizontal_lines = self._find_all_horizontal_lines(
+                pdf_path, page_number, raster
+            )
+
             if not horizontal_lines:
-                self.logger.warning("❌ No horizontal lines 15cm+ found, cannot determine QR position")
+                self.logger.warning(
+                    "❌ No horizontal lines 15cm+ found, cannot determine QR position"
+                )
                 return None
-            
+
             # Размер QR кода: 3.5 см x 3.5 см
             qr_size_cm = 3.5
             qr_size_points = qr_size_cm * 28.35  # 99.225 точек
-            
+
             # Отступы от краев
             margin_cm = 0.5  # 0.5 см отступ
             margin_points = margin_cm * 28.35
-            
+
             # Получаем размеры страницы
-            doc = fitz.open(pdf_path)
-            page = doc[page_number]
-            page_rect = page.rect
-            page_width = page_rect.width
-            page_height = page_rect.height
-            doc.close()
-            
+            page_width = raster.page_width
+            page_height = raster.page_height
+
             # Пробуем каждую горизонтальную линию, начиная с самой верхней
             for i, horizontal_line in enumerate(horizontal_lines):
-                self.logger.debug("🔍 Trying horizontal line {} of {}".format(i + 1, len(horizontal_lines)),
-                                line_y=horizontal_line["y"],
-                                line_length_cm=horizontal_line["length_cm"])
-                
+                self.logger.debug(
+                    "🔍 Trying horizontal line {} of {}".format(
+                        i + 1, len(horizontal_lines)
+                    ),
+                    line_y=horizontal_line["y"],
+                    line_length_cm=horizontal_line["length_cm"],
+                )
+
                 # Вычисляем позицию QR кода для этой линии
                 x_position, y_position = self._calculate_qr_position_for_line(
-                    horizontal_line, right_frame, qr_size_points, margin_points, 
-                    page_width, page_height
+                    horizontal_line,
+                    right_frame,
+                    qr_size_points,
+                    margin_points,
+                    page_width,
+                    page_height,
                 )
-                
-                self.logger.debug("📍 Calculated QR position for line {}: ({}, {})".format(i + 1, x_position, y_position))
-                
+
+                self.logger.debug(
+                    "📍 Calculated QR position for line {}: ({}, {})".format(
+                        i + 1, x_position, y_position
+                    )
+                )
+
                 # Проверяем, что область действительно пустая
-                is_empty = self._is_area_empty(pdf_path, page_number, x_position, y_position, qr_size_points, qr_size_points)
-                
+                is_empty = self._is_area_empty(
+                    pdf_path,
+                    page_number,
+                    x_position,
+                    y_position,
+                    qr_size_points,
+                    qr_size_points,
+                    raster,
+                )
+
                 if is_empty:
                     result = {
                         "x": x_position,
                         "y": y_position,
                         "width": qr_size_points,
-                        "height": qr_size_points
+                        "height": qr_size_points,
                     }
-                    
-                    self.logger.info("✅ Free space 3.5x3.5cm found and verified as empty using line {} of {}".format(i + 1, len(horizontal_lines)), 
-                                   line_y=horizontal_line["y"],
-                                   line_length_cm=horizontal_line["length_cm"],
-                                   x=result["x"],
-                                   y=result["y"],
-                                   width=result["width"],
-                                   height=result["height"],
-                                   x_cm=round(result["x"] / 28.35, 2),
-                                   y_cm=round(result["y"] / 28.35, 2))
-                    
+
+                    self.logger.info(
+                        "✅ Free space 3.5x3.5cm found and verified as empty "
+                        "using line {} of {}".format(i + 1, len(horizontal_lines)),
+                        line_y=horizontal_line["y"],
+                        line_length_cm=horizontal_line["length_cm"],
+                        x=result["x"],
+                        y=result["y"],
+                        width=result["width"],
+                        height=result["height"],
+                        x_cm=round(result["x"] / 28.35, 2),
+                        y_cm=round(result["y"] / 28.35, 2),
+                    )
+
                     return result
                 else:
-                    self.logger.warning("❌ Area for line {} is not empty, trying next line".format(i + 1),
-                                      line_y=horizontal_line["y"],
-                                      x_position=x_position,
-                                      y_position=y_position,
-                                      x_cm=round(x_position / 28.35, 2),
-                                      y_cm=round(y_position / 28.35, 2))
-            
-            # Если ни одна линия не подошла, возвращаем None (будет использован fallback)
-            self.logger.warning("❌ No empty space found for any horizontal line, will use fallback algorithm")
+                    self.logger.warning(
+                        "❌ Area for line {} is not empty, trying next line".format(
+                            i + 1
+                        ),
+                        line_y=horizontal_line["y"],
+                        x_position=x_position,
+                        y_position=y_position,
+                        x_cm=round(x_position / 28.35, 2),
+                        y_cm=round(y_position / 28.35, 2),
+                    )
+
+            # Если ни одна линия не подошла, возвращаем None (будет использован
+            # fallback)
+            self.logger.warning(
+                "❌ No empty space found for any horizontal line, will use fallback "
+                "algorithm"
+            )
             return None
-            
+
         except Exception as e:
-            self.logger.error("❌ Error detecting free space 3.5x3.5cm in top area", 
-                            error=str(e), pdf_path=pdf_path, page_number=page_number)
+            self.logger.error(
+                "❌ Error detecting free space 3.5x3.5cm in top area",
+                error=str(e),
+                pdf_path=pdf_path,
+                page_number=page_number,
+            )
             return None
-    
-    def _find_all_horizontal_lines(self, pdf_path: str, page_number: int = 0) -> List[Dict[str, float]]:
+        finally:
+            if own_raster is not None:
+                own_raster.close()
+
+    def _find_all_horizontal_lines(
+        self, pdf_path: str, page_number: int = 0, raster: Optional[PageRaster] = None
+    ) -> List[Dict[str, float]]:
         """
         Находит все горизонтальные линии длиной не менее 15 см в верхней части страницы
-        
+
         Args:
             pdf_content: Содержимое PDF файла в байтах
             page_number: Номер страницы (начиная с 0)
-            
+            raster: Общий растр страницы (если None, открывается собственный)
+
         Returns:
             Список словарей с информацией о найденных горизонтальных линиях
             [{"start_x": float, "end_x": float, "y": float, "length_cm": float}, ...]
         """
         if not CV_AVAILABLE:
-            self.logger.warning("OpenCV not available, using fallback horizontal line detection")
-            fallback_line = self._fallback_horizontal_line_detection(pdf_path, page_number)
+            self.logger.warning(
+                "OpenCV not available, using fallback horizontal line detection"
+            )
+            fallback_line = self._fallback_horizontal_line_detection(
+                pdf_path, page_number, raster
+            )
             return [fallback_line] if fallback_line else []
-            
+
+        own_raster = None
         try:
-            self.logger.debug("🔍 Finding all horizontal lines 15cm+ in top area", 
-                            pdf_path=pdf_path, page_number=page_number)
-            
-            # Открываем PDF с помощью PyMuPDF
-            doc = fitz.open(pdf_path)
-            if page_number >= len(doc):
-                self.logger.error("❌ Page number out of range", 
-                                page_number=page_number, total_pages=len(doc))
-                return []
-                
-            page = doc[page_number]
-            
+            self.logger.debug(
+                "🔍 Finding all horizontal lines 15cm+ in top area",
+                pdf_path=pdf_path,
+                page_number=page_number,
+            )
+
+            raster, own_raster = self._page_raster(pdf_path, page_number, raster)
+            page = raster.page
+
             # Получаем размеры страницы
             page_rect = page.rect
             page_width = page_rect.width
             page_height = page_rect.height
-            
-            # Конвертируем страницу в изображение
-            mat = fitz.Matrix(2.0, 2.0)
-            pix = page.get_pixmap(matrix=mat)
-            img_data = pix.tobytes("png")
-            
-            # Конвертируем в PIL Image
-            pil_image = Image.open(io.BytesIO(img_data))
-            img_array = np.array(pil_image.convert('L'))
-            
+
             # Ищем горизонтальные линии в верхней части страницы (верхние 30%)
+            # Рендерим только верхнюю полосу листа (clip)
             top_region_height = int(page_height * 0.3)
-            top_region = img_array[:top_region_height, :]
-            
-            self.logger.debug("📊 Top region analysis", 
-                            total_height=img_array.shape[0],
-                            top_region_height=top_region.shape[0],
-                            top_region_width=top_region.shape[1])
-            
+            top_region = raster.window(0, 0, raster.width_px, top_region_height).gray
+
+            self.logger.debug(
+                "📊 Top region analysis",
+                total_height=raster.height_px,
+                top_region_height=top_region.shape[0],
+                top_region_width=top_region.shape[1],
+            )
+
             # Применяем детекцию краев
             edges = cv2.Canny(top_region, 30, 100)
-            
+
             # Ищем горизонтальные линии
             horizontal_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (20, 1))
-            horizontal_lines = cv2.morphologyEx(edges, cv2.MORPH_OPEN, horizontal_kernel)
-            
+            horizontal_lines = cv2.morphologyEx(
+                edges, cv2.MORPH_OPEN, horizontal_kernel
+            )
+
             # Находим контуры горизонтальных линий
-            contours, _ = cv2.findContours(horizontal_lines, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-            
+            contours, _ = cv2.findContours(
+                horizontal_lines, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE
+            )
+
             # Минимальная длина линии: 15 см в пикселях
-            min_length_pixels = int(15.0 * 28.35 * 2.0)  # 15 см в пикселях с масштабом 2.0
-            
-            self.logger.debug("📏 Line length requirements", 
-                            min_length_cm=15.0,
-                            min_length_pixels=min_length_pixels)
-            
+            min_length_pixels = int(
+                15.0 * 28.35 * 2.0
+            )  # 15 см в пикселях с масштабом 2.0
+
+            self.logger.debug(
+                "📏 Line length requirements",
+                min_length_cm=15.0,
+                min_length_pixels=min_length_pixels,
+            )
+
             # Ищем все горизонтальные линии длиной не менее 15 см
             valid_lines = []
-            
+
             for contour in contours:
                 x, y, w, h = cv2.boundingRect(contour)
-                
+
                 # Проверяем, что это горизонтальная линия достаточной длины
-                if w >= min_length_pixels and h <= 5:  # Горизонтальная линия не должна быть слишком толстой
+                if (
+                    w >= min_length_pixels and h <= 5
+                ):  # Горизонтальная линия не должна быть слишком толстой
                     line_length_cm = w / (28.35 * 2.0)  # Конвертируем в см
-                    
-                    valid_lines.append({
-                        "start_x": x,
-                        "end_x": x + w,
-                        "y": y,
-                        "length_cm": line_length_cm
-                    })
-                    
-                    self.logger.debug("🎯 Found candidate horizontal line in top area", 
-                                    bbox=(x, y, w, h),
-                                    length_cm=line_length_cm)
-            
+
+                    valid_lines.append(
+                        {
+                            "start_x": x,
+                            "end_x": x + w,
+                            "y": y,
+                            "length_cm": line_length_cm,
+                        }
+                    )
+
+                    self.logger.debug(
+                        "🎯 Found candidate horizontal line in top area",
+                        bbox=(x, y, w, h),
+                        length_cm=line_length_cm,
+                    )
+
             if not valid_lines:
                 self.logger.warning("❌ No horizontal line 15cm+ found in top area")
-                doc.close()
                 return []
-            
+
             # Сортируем линии по Y-позиции (от верха к низу)
             valid_lines.sort(key=lambda line: line["y"])
-            
-            self.logger.debug("📊 Found horizontal lines in top area", 
-                            total_lines=len(valid_lines),
-                            lines_info=[f"Y={line['y']}, length={line['length_cm']:.1f}cm" 
-                                       for line in valid_lines])
-            
+
+            self.logger.debug(
+                "📊 Found horizontal lines in top area",
+                total_lines=len(valid_lines),
+                lines_info=[
+                    f"Y={line['y']}, length={line['length_cm']:.1f}cm"
+                    for line in valid_lines
+                ],
+            )
+
             # Конвертируем координаты обратно в PDF точки
             scale_factor = 2.0
             result_lines = []
-            
+
             for line in valid_lines:
                 # Нормализация координат: используем новую функцию конверсии
                 x_img_points = line["start_x"] / scale_factor
                 y_img_points = line["y"] / scale_factor
-                
-                x_pdf, y_pdf = self.to_pdf_point(x_img_points, y_img_points, page_height)
-                
+
+                x_pdf, y_pdf = self.to_pdf_point(
+                    x_img_points, y_img_points, page_height
+                )
+
                 line_info = {
                     "start_x": line["start_x"] / scale_factor,
                     "end_x": line["end_x"] / scale_factor,
                     "y": y_pdf,  # Используем нормализованную Y координату
-                    "length_cm": line["length_cm"]
+                    "length_cm": line["length_cm"],
                 }
                 result_lines.append(line_info)
-            
-            self.logger.info("✅ Found {} horizontal lines 15cm+ in top area".format(len(result_lines)))
-            
-            doc.close()
+
+            self.logger.info(
+                "✅ Found {} horizontal lines 15cm+ in top area".format(
+                    len(result_lines)
+                )
+            )
+
             return result_lines
-            
+
         except Exception as e:
-            self.logger.error("❌ Error finding all horizontal lines 15cm+", 
-                            error=str(e), pdf_path=pdf_path, page_number=page_number)
+            self.logger.error(
+                "❌ Error finding all horizontal lines 15cm+",
+                error=str(e),
+                pdf_path=pdf_path,
+                page_number=page_number,
+            )
             return []
-    
-    def _is_area_empty(self, pdf_path: str, page_number: int, x: float, y: float, width: float, height: float) -> bool:
+        finally:
+            if own_raster is not None:
+                own_raster.close()
+
+    def _is_area_empty(
+        self,
+        pdf_path: str,
+        page_number: int,
+        x: float,
+        y: float,
+        width: float,
+        height: float,
+        raster: Optional[PageRaster] = None,
+    ) -> bool:
         """
         Проверяет, является ли указанная область изображения пустой (без значимых элементов)
-        
+
         Args:
             pdf_content: Содержимое PDF файла в байтах
             page_number: Номер страницы (начиная с 0)
+            raster: Общий растр страницы (если None, открывается собственный)
             x, y: Координаты левого верхнего угла области в PDF точках
             width, height: Размеры области в PDF точках
-            
+
         Returns:
             True если область пустая, False если содержит элементы
         """
         if not CV_AVAILABLE:
             self.logger.warning("OpenCV not available, assuming area is empty")
             return True
-            
+
+        own_raster = None
         try:
-            self.logger.debug("🔍 Checking if area is empty", 
-                            x=x, y=y, width=width, height=height,
-                            x_cm=round(x / 28.35, 2), y_cm=round(y / 28.35, 2),
-                            width_cm=round(width / 28.35, 2), height_cm=round(height / 28.35, 2))
-            
-            # Открываем PDF
-            doc = fitz.open(pdf_path)
-            if page_number >= len(doc):
-                self.logger.error("❌ Page number out of range", 
-                                page_number=page_number, total_pages=len(doc))
-                return False
-                
-            page = doc[page_number]
-            
-            # Конвертируем страницу в изображение
-            mat = fitz.Matrix(2.0, 2.0)
-            pix = page.get_pixmap(matrix=mat)
-            img_data = pix.tobytes("png")
-            
-            # Конвертируем в PIL Image
-            pil_image = Image.open(io.BytesIO(img_data))
-            img_array = np.array(pil_image.convert('L'))
-            
+            self.logger.debug(
+                "🔍 Checking if area is empty",
+                x=x,
+                y=y,
+                width=width,
+                height=height,
+                x_cm=round(x / 28.35, 2),
+                y_cm=round(y / 28.35, 2),
+                width_cm=round(width / 28.35, 2),
+                height_cm=round(height / 28.35, 2),
+            )
+
+            raster, own_raster = self._page_raster(pdf_path, page_number, raster)
+
             # Конвертируем координаты из PDF точек в пиксели изображения
             scale_factor = 2.0
             x_pixels = int(x * scale_factor)
             y_pixels = int(y * scale_factor)
             width_pixels = int(width * scale_factor)
             height_pixels = int(height * scale_factor)
-            
+
             # Проверяем границы
-            if (x_pixels < 0 or y_pixels < 0 or 
-                x_pixels + width_pixels > img_array.shape[1] or 
-                y_pixels + height_pixels > img_array.shape[0]):
-                self.logger.warning("⚠️ Area extends beyond image boundaries", 
-                                  x_pixels=x_pixels, y_pixels=y_pixels,
-                                  width_pixels=width_pixels, height_pixels=height_pixels,
-                                  img_width=img_array.shape[1], img_height=img_array.shape[0])
+            if (
+                x_pixels < 0
+                or y_pixels < 0
+                or x_pixels + width_pixels > raster.width_px
+                or y_pixels + height_pixels > raster.height_px
+            ):
+                self.logger.warning(
+                    "⚠️ Area extends beyond image boundaries",
+                    x_pixels=x_pixels,
+                    y_pixels=y_pixels,
+                    width_pixels=width_pixels,
+                    height_pixels=height_pixels,
+                    img_width=raster.width_px,
+                    img_height=raster.height_px,
+                )
                 return False
-            
-            # Извлекаем область для анализа
-            area = img_array[y_pixels:y_pixels + height_pixels, 
-                           x_pixels:x_pixels + width_pixels]
-            
+
+            # Рендерим только область для анализа (clip)
+            area = raster.window(
+                x_pixels, y_pixels, x_pixels + width_pixels, y_pixels + height_pixels
+            ).gray
+
             # Анализируем область на наличие элементов
             # Вычисляем статистики яркости
             mean_brightness = np.mean(area)
             std_brightness = np.std(area)
-            
+
             # Область считается пустой, если:
             # 1. Средняя яркость близка к белому (высокие значения)
             # 2. Низкое стандартное отклонение (мало вариации)
             # 3. Мало краев (отсутствие значимых элементов)
             is_bright = mean_brightness > 200  # Близко к белому
             is_uniform = std_brightness < 100  # Мало вариации (смягчено до 100)
-            
+
             # Дополнительная проверка: ищем края в области
             edges = cv2.Canny(area, 50, 150)
             edge_pixels = np.sum(edges > 0)
             total_pixels = area.shape[0] * area.shape[1]
             edge_ratio = edge_pixels / total_pixels
-            
+
             # Область считается пустой, если мало краев
             has_few_edges = edge_ratio < 0.05  # Менее 5% пикселей являются краями
-            
-            # Дополнительная проверка: если область очень яркая, то даже при наличии краев считаем её пустой
+
+            # Дополнительная проверка: если область очень яркая, то даже при наличии
+            # краев считаем её пустой
             is_very_bright = mean_brightness > 240  # Очень близко к белому
-            
+
             is_empty = (is_bright and is_uniform and has_few_edges) or is_very_bright
-            
-            self.logger.debug("📊 Area analysis results", 
-                            mean_brightness=round(mean_brightness, 1),
-                            std_brightness=round(std_brightness, 1),
-                            edge_pixels=edge_pixels,
-                            total_pixels=total_pixels,
-                            edge_ratio=round(edge_ratio, 3),
-                            is_bright=is_bright,
-                            is_uniform=is_uniform,
-                            has_few_edges=has_few_edges,
-                            is_very_bright=is_very_bright,
-                            is_empty=is_empty)
-            
-            doc.close()
+
+            self.logger.debug(
+                "📊 Area analysis results",
+                mean_brightness=round(mean_brightness, 1),
+                std_brightness=round(std_brightness, 1),
+                edge_pixels=edge_pixels,
+                total_pixels=total_pixels,
+                edge_ratio=round(edge_ratio, 3),
+                is_bright=is_bright,
+                is_uniform=is_uniform,
+                has_few_edges=has_few_edges,
+                is_very_bright=is_very_bright,
+                is_empty=is_empty,
+            )
+
             return is_empty
-            
+
         except Exception as e:
-            self.logger.error("❌ Error checking if area is empty", 
-                            error=str(e), pdf_path=pdf_path, page_number=page_number)
+            self.logger.error(
+                "❌ Error checking if area is empty",
+                error=str(e),
+                pdf_path=pdf_path,
+                page_number=page_number,
+            )
             return True  # В случае ошибки считаем область пустой
-    
+        finally:
+            if own_raster is not None:
+                own_raster.close()
+
     def _calculate_qr_position_for_line(self, horizontal_line: Dict[str, float], right_frame: Optional[float], 
                                       qr_size_points: float, margin_points: float, 
                                       page_width: float, page_height: float) -> tuple[float, float]:
@@ -2197,12 +2790,12 @@ class PDFAnalyzer:
         """
         # Y-позиция: ниже горизонтальной линии с отступом
         y_position = horizontal_line["y"] - qr_size_points - margin_points
-        
+
         # X-позиция: если есть правая рамка, используем её, иначе от левого края
         if right_frame:
             # Позиционируем слева от правой рамки с отступом
             x_position = right_frame - qr_size_points - margin_points
-            
+
             # Проверяем, что QR код не выходит за левый край
             min_x = margin_points
             if x_position < min_x:
@@ -2210,12 +2803,12 @@ class PDFAnalyzer:
         else:
             # Fallback: позиционируем в левом верхнем углу
             x_position = margin_points
-        
+
         # Проверяем, что QR код помещается в области горизонтальной линии
         if x_position + qr_size_points > horizontal_line["end_x"]:
             # Сдвигаем влево, чтобы поместиться в области линии
             x_position = horizontal_line["end_x"] - qr_size_points - margin_points
-        
+
         # Проверяем границы страницы
         if x_position < margin_points:
             x_position = margin_points
@@ -2225,84 +2818,98 @@ class PDFAnalyzer:
             y_position = margin_points
         if y_position + qr_size_points > page_height - margin_points:
             y_position = page_height - qr_size_points - margin_points
-        
+
         return x_position, y_position
-    
-    def _fallback_horizontal_line_detection(self, pdf_path: str, page_number: int = 0) -> Optional[Dict[str, float]]:
+
+    def _fallback_horizontal_line_detection(
+        self, pdf_path: str, page_number: int = 0, raster: Optional[PageRaster] = None
+    ) -> Optional[Dict[str, float]]:
         """
         Fallback метод для детекции горизонтальной линии без OpenCV
         """
+        own_raster = None
         try:
             self.logger.debug("🔄 Using fallback horizontal line detection (no OpenCV)")
-            
-            doc = fitz.open(pdf_path)
-            if page_number >= len(doc):
-                return None
-                
-            page = doc[page_number]
+
+            raster, own_raster = self._page_raster(pdf_path, page_number, raster)
+            page = raster.page
             page_rect = page.rect
-            
+
             # Простая эвристика: предполагаем горизонтальную линию в верхней части
             # Примерно на 10% от высоты страницы от верха
             estimated_y = page_rect.height * 0.9
             estimated_start_x = page_rect.width * 0.1  # 10% от левого края
-            estimated_end_x = page_rect.width * 0.9    # 90% от левого края
+            estimated_end_x = page_rect.width * 0.9  # 90% от левого края
             estimated_length_cm = (estimated_end_x - estimated_start_x) / 28.35
-            
+
             result = {
                 "start_x": estimated_start_x,
                 "end_x": estimated_end_x,
                 "y": estimated_y,
-                "length_cm": estimated_length_cm
+                "length_cm": estimated_length_cm,
             }
-            
-            self.logger.info("✅ Fallback horizontal line detection (top area)", 
-                           start_x=result["start_x"],
-                           end_x=result["end_x"],
-                           y=result["y"],
-                           length_cm=result["length_cm"],
-                           method="heuristic_top")
-            
-            doc.close()
+
+            self.logger.info(
+                "✅ Fallback horizontal line detection (top area)",
+                start_x=result["start_x"],
+                end_x=result["end_x"],
+                y=result["y"],
+                length_cm=result["length_cm"],
+                method="heuristic_top",
+            )
+
             return result
-            
+
         except Exception as e:
-            self.logger.error("❌ Error in fallback horizontal line detection", error=str(e))
+            self.logger.error(
+                "❌ Error in fallback horizontal line detection", error=str(e)
+            )
             return None
+        finally:
+            if own_raster is not None:
+                own_raster.close()
 
-    def _fallback_frame_detection(self, pdf_path: str, page_number: int = 0, frame_type: str = "right") -> Optional[float]:
+    def _fallback_frame_detection(
+        self,
+        pdf_path: str,
+        page_number: int = 0,
+        frame_type: str = "right",
+        raster: Optional[PageRaster] = None,
+    ) -> Optional[float]:
         """
         Fallback метод для детекции рамки без OpenCV
         Использует простую эвристику на основе размеров страницы
         """
+        own_raster = None
         try:
-            doc = fitz.open(pdf_path)
-            if page_number >= len(doc):
-                return None
-                
-            page = doc[page_number]
+            raster, own_raster = self._page_raster(pdf_path, page_number, raster)
+            page = raster.page
             page_rect = page.rect
-            
+
             if frame_type == "right":
                 # Правая рамка обычно находится на 5% от ширины страницы от правого края
                 estimated_frame_x = page_rect.width * 0.95  # 95% от ширины
-                self.logger.info("Fallback right frame detection", estimated_x=estimated_frame_x)
-                doc.close()
+                self.logger.info(
+                    "Fallback right frame detection", estimated_x=estimated_frame_x
+                )
                 return estimated_frame_x
             elif frame_type == "bottom":
                 # Нижняя рамка обычно находится на 5% от высоты страницы от низа
                 estimated_frame_y = page_rect.height * 0.05  # 5% от высоты
-                self.logger.info("Fallback bottom frame detection", estimated_y=estimated_frame_y)
-                doc.close()
+                self.logger.info(
+                    "Fallback bottom frame detection", estimated_y=estimated_frame_y
+                )
                 return estimated_frame_y
-            
-            doc.close()
+
             return None
-            
+
         except Exception as e:
             self.logger.error("Error in fallback frame detection", error=str(e))
             return None
-    
+        finally:
+            if own_raster is not None:
+                own_raster.close()
+
     def _find_right_frame_in_stamp_region(self, stamp_region: np.ndarray, right_start: int, bottom_start: int) -> Optional[float]:
         """
         Находит правую рамку (крайнюю правую вертикальную линию) в области поиска штампа
@@ -2318,15 +2925,15 @@ class PDFAnalyzer:
         try:
             # Применяем детекцию краев для поиска вертикальных линий
             edges = cv2.Canny(stamp_region, 30, 100)
-            
+
             # Ищем вертикальные линии с помощью HoughLinesP
             lines = cv2.HoughLinesP(edges, 1, np.pi/180, threshold=50, 
                                   minLineLength=100, maxLineGap=10)
-            
+
             if lines is None:
                 self.logger.debug("❌ No lines found in stamp region")
                 return None
-            
+
             # Фильтруем вертикальные линии (угол близкий к 90 градусам)
             vertical_lines = []
             for line in lines:
@@ -2338,28 +2945,28 @@ class PDFAnalyzer:
                     angle = np.arctan2(y2 - y1, x2 - x1) * 180 / np.pi
                     if abs(angle - 90) < 10 or abs(angle + 90) < 10:  # Вертикальная линия
                         vertical_lines.append((x1 + x2) // 2)
-            
+
             if not vertical_lines:
                 self.logger.debug("❌ No vertical lines found in stamp region")
                 return None
-            
+
             # Находим крайнюю правую вертикальную линию
             rightmost_x = max(vertical_lines)
-            
+
             # Конвертируем в PDF координаты
             right_frame_x_points = (right_start + rightmost_x) / 2.0  # Масштаб 2.0
-            
+
             self.logger.debug("✅ Right frame found in stamp region", 
                             rightmost_x_pixels=rightmost_x,
                             right_frame_x_points=right_frame_x_points,
                             right_frame_x_cm=round(right_frame_x_points / 28.35, 2))
-            
+
             return right_frame_x_points
-            
+
         except Exception as e:
             self.logger.error("Error finding right frame in stamp region", error=str(e))
             return None
-    
+
     def _find_horizontal_line_18cm_in_stamp_region(self, stamp_region: np.ndarray, right_frame_x: float, 
                                                  right_start: int, bottom_start: int) -> Optional[Dict[str, float]]:
         """
@@ -2378,21 +2985,21 @@ class PDFAnalyzer:
         try:
             # Применяем детекцию краев
             edges = cv2.Canny(stamp_region, 30, 100)
-            
+
             # Ищем горизонтальные линии
             lines = cv2.HoughLinesP(edges, 1, np.pi/180, threshold=50, 
                                   minLineLength=100, maxLineGap=10)
-            
+
             if lines is None:
                 self.logger.debug("❌ No lines found for horizontal line detection")
                 return None
-            
+
             # Минимальная длина линии в пикселях (18 см)
             min_length_pixels = int(18.0 * 28.35 * 2.0)  # 18 см в пикселях
-            
+
             # Конвертируем правую рамку в пиксели области поиска
             right_frame_x_pixels = int((right_frame_x - right_start) * 2.0)
-            
+
             # Фильтруем горизонтальные линии
             horizontal_lines = []
             for line in lines:
@@ -2412,34 +3019,34 @@ class PDFAnalyzer:
                             # Проверяем, соприкасается ли линия с правой рамкой
                             if (x1 <= right_frame_x_pixels <= x2) or (x2 <= right_frame_x_pixels <= x1):
                                 horizontal_lines.append(((y1 + y2) // 2, length))
-            
+
             if not horizontal_lines:
                 self.logger.debug("❌ No horizontal lines 18cm+ found in stamp region")
                 return None
-            
+
             # Находим самую верхнюю линию (минимальная Y координата)
             top_line = min(horizontal_lines, key=lambda x: x[0])
             y_pixels, length_pixels = top_line
-            
+
             # Конвертируем в PDF координаты
             y_points = (bottom_start + y_pixels) / 2.0  # Масштаб 2.0
             length_cm = length_pixels / (28.35 * 2.0)
-            
+
             result = {
                 "y": y_points,
                 "length_cm": length_cm
             }
-            
+
             self.logger.debug("✅ Top horizontal line 18cm+ found in stamp region", 
                             y_pixels=y_pixels, y_points=y_points,
                             length_pixels=length_pixels, length_cm=length_cm)
-            
+
             return result
-            
+
         except Exception as e:
             self.logger.error("Error finding horizontal line in stamp region", error=str(e))
             return None
-    
+
     def _find_bottom_horizontal_line_in_stamp_region(self, stamp_region: np.ndarray, right_frame_x: float, 
                                                    right_start: int, bottom_start: int) -> Optional[Dict[str, float]]:
         """
@@ -2458,18 +3065,18 @@ class PDFAnalyzer:
         try:
             # Применяем детекцию краев
             edges = cv2.Canny(stamp_region, 30, 100)
-            
+
             # Ищем горизонтальные линии
             lines = cv2.HoughLinesP(edges, 1, np.pi/180, threshold=50, 
                                   minLineLength=50, maxLineGap=10)  # Меньше требований к длине
-            
+
             if lines is None:
                 self.logger.debug("❌ No lines found for bottom horizontal line detection")
                 return None
-            
+
             # Конвертируем правую рамку в пиксели области поиска
             right_frame_x_pixels = int((right_frame_x - right_start) * 2.0)
-            
+
             # Фильтруем горизонтальные линии
             horizontal_lines = []
             for line in lines:
@@ -2489,34 +3096,34 @@ class PDFAnalyzer:
                             # Проверяем, соприкасается ли линия с правой рамкой
                             if (x1 <= right_frame_x_pixels <= x2) or (x2 <= right_frame_x_pixels <= x1):
                                 horizontal_lines.append(((y1 + y2) // 2, length))
-            
+
             if not horizontal_lines:
                 self.logger.debug("❌ No horizontal lines found in stamp region")
                 return None
-            
+
             # Находим самую нижнюю линию (максимальная Y координата)
             bottom_line = max(horizontal_lines, key=lambda x: x[0])
             y_pixels, length_pixels = bottom_line
-            
+
             # Конвертируем в PDF координаты
             y_points = (bottom_start + y_pixels) / 2.0  # Масштаб 2.0
             length_cm = length_pixels / (28.35 * 2.0)
-            
+
             result = {
                 "y": y_points,
                 "length_cm": length_cm
             }
-            
+
             self.logger.debug("✅ Bottom horizontal line found in stamp region", 
                             y_pixels=y_pixels, y_points=y_points,
                             length_pixels=length_pixels, length_cm=length_cm)
-            
+
             return result
-            
+
         except Exception as e:
             self.logger.error("Error finding bottom horizontal line in stamp region", error=str(e))
             return None
-    
+
     def _find_bottom_frame_in_stamp_region(self, stamp_region: np.ndarray, right_start: int, bottom_start: int) -> Optional[float]:
         """
         Находит нижнюю рамку в области поиска штампа
@@ -2532,14 +3139,14 @@ class PDFAnalyzer:
         try:
             # Применяем детекцию краев для поиска горизонтальных линий
             edges = cv2.Canny(stamp_region, 30, 100)
-            
+
             # Ищем горизонтальные линии
             lines = cv2.HoughLinesP(edges, 1, np.pi/180, threshold=50, 
                                   minLineLength=100, maxLineGap=10)
-            
+
             if lines is None:
                 return None
-            
+
             # Фильтруем горизонтальные линии
             horizontal_lines = []
             for line in lines:
@@ -2551,70 +3158,80 @@ class PDFAnalyzer:
                     angle = np.arctan2(y2 - y1, x2 - x1) * 180 / np.pi
                     if abs(angle) < 10 or abs(angle - 180) < 10:  # Горизонтальная линия
                         horizontal_lines.append((y1 + y2) // 2)
-            
+
             if not horizontal_lines:
                 return None
-            
+
             # Находим самую нижнюю горизонтальную линию
             bottommost_y = max(horizontal_lines)
-            
+
             # Конвертируем в PDF координаты
             bottom_frame_y_points = (bottom_start + bottommost_y) / 2.0  # Масштаб 2.0
-            
+
             return bottom_frame_y_points
-            
+
         except Exception as e:
             self.logger.error("Error finding bottom frame in stamp region", error=str(e))
             return None
 
-    def _fallback_qr_position_in_stamp_region(self, pdf_path: str, page_number: int = 0) -> Optional[Dict[str, float]]:
+    def _fallback_qr_position_in_stamp_region(
+        self, pdf_path: str, page_number: int = 0, raster: Optional[PageRaster] = None
+    ) -> Optional[Dict[str, float]]:
         """
         Fallback метод для позиционирования QR кода в области поиска штампа без OpenCV
-        
+
         Args:
             pdf_content: Содержимое PDF файла в байтах
             page_number: Номер страницы (начиная с 0)
-            
+            raster: Общий растр страницы (если None, открывается собственный)
+
         Returns:
             Словарь с координатами позиции QR кода или None
         """
+        own_raster = None
         try:
             self.logger.debug("🔄 Using fallback QR positioning in stamp region")
-            
-            doc = fitz.open(pdf_path)
-            if page_number >= len(doc):
-                self.logger.error("❌ Page number out of range in fallback", 
-                                page_number=page_number, total_pages=len(doc))
-                return None
-                
-            page = doc[page_number]
+
+            raster, own_raster = self._page_raster(pdf_path, page_number, raster)
+            page = raster.page
             page_rect = page.rect
             page_width = page_rect.width
             page_height = page_rect.height
-            
+
             # Размер QR кода
             qr_size_cm = 3.5
             qr_size_points = qr_size_cm * 28.35
-            
+
             # Fallback: ставим QR на 1 см от правого края и 1 см от нижнего края
-            x_position = page_width - qr_size_points - (1.0 * 28.35)  # 1 см от правого края
-            y_position = page_height - qr_size_points - (1.0 * 28.35)  # 1 см от нижнего края
-            
+            x_position = (
+                page_width - qr_size_points - (1.0 * 28.35)
+            )  # 1 см от правого края
+            y_position = (
+                page_height - qr_size_points - (1.0 * 28.35)
+            )  # 1 см от нижнего края
+
             result = {
                 "x": x_position,
                 "y": y_position,
                 "width": qr_size_points,
-                "height": qr_size_points
+                "height": qr_size_points,
             }
-            
-            self.logger.info("✅ Fallback QR position calculated in stamp region", 
-                           x=result["x"], y=result["y"],
-                           x_cm=round(result["x"] / 28.35, 2),
-                           y_cm=round(result["y"] / 28.35, 2))
-            
-            doc.close()
+
+            self.logger.info(
+                "✅ Fallback QR position calculated in stamp region",
+                x=result["x"],
+                y=result["y"],
+                x_cm=round(result["x"] / 28.35, 2),
+                y_cm=round(result["y"] / 28.35, 2),
+            )
+
             return result
-            
+
         except Exception as e:
-            self.logger.error("Error in fallback QR positioning in stamp region", error=str(e))
+            self.logger.error(
+                "Error in fallback QR positioning in stamp region", error=str(e)
+            )
             return None
+        finally:
+            if own_raster is not None:
+                own_raster.close()
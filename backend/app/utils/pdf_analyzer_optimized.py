@@ -6,12 +6,11 @@
 import structlog
 from typing import Dict, Any, Tuple, Optional, List
 from PyPDF2 import PdfReader
-from PIL import Image
-import io
 from io import BytesIO
-import fitz  # PyMuPDF
-import numpy as np
 from app.core.config import settings
+from app.utils.layout_cache import LayoutCache
+from app.utils.page_raster import render_gray
+from app.utils.upload_spool import open_pdf_document
 
 # Try to import OpenCV and scikit-image, fallback to basic functionality if not available
 try:
@@ -28,8 +27,8 @@ class OptimizedPDFAnalyzer:
     
     def __init__(self):
         self.logger = structlog.get_logger(__name__)
-        # Кэш для избежания повторных вычислений
-        self._analysis_cache = {}
+        # Кэш по содержимому страницы: одинаковые листы разных ревизий не анализируются повторно
+        self._analysis_cache = LayoutCache(namespace="optimized", redis_enabled=False)
     
     def to_pdf_point(self, x_img: float, y_img: float, page_h: float) -> Tuple[float, float]:
         """
@@ -233,16 +232,10 @@ class OptimizedPDFAnalyzer:
             Словарь с информацией о макете страницы
         """
         try:
-            # Проверяем кэш
-            cache_key = f"{hash(pdf_content)}_{page_number}"
-            if cache_key in self._analysis_cache:
-                self.logger.debug("Using cached analysis result", page_number=page_number)
-                return self._analysis_cache[cache_key]
-            
             self.logger.debug("Analyzing page layout (optimized)", page_number=page_number)
             
             # Открываем PDF с помощью PyMuPDF (fitz) для анализа изображения
-            doc = fitz.open(stream=pdf_content, filetype="pdf")
+            doc = open_pdf_document(pdf_content)
             if page_number >= len(doc):
                 self.logger.error("Page number out of range", 
                                 page_number=page_number, total_pages=len(doc))
@@ -250,6 +243,15 @@ class OptimizedPDFAnalyzer:
                 
             page = doc[page_number]
             
+            # Проверяем кэш
+            cache_key = self._analysis_cache.page_key(page)
+            cached = self._analysis_cache.get(cache_key)
+            if cached is not None:
+                self.logger.debug("Using cached analysis result", page_number=page_number)
+                doc.close()
+                cached["page_number"] = page_number
+                return cached
+            
             # Аудит координат страницы
             coordinate_info = self._audit_page_coordinates(page, page_number)
             
@@ -287,7 +289,7 @@ class OptimizedPDFAnalyzer:
                 result = self._fallback_analysis(page, page_number, coordinate_info)
             
             # Кэшируем результат
-            self._analysis_cache[cache_key] = result
+            self._analysis_cache.set(cache_key, result)
             
             self.logger.info("Page layout analysis completed (optimized)", 
                            page_number=page_number,
@@ -308,13 +310,7 @@ class OptimizedPDFAnalyzer:
         """
         try:
             # Конвертируем страницу в изображение с высоким разрешением
-            mat = fitz.Matrix(2.0, 2.0)
-            pix = page.get_pixmap(matrix=mat)
-            img_data = pix.tobytes("png")
-            
-            # Конвертируем в PIL Image
-            pil_image = Image.open(io.BytesIO(img_data))
-            img_array = np.array(pil_image.convert('L'))
+            img_array = render_gray(page, 2.0)
             
             # Получаем размеры страницы
             page_width = page.rect.width
@@ -425,13 +421,7 @@ class OptimizedPDFAnalyzer:
         """
         try:
             # Конвертируем страницу в изображение
-            mat = fitz.Matrix(2.0, 2.0)
-            pix = page.get_pixmap(matrix=mat)
-            img_data = pix.tobytes("png")
-            
-            # Конвертируем в PIL Image
-            pil_image = Image.open(io.BytesIO(img_data))
-            img_array = np.array(pil_image.convert('L'))
+            img_array = render_gray(page, 2.0)
             
             # Получаем размеры страницы
             page_width = page.rect.width
@@ -488,13 +478,7 @@ class OptimizedPDFAnalyzer:
         """
         try:
             # Конвертируем страницу в изображение
-            mat = fitz.Matrix(2.0, 2.0)
-            pix = page.get_pixmap(matrix=mat)
-            img_data = pix.tobytes("png")
-            
-            # Конвертируем в PIL Image
-            pil_image = Image.open(io.BytesIO(img_data))
-            img_array = np.array(pil_image.convert('L'))
+            img_array = render_gray(page, 2.0)
             
             # Получаем размеры страницы
             page_width = page.rect.width
@@ -551,13 +535,7 @@ class OptimizedPDFAnalyzer:
         """
         try:
             # Конвертируем страницу в изображение
-            mat = fitz.Matrix(2.0, 2.0)
-            pix = page.get_pixmap(matrix=mat)
-            img_data = pix.tobytes("png")
-            
-            # Конвертируем в PIL Image
-            pil_image = Image.open(io.BytesIO(img_data))
-            img_array = np.array(pil_image.convert('L'))
+            img_array = render_gray(page, 2.0)
             
             # Получаем размеры страницы
             page_width = page.rect.width
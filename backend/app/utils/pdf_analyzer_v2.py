@@ -5,15 +5,14 @@
 
 import structlog
 import time
-import psutil
 from typing import Dict, Any, Tuple, Optional, List, Union
 from PyPDF2 import PdfReader
-from PIL import Image
-import io
 from io import BytesIO
-import fitz  # PyMuPDF
 import numpy as np
 from app.core.config import settings
+from app.utils.page_raster import render_gray
+from app.utils.resource_monitor import estimate_raster_bytes, resource_monitor
+from app.utils.upload_spool import open_pdf_document
 from app.utils.pdf_exceptions import (
     PDFAnalysisError, PDFFileError, PDFCorruptedError, PDFPageError, 
     PDFPageOutOfRangeError, PDFPageCorruptedError, PDFImageProcessingError,
@@ -90,32 +89,30 @@ class PDFAnalyzerV2:
             "max_contour_area": 100000
         }
     
-    def _check_system_resources(self) -> None:
-        """Проверка доступности системных ресурсов"""
-        try:
-            memory = psutil.virtual_memory()
-            available_memory = memory.available
-            
-            if available_memory < self.max_memory_usage:
-                raise PDFMemoryError(
-                    f"Insufficient memory for PDF analysis. Available: {available_memory / (1024*1024):.1f}MB, Required: {self.max_memory_usage / (1024*1024):.1f}MB",
-                    required_memory=self.max_memory_usage,
-                    available_memory=available_memory
-                )
-            
-            cpu_percent = psutil.cpu_percent(interval=0.1)
-            if cpu_percent > 90:
-                import warnings
-                warnings.warn(
-                    PDFPerformanceWarning(
-                        f"High CPU usage detected: {cpu_percent:.1f}%. PDF analysis may be slow.",
-                        performance_metric="cpu_usage",
-                        metric_value=cpu_percent
-                    )
+    def _check_system_resources(self, required_memory: int, page_number: Optional[int] = None) -> None:
+        """
+        Проверка доступности системных ресурсов
+
+        Показатели берутся из последнего замера фонового монитора, без
+        блокирующих вызовов psutil. Если после выделения растра страницы
+        свободной памяти останется меньше резерва, задание ждёт освобождения
+        памяти и затем отклоняется с PDFMemoryError.
+
+        Args:
+            required_memory: Оценка пиковой памяти растра страницы в байтах
+            page_number: Номер страницы (для диагностики)
+        """
+        snapshot = resource_monitor.admit(required_memory, page_number=page_number)
+
+        if snapshot.cpu_percent > 90:
+            import warnings
+            warnings.warn(
+                PDFPerformanceWarning(
+                    f"High CPU usage detected: {snapshot.cpu_percent:.1f}%. PDF analysis may be slow.",
+                    performance_metric="cpu_usage",
+                    metric_value=snapshot.cpu_percent
                 )
-                
-        except Exception as e:
-            self.logger.warning("Failed to check system resources", error=str(e))
+            )
     
     def _validate_pdf_content(self, pdf_content: bytes) -> None:
         """Валидация содержимого PDF"""
@@ -128,7 +125,7 @@ class PDFAnalyzerV2:
                 file_size=len(pdf_content)
             )
         
-        if not pdf_content.startswith(b'%PDF'):
+        if pdf_content[:4] != b'%PDF':
             raise PDFCorruptedError(
                 "Invalid PDF file format. File does not start with PDF signature.",
                 corruption_type="invalid_signature"
@@ -174,7 +171,7 @@ class PDFAnalyzerV2:
         
         try:
             # Открываем PDF с помощью PyMuPDF
-            doc = fitz.open(stream=pdf_content, filetype="pdf")
+            doc = open_pdf_document(pdf_content)
             if page_number >= len(doc):
                 raise PDFPageOutOfRangeError(page_number, len(doc))
             
@@ -193,15 +190,15 @@ class PDFAnalyzerV2:
                 }
             }
             
-            # Конвертируем страницу в изображение
+            # Проверка системных ресурсов под растр этой страницы
             scale_factor = self.analysis_config["image_scale_factor"]
-            mat = fitz.Matrix(scale_factor, scale_factor)
-            pix = page.get_pixmap(matrix=mat)
-            img_data = pix.tobytes("png")
+            self._check_system_resources(
+                estimate_raster_bytes(page_metadata["width"], page_metadata["height"], scale_factor),
+                page_number=page_number
+            )
             
-            # Конвертируем в numpy array
-            pil_image = Image.open(io.BytesIO(img_data))
-            img_array = np.array(pil_image.convert('L'))
+            # Конвертируем страницу в изображение
+            img_array = render_gray(page, scale_factor)
             
             result = (img_array, page_metadata)
             
@@ -217,6 +214,8 @@ class PDFAnalyzerV2:
             doc.close()
             return result
             
+        except PDFMemoryError:
+            raise
         except Exception as e:
             raise PDFImageProcessingError(
                 f"Failed to get page image: {str(e)}",
@@ -604,7 +603,7 @@ class PDFAnalyzerV2:
         
         # Записываем использование памяти
         try:
-            memory_usage = psutil.Process().memory_info().rss
+            memory_usage = resource_monitor.snapshot.rss_bytes
             self.analysis_stats["memory_usage_history"].append({
                 "timestamp": time.time(),
                 "memory_mb": memory_usage / (1024 * 1024)
@@ -629,9 +628,6 @@ class PDFAnalyzerV2:
                             page_number=page_number, 
                             content_size=len(pdf_content))
             
-            # Проверка системных ресурсов
-            self._check_system_resources()
-            
             # Валидация входных данных
             self._validate_pdf_content(pdf_content)
             
@@ -47,6 +47,16 @@ class PDFCorruptedError(PDFFileError):
         self.corruption_type = corruption_type
 
 
+class PDFFileTooLargeError(PDFFileError):
+    """PDF файл превышает допустимый размер загрузки"""
+    
+    def __init__(self, file_size: int, max_size: int):
+        message = f"File too large (max {max_size // (1024 * 1024)}MB)"
+        super().__init__(message, file_size=file_size, details={"max_size": max_size})
+        self.error_code = "PDF_FILE_TOO_LARGE"
+        self.max_size = max_size
+
+
 class PDFPageError(PDFAnalysisError):
     """Ошибки связанные с конкретной страницей PDF"""
     
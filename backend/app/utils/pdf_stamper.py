@@ -3,16 +3,15 @@ PDF stamping utilities for embedding QR codes
 """
 
 import io
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 
 import structlog
-from PIL import Image
-from pypdf import PdfReader, PdfWriter
-from reportlab.lib.colors import white
-from reportlab.pdfgen import canvas
+from pypdf import PdfReader
 
 from app.core.config import settings
+from app.utils.incremental_pdf import create_output_writer
 from app.utils.qr_generator import QRCodeGenerator
+from app.utils.qr_overlay import QROverlay
 
 logger = structlog.get_logger()
 
@@ -31,6 +30,7 @@ class PDFStamper:
         pages: List[int],
         position: str = "bottom-right",
         margin_mm: int = 5,
+        render_mode: Optional[str] = None,
     ) -> bytes:
         """
         Stamp PDF with QR codes on specified pages
@@ -42,6 +42,7 @@ class PDFStamper:
             pages: List of page numbers to stamp (1-indexed)
             position: QR position (bottom-right, top-right, top-center)
             margin_mm: Margin from edge in millimeters
+            render_mode: QR rendering, image or vector (settings default if None)
 
         Returns:
             Stamped PDF as bytes
@@ -51,33 +52,38 @@ class PDFStamper:
             # Read input PDF
             with open(pdf_path, "rb") as file:
                 pdf_reader = PdfReader(file)
-                pdf_writer = PdfWriter()
+                # Открытый файл - исходные байты для инкрементального режима
+                pdf_writer = create_output_writer(pdf_reader, file)
+                overlay = QROverlay(pdf_writer)
 
                 # Process each page
                 for page_num in range(len(pdf_reader.pages)):
-                    page = pdf_reader.pages[page_num]
+                    page = pdf_writer.add_page(pdf_reader.pages[page_num])
 
                     # Check if this page needs QR stamping
                     if (page_num + 1) in pages:
-                        # Generate QR code for this page
-                        qr_image = self.qr_generator.generate_qr_for_pdf_stamp(
+                        # Draw QR code straight into the page content
+                        qr_url = self.qr_generator.hmac_signer.generate_qr_url(
                             doc_uid, revision, page_num + 1
                         )
-
-                        # Create stamp PDF
-                        stamp_pdf = self._create_qr_stamp(
-                            qr_image,
+                        x, y = self.get_stamp_positions(
+                            float(page.mediabox.width),
+                            float(page.mediabox.height),
                             position,
                             margin_mm,
-                            page.mediabox.width,
-                            page.mediabox.height,
+                        )[0]
+                        overlay.stamp(
+                            page,
+                            qr_url,
+                            x,
+                            y,
+                            self.qr_size_points,
+                            error_correction=settings.QR_CODE_ERROR_CORRECTION,
+                            border=settings.QR_CODE_BORDER,
+                            background_pad=2,
+                            mode=render_mode or settings.QR_STAMP_RENDER_MODE,
                         )
 
-                        # Merge stamp with page
-                        page.merge_page(stamp_pdf.pages[0])
-
-                    pdf_writer.add_page(page)
-
                 # Write output PDF
                 output_buffer = io.BytesIO()
                 pdf_writer.write(output_buffer)
@@ -94,79 +100,10 @@ class PDFStamper:
             )
             raise
 
-    def _create_qr_stamp(
-        self,
-        qr_image: Image.Image,
-        position: str,
-        margin_mm: int,
-        page_width: float,
-        page_height: float,
-    ) -> PdfWriter:
-        """
-        Create PDF stamp with QR code
-
-        Args:
-            qr_image: QR code PIL Image
-            position: Position on page
-            margin_mm: Margin in millimeters
-            page_width: Page width in points
-            page_height: Page height in points
-
-        Returns:
-            PDF writer with stamp
-        """
-        logger.debug("Creating QR stamp", qr_image=qr_image, position=position, margin_mm=margin_mm, page_width=page_width, page_height=page_height)
-        # Convert QR image to bytes
-        qr_buffer = io.BytesIO()
-        qr_image.save(qr_buffer, format="PNG")
-        qr_data = qr_buffer.getvalue()
-
-        # Calculate position
-        qr_size_mm = settings.QR_SIZE_MM
-        qr_size_points = qr_size_mm * 72 / 25.4  # Convert mm to points
-        margin_points = margin_mm * 72 / 25.4
-
-        if position == "bottom-right":
-            x = page_width - qr_size_points - margin_points
-            y = margin_points
-        elif position == "top-right":
-            x = page_width - qr_size_points - margin_points
-            y = page_height - qr_size_points - margin_points
-        elif position == "top-center":
-            x = (page_width - qr_size_points) / 2
-            y = page_height - qr_size_points - margin_points
-        else:
-            # Default to bottom-right
-            x = page_width - qr_size_points - margin_points
-            y = margin_points
-
-        # Create stamp PDF
-        stamp_buffer = io.BytesIO()
-        stamp_canvas = canvas.Canvas(stamp_buffer, pagesize=(page_width, page_height))
-
-        # Draw white background rectangle
-        stamp_canvas.setFillColor(white)
-        stamp_canvas.rect(x - 2, y - 2, qr_size_points + 4, qr_size_points + 4, fill=1)
-
-        # Draw QR code
-        stamp_canvas.drawImage(
-            io.BytesIO(qr_data),
-            x,
-            y,
-            width=qr_size_points,
-            height=qr_size_points,
-            mask="auto",
-        )
-
-        stamp_canvas.save()
-
-        # Create PDF writer
-        stamp_buffer.seek(0)
-        stamp_reader = PdfReader(stamp_buffer)
-        stamp_writer = PdfWriter()
-        stamp_writer.add_page(stamp_reader.pages[0])
-
-        return stamp_writer
+    @property
+    def qr_size_points(self) -> float:
+        """QR code side in points"""
+        return settings.QR_SIZE_MM * 72 / 25.4
 
     def get_stamp_positions(
         self,
@@ -188,8 +125,7 @@ class PDFStamper:
             List of (x, y) positions in points
         """
         logger.debug("Getting QR stamp positions", page_width=page_width, page_height=page_height, position=position, margin_mm=margin_mm)
-        qr_size_mm = settings.QR_SIZE_MM
-        qr_size_points = qr_size_mm * 72 / 25.4
+        qr_size_points = self.qr_size_points
         margin_points = margin_mm * 72 / 25.4
 
         if position == "bottom-right":
@@ -4,18 +4,22 @@ QR Code generation utilities
 
 import base64
 from io import BytesIO
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Sequence
 
 import qrcode
 import segno
 import structlog
 from PIL import Image, ImageDraw, ImageFont
 
-from app.models.qr_code import QRCodeStyleEnum
+from app.models.qr_code import QRCodeFormatEnum, QRCodeStyleEnum
 from app.utils.hmac_signer import HMACSigner
+from app.utils.qr_overlay import qr_vector_pdf
 
 logger = structlog.get_logger()
 
+# Formats returned by default (PDF vector output is opt-in)
+DEFAULT_FORMATS = ("png", "svg")
+
 
 class QRCodeGenerator:
     """QR Code generation with various formats and styles"""
@@ -31,6 +35,7 @@ class QRCodeGenerator:
         style: QRCodeStyleEnum = QRCodeStyleEnum.BLACK,
         dpi: int = 300,
         size_mm: int = 35,
+        formats: Sequence[str] = DEFAULT_FORMATS,
     ) -> List[Dict[str, Any]]:
         """
         Generate QR codes for multiple pages
@@ -42,6 +47,7 @@ class QRCodeGenerator:
             style: QR code style
             dpi: DPI for generation
             size_mm: Size in millimeters
+            formats: Output formats (png, svg, pdf)
 
         Returns:
             List of QR code data dictionaries
@@ -54,7 +60,7 @@ class QRCodeGenerator:
                 qr_url = self.hmac_signer.generate_qr_url(doc_uid, revision, page)
 
                 # Generate QR code image
-                qr_data = self._generate_qr_image(qr_url, style, dpi, size_mm)
+                qr_data = self._generate_qr_image(qr_url, style, dpi, size_mm, formats)
 
                 results.append({"page": page, "url": qr_url, "data": qr_data})
 
@@ -80,7 +86,12 @@ class QRCodeGenerator:
         return results
 
     def _generate_qr_image(
-        self, url: str, style: QRCodeStyleEnum, dpi: int, size_mm: int
+        self,
+        url: str,
+        style: QRCodeStyleEnum,
+        dpi: int,
+        size_mm: int,
+        formats: Sequence[str] = DEFAULT_FORMATS,
     ) -> Dict[str, str]:
         """
         Generate QR code image in multiple formats
@@ -90,50 +101,64 @@ class QRCodeGenerator:
             style: QR code style
             dpi: DPI for generation
             size_mm: Size in millimeters
+            formats: Output formats: png (raster at dpi), svg, pdf (vector
+                module runs, crisp at any print scale, no raster round trip)
 
         Returns:
             Dictionary with base64 encoded images
         """
-        # Calculate size in pixels
-        size_px = int(size_mm * dpi / 25.4)  # Convert mm to pixels
-
-        # Generate QR code
-        qr = qrcode.QRCode(
-            version=1,
-            error_correction=qrcode.constants.ERROR_CORRECT_M,
-            box_size=10,
-            border=4,
-        )
-        qr.add_data(url)
-        qr.make(fit=True)
-
-        # Create QR code image in RGB mode
-        qr_image = qr.make_image(fill_color="black", back_color="white")
-        # Convert to RGB to ensure compatibility
-        if qr_image.mode != "RGB":
-            qr_image = qr_image.convert("RGB")
-
-        # Resize to target size
-        qr_image = qr_image.resize((size_px, size_px), Image.Resampling.LANCZOS)
-
-        # Apply style
-        styled_image = self._apply_style(qr_image, style, size_px)
-
-        # Convert to different formats
+        unsupported = set(formats) - {f.value for f in QRCodeFormatEnum}
+        if unsupported:
+            raise ValueError(f"Unsupported QR code formats: {sorted(unsupported)}")
+
         result = {}
 
-        # PNG format - ensure RGB mode
-        png_buffer = BytesIO()
-        if styled_image.mode != "RGB":
-            styled_image = styled_image.convert("RGB")
-        styled_image.save(png_buffer, format="PNG", dpi=(dpi, dpi))
-        result["png"] = base64.b64encode(png_buffer.getvalue()).decode("utf-8")
-
-        # SVG format (using segno for better SVG support)
-        svg_buffer = BytesIO()
-        segno_qr = segno.make(url, error="M")
-        segno_qr.save(svg_buffer, kind="svg", scale=10)
-        result["svg"] = base64.b64encode(svg_buffer.getvalue()).decode("utf-8")
+        if QRCodeFormatEnum.PNG in formats:
+            # Calculate size in pixels
+            size_px = int(size_mm * dpi / 25.4)  # Convert mm to pixels
+
+            # Generate QR code
+            qr = qrcode.QRCode(
+                version=1,
+                error_correction=qrcode.constants.ERROR_CORRECT_M,
+                box_size=10,
+                border=4,
+            )
+            qr.add_data(url)
+            qr.make(fit=True)
+
+            # Create QR code image in RGB mode
+            qr_image = qr.make_image(fill_color="black", back_color="white")
+            # Convert to RGB to ensure compatibility
+            if qr_image.mode != "RGB":
+                qr_image = qr_image.convert("RGB")
+
+            # Resize to target size
+            qr_image = qr_image.resize((size_px, size_px), Image.Resampling.LANCZOS)
+
+            # Apply style
+            styled_image = self._apply_style(qr_image, style, size_px)
+
+            # PNG format - ensure RGB mode
+            png_buffer = BytesIO()
+            if styled_image.mode != "RGB":
+                styled_image = styled_image.convert("RGB")
+            styled_image.save(png_buffer, format="PNG", dpi=(dpi, dpi))
+            result["png"] = base64.b64encode(png_buffer.getvalue()).decode("utf-8")
+
+        if QRCodeFormatEnum.SVG in formats:
+            # SVG format (using segno for better SVG support)
+            svg_buffer = BytesIO()
+            segno_qr = segno.make(url, error="M")
+            segno_qr.save(svg_buffer, kind="svg", scale=10)
+            result["svg"] = base64.b64encode(svg_buffer.getvalue()).decode("utf-8")
+
+        if QRCodeFormatEnum.PDF in formats:
+            # Vector PDF, size_mm x size_mm page
+            pdf_data = qr_vector_pdf(
+                url, size_mm * 72 / 25.4, error_correction="M", border=4
+            )
+            result["pdf"] = base64.b64encode(pdf_data).decode("utf-8")
 
         return result
 
@@ -0,0 +1,342 @@
+"""
+Вставка QR кода прямо в поток содержимого страницы PDF
+
+Вместо промежуточного PDF (ReportLab canvas -> PNG -> PdfReader -> merge_page)
+матрица модулей QR кода записывается как 1-битное изображение (XObject, один
+пиксель на модуль, без интерполяции), а на страницу добавляется поток из
+нескольких операторов, который рисует его в заданном прямоугольнике.
+
+В режиме ``vector`` изображение не создаётся: модули рисуются залитыми
+прямоугольниками, соседние модули объединяются в полосы (по строке, затем
+одинаковые полосы соседних строк - в прямоугольники). Код остаётся чётким
+при любом масштабе печати, сжатие изображения из горячего пути уходит.
+
+Исходное содержимое страницы оборачивается в ``q ... Q``: вставка не зависит
+от графического состояния, оставленного потоком страницы. Поток ``q`` общий
+для всех страниц документа.
+
+Работает с ``PdfWriter`` как PyPDF2, так и pypdf (используются generic-объекты
+той библиотеки, которой создан writer), и с ``IncrementalWriter``.
+"""
+
+import importlib
+import zlib
+from io import BytesIO
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import qrcode
+
+QR_ERROR_CORRECTION = {
+    "L": qrcode.constants.ERROR_CORRECT_L,
+    "M": qrcode.constants.ERROR_CORRECT_M,
+    "Q": qrcode.constants.ERROR_CORRECT_Q,
+    "H": qrcode.constants.ERROR_CORRECT_H,
+}
+
+# Префиксы имён ресурсов, добавляемых на страницу
+XOBJECT_PREFIX = "PteQr"
+FONT_PREFIX = "PteQrF"
+
+LABEL_FONT_SIZE = 8
+
+# Способы отрисовки QR кода на странице
+RENDER_MODE_IMAGE = "image"
+RENDER_MODE_VECTOR = "vector"
+RENDER_MODES = (RENDER_MODE_IMAGE, RENDER_MODE_VECTOR)
+
+
+def qr_matrix(
+    data: str, error_correction: str = "M", border: int = 4
+) -> List[List[bool]]:
+    """
+    Матрица модулей QR кода (True - тёмный модуль), включая свободную зону
+
+    Args:
+        data: Кодируемые данные
+        error_correction: Уровень коррекции ошибок (L, M, Q, H)
+        border: Ширина свободной зоны в модулях
+    """
+    qr = qrcode.QRCode(
+        version=None,
+        error_correction=QR_ERROR_CORRECTION.get(
+            error_correction, qrcode.constants.ERROR_CORRECT_M
+        ),
+        border=border,
+    )
+    qr.add_data(data)
+    qr.make(fit=True)
+    return qr.get_matrix()
+
+
+def qr_rectangles(matrix: Sequence[Sequence[bool]]) -> List[Tuple[int, int, int, int]]:
+    """
+    Тёмные модули, объединённые в прямоугольники
+
+    Сначала модули строки объединяются в горизонтальные полосы, затем
+    полосы с одинаковыми границами в соседних строках - в один прямоугольник.
+
+    Returns:
+        Список (столбец, строка, ширина, высота) в модулях, строка 0 - верхняя
+    """
+    rectangles = []
+    # (начало, длина) -> (верхняя строка, высота) для незакрытых прямоугольников
+    open_runs: Dict[Tuple[int, int], Tuple[int, int]] = {}
+    for row_index, row in enumerate(matrix):
+        runs = set()
+        start = None
+        for column, dark in enumerate(list(row) + [False]):
+            if dark and start is None:
+                start = column
+            elif not dark and start is not None:
+                runs.add((start, column - start))
+                start = None
+        for run in list(open_runs):
+            if run not in runs:
+                top, height = open_runs.pop(run)
+                rectangles.append((run[0], top, run[1], height))
+        for run in runs:
+            top, height = open_runs.get(run, (row_index, 0))
+            open_runs[run] = (top, height + 1)
+    for run, (top, height) in open_runs.items():
+        rectangles.append((run[0], top, run[1], height))
+    return sorted(rectangles, key=lambda rect: (rect[1], rect[0]))
+
+
+def qr_vector_operators(matrix: Sequence[Sequence[bool]]) -> str:
+    """
+    Операторы PDF, рисующие QR код в квадрате 0..n модулей (n - сторона матрицы)
+
+    Свободная зона заливается белым, как у изображения; масштаб и положение
+    задаются матрицей ``cm`` вызывающей стороны.
+    """
+    size = len(matrix)
+    operators = [f"1 g 0 0 {size} {size} re f 0 g"]
+    for column, row, width, height in qr_rectangles(matrix):
+        operators.append(f"{column} {size - row - height} {width} {height} re")
+    operators.append("f")
+    return "\n".join(operators)
+
+
+def qr_vector_pdf(
+    data: str, size: float, error_correction: str = "M", border: int = 4
+) -> bytes:
+    """
+    Одностраничный PDF с векторным QR кодом
+
+    Args:
+        data: Кодируемые данные
+        size: Сторона страницы (и QR кода) в точках
+        error_correction: Уровень коррекции ошибок (L, M, Q, H)
+        border: Ширина свободной зоны в модулях
+    """
+    from pypdf import PdfWriter
+
+    writer = PdfWriter()
+    page = writer.add_blank_page(width=size, height=size)
+    QROverlay(writer).stamp(
+        page,
+        data,
+        0,
+        0,
+        size,
+        error_correction=error_correction,
+        border=border,
+        mode=RENDER_MODE_VECTOR,
+    )
+    buffer = BytesIO()
+    writer.write(buffer)
+    return buffer.getvalue()
+
+
+def _pdf_string(text: str) -> str:
+    """Строковый литерал PDF с экранированием"""
+    escaped = text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+    return f"({escaped})"
+
+
+class QROverlay:
+    """Вставка QR кодов в страницы одного PdfWriter"""
+
+    def __init__(self, writer: Any):
+        self.writer = writer
+        # IncrementalWriter сообщает библиотеку своего reader
+        library = (
+            getattr(writer, "pdf_library", None)
+            or type(writer).__module__.split(".")[0]
+        )
+        self._generic = importlib.import_module(f"{library}.generic")
+        self._save_state_ref = None
+        self._font_ref = None
+        self.stamped_pages = 0
+
+    # ------------------------------------------------------------------
+    # Объекты PDF
+    # ------------------------------------------------------------------
+
+    def _name(self, value: str):
+        return self._generic.NameObject(value)
+
+    def _stream(self, data: bytes, **entries: Any):
+        """Добавляет в writer поток со сжатием Flate и возвращает ссылку"""
+        g = self._generic
+        stream = g.StreamObject()
+        stream._data = zlib.compress(data)
+        stream[self._name("/Filter")] = self._name("/FlateDecode")
+        for key, value in entries.items():
+            stream[self._name(f"/{key}")] = value
+        return self.writer._add_object(stream)
+
+    def _image(self, matrix: Sequence[Sequence[bool]]):
+        """1-битное изображение DeviceGray: 0 - чёрный модуль, 1 - белый"""
+        g = self._generic
+        modules = np.asarray(matrix, dtype=bool)
+        height, width = modules.shape
+        data = np.packbits(~modules, axis=1).tobytes()
+        return self._stream(
+            data,
+            Type=self._name("/XObject"),
+            Subtype=self._name("/Image"),
+            Width=g.NumberObject(width),
+            Height=g.NumberObject(height),
+            ColorSpace=self._name("/DeviceGray"),
+            BitsPerComponent=g.NumberObject(1),
+            Interpolate=g.BooleanObject(False),
+        )
+
+    @property
+    def save_state_ref(self):
+        """Общий для всех страниц поток ``q``"""
+        if self._save_state_ref is None:
+            self._save_state_ref = self._stream(b"q\n")
+        return self._save_state_ref
+
+    @property
+    def font_ref(self):
+        """Общий шрифт Helvetica для подписи под QR кодом"""
+        if self._font_ref is None:
+            g = self._generic
+            font = g.DictionaryObject()
+            font[self._name("/Type")] = self._name("/Font")
+            font[self._name("/Subtype")] = self._name("/Type1")
+            font[self._name("/BaseFont")] = self._name("/Helvetica")
+            font[self._name("/Encoding")] = self._name("/WinAnsiEncoding")
+            self._font_ref = self.writer._add_object(font)
+        return self._font_ref
+
+    def _own_resources(self, page: Any, category: str):
+        """
+        Собственные (не разделяемые с другими страницами) словари ресурсов
+
+        /Resources часто общий для многих страниц, поэтому он и его подсловарь
+        копируются поверхностно: добавленные имена не попадают на другие листы.
+        """
+        g = self._generic
+        resources = page.get("/Resources")
+        resources = (
+            g.DictionaryObject(resources.get_object())
+            if resources is not None
+            else g.DictionaryObject()
+        )
+        entries = resources.get(category)
+        entries = (
+            g.DictionaryObject(entries.get_object())
+            if entries is not None
+            else g.DictionaryObject()
+        )
+        resources[self._name(category)] = entries
+        page[self._name("/Resources")] = resources
+        return entries
+
+    @staticmethod
+    def _unique_name(entries: Any, prefix: str) -> str:
+        index = 1
+        while f"/{prefix}{index}" in entries:
+            index += 1
+        return f"/{prefix}{index}"
+
+    def _append_content(self, page: Any, operators: str) -> None:
+        """Оборачивает содержимое страницы в q ... Q и дописывает операторы"""
+        g = self._generic
+        contents = g.ArrayObject([self.save_state_ref])
+        existing = page.get("/Contents")
+        if existing is not None:
+            existing_object = existing.get_object()
+            if isinstance(existing_object, g.ArrayObject):
+                contents.extend(existing_object)
+            elif isinstance(existing, g.IndirectObject):
+                contents.append(existing)
+            else:
+                contents.append(self.writer._add_object(existing_object))
+        contents.append(self._stream(f"Q\n{operators}".encode("latin-1")))
+        page[self._name("/Contents")] = contents
+
+    # ------------------------------------------------------------------
+    # Вставка
+    # ------------------------------------------------------------------
+
+    def stamp(
+        self,
+        page: Any,
+        data: Optional[str],
+        x: float,
+        y: float,
+        size: float,
+        matrix: Optional[Sequence[Sequence[bool]]] = None,
+        error_correction: str = "M",
+        border: int = 4,
+        background_pad: Optional[float] = None,
+        label: Optional[str] = None,
+        mode: str = RENDER_MODE_IMAGE,
+    ) -> None:
+        """
+        Рисует QR код на странице, принадлежащей writer
+
+        Args:
+            page: Страница writer (результат ``writer.add_page``)
+            data: Кодируемые данные (не нужны, если передана matrix)
+            x, y: Левый нижний угол QR кода в PDF-СК страницы
+            size: Сторона QR кода в точках (включая свободную зону)
+            matrix: Готовая матрица модулей
+            error_correction: Уровень коррекции ошибок (L, M, Q, H)
+            border: Свободная зона в модулях
+            background_pad: Белая подложка с указанным отступом вокруг QR кода
+            label: Подпись под QR кодом
+            mode: ``image`` - 1-битное изображение, ``vector`` - прямоугольники
+        """
+        if mode not in RENDER_MODES:
+            raise ValueError(f"Unknown QR render mode: {mode}")
+        if matrix is None:
+            matrix = qr_matrix(data, error_correction, border)
+
+        operators = []
+        if background_pad is not None:
+            side = size + 2 * background_pad
+            operators.append(
+                f"q 1 g {x - background_pad:.3f} {y - background_pad:.3f} "
+                f"{side:.3f} {side:.3f} re f Q"
+            )
+        if mode == RENDER_MODE_VECTOR:
+            scale = size / len(matrix)
+            operators.append(
+                f"q {scale:.5f} 0 0 {scale:.5f} {x:.3f} {y:.3f} cm\n"
+                f"{qr_vector_operators(matrix)}\nQ"
+            )
+        else:
+            xobjects = self._own_resources(page, "/XObject")
+            image_name = self._unique_name(xobjects, XOBJECT_PREFIX)
+            xobjects[self._name(image_name)] = self._image(matrix)
+            operators.append(
+                f"q {size:.3f} 0 0 {size:.3f} {x:.3f} {y:.3f} cm {image_name} Do Q"
+            )
+        if label:
+            fonts = self._own_resources(page, "/Font")
+            font_name = self._unique_name(fonts, FONT_PREFIX)
+            fonts[self._name(font_name)] = self.font_ref
+            operators.append(
+                f"BT 0 g {font_name} {LABEL_FONT_SIZE} Tf {x:.3f} {y - 15:.3f} Td "
+                f"{_pdf_string(label)} Tj ET"
+            )
+
+        self._append_content(page, "\n".join(operators) + "\n")
+        self.stamped_pages += 1
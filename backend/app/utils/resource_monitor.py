@@ -0,0 +1,195 @@
+"""
+Фоновый мониторинг ресурсов процесса и допуск заданий анализа по памяти
+"""
+
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+import psutil
+import structlog
+
+from app.core.config import settings
+from app.utils.pdf_exceptions import PDFMemoryError
+
+logger = structlog.get_logger(__name__)
+
+# Число одновременно живущих байтовых копий растра страницы у детекторов
+# (grayscale, размытие, границы Canny, бинаризация)
+RASTER_WORKING_COPIES = 4
+
+
+@dataclass(frozen=True)
+class ResourceSnapshot:
+    """Замер ресурсов на момент времени"""
+
+    timestamp: float
+    cpu_percent: float
+    rss_bytes: int
+    available_memory: int
+    total_memory: int
+    memory_percent: float
+
+    @property
+    def age(self) -> float:
+        """Возраст замера в секундах"""
+        return time.monotonic() - self.timestamp
+
+
+def estimate_raster_bytes(
+    width_pt: float,
+    height_pt: float,
+    scale: float,
+    channels: int = 1,
+    copies: int = RASTER_WORKING_COPIES,
+) -> int:
+    """
+    Оценка пиковой памяти растра страницы
+
+    Args:
+        width_pt: Ширина страницы в точках PDF
+        height_pt: Высота страницы в точках PDF
+        scale: Масштаб рендеринга
+        channels: Число каналов растра (1 для grayscale, 3 для RGB)
+        copies: Число одновременно живущих копий растра
+
+    Returns:
+        Оценка в байтах
+    """
+    pixels = int(abs(width_pt) * scale) * int(abs(height_pt) * scale)
+    return pixels * channels * copies
+
+
+class ResourceMonitor:
+    """
+    Фоновый сборщик замеров CPU, RSS и доступной памяти
+
+    Поток-демон раз в ``interval`` секунд снимает показатели через psutil и
+    заменяет ссылку на неизменяемый ResourceSnapshot. Чтение ``snapshot`` -
+    обычное чтение атрибута без блокировок и системных вызовов, поэтому
+    анализаторы могут проверять ресурсы на каждой странице. CPU считается
+    через ``cpu_percent(interval=None)`` - загрузка между соседними замерами,
+    без сна в вызывающем потоке.
+    """
+
+    def __init__(
+        self, interval: Optional[float] = None, reserve_bytes: Optional[int] = None
+    ):
+        self.interval = interval or settings.RESOURCE_SAMPLE_INTERVAL_SECONDS
+        self.reserve_bytes = (
+            settings.ANALYSIS_MEMORY_RESERVE_MB * 1024 * 1024
+            if reserve_bytes is None
+            else reserve_bytes
+        )
+        self._process = psutil.Process()
+        self._snapshot: Optional[ResourceSnapshot] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._start_lock = threading.Lock()
+        self._sampled = threading.Condition()
+
+    @property
+    def snapshot(self) -> ResourceSnapshot:
+        """Последний замер; первый вызов запускает фоновый поток"""
+        snapshot = self._snapshot
+        if snapshot is None:
+            self.start()
+            snapshot = self._snapshot or self.sample()
+        return snapshot
+
+    def sample(self) -> ResourceSnapshot:
+        """Снимает замер и публикует его"""
+        memory = psutil.virtual_memory()
+        snapshot = ResourceSnapshot(
+            timestamp=time.monotonic(),
+            cpu_percent=psutil.cpu_percent(interval=None),
+            rss_bytes=self._process.memory_info().rss,
+            available_memory=memory.available,
+            total_memory=memory.total,
+            memory_percent=memory.percent,
+        )
+        self._snapshot = snapshot
+        with self._sampled:
+            self._sampled.notify_all()
+        return snapshot
+
+    def start(self) -> None:
+        """Запускает фоновый поток замеров"""
+        with self._start_lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            # Первый вызов cpu_percent(None) только задаёт точку отсчёта
+            self.sample()
+            self._thread = threading.Thread(
+                target=self._run, name="pte-qr-resource-monitor", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self) -> None:
+        """Останавливает фоновый поток замеров"""
+        self._stop.set()
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join(timeout=self.interval + 1)
+
+    def admit(
+        self,
+        required_bytes: int,
+        timeout: Optional[float] = None,
+        page_number: Optional[int] = None,
+    ) -> ResourceSnapshot:
+        """
+        Допуск задания, которому нужно ``required_bytes`` памяти
+
+        Задание допускается, если после выделения останется не меньше
+        резерва. Иначе вызывающий поток ждёт новых замеров до ``timeout``
+        секунд (память освобождают завершающиеся задания), затем задание
+        отклоняется.
+
+        Raises:
+            PDFMemoryError: Память не освободилась за время ожидания
+        """
+        timeout = (
+            settings.ANALYSIS_ADMISSION_WAIT_SECONDS if timeout is None else timeout
+        )
+        deadline = time.monotonic() + timeout
+        snapshot = self.snapshot
+        while not self._fits(snapshot, required_bytes):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                logger.warning(
+                    "Analysis job rejected by memory admission",
+                    required_mb=required_bytes / (1024 * 1024),
+                    available_mb=snapshot.available_memory / (1024 * 1024),
+                    reserve_mb=self.reserve_bytes / (1024 * 1024),
+                    page_number=page_number,
+                )
+                raise PDFMemoryError(
+                    f"Insufficient memory for PDF analysis. "
+                    f"Available: {snapshot.available_memory / (1024 * 1024):.1f}MB, "
+                    f"Required: {required_bytes / (1024 * 1024):.1f}MB "
+                    f"+ {self.reserve_bytes / (1024 * 1024):.1f}MB reserve",
+                    required_memory=required_bytes,
+                    available_memory=snapshot.available_memory,
+                    page_number=page_number,
+                )
+            with self._sampled:
+                self._sampled.wait(min(remaining, self.interval))
+            snapshot = self.snapshot
+        return snapshot
+
+    def _fits(self, snapshot: ResourceSnapshot, required_bytes: int) -> bool:
+        return snapshot.available_memory - required_bytes >= self.reserve_bytes
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.sample()
+            except Exception as e:
+                logger.warning("Failed to sample system resources", error=str(e))
+
+
+# Глобальный монитор ресурсов процесса
+resource_monitor = ResourceMonitor()
@@ -0,0 +1,233 @@
+"""
+Потоковый приём загружаемых PDF во временный файл
+
+Тело загрузки читается кусками и пишется во временный файл на диске, по
+ходу считаются SHA-256 и проверяются сигнатура ``%PDF`` и маркер ``%%EOF``
+в конце файла. Обработка получает отображение файла в память (mmap) только
+для чтения: страницы читаются из page cache по требованию, и в памяти
+процесса нет ни одной полной копии загрузки.
+"""
+
+import hashlib
+import mmap
+import os
+import tempfile
+from io import BytesIO
+from typing import BinaryIO, Optional, Union
+
+import fitz  # PyMuPDF
+import structlog
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.utils.pdf_exceptions import (
+    PDFCorruptedError,
+    PDFFileError,
+    PDFFileTooLargeError,
+)
+
+logger = structlog.get_logger(__name__)
+
+PDF_SIGNATURE = b"%PDF"
+PDF_EOF_MARKER = b"%%EOF"
+# Маркер %%EOF ищется в последних байтах файла (как в анализаторах)
+PDF_EOF_WINDOW = 1000
+# Минимальный размер PDF
+PDF_MIN_SIZE = 100
+
+
+class PDFStreamValidator:
+    """
+    Инкрементальная проверка PDF по мере поступления данных
+
+    Хранит только первые байты (сигнатура) и скользящее окно хвоста файла.
+    """
+
+    def __init__(self, max_size: Optional[int] = None):
+        self.max_size = max_size
+        self.size = 0
+        self.sha256 = hashlib.sha256()
+        self._head = b""
+        self._tail = b""
+
+    def update(self, chunk: bytes) -> None:
+        """Учитывает очередной кусок данных"""
+        self.size += len(chunk)
+        if self.max_size and self.size > self.max_size:
+            raise PDFFileTooLargeError(self.size, self.max_size)
+
+        if len(self._head) < len(PDF_SIGNATURE):
+            self._head = (self._head + chunk[: len(PDF_SIGNATURE)])[
+                : len(PDF_SIGNATURE)
+            ]
+            if not PDF_SIGNATURE.startswith(self._head):
+                raise PDFCorruptedError(
+                    "Invalid PDF file format. File does not start with PDF signature.",
+                    corruption_type="invalid_signature",
+                )
+
+        self.sha256.update(chunk)
+        self._tail = (self._tail + chunk[-PDF_EOF_WINDOW:])[-PDF_EOF_WINDOW:]
+
+    def finish(self) -> str:
+        """
+        Проверка после получения всего файла
+
+        Returns:
+            SHA-256 содержимого (hex)
+        """
+        if self.size == 0:
+            raise PDFFileError("PDF content is empty", file_size=0)
+        if self.size < PDF_MIN_SIZE:
+            raise PDFFileError(
+                f"PDF file is too small: {self.size} bytes. "
+                f"Minimum size is {PDF_MIN_SIZE} bytes.",
+                file_size=self.size,
+            )
+        if PDF_EOF_MARKER not in self._tail:
+            raise PDFCorruptedError(
+                "PDF file appears to be truncated. EOF marker not found.",
+                corruption_type="truncated_file",
+            )
+        return self.sha256.hexdigest()
+
+
+class PDFMapping(mmap.mmap):
+    """
+    Отображение PDF файла в память только для чтения
+
+    Помнит путь к файлу: PyMuPDF не открывает mmap как поток, поэтому
+    документ открывается по пути и читается из того же page cache.
+    """
+
+    path: str
+    sha256: Optional[str] = None
+
+    def __hash__(self) -> int:
+        # Как у bytes - по содержимому: анализаторы строят по hash() ключи кэша
+        if self.sha256 is None:
+            self.sha256 = hashlib.sha256(self).hexdigest()
+        return hash(self.sha256)
+
+
+def map_pdf_file(path: str) -> PDFMapping:
+    """Отображает PDF файл в память (дескриптор файла закрывается сразу)"""
+    with open(path, "rb") as f:
+        mapping = PDFMapping(f.fileno(), 0, access=mmap.ACCESS_READ)
+    mapping.path = path
+    return mapping
+
+
+def pdf_stream(pdf_content: Union[bytes, PDFMapping]) -> BinaryIO:
+    """Поток для PdfReader без копирования содержимого"""
+    if isinstance(pdf_content, PDFMapping):
+        return pdf_content
+    return BytesIO(pdf_content)
+
+
+def open_pdf_document(pdf_content: Union[bytes, PDFMapping]) -> fitz.Document:
+    """Открывает содержимое PDF в PyMuPDF (отображение - по пути к файлу)"""
+    if isinstance(pdf_content, PDFMapping):
+        return fitz.open(pdf_content.path, filetype="pdf")
+    return fitz.open(stream=pdf_content, filetype="pdf")
+
+
+class SpooledUpload:
+    """
+    Загруженный PDF во временном файле
+
+    ``view`` - отображение файла в память только для чтения; его можно
+    передавать вместо байтов PDF (``len``, срезы, чтение как из файла).
+    Файл удаляется в ``close()`` или при выходе из ``with``.
+    """
+
+    def __init__(
+        self, path: str, size: int, sha256: str, filename: Optional[str] = None
+    ):
+        self.path = path
+        self.size = size
+        self.sha256 = sha256
+        self.filename = filename
+        self._view: Optional[PDFMapping] = None
+
+    @property
+    def view(self) -> PDFMapping:
+        """Отображение содержимого в память (создаётся при первом обращении)"""
+        if self._view is None:
+            self._view = map_pdf_file(self.path)
+            self._view.sha256 = self.sha256
+        return self._view
+
+    def close(self) -> None:
+        """Освобождает отображение и удаляет временный файл"""
+        if self._view is not None:
+            self._view.close()
+            self._view = None
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __enter__(self) -> "SpooledUpload":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    async def __aenter__(self) -> "SpooledUpload":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+
+async def spool_upload(
+    upload,
+    max_size: Optional[int] = None,
+    chunk_size: Optional[int] = None,
+) -> SpooledUpload:
+    """
+    Принимает загружаемый PDF потоком во временный файл
+
+    Args:
+        upload: UploadFile FastAPI (или объект с async ``read(size)``)
+        max_size: Максимальный размер в байтах (по умолчанию UPLOAD_MAX_SIZE_MB)
+        chunk_size: Размер куска чтения (по умолчанию UPLOAD_CHUNK_SIZE)
+
+    Returns:
+        SpooledUpload; закрывать вызывающему (``async with``)
+
+    Raises:
+        PDFFileTooLargeError: Превышен максимальный размер
+        PDFFileError: Пустой или слишком маленький файл
+        PDFCorruptedError: Нет сигнатуры %PDF или маркера %%EOF
+    """
+    max_size = (
+        max_size if max_size is not None else settings.UPLOAD_MAX_SIZE_MB * 1024 * 1024
+    )
+    chunk_size = chunk_size or settings.UPLOAD_CHUNK_SIZE
+    validator = PDFStreamValidator(max_size)
+
+    fd, path = tempfile.mkstemp(suffix=".pdf", dir=settings.UPLOAD_SPOOL_DIR or None)
+    try:
+        with os.fdopen(fd, "wb") as spool:
+            while True:
+                chunk = await upload.read(chunk_size)
+                if not chunk:
+                    break
+                validator.update(chunk)
+                # Запись на диск не блокирует event loop
+                await run_in_threadpool(spool.write, chunk)
+        sha256 = validator.finish()
+    except BaseException:
+        os.unlink(path)
+        raise
+
+    filename = getattr(upload, "filename", None)
+    logger.debug(
+        "Upload spooled", filename=filename, size=validator.size, sha256=sha256
+    )
+    return SpooledUpload(path, validator.size, sha256, filename)
@@ -0,0 +1,307 @@
+"""
+Векторная детекция рамки и штампа по операторам рисования PDF
+
+Чертежи выгружаются из CAD, поэтому рамка, линии основной надписи и границы
+штампа являются настоящими векторными штрихами. Их координаты берутся прямо из
+потока содержимого страницы, без рендеринга и Canny/морфологии, поэтому
+результат не зависит от DPI растра.
+
+Все координаты внутри модуля заданы в точках PDF в image-СК страницы
+(origin верх-лево, с учётом поворота страницы, как ``page.rect``).
+"""
+
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import fitz  # PyMuPDF
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+# 1 см = 28.35 точек PDF
+POINTS_PER_CM = 28.35
+
+# Допуски (в точках PDF)
+AXIS_TOLERANCE_PT = 0.5  # отклонение от горизонтали/вертикали
+MERGE_GAP_PT = 1.0  # разрыв между соседними кусками одной линии
+PAGE_BORDER_PT = 3.0  # линии обреза листа у самого края страницы
+FRAME_JOIN_PT = 3.0  # примыкание линии штампа к рамке
+MAX_LINE_THICKNESS_PT = 25.0  # bbox штриха толще этого не считается линией
+MIN_SEGMENT_PT = 28.35  # более короткие штрихи детекторам не нужны (1 см)
+
+# Области поиска (доли страницы), совпадают с окнами растровых детекторов
+FRAME_SEARCH_FRACTION = 0.1
+TOP_SEARCH_FRACTION = 0.15
+MIN_FRAME_LINE_FRACTION = 0.3
+
+# Область поиска штампа и минимальные длины линий (см)
+STAMP_SEARCH_WIDTH_CM = 20.0
+STAMP_SEARCH_HEIGHT_CM = 10.0
+STAMP_MIN_WIDTH_CM = 17.0
+TOP_LINE_MIN_LENGTH_CM = 15.0
+
+
+@dataclass
+class Segment:
+    """Осевой отрезок: горизонтальный (pos = y) или вертикальный (pos = x)"""
+
+    start: float
+    end: float
+    pos: float
+
+    @property
+    def length(self) -> float:
+        return self.end - self.start
+
+
+class VectorLayout:
+    """
+    Горизонтальные и вертикальные отрезки страницы и детекторы поверх них
+
+    Отрезки извлекаются один раз. Сначала используется ``get_bboxlog()``:
+    CAD выгружает каждую линию отдельным путём, и тонкий вытянутый bbox
+    штриха однозначно задаёт отрезок. Если длинных линий так не нашлось
+    (например, рамка нарисована одним прямоугольником), пути раскладываются
+    на отрезки через ``get_cdrawings()``.
+    """
+
+    def __init__(self, page: fitz.Page):
+        self.page = page
+        self.page_width = float(page.rect.width)
+        self.page_height = float(page.rect.height)
+        self.source: Optional[str] = None
+        self._horizontal: Optional[List[Segment]] = None
+        self._vertical: Optional[List[Segment]] = None
+
+    # ------------------------------------------------------------------
+    # Извлечение отрезков
+    # ------------------------------------------------------------------
+
+    @property
+    def horizontal(self) -> List[Segment]:
+        """Горизонтальные отрезки страницы"""
+        self._ensure_segments()
+        return self._horizontal
+
+    @property
+    def vertical(self) -> List[Segment]:
+        """Вертикальные отрезки страницы"""
+        self._ensure_segments()
+        return self._vertical
+
+    def _ensure_segments(self) -> None:
+        if self._horizontal is not None:
+            return
+
+        horizontal, vertical = self._segments_from_bboxlog()
+        self.source = "bboxlog"
+        if not self._has_long_lines(horizontal, vertical):
+            horizontal, vertical = self._segments_from_drawings()
+            self.source = "drawings"
+
+        self._horizontal = self._merge(horizontal)
+        self._vertical = self._merge(vertical)
+
+        logger.debug(
+            "📐 Vector segments extracted",
+            source=self.source,
+            horizontal=len(self._horizontal),
+            vertical=len(self._vertical),
+        )
+
+    def _segments_from_bboxlog(self):
+        horizontal: List[Segment] = []
+        vertical: List[Segment] = []
+        rotation = self.page.rotation_matrix
+
+        for kind, (x0, y0, x1, y1) in self.page.get_bboxlog():
+            if kind != "stroke-path":
+                continue
+            # Отбор по исходному bbox: поворот страницы на 90° лишь меняет оси
+            thin, long = sorted((x1 - x0, y1 - y0))
+            if thin > MAX_LINE_THICKNESS_PT or long < max(MIN_SEGMENT_PT, 10 * thin):
+                continue
+
+            rect = fitz.Rect(x0, y0, x1, y1) * rotation
+            # bbox штриха расширен на половину толщины линии (и miter) с каждой
+            # стороны, поэтому ось линии - середина bbox, а концы - bbox минус
+            # половина его толщины
+            pad = thin / 2
+            if rect.width > rect.height:
+                horizontal.append(
+                    Segment(rect.x0 + pad, rect.x1 - pad, (rect.y0 + rect.y1) / 2)
+                )
+            else:
+                vertical.append(
+                    Segment(rect.y0 + pad, rect.y1 - pad, (rect.x0 + rect.x1) / 2)
+                )
+
+        return horizontal, vertical
+
+    def _segments_from_drawings(self):
+        horizontal: List[Segment] = []
+        vertical: List[Segment] = []
+        rotation = self.page.rotation_matrix
+
+        def add(p1: fitz.Point, p2: fitz.Point) -> None:
+            p1, p2 = fitz.Point(p1) * rotation, fitz.Point(p2) * rotation
+            if abs(p1 - p2) < MIN_SEGMENT_PT:
+                return
+            if abs(p1.y - p2.y) <= AXIS_TOLERANCE_PT:
+                x0, x1 = sorted((p1.x, p2.x))
+                horizontal.append(Segment(x0, x1, (p1.y + p2.y) / 2))
+            elif abs(p1.x - p2.x) <= AXIS_TOLERANCE_PT:
+                y0, y1 = sorted((p1.y, p2.y))
+                vertical.append(Segment(y0, y1, (p1.x + p2.x) / 2))
+
+        for path in self.page.get_cdrawings():
+            if "s" not in path.get("type", ""):
+                continue
+            for item in path["items"]:
+                for p1, p2 in self._item_edges(item):
+                    add(p1, p2)
+
+        return horizontal, vertical
+
+    @staticmethod
+    def _item_edges(item: tuple) -> List[Tuple[fitz.Point, fitz.Point]]:
+        """Отрезки элемента пути: линия, прямоугольник или четырёхугольник"""
+        if item[0] == "l":
+            return [(item[1], item[2])]
+        if item[0] == "re":
+            r = fitz.Rect(item[1])
+            return [(r.tl, r.tr), (r.bl, r.br), (r.tl, r.bl), (r.tr, r.br)]
+        if item[0] == "qu":
+            q = fitz.Quad(item[1])
+            return [(q.ul, q.ur), (q.ll, q.lr), (q.ul, q.ll), (q.ur, q.lr)]
+        return []
+
+    def _has_long_lines(
+        self, horizontal: List[Segment], vertical: List[Segment]
+    ) -> bool:
+        min_h = self.page_width * MIN_FRAME_LINE_FRACTION
+        min_v = self.page_height * MIN_FRAME_LINE_FRACTION
+        return any(s.length >= min_h for s in horizontal) and any(
+            s.length >= min_v for s in vertical
+        )
+
+    @staticmethod
+    def _merge(segments: List[Segment]) -> List[Segment]:
+        """Склеивает коллинеарные куски одной линии"""
+        merged: List[Segment] = []
+        for seg in sorted(segments, key=lambda s: (round(s.pos), s.start)):
+            last = merged[-1] if merged else None
+            if (
+                last is not None
+                and abs(last.pos - seg.pos) <= AXIS_TOLERANCE_PT
+                and seg.start <= last.end + MERGE_GAP_PT
+            ):
+                last.end = max(last.end, seg.end)
+            else:
+                merged.append(Segment(seg.start, seg.end, seg.pos))
+        return merged
+
+    def _on_page_border(self, seg: Segment, horizontal: bool) -> bool:
+        limit = self.page_height if horizontal else self.page_width
+        return seg.pos <= PAGE_BORDER_PT or seg.pos >= limit - PAGE_BORDER_PT
+
+    # ------------------------------------------------------------------
+    # Детекторы (возвращают координаты в PDF-СК, origin низ-лево)
+    # ------------------------------------------------------------------
+
+    def right_frame_x(self) -> Optional[float]:
+        """X-координата правой линии рамки"""
+        min_length = self.page_height * MIN_FRAME_LINE_FRACTION
+        min_x = self.page_width * (1 - FRAME_SEARCH_FRACTION)
+
+        candidates = [
+            s
+            for s in self.vertical
+            if s.length >= min_length
+            and s.pos >= min_x
+            and not self._on_page_border(s, horizontal=False)
+        ]
+        if not candidates:
+            return None
+        return max(s.pos for s in candidates)
+
+    def bottom_frame_y(self) -> Optional[float]:
+        """Y-координата нижней линии рамки (PDF-СК)"""
+        y_img = self._bottom_frame_y_img()
+        if y_img is None:
+            return None
+        return self.page_height - y_img
+
+    def _bottom_frame_y_img(self) -> Optional[float]:
+        min_length = self.page_width * MIN_FRAME_LINE_FRACTION
+        min_y = self.page_height * (1 - FRAME_SEARCH_FRACTION)
+
+        candidates = [
+            s
+            for s in self.horizontal
+            if s.length >= min_length
+            and s.pos >= min_y
+            and not self._on_page_border(s, horizontal=True)
+        ]
+        if not candidates:
+            return None
+        return max(s.pos for s in candidates)
+
+    def stamp_top_y(self) -> Optional[float]:
+        """
+        Y-координата верхнего края штампа основной надписи (PDF-СК)
+
+        Верхний край - самая верхняя горизонтальная линия в области поиска
+        штампа (правый нижний угол), которая примыкает к правой линии рамки и
+        не короче ширины основной надписи.
+        """
+        right_x = self.right_frame_x()
+        if right_x is None:
+            return None
+        bottom_y = self._bottom_frame_y_img()
+        if bottom_y is None:
+            bottom_y = self.page_height
+
+        min_width = STAMP_MIN_WIDTH_CM * POINTS_PER_CM
+        min_y = self.page_height - STAMP_SEARCH_HEIGHT_CM * POINTS_PER_CM
+        min_x = self.page_width - STAMP_SEARCH_WIDTH_CM * POINTS_PER_CM
+
+        candidates = [
+            s
+            for s in self.horizontal
+            if s.length >= min_width
+            and abs(s.end - right_x) <= FRAME_JOIN_PT
+            and s.start >= min_x - MERGE_GAP_PT
+            and min_y <= s.pos < bottom_y - FRAME_JOIN_PT
+        ]
+        if not candidates:
+            return None
+        return self.page_height - min(s.pos for s in candidates)
+
+    def top_horizontal_line(self) -> Optional[Dict[str, float]]:
+        """
+        Самая нижняя горизонтальная линия 15 см+ в верхней части листа
+
+        Returns:
+            {"start_x": float, "end_x": float, "y": float, "length_cm": float}
+        """
+        min_length = TOP_LINE_MIN_LENGTH_CM * POINTS_PER_CM
+        max_y = self.page_height * TOP_SEARCH_FRACTION
+
+        candidates = [
+            s
+            for s in self.horizontal
+            if s.length >= min_length
+            and s.pos <= max_y
+            and not self._on_page_border(s, horizontal=True)
+        ]
+        if not candidates:
+            return None
+
+        line = max(candidates, key=lambda s: s.pos)
+        return {
+            "start_x": line.start,
+            "end_x": line.end,
+            "y": self.page_height - line.pos,
+            "length_cm": line.length / POINTS_PER_CM,
+        }
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Benchmark of batched ENOVIA revision lookups
+
+Starts a local ENOVIA stub that answers every request after a fixed latency
+(50 ms by default) and resolves the revisions of a document package one after
+another and through ENOVIAClient.get_revisions_meta for several concurrency
+limits. The metadata cache is cleared before every run.
+
+Usage:
+    cd backend && PYTHONPATH=. python scripts/benchmark_enovia_batch.py \
+        [--documents N] [--latency-ms MS] [--concurrency 4 16 32]
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from app.services.enovia_service import ENOVIAClient
+
+
+def start_stub(latency: float) -> ThreadingHTTPServer:
+    """ENOVIA stub: token and revision endpoints with a fixed latency"""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def log_message(self, *args):
+            pass
+
+        def reply(self, body):
+            payload = json.dumps(body).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            self.reply({"access_token": "benchmark", "expires_in": 3600})
+
+        def do_GET(self):
+            time.sleep(latency)
+            parts = self.path.strip("/").split("/")
+            self.reply(
+                {"id": parts[3], "revision": parts[-1], "maturityState": "Released"}
+            )
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+async def run_sequential(client: ENOVIAClient, pairs: list) -> float:
+    client.metadata_cache.clear()
+    start = time.perf_counter()
+    for doc_uid, revision in pairs:
+        await client.get_revision_meta(doc_uid, revision)
+    return time.perf_counter() - start
+
+
+async def run_batched(client: ENOVIAClient, pairs: list, concurrency: int) -> float:
+    client.metadata_cache.clear()
+    client.resolver.concurrency = concurrency
+    client.resolver._semaphore = None
+    start = time.perf_counter()
+    results = await client.get_revisions_meta(pairs)
+    elapsed = time.perf_counter() - start
+    assert all(result is not None for result in results.values())
+    return elapsed
+
+
+async def benchmark(url: str, documents: int, concurrency_levels: list) -> None:
+    client = ENOVIAClient(base_url=url)
+    pairs = [(f"DOC-{i:05d}", "A") for i in range(documents)]
+    try:
+        await client._get_access_token()
+        baseline = await run_sequential(client, pairs)
+        print(f"{'mode':<16}{'time, s':>10}{'ms/doc':>10}{'speedup':>10}")
+        per_document = baseline / documents * 1000
+        print(f"{'sequential':<16}{baseline:>10.2f}{per_document:>10.1f}{1.0:>10.2f}")
+        for concurrency in concurrency_levels:
+            elapsed = await run_batched(client, pairs, concurrency)
+            print(
+                f"{f'batched x{concurrency}':<16}{elapsed:>10.2f}"
+                f"{elapsed / documents * 1000:>10.1f}{baseline / elapsed:>10.2f}"
+            )
+    finally:
+        await client.close()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--documents", type=int, default=300)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[4, 16])
+    args = parser.parse_args()
+
+    server = start_stub(args.latency_ms / 1000)
+    try:
+        print(f"{args.documents} documents, ENOVIA latency {args.latency_ms:.0f} ms")
+        asyncio.run(
+            benchmark(
+                f"http://127.0.0.1:{server.server_address[1]}",
+                args.documents,
+                args.concurrency,
+            )
+        )
+    finally:
+        server.shutdown()
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Benchmark of parallel page layout analysis
+
+Analyzes every sheet of a generated drawing set in-process and with
+app.utils.layout_pool for an increasing number of workers, and prints the
+speedup. The layout cache is disabled so that every page is analyzed.
+
+Usage:
+    cd backend && PYTHONPATH=. python scripts/benchmark_layout_pool.py \
+        [--pages N] [--workers 1 2 4 8]
+"""
+
+import argparse
+import asyncio
+import io
+import os
+import sys
+import time
+
+from reportlab.lib.pagesizes import A1, landscape
+from reportlab.pdfgen import canvas
+
+from app.utils.layout_cache import LayoutCache
+from app.utils.layout_pool import LayoutAnalysisPool
+from app.utils.pdf_analyzer import PDFAnalyzer
+
+
+def make_drawing_set(pages: int) -> bytes:
+    """Build a landscape A1 drawing set; every sheet has distinct content"""
+    buffer = io.BytesIO()
+    width, height = landscape(A1)
+    c = canvas.Canvas(buffer, pagesize=(width, height))
+    for page in range(pages):
+        c.setLineWidth(1.5)
+        c.rect(56.7, 14.2, width - 70.9, height - 28.4)
+        c.rect(width - 538.7, 14.2, 524.5, 155.9)
+        c.setLineWidth(0.5)
+        for i in range(100):
+            c.line(
+                100 + i * 7, 200, width - 600, 200 + (i + page) * 13 % (height - 300)
+            )
+        c.drawString(width - 500, 40, f"Sheet {page + 1}")
+        c.showPage()
+    c.save()
+    return buffer.getvalue()
+
+
+def run_in_process(pdf_content: bytes, pages: int) -> float:
+    analyzer = PDFAnalyzer(cache=LayoutCache(redis_enabled=False))
+    start = time.perf_counter()
+    for page_number in range(pages):
+        analyzer.analyze_page_layout(pdf_content, page_number)
+    return time.perf_counter() - start
+
+
+def run_pool(pdf_content: bytes, pages: int, workers: int) -> float:
+    pool = LayoutAnalysisPool(max_workers=workers, min_pages=1)
+    try:
+        # Warm up: start the worker processes outside the measurement
+        asyncio.run(pool.analyze(pdf_content, range(min(workers, pages))))
+        start = time.perf_counter()
+        asyncio.run(pool.analyze(pdf_content, range(pages)))
+        return time.perf_counter() - start
+    finally:
+        pool.shutdown()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    pdf_content = make_drawing_set(args.pages)
+    baseline = run_in_process(pdf_content, args.pages)
+
+    print(f"{args.pages} sheets, {os.cpu_count()} CPU cores")
+    print(f"{'mode':<14}{'time, s':>10}{'s/page':>10}{'speedup':>10}")
+    print(
+        f"{'in-process':<14}{baseline:>10.2f}{baseline / args.pages:>10.3f}{1.0:>10.2f}"
+    )
+    for workers in args.workers:
+        elapsed = run_pool(pdf_content, args.pages, workers)
+        print(
+            f"{f'pool x{workers}':<14}{elapsed:>10.2f}{elapsed / args.pages:>10.3f}"
+            f"{baseline / elapsed:>10.2f}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
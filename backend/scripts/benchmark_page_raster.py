@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Benchmark of page rasterization for PDF analyzer detectors
+
+Compares the legacy PNG round trip (pixmap -> PNG -> PIL -> grayscale array)
+with the zero-copy grayscale path from app.utils.page_raster on landscape
+A0/A1 sheets. Each measurement runs in a fresh process so that peak RSS is
+not polluted by previous runs.
+
+Usage:
+    cd backend && PYTHONPATH=. python scripts/benchmark_page_raster.py [--repeat N]
+"""
+
+import argparse
+import io
+import multiprocessing
+import resource
+import sys
+import time
+
+import fitz  # PyMuPDF
+import numpy as np
+from PIL import Image
+from reportlab.lib.pagesizes import A0, A1, landscape
+from reportlab.pdfgen import canvas
+
+from app.utils.page_raster import RENDER_SCALE, render_gray
+
+SHEETS = {"A0": landscape(A0), "A1": landscape(A1)}
+
+
+def make_sheet(pagesize) -> bytes:
+    """Build a drawing sheet with a frame, a title block and some geometry"""
+    buffer = io.BytesIO()
+    width, height = pagesize
+    c = canvas.Canvas(buffer, pagesize=pagesize)
+    c.setLineWidth(1.5)
+    c.rect(56.7, 14.2, width - 70.9, height - 28.4)
+    c.rect(width - 538.7, 14.2, 524.5, 155.9)
+    c.setLineWidth(0.5)
+    for i in range(200):
+        c.line(100 + i * 5, 200, width - 600, 200 + i * 10 % (height - 300))
+    c.save()
+    return buffer.getvalue()
+
+
+def render_png(page: fitz.Page) -> np.ndarray:
+    """Legacy path: PNG encode/decode round trip"""
+    pix = page.get_pixmap(matrix=fitz.Matrix(RENDER_SCALE, RENDER_SCALE))
+    pil_image = Image.open(io.BytesIO(pix.tobytes("png")))
+    return np.array(pil_image.convert("L"))
+
+
+def render_zero_copy(page: fitz.Page) -> np.ndarray:
+    """New path: grayscale pixmap wrapped without copying"""
+    return render_gray(page, RENDER_SCALE)
+
+
+MODES = {"png": render_png, "zero-copy": render_zero_copy}
+
+
+def measure(mode: str, pdf_content: bytes, repeat: int, queue) -> None:
+    """Run one mode in a child process and report time and peak RSS"""
+    doc = fitz.open(stream=pdf_content, filetype="pdf")
+    page = doc[0]
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        gray = MODES[mode](page)
+        timings.append(time.perf_counter() - start)
+        shape = gray.shape
+        del gray
+
+    rss_peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    doc.close()
+    queue.put(
+        {
+            "mean_s": sum(timings) / len(timings),
+            "min_s": min(timings),
+            "peak_rss_delta_mb": (rss_peak - rss_before) / 1024,
+            "shape": shape,
+        }
+    )
+
+
+def run(mode: str, pdf_content: bytes, repeat: int) -> dict:
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+    process = ctx.Process(target=measure, args=(mode, pdf_content, repeat, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(
+        f"{'sheet':<6}{'mode':<11}{'pixels':>14}{'mean, s':>10}{'min, s':>10}"
+        f"{'peak RSS +MB':>14}"
+    )
+    for sheet, pagesize in SHEETS.items():
+        pdf_content = make_sheet(pagesize)
+        for mode in MODES:
+            r = run(mode, pdf_content, args.repeat)
+            pixels = f"{r['shape'][1]}x{r['shape'][0]}"
+            print(
+                f"{sheet:<6}{mode:<11}{pixels:>14}{r['mean_s']:>10.3f}"
+                f"{r['min_s']:>10.3f}{r['peak_rss_delta_mb']:>14.1f}"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
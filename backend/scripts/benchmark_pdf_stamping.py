@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Benchmark of QR stamping in PDFServiceV2
+
+Compares three ways of stamping every page of 10, 100 and 500 page documents:
+
+- legacy: the whole document is parsed, copied and serialized again for each
+  QR code, each QR code is a ReportLab canvas overlay merged with merge_page
+- canvas-merge: single pass, but still one ReportLab canvas, PNG and PdfReader
+  per page merged with merge_page
+- xobject: single pass, QR codes are written straight into the page content
+  as 1-bit image XObjects (current PDFServiceV2, render_mode="image")
+- vector: single pass, QR modules drawn as filled rectangles merged into
+  runs (render_mode="vector")
+
+Layout analysis is excluded: positions are fixed.
+
+Usage:
+    cd backend && PYTHONPATH=. python scripts/benchmark_pdf_stamping.py \
+        [--pages 10 100 500] [--legacy-max 100]
+"""
+
+import argparse
+import io
+import sys
+import time
+
+from PyPDF2 import PdfReader, PdfWriter
+from reportlab.lib.pagesizes import A3, landscape
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfgen import canvas
+
+from app.services.pdf_service_v2 import PDFServiceV2
+
+QR_SIZE = 99.225  # 3.5 cm
+
+
+def make_document(pages: int) -> bytes:
+    """Build a landscape A3 drawing set"""
+    buffer = io.BytesIO()
+    width, height = landscape(A3)
+    c = canvas.Canvas(buffer, pagesize=(width, height))
+    for page in range(pages):
+        c.setLineWidth(1.5)
+        c.rect(56.7, 14.2, width - 70.9, height - 28.4)
+        c.rect(width - 538.7, 14.2, 524.5, 155.9)
+        c.drawString(width - 500, 40, f"Sheet {page + 1}")
+        c.showPage()
+    c.save()
+    return buffer.getvalue()
+
+
+def qr_positions(pages: int) -> list:
+    width, _ = landscape(A3)
+    position = {
+        "x": width - 14.2 - 12 - QR_SIZE,
+        "y": 182.0,
+        "width": QR_SIZE,
+        "height": QR_SIZE,
+    }
+    return [
+        {
+            "page_number": i,
+            "qr_data": f"https://pte-qr.example.com/r/DOC/A/{i + 1}",
+            "position": position,
+        }
+        for i in range(pages)
+    ]
+
+
+def merge_canvas_overlay(service: PDFServiceV2, page, qr_data: str, position: dict):
+    """Canvas overlay: PNG -> ReportLab PDF -> PdfReader -> merge_page"""
+    qr_png = service.qr_service.generate_qr_code_image(qr_data, size=int(3.5 * 28.35))
+    buffer = io.BytesIO()
+    c = canvas.Canvas(buffer, pagesize=landscape(A3))
+    c.drawImage(
+        ImageReader(io.BytesIO(qr_png)),
+        position["x"],
+        position["y"],
+        width=position["width"],
+        height=position["height"],
+    )
+    c.save()
+    buffer.seek(0)
+    page.merge_page(PdfReader(buffer).pages[0])
+    return page
+
+
+def stamp_legacy(service: PDFServiceV2, pdf_content: bytes, positions: list) -> bytes:
+    """Legacy path: the whole document is rebuilt for every QR code"""
+    result = pdf_content
+    for qr_info in positions:
+        doc = PdfReader(io.BytesIO(result))
+        writer = PdfWriter()
+        for i, page in enumerate(doc.pages):
+            if i == qr_info["page_number"]:
+                page = merge_canvas_overlay(
+                    service, page, qr_info["qr_data"], qr_info["position"]
+                )
+            writer.add_page(page)
+        buffer = io.BytesIO()
+        writer.write(buffer)
+        result = buffer.getvalue()
+    return result
+
+
+def stamp_canvas_merge(
+    service: PDFServiceV2, pdf_content: bytes, positions: list
+) -> bytes:
+    """Single pass with a canvas overlay merged into every page"""
+    qr_by_page = {qr_info["page_number"]: qr_info for qr_info in positions}
+    doc = PdfReader(io.BytesIO(pdf_content))
+    writer = PdfWriter()
+    for i, page in enumerate(doc.pages):
+        qr_info = qr_by_page.get(i)
+        if qr_info is not None:
+            page = merge_canvas_overlay(
+                service, page, qr_info["qr_data"], qr_info["position"]
+            )
+        writer.add_page(page)
+    buffer = io.BytesIO()
+    writer.write(buffer)
+    return buffer.getvalue()
+
+
+def stamp_xobject(service: PDFServiceV2, pdf_content: bytes, positions: list) -> bytes:
+    """Current path: QR image XObjects written straight into the pages"""
+    return service._stamp_pages(pdf_content, positions, "image")
+
+
+def stamp_vector(service: PDFServiceV2, pdf_content: bytes, positions: list) -> bytes:
+    """Current path with QR codes drawn as vector module runs"""
+    return service._stamp_pages(pdf_content, positions, "vector")
+
+
+def measure(func, service, pdf_content, positions) -> tuple:
+    start = time.perf_counter()
+    result = func(service, pdf_content, positions)
+    return time.perf_counter() - start, len(result)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pages", type=int, nargs="+", default=[10, 100, 500])
+    parser.add_argument(
+        "--legacy-max",
+        type=int,
+        default=100,
+        help="skip the quadratic legacy path for larger documents",
+    )
+    args = parser.parse_args()
+
+    service = PDFServiceV2()
+    print(f"{'pages':>6}{'mode':>14}{'time, s':>10}{'ms/page':>10}{'size, KB':>10}")
+    for pages in args.pages:
+        pdf_content = make_document(pages)
+        positions = qr_positions(pages)
+        modes = [
+            ("canvas-merge", stamp_canvas_merge),
+            ("xobject", stamp_xobject),
+            ("vector", stamp_vector),
+        ]
+        if pages <= args.legacy_max:
+            modes.insert(0, ("legacy", stamp_legacy))
+        for mode, func in modes:
+            elapsed, size = measure(func, service, pdf_content, positions)
+            print(
+                f"{pages:>6}{mode:>14}{elapsed:>10.2f}{elapsed / pages * 1000:>10.1f}"
+                f"{size / 1024:>10.0f}"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
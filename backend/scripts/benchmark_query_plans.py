@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+Plan check of the document status and QR page lookups
+
+Seeds documents with QR codes for every page (1,000,000 QR rows by default)
+into a scratch schema of the PostgreSQL database from DATABASE_URL, or into a
+temporary SQLite file when PostgreSQL is unavailable, and runs the lookups of
+app.services.document_service that serve scanned QR codes. Both must be
+answered by an index-only scan of the covering indexes declared on the models
+(PostgreSQL "Index Only Scan", SQLite "COVERING INDEX") with p99 latency under
+the threshold; the exit code is 1 otherwise.
+
+SQLite has no INCLUDE clause: the included columns of the model indexes are
+appended to the index key there.
+
+Usage:
+    cd backend && PYTHONPATH=. python scripts/benchmark_query_plans.py \
+        [--rows N] [--pages N] [--lookups N] [--p99-ms MS] [--sqlite]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from app.core.config import settings
+from app.models.document import Document
+from app.models.qr_code import QRCode
+from app.models.user import User
+from app.services.document_service import document_status_query, qr_code_page_query
+
+SCHEMA = "query_plan_benchmark"
+
+
+def enovia_id(number: int) -> str:
+    return f"DOC-{number:07d}"
+
+
+def covering_index_ddl(table) -> list:
+    """CREATE INDEX statements for SQLite with included columns appended to the key"""
+    statements = []
+    for index in table.indexes:
+        columns = [column.name for column in index.columns]
+        columns += index.dialect_options["postgresql"]["include"] or []
+        unique = (
+            "UNIQUE " if index.unique and len(columns) == len(index.columns) else ""
+        )
+        statements.append(
+            f"CREATE {unique}INDEX {index.name} ON {table.name} ({', '.join(columns)})"
+        )
+    return statements
+
+
+def seed_postgres(engine, documents: int, pages: int) -> None:
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+        conn.execute(text(f"SET search_path TO {SCHEMA}"))
+        Document.metadata.create_all(
+            conn, tables=[User.__table__, Document.__table__, QRCode.__table__]
+        )
+        conn.execute(
+            text(
+                "INSERT INTO documents (id, enovia_id, title, revision, is_actual) "
+                "SELECT gen_random_uuid(), 'DOC-' || lpad(i::text, 7, '0'), "
+                "'Sheet set ' || i, 'A', true FROM generate_series(1, :documents) AS i"
+            ),
+            {"documents": documents},
+        )
+        conn.execute(
+            text(
+                "INSERT INTO qr_codes "
+                "(id, enovia_id, document_id, revision, page_number, qr_data) "
+                "SELECT gen_random_uuid(), d.enovia_id, d.id, d.revision, p, "
+                "'https://pte-qr.example.com/r/' "
+                "|| d.enovia_id || '/' || d.revision || '/' || p "
+                "FROM documents AS d CROSS JOIN generate_series(1, :pages) AS p"
+            ),
+            {"pages": pages},
+        )
+    # Index-only scans need an up-to-date visibility map
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text(f"VACUUM ANALYZE {SCHEMA}.documents"))
+        conn.execute(text(f"VACUUM ANALYZE {SCHEMA}.qr_codes"))
+
+
+def seed_sqlite(engine, documents: int, pages: int) -> None:
+    with engine.begin() as conn:
+        conn.execute(
+            text(
+                "CREATE TABLE documents (id CHAR(32) PRIMARY KEY, "
+                "enovia_id VARCHAR(100) NOT NULL, title VARCHAR(255) NOT NULL, "
+                "revision VARCHAR(50) NOT NULL, is_actual BOOLEAN NOT NULL)"
+            )
+        )
+        conn.execute(
+            text(
+                "CREATE TABLE qr_codes (id CHAR(32) PRIMARY KEY, "
+                "enovia_id VARCHAR(100) NOT NULL, "
+                "document_id CHAR(32) NOT NULL, revision VARCHAR(50) NOT NULL, "
+                "page_number INTEGER NOT NULL, qr_data TEXT NOT NULL)"
+            )
+        )
+        for statement in covering_index_ddl(Document.__table__) + covering_index_ddl(
+            QRCode.__table__
+        ):
+            conn.execute(text(statement))
+
+        for number in range(1, documents + 1):
+            document_id = uuid.uuid4().hex
+            conn.execute(
+                text("INSERT INTO documents VALUES (:id, :enovia_id, :title, 'A', 1)"),
+                {
+                    "id": document_id,
+                    "enovia_id": enovia_id(number),
+                    "title": f"Sheet set {number}",
+                },
+            )
+            conn.execute(
+                text(
+                    "INSERT INTO qr_codes VALUES "
+                    "(:id, :enovia_id, :document_id, 'A', :page, :qr_data)"
+                ),
+                [
+                    {
+                        "id": uuid.uuid4().hex,
+                        "enovia_id": enovia_id(number),
+                        "document_id": document_id,
+                        "page": page,
+                        "qr_data": (
+                            f"https://pte-qr.example.com/r/{enovia_id(number)}/A/{page}"
+                        ),
+                    }
+                    for page in range(1, pages + 1)
+                ],
+            )
+        conn.execute(text("ANALYZE"))
+
+
+def plan_uses_index_only(conn, statement) -> tuple:
+    """(index-only, plan summary) of a lookup statement"""
+    sql = str(
+        statement.compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True})
+    )
+    if conn.dialect.name == "postgresql":
+        plan = json.loads(conn.execute(text(f"EXPLAIN (FORMAT JSON) {sql}")).scalar())
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        nodes, stack = [], [plan[0]["Plan"]]
+        while stack:
+            node = stack.pop()
+            nodes.append(f"{node['Node Type']} {node.get('Index Name', '')}".strip())
+            stack.extend(node.get("Plans", []))
+        return any(node.startswith("Index Only Scan") for node in nodes), "; ".join(
+            nodes
+        )
+    details = [row[3] for row in conn.execute(text(f"EXPLAIN QUERY PLAN {sql}"))]
+    return any("COVERING INDEX" in detail for detail in details), "; ".join(details)
+
+
+def p99_latency_ms(conn, make_statement, lookups: int) -> float:
+    timings = []
+    for _ in range(lookups):
+        statement = make_statement()
+        start = time.perf_counter()
+        conn.execute(statement).first()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return timings[min(len(timings) - 1, int(len(timings) * 0.99))]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1_000_000, help="QR code rows")
+    parser.add_argument("--pages", type=int, default=50, help="pages per document")
+    parser.add_argument("--lookups", type=int, default=5000)
+    parser.add_argument("--p99-ms", type=float, default=2.0)
+    parser.add_argument("--sqlite", action="store_true", help="skip PostgreSQL")
+    args = parser.parse_args()
+
+    documents = max(1, args.rows // args.pages)
+    database_url = os.getenv("DATABASE_URL", settings.DATABASE_URL)
+    engine = None
+    if not args.sqlite and database_url.startswith("postgresql"):
+        engine = create_engine(
+            database_url, connect_args={"options": f"-csearch_path={SCHEMA}"}
+        )
+        try:
+            seed_postgres(engine, documents, args.pages)
+        except OperationalError as e:
+            reason = str(e.orig).strip()
+            print(f"PostgreSQL unavailable ({reason}), falling back to SQLite")
+            engine.dispose()
+            engine = None
+
+    sqlite_path = None
+    if engine is None:
+        sqlite_path = tempfile.mktemp(suffix=".db")
+        engine = create_engine(f"sqlite:///{sqlite_path}")
+        seed_sqlite(engine, documents, args.pages)
+
+    lookups = {
+        "document status": lambda: document_status_query(
+            enovia_id(random.randint(1, documents))
+        ),
+        "QR page": lambda: qr_code_page_query(
+            enovia_id(random.randint(1, documents)), "A", random.randint(1, args.pages)
+        ),
+    }
+
+    failed = False
+    try:
+        with engine.connect() as conn:
+            qr_codes = documents * args.pages
+            print(f"{engine.dialect.name}: {documents} documents, {qr_codes} QR codes")
+            print(f"{'lookup':<18}{'index-only':>12}{'p99, ms':>10}  plan")
+            for name, make_statement in lookups.items():
+                index_only, plan = plan_uses_index_only(conn, make_statement())
+                p99_latency_ms(conn, make_statement, min(args.lookups, 100))  # warm up
+                p99 = p99_latency_ms(conn, make_statement, args.lookups)
+                failed |= not index_only or p99 > args.p99_ms
+                print(f"{name:<18}{str(index_only):>12}{p99:>10.3f}  {plan}")
+    finally:
+        if sqlite_path is None:
+            with engine.begin() as conn:
+                conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        engine.dispose()
+        if sqlite_path is not None and os.path.exists(sqlite_path):
+            os.unlink(sqlite_path)
+
+    if failed:
+        print(f"FAILED: every lookup must be index-only with p99 <= {args.p99_ms} ms")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
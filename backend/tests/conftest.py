@@ -6,14 +6,16 @@ from typing import Generator
 
 import pytest
 from fastapi.testclient import TestClient
+from sqlalchemy import select
 
-from app.core.database import get_db
+from app.core.database import get_async_db, get_db
 from app.core.test_cache import test_cache_service
 from app.core.test_database import (
     TestSessionLocal,
     cleanup_test_db,
     create_test_tables,
     drop_test_tables,
+    get_test_async_db,
 )
 from app.main import app as fastapi_app
 from app.models.document import Document
@@ -45,7 +47,7 @@ app.services.auth_service._auth_service_instance = test_auth_service
 async def mock_get_user_by_username(username: str, db):
     """Mock get_user_by_username to return test user"""
     if username == "testuser":
-        return db.query(User).filter(User.username == "testuser").first()
+        return await db.scalar(select(User).where(User.username == "testuser"))
     return None
 
 
@@ -89,12 +91,14 @@ def client(db_session) -> Generator:
     """Create a test client with database session override."""
     # Override database dependency
     fastapi_app.dependency_overrides[get_db] = lambda: TestSessionLocal()
+    fastapi_app.dependency_overrides[get_async_db] = get_test_async_db
 
     with TestClient(fastapi_app) as test_client:
         yield test_client
 
     # Clean up only database dependency
     fastapi_app.dependency_overrides.pop(get_db, None)
+    fastapi_app.dependency_overrides.pop(get_async_db, None)
 
 
 @pytest.fixture
@@ -112,6 +116,7 @@ def authenticated_client(db_session, test_user) -> Generator:
 
     # Override all dependencies
     fastapi_app.dependency_overrides[get_db] = lambda: TestSessionLocal()
+    fastapi_app.dependency_overrides[get_async_db] = get_test_async_db
     fastapi_app.dependency_overrides[get_current_user] = mock_get_current_user
     fastapi_app.dependency_overrides[get_current_user_optional] = (
         mock_get_current_user_optional
@@ -145,6 +150,7 @@ def unauthenticated_client(db_session) -> Generator:
 
     # Override all dependencies
     fastapi_app.dependency_overrides[get_db] = lambda: TestSessionLocal()
+    fastapi_app.dependency_overrides[get_async_db] = get_test_async_db
     fastapi_app.dependency_overrides[get_current_user] = mock_get_current_user
     fastapi_app.dependency_overrides[get_current_user_optional] = (
         mock_get_current_user_optional
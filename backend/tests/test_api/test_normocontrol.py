@@ -0,0 +1,102 @@
+"""
+Integration tests for normocontrol endpoints
+"""
+
+import json
+import os
+
+import fitz  # PyMuPDF
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.api_v1.endpoints import normocontrol
+from app.core.database import get_async_db
+from app.models.settings import SystemSettings
+from tests.test_utils.test_page_raster import make_drawing_pdf
+
+
+class FakeSettingsSession:
+    """Async session returning stored system settings"""
+
+    async def scalar(self, statement):
+        return SystemSettings(
+            settings_data=json.dumps(
+                {"urlPrefix": "https://qr.test", "documentStatusUrl": "r"}
+            )
+        )
+
+
+@pytest.fixture
+def normocontrol_client():
+    """Client for the normocontrol router with a stub settings session."""
+    app = FastAPI()
+    app.include_router(normocontrol.router, prefix="/api/v1/normocontrol")
+
+    async def get_settings_session():
+        yield FakeSettingsSession()
+
+    app.dependency_overrides[get_async_db] = get_settings_session
+    with TestClient(app) as client:
+        yield client
+
+
+class TestNormocontrolEndpoints:
+    """Test PDF upload through the normocontrol routes"""
+
+    def test_upload_stamps_pdf(self, normocontrol_client: TestClient):
+        """Uploaded PDF is stamped and saved for the control result."""
+        response = normocontrol_client.post(
+            "/api/v1/normocontrol/upload",
+            files={"file": ("drawing.pdf", make_drawing_pdf(), "application/pdf")},
+            data={"enovia_id": "NC-DOC-1", "revision": "B"},
+        )
+
+        assert response.status_code == 200
+        body = response.json()
+        assert body["success"], body.get("error")
+        assert body["result"]["document_id"] == "NC-DOC-1"
+        assert body["result"]["qr_codes_added"] == 1
+
+        saved = [
+            name
+            for name in os.listdir("/tmp/processed_pdfs")
+            if name.startswith("normocontrol_NC-DOC-1_B_")
+        ]
+        assert saved
+        doc = fitz.open(os.path.join("/tmp/processed_pdfs", saved[-1]))
+        assert len(doc[0].get_images()) == 1
+        doc.close()
+
+    def test_upload_rejects_non_pdf(self, normocontrol_client: TestClient):
+        """Files without a PDF signature are reported as failed control."""
+        response = normocontrol_client.post(
+            "/api/v1/normocontrol/upload",
+            files={"file": ("drawing.pdf", b"GIF89a" + b"\0" * 200, "application/pdf")},
+            data={"enovia_id": "NC-DOC-2"},
+        )
+
+        assert response.status_code == 200
+        assert not response.json()["success"]
+
+    def test_validate_accepts_pdf(self, normocontrol_client: TestClient):
+        """Structure validation receives the upload through the spool."""
+        response = normocontrol_client.post(
+            "/api/v1/normocontrol/validate",
+            files={"file": ("drawing.pdf", make_drawing_pdf(), "application/pdf")},
+        )
+
+        assert response.status_code == 200
+        assert response.json()["valid"]
+
+    def test_validate_rejects_truncated_pdf(self, normocontrol_client: TestClient):
+        """Truncated uploads are rejected with 400."""
+        content = make_drawing_pdf()
+        response = normocontrol_client.post(
+            "/api/v1/normocontrol/validate",
+            files={
+                "file": ("drawing.pdf", content[: len(content) // 2], "application/pdf")
+            },
+        )
+
+        assert response.status_code == 400
@@ -0,0 +1,166 @@
+"""
+Unit tests for SCAN-based and tag-based cache invalidation
+"""
+
+import asyncio
+import fnmatch
+
+from redis.exceptions import ResponseError
+
+from app.core.cache import CacheManager, invalidate_tag, tag_key
+from app.services.cache_service import CacheService, document_cache_tag
+
+
+class FakeRedis:
+    """In-memory stand-in for the redis.asyncio commands used by invalidation"""
+
+    def __init__(self):
+        self.data = {}
+        self.ttls = {}
+        self.scan_counts = []
+        self.unlink_calls = []
+
+    async def keys(self, pattern):
+        raise AssertionError("KEYS blocks Redis and must not be used")
+
+    async def scan_iter(self, match=None, count=None):
+        self.scan_counts.append(count)
+        for key in list(self.data):
+            if match is None or fnmatch.fnmatchcase(key, match):
+                yield key
+
+    async def sscan_iter(self, name, count=None):
+        for member in list(self.data.get(name, set())):
+            yield member
+
+    async def unlink(self, *keys):
+        self.unlink_calls.append(keys)
+        return sum(self.data.pop(key, None) is not None for key in keys)
+
+    async def rename(self, src, dst):
+        if src not in self.data:
+            raise ResponseError("no such key")
+        self.data[dst] = self.data.pop(src)
+
+    async def setex(self, key, ttl, value):
+        self.data[key] = value
+        self.ttls[key] = ttl
+
+    def sadd(self, key, member):
+        self.data.setdefault(key, set()).add(member)
+
+    def expire(self, key, ttl):
+        self.ttls[key] = ttl
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, client):
+        self.client = client
+        self.commands = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def setex(self, key, ttl, value):
+        self.commands.append(lambda: self.client.data.__setitem__(key, value))
+        self.commands.append(lambda: self.client.ttls.__setitem__(key, ttl))
+
+    def sadd(self, key, member):
+        self.commands.append(lambda: self.client.sadd(key, member))
+
+    def expire(self, key, ttl):
+        self.commands.append(lambda: self.client.expire(key, ttl))
+
+    async def execute(self):
+        for command in self.commands:
+            command()
+
+
+class TestPatternInvalidation:
+    """Test SCAN + UNLINK pattern deletion"""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.redis = FakeRedis()
+        for i in range(1200):
+            self.redis.data[f"status:DOC-{i}:A:1:noauth"] = "{}"
+        self.redis.data["layout:abc"] = "{}"
+
+        self.manager = CacheManager()
+        self.manager.redis_client = self.redis
+        self.service = CacheService()
+        self.service._redis = self.redis
+
+    def test_delete_pattern_unlinks_in_batches(self, monkeypatch):
+        """Matching keys are deleted with bounded UNLINK batches."""
+        monkeypatch.setattr("app.core.cache.settings.CACHE_SCAN_BATCH_SIZE", 500)
+
+        deleted = asyncio.run(self.manager.delete_pattern("status:*"))
+
+        assert deleted == 1200
+        assert [len(batch) for batch in self.redis.unlink_calls] == [500, 500, 200]
+        assert self.redis.scan_counts == [500]
+        assert list(self.redis.data) == ["layout:abc"]
+
+    def test_get_keys_uses_scan(self):
+        keys = asyncio.run(self.manager.get_keys("layout:*"))
+        assert keys == ["layout:abc"]
+
+    def test_clear_pattern_uses_scan(self):
+        """Admin cache clearing no longer issues KEYS."""
+        assert asyncio.run(self.service.clear_pattern("*")) == 1201
+        assert self.redis.data == {}
+
+
+class TestTagInvalidation:
+    """Test per-document tag sets"""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.redis = FakeRedis()
+        self.service = CacheService()
+        self.service._redis = self.redis
+
+    def cache_status(self, doc_uid: str, page: int):
+        return asyncio.run(
+            self.service.set(
+                f"status:{doc_uid}:A:{page}:noauth",
+                {"is_actual": True},
+                ttl=900,
+                tags=[document_cache_tag(doc_uid)],
+            )
+        )
+
+    def test_invalidate_document_removes_only_its_keys(self):
+        """A new revision drops exactly the entries of its own document."""
+        for page in range(1, 4):
+            self.cache_status("DOC-1", page)
+        self.cache_status("DOC-2", 1)
+
+        deleted = asyncio.run(
+            self.service.invalidate_tags([document_cache_tag("DOC-1")])
+        )
+
+        assert deleted == 3
+        assert sorted(self.redis.data) == [
+            "status:DOC-2:A:1:noauth",
+            tag_key(document_cache_tag("DOC-2")),
+        ]
+
+    def test_tag_set_outlives_tagged_entries(self, monkeypatch):
+        """Entry TTLs are clamped to the tag set TTL."""
+        monkeypatch.setattr("app.core.cache.settings.CACHE_TAG_TTL_SECONDS", 600)
+
+        self.cache_status("DOC-1", 1)
+
+        assert self.redis.ttls["status:DOC-1:A:1:noauth"] == 600
+        assert self.redis.ttls[tag_key(document_cache_tag("DOC-1"))] == 600
+
+    def test_invalidate_unknown_tag(self):
+        assert asyncio.run(invalidate_tag(self.redis, "document:missing")) == 0
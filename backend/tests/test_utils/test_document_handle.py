@@ -0,0 +1,182 @@
+"""
+Unit tests for the per-job document handle
+"""
+
+import asyncio
+import os
+import sys
+from contextlib import contextmanager
+from io import BytesIO
+
+import fitz  # PyMuPDF
+import pytest
+from reportlab.lib.pagesizes import A3, landscape
+from reportlab.pdfgen import canvas
+
+from app.core.config import settings
+from app.services.metrics_service import metrics_service
+from app.services.pdf_service import PDFService
+from app.utils.document_handle import PARSER_PYMUPDF, PARSER_PYPDF2, DocumentHandle
+from app.utils.pdf_analyzer import PDFAnalyzer
+
+PAGES = 5
+
+WRITE_FLAGS = os.O_WRONLY | os.O_RDWR | os.O_CREAT | os.O_TRUNC | os.O_APPEND
+
+# Paths opened for writing while recording (None - not recording)
+_file_writes = None
+
+
+def _audit_file_writes(event, args):
+    if event == "open" and _file_writes is not None and (args[2] or 0) & WRITE_FLAGS:
+        _file_writes.append(args[0])
+
+
+sys.addaudithook(_audit_file_writes)
+
+
+@contextmanager
+def recorded_file_writes():
+    """Collect files opened for writing (open, os.open, tempfile) in the block."""
+    global _file_writes
+    _file_writes = writes = []
+    try:
+        yield writes
+    finally:
+        _file_writes = None
+
+
+def make_drawing_pdf(pages: int = PAGES) -> bytes:
+    """Build a set of landscape A3 sheets with a frame and a title block."""
+    buffer = BytesIO()
+    width, height = landscape(A3)
+    c = canvas.Canvas(buffer, pagesize=(width, height))
+    for page in range(pages):
+        c.setLineWidth(1.5)
+        c.rect(56.7, 14.2, width - 56.7 - 14.2, height - 14.2 - 14.2)
+        c.rect(width - 14.2 - 524.5, 14.2, 524.5, 155.9 + page * 10)
+        c.showPage()
+    c.save()
+    return buffer.getvalue()
+
+
+def observed_parses(parser: str) -> tuple:
+    """(number of jobs, total parses) recorded for a parser."""
+    samples = {
+        sample.name: sample.value
+        for metric in metrics_service.pdf_document_parses.collect()
+        for sample in metric.samples
+        if sample.labels.get("parser") == parser
+    }
+    return (
+        samples.get("pte_qr_pdf_document_parses_count", 0.0),
+        samples.get("pte_qr_pdf_document_parses_sum", 0.0),
+    )
+
+
+class TestDocumentHandle:
+    """Test document handle"""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.pdf_content = make_drawing_pdf(2)
+
+    def test_parses_lazily_once(self):
+        """Each parser opens the document at most once, on first use."""
+        with DocumentHandle(self.pdf_content) as document:
+            assert document.parse_counts == {PARSER_PYPDF2: 0, PARSER_PYMUPDF: 0}
+
+            assert document.reader is document.reader
+            assert document.doc is document.doc
+            with document.page_raster(1) as raster:
+                assert raster.page_number == 1
+            assert document.page_count == 2
+
+            assert document.parse_counts == {PARSER_PYPDF2: 1, PARSER_PYMUPDF: 1}
+            # The page raster does not close the shared document
+            assert not document.doc.is_closed
+
+    def test_close_releases_document_and_records_metric(self):
+        """Closing is idempotent, closes PyMuPDF and records parse counts."""
+        jobs_before, parses_before = observed_parses(PARSER_PYMUPDF)
+
+        document = DocumentHandle(self.pdf_content)
+        doc = document.doc
+        document.close()
+        document.close()
+
+        assert doc.is_closed
+        assert observed_parses(PARSER_PYMUPDF) == (jobs_before + 1, parses_before + 1)
+        with pytest.raises(ValueError):
+            document.reader
+
+    def test_heuristics_delta_without_document_creates_no_files(self, monkeypatch):
+        """A standalone heuristics call analyzes the PDF bytes in memory."""
+        monkeypatch.setattr(settings, "QR_VECTOR_DETECTION", False)
+        analyzer = PDFAnalyzer()
+        analyzer.compute_heuristics_delta(self.pdf_content, 1)
+
+        with recorded_file_writes() as writes:
+            dx, dy = analyzer.compute_heuristics_delta(self.pdf_content, 1)
+
+        assert writes == []
+        assert abs(dx) <= 50 and abs(dy) <= 50
+
+
+class TestStampingJobParses:
+    """Test the source PDF is parsed once per stamping job"""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.pdf_content = make_drawing_pdf()
+        self.service = PDFService()
+
+    def test_add_qr_codes_parses_source_once(self, monkeypatch):
+        """Positioning and analysis of every page share one parse per parser."""
+        monkeypatch.setattr(settings, "LAYOUT_POOL_ENABLED", False)
+        opened = []
+        original_open = fitz.open
+
+        def counting_open(*args, **kwargs):
+            if kwargs.get("stream") == self.pdf_content:
+                opened.append(1)
+            return original_open(*args, **kwargs)
+
+        monkeypatch.setattr(fitz, "open", counting_open)
+        _, pypdf2_before = observed_parses(PARSER_PYPDF2)
+
+        output, qr_codes = asyncio.run(
+            self.service.add_qr_codes_to_pdf(
+                self.pdf_content, "DOC-1", "A", "https://pte-qr.example.com/r"
+            )
+        )
+
+        assert len(qr_codes) == PAGES
+        assert len(opened) == 1
+        assert observed_parses(PARSER_PYPDF2)[1] == pypdf2_before + 1
+        with fitz.Document(stream=output, filetype="pdf") as doc:
+            assert all(len(page.get_image_info()) == 1 for page in doc)
+
+    def test_heuristic_positioning_creates_no_files(self, monkeypatch):
+        """Analysis and heuristic positioning run on the in-memory document."""
+        monkeypatch.setattr(settings, "LAYOUT_POOL_ENABLED", False)
+        monkeypatch.setattr(settings, "QR_HEURISTICS_DELTA", True)
+        # Raster detectors are the ones that used to write files
+        monkeypatch.setattr(settings, "QR_VECTOR_DETECTION", False)
+        # Analyze every page again instead of reusing the warm-up layouts
+        monkeypatch.setattr(self.service.pdf_analyzer, "layout_cache", None)
+        stamp = self.service.add_qr_codes_to_pdf(
+            self.pdf_content, "DOC-1", "A", "https://pte-qr.example.com/r"
+        )
+        # Warm-up run: lazy imports may write bytecode caches
+        asyncio.run(stamp)
+
+        with recorded_file_writes() as writes:
+            _, qr_codes = asyncio.run(
+                self.service.add_qr_codes_to_pdf(
+                    self.pdf_content, "DOC-2", "A", "https://pte-qr.example.com/r"
+                )
+            )
+
+        assert len(qr_codes) == PAGES
+        assert writes == []
@@ -0,0 +1,147 @@
+"""
+Unit tests for bulk QR code persistence
+"""
+
+import asyncio
+import uuid
+
+from sqlalchemy.dialects import postgresql
+
+from app.models.document import Document
+from app.models.qr_code import QRCode
+from app.services import document_service
+from app.services.document_service import (
+    DocumentService,
+    build_qr_codes_upsert,
+    document_status_query,
+    qr_code_page_query,
+)
+
+
+class RecordingSession:
+    """AsyncSession stand-in that records executed statements and commits"""
+
+    def __init__(self):
+        self.statements = []
+        self.commits = 0
+        self.rollbacks = 0
+
+    async def execute(self, statement):
+        self.statements.append(statement)
+
+    async def commit(self):
+        self.commits += 1
+
+    async def rollback(self):
+        self.rollbacks += 1
+
+
+def qr_codes_data(pages: int) -> list:
+    return [
+        {"page_number": page, "qr_data": f"https://pte-qr.example.com/r/DOC-1/A/{page}"}
+        for page in range(1, pages + 1)
+    ]
+
+
+class TestQRCodesUpsert:
+    """Test bulk QR code upsert"""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.db = RecordingSession()
+        self.service = DocumentService(self.db)
+        self.document_id = uuid.uuid4()
+        self.user_id = uuid.uuid4()
+
+    def upsert(self, pages: int) -> int:
+        return asyncio.run(
+            self.service.upsert_qr_codes(
+                self.document_id, "DOC-1", "A", qr_codes_data(pages), self.user_id
+            )
+        )
+
+    def test_statement_is_upsert_on_revision_page(self):
+        """Rows conflict on (enovia_id, revision, page_number) and update QR data."""
+        statement = build_qr_codes_upsert(
+            [{"enovia_id": "DOC-1", "revision": "A", "page_number": 1, "qr_data": "x"}]
+        )
+        sql = " ".join(str(statement.compile(dialect=postgresql.dialect())).split())
+
+        assert sql.startswith("INSERT INTO qr_codes")
+        assert "ON CONFLICT (enovia_id, revision, page_number) DO UPDATE SET" in sql
+        assert "qr_data = excluded.qr_data" in sql
+
+    def test_revision_is_saved_in_one_statement_and_commit(self):
+        """All pages of a revision are written by one statement and one commit."""
+        assert self.upsert(300) == 300
+
+        assert len(self.db.statements) == 1
+        assert self.db.commits == 1
+        params = self.db.statements[0].compile(dialect=postgresql.dialect()).params
+        assert params["page_number_m299"] == 300
+
+    def test_large_revisions_are_batched_in_one_transaction(self, monkeypatch):
+        """Statements stay under the bind parameter limit, the commit stays single."""
+        monkeypatch.setattr(document_service, "QR_UPSERT_BATCH_SIZE", 100)
+
+        assert self.upsert(250) == 250
+
+        assert len(self.db.statements) == 3
+        assert self.db.commits == 1
+
+    def test_empty_revision(self):
+        """Nothing is written without QR codes."""
+        assert self.upsert(0) == 0
+        assert self.db.statements == []
+        assert self.db.commits == 0
+
+
+def covered_columns(table, index_name: str) -> set:
+    index = next(index for index in table.indexes if index.name == index_name)
+    return {column.name for column in index.columns} | set(
+        index.dialect_options["postgresql"]["include"]
+    )
+
+
+class TestHotPathQueries:
+    """Test that QR scan lookups stay within their covering indexes"""
+
+    def test_document_status_query_is_covered(self):
+        """The status lookup reads only columns of uq_documents_enovia_id_status."""
+        statement = document_status_query("DOC-1")
+        sql = " ".join(str(statement.compile(dialect=postgresql.dialect())).split())
+
+        assert sql.startswith(
+            "SELECT documents.id, documents.revision, documents.is_actual "
+            "FROM documents WHERE documents.enovia_id ="
+        )
+        assert covered_columns(Document.__table__, "uq_documents_enovia_id_status") == {
+            "enovia_id",
+            "id",
+            "revision",
+            "is_actual",
+        }
+
+    def test_qr_code_page_query_is_covered(self):
+        """The QR page lookup reads only columns of its covering unique index."""
+        statement = qr_code_page_query("DOC-1", "A", 3)
+        sql = " ".join(str(statement.compile(dialect=postgresql.dialect())).split())
+
+        assert sql.startswith("SELECT qr_codes.document_id FROM qr_codes WHERE")
+        assert covered_columns(
+            QRCode.__table__, "uq_qr_codes_enovia_revision_page_doc"
+        ) == {"enovia_id", "revision", "page_number", "document_id"}
+
+    def test_covering_indexes_compile_with_include(self):
+        """PostgreSQL DDL carries the INCLUDE clause."""
+        from sqlalchemy.schema import CreateIndex
+
+        index = next(
+            index
+            for index in Document.__table__.indexes
+            if index.name == "uq_documents_enovia_id_status"
+        )
+        ddl = str(CreateIndex(index).compile(dialect=postgresql.dialect()))
+
+        assert "UNIQUE INDEX uq_documents_enovia_id_status" in ddl
+        assert "INCLUDE (id, revision, is_actual)" in ddl
@@ -0,0 +1,266 @@
+"""
+Tests of the pooled ENOVIA client against a local ENOVIA stand-in server
+"""
+
+import asyncio
+import json
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from app.services.enovia_service import BatchResolver, ENOVIAClient
+
+
+class ENOVIAStandIn:
+    """Threaded HTTP/1.1 server answering the ENOVIA endpoints used by the client"""
+
+    def __init__(self, delay: float = 0.05):
+        self.delay = delay
+        self.connections = 0
+        self.requests = Counter()
+        self.revision_state = "Released"
+        self.reject_tokens = set()
+        self.tokens_issued = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def setup(self):
+                super().setup()
+                with stand_in._lock:
+                    stand_in.connections += 1
+
+            def log_message(self, *args):
+                pass
+
+            def reply(self, status, body):
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                with stand_in._lock:
+                    stand_in.requests[self.path] += 1
+                    stand_in.tokens_issued += 1
+                    token = f"token-{stand_in.tokens_issued}"
+                time.sleep(stand_in.delay)
+                self.reply(200, {"access_token": token, "expires_in": 3600})
+
+            def do_GET(self):
+                with stand_in._lock:
+                    stand_in.requests[self.path] += 1
+                token = self.headers.get("Authorization", "").removeprefix("Bearer ")
+                if token in stand_in.reject_tokens:
+                    self.reply(401, {"error": "invalid_token"})
+                    return
+                with stand_in._lock:
+                    stand_in.in_flight += 1
+                    stand_in.max_in_flight = max(
+                        stand_in.max_in_flight, stand_in.in_flight
+                    )
+                time.sleep(stand_in.delay)
+                with stand_in._lock:
+                    stand_in.in_flight -= 1
+                parts = self.path.strip("/").split("/")
+                if len(parts) == 6 and parts[4] == "revisions":
+                    self.reply(
+                        200,
+                        {
+                            "id": parts[3],
+                            "revision": parts[5],
+                            "maturityState": stand_in.revision_state,
+                        },
+                    )
+                else:
+                    self.reply(200, {"id": parts[-1], "title": "Drawing set"})
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class TestENOVIAClient:
+    """Test connection reuse, token single-flight, coalescing and SWR cache"""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.stand_in = ENOVIAStandIn().__enter__()
+        self.client = ENOVIAClient(base_url=self.stand_in.url)
+
+    def teardown_method(self):
+        """Clean up after tests."""
+        self.stand_in.__exit__()
+
+    def run(self, coroutine_factory):
+        async def scenario():
+            try:
+                return await coroutine_factory()
+            finally:
+                await self.client.close()
+
+        return asyncio.run(scenario())
+
+    def test_sequential_requests_reuse_one_connection(self):
+        """Keep-alive: one TCP connection and one token for a series of calls."""
+
+        async def scenario():
+            for revision in "ABCDE":
+                await self.client.get_revision_meta("DOC-1", revision)
+
+        self.run(scenario)
+
+        assert self.stand_in.connections == 1
+        assert self.stand_in.requests["/oauth2/token"] == 1
+
+    def test_concurrent_calls_share_one_token_refresh(self):
+        """Single-flight: concurrent callers on an expired token refresh it once."""
+
+        async def scenario():
+            await asyncio.gather(
+                *(self.client.get_revision_meta("DOC-1", str(i)) for i in range(10))
+            )
+
+        self.run(scenario)
+
+        assert self.stand_in.requests["/oauth2/token"] == 1
+
+    def test_identical_calls_are_coalesced(self):
+        """Identical in-flight metadata requests reach ENOVIA once."""
+
+        async def scenario():
+            return await asyncio.gather(
+                *(self.client.get_document_meta("DOC-1") for _ in range(10)),
+                *(self.client.get_revision_meta("DOC-1", "B") for _ in range(10)),
+            )
+
+        results = self.run(scenario)
+
+        assert self.stand_in.requests["/api/v1/documents/DOC-1"] == 1
+        assert self.stand_in.requests["/api/v1/documents/DOC-1/revisions/B"] == 1
+        assert results[0]["title"] == "Drawing set"
+        assert results[-1]["maturityState"] == "Released"
+
+    def test_stale_metadata_is_served_while_revalidating(self):
+        """Past the TTL the cached value is returned at once and refreshed later."""
+        path = "/api/v1/documents/DOC-1/revisions/A"
+
+        async def scenario():
+            first = await self.client.get_revision_meta("DOC-1", "A")
+            cached = await self.client.get_revision_meta("DOC-1", "A")
+            assert self.stand_in.requests[path] == 1
+
+            self.stand_in.revision_state = "Obsolete"
+            self.client.metadata_cache.ttl = 0
+            stale = await self.client.get_revision_meta("DOC-1", "A")
+            await asyncio.gather(*self.client._revalidations)
+            self.client.metadata_cache.ttl = 60
+            refreshed = await self.client.get_revision_meta("DOC-1", "A")
+            return first, cached, stale, refreshed
+
+        first, cached, stale, refreshed = self.run(scenario)
+
+        assert first["maturityState"] == cached["maturityState"] == "Released"
+        assert stale["maturityState"] == "Released"
+        assert refreshed["maturityState"] == "Obsolete"
+        assert self.stand_in.requests[path] == 2
+
+    def test_rejected_token_is_refreshed_once(self):
+        """A 401 drops the token, fetches a new one and retries the request."""
+
+        async def scenario():
+            await self.client.get_document_meta("DOC-1")
+            self.stand_in.reject_tokens.add(self.client.access_token)
+            return await self.client.get_document_meta("DOC-2")
+
+        result = self.run(scenario)
+
+        assert result["id"] == "DOC-2"
+        assert self.stand_in.requests["/oauth2/token"] == 2
+        assert self.stand_in.requests["/api/v1/documents/DOC-2"] == 2
+
+
+class TestBatchResolver:
+    """Test batched revision lookups"""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.stand_in = ENOVIAStandIn().__enter__()
+        self.client = ENOVIAClient(base_url=self.stand_in.url)
+        self.client.resolver.concurrency = 8
+
+    def teardown_method(self):
+        """Clean up after tests."""
+        self.stand_in.__exit__()
+
+    def test_package_lookup_runs_in_parallel_with_bounded_concurrency(self):
+        """40 revisions at 50 ms each take a few round trips, not 40."""
+        pairs = [(f"DOC-{i}", "A") for i in range(40)]
+
+        async def scenario():
+            try:
+                await self.client._get_access_token()
+                start = time.perf_counter()
+                results = await self.client.get_revisions_meta(pairs)
+                return results, time.perf_counter() - start
+            finally:
+                await self.client.close()
+
+        results, elapsed = asyncio.run(scenario())
+
+        assert list(results) == pairs
+        assert results[("DOC-7", "A")]["id"] == "DOC-7"
+        assert self.stand_in.max_in_flight <= 8
+        assert elapsed < 40 * self.stand_in.delay / 2
+
+    def test_concurrent_callers_share_a_batch(self):
+        """Lookups from separate callers inside the window form one batch."""
+        fetched = []
+
+        async def fetch(key):
+            fetched.append(key)
+            return key.upper()
+
+        async def scenario():
+            resolver = BatchResolver(fetch, window=0.01, max_batch=100, concurrency=4)
+            return await asyncio.gather(
+                resolver.resolve("a"), resolver.resolve("b"), resolver.resolve("a")
+            )
+
+        assert asyncio.run(scenario()) == ["A", "B", "A"]
+        assert fetched == ["a", "b"]
+
+    def test_failure_reaches_only_its_caller(self):
+        async def fetch(key):
+            if key == "bad":
+                raise ValueError(key)
+            return key
+
+        async def scenario():
+            resolver = BatchResolver(fetch, window=0.01, max_batch=2, concurrency=4)
+            return await resolver.resolve_many(["ok", "bad", "late"])
+
+        results = asyncio.run(scenario())
+
+        assert results["ok"] == "ok"
+        assert results["late"] == "late"
+        assert isinstance(results["bad"], ValueError)
@@ -0,0 +1,236 @@
+"""
+Unit tests for bounded executors used to offload CPU-bound work
+"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.core.executor import BoundedExecutor, ExecutorOverloadedError, MemoryBudget
+from app.services.metrics_service import metrics_service
+
+
+class TestBoundedExecutor:
+    """Test bounded executor"""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.executor = BoundedExecutor("test", max_workers=1, max_queue=1)
+
+    def teardown_method(self):
+        """Stop worker threads."""
+        self.executor.shutdown()
+
+    def test_run_returns_result_and_keeps_loop_responsive(self):
+        """Blocking work runs in a worker thread while the loop keeps ticking."""
+
+        def blocking(value):
+            time.sleep(0.2)
+            return value * 2
+
+        async def scenario():
+            ticks = 0
+
+            async def ticker():
+                nonlocal ticks
+                while True:
+                    await asyncio.sleep(0.01)
+                    ticks += 1
+
+            task = asyncio.create_task(ticker())
+            result = await self.executor.run(blocking, 21)
+            task.cancel()
+            return result, ticks
+
+        result, ticks = asyncio.run(scenario())
+
+        assert result == 42
+        assert ticks >= 5
+
+    def test_concurrency_limit_and_queue_bound(self):
+        """Work beyond the limit waits; a full queue rejects new work."""
+        release = threading.Event()
+        queue_depth = metrics_service.executor_queue_depth.labels(executor="test")
+
+        async def scenario():
+            running = asyncio.create_task(self.executor.run(release.wait))
+            await asyncio.sleep(0.05)
+            queued = asyncio.create_task(self.executor.run(lambda: "queued"))
+            await asyncio.sleep(0.05)
+
+            assert self.executor.active == 1
+            assert self.executor.queued == 1
+            assert queue_depth._value.get() == 1
+
+            with pytest.raises(ExecutorOverloadedError):
+                await self.executor.run(lambda: "rejected")
+
+            release.set()
+            return await asyncio.gather(running, queued)
+
+        results = asyncio.run(scenario())
+
+        assert results == [True, "queued"]
+        assert self.executor.queued == 0
+        assert self.executor.active == 0
+        assert queue_depth._value.get() == 0
+
+    def test_exceptions_propagate(self):
+        """Errors raised in the worker reach the caller."""
+
+        def failing():
+            raise ValueError("broken page")
+
+        with pytest.raises(ValueError, match="broken page"):
+            asyncio.run(self.executor.run(failing))
+
+        assert self.executor.active == 0
+
+    def test_cancelled_caller_waits_for_running_task(self):
+        """Cleanup after a cancelled run() happens only once the thread is done."""
+        started = threading.Event()
+        events = []
+
+        def blocking():
+            started.set()
+            time.sleep(0.2)
+            events.append("task finished")
+
+        async def caller():
+            try:
+                await self.executor.run(blocking)
+            finally:
+                events.append("caller cleanup")
+
+        async def scenario():
+            task = asyncio.create_task(caller())
+            await asyncio.get_running_loop().run_in_executor(None, started.wait)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+        asyncio.run(scenario())
+
+        assert events == ["task finished", "caller cleanup"]
+        assert self.executor.active == 0
+
+    def test_cancelled_caller_drops_queued_task(self):
+        """A task cancelled before it started never runs."""
+        release = threading.Event()
+        ran = []
+
+        async def scenario():
+            running = asyncio.create_task(self.executor.run(release.wait))
+            await asyncio.sleep(0.05)
+            queued = asyncio.create_task(self.executor.run(ran.append, "queued"))
+            await asyncio.sleep(0.05)
+            queued.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await queued
+            release.set()
+            await running
+
+        asyncio.run(scenario())
+
+        assert ran == []
+        assert self.executor.queued == 0
+
+
+MB = 1024 * 1024
+
+
+class TestMemoryBudget:
+    """Test memory-budgeted admission of PDF jobs"""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.budget = MemoryBudget("test_memory", budget_bytes=100 * MB, max_queue=2)
+
+    def test_jobs_are_admitted_in_arrival_order(self):
+        """A large job at the head is not overtaken by smaller ones that would fit."""
+        order = []
+
+        async def job(name, nbytes, hold):
+            async with self.budget.reserve(nbytes * MB):
+                order.append(name)
+                await hold.wait()
+
+        async def scenario():
+            first_done, big_done, small_done = (
+                asyncio.Event(),
+                asyncio.Event(),
+                asyncio.Event(),
+            )
+            first = asyncio.create_task(job("first", 60, first_done))
+            await asyncio.sleep(0)
+            big = asyncio.create_task(job("big", 70, big_done))
+            small = asyncio.create_task(job("small", 10, small_done))
+            await asyncio.sleep(0.01)
+
+            assert order == ["first"]
+            assert self.budget.queued == 2
+
+            first_done.set()
+            await asyncio.sleep(0.01)
+            assert order == ["first", "big", "small"]
+            assert self.budget.reserved == 80 * MB
+
+            big_done.set()
+            small_done.set()
+            await asyncio.gather(first, big, small)
+
+        asyncio.run(scenario())
+
+        assert self.budget.reserved == 0
+        assert self.budget.queued == 0
+
+    def test_oversized_job_runs_alone(self):
+        async def scenario():
+            async with self.budget.reserve(500 * MB) as reserved:
+                assert reserved == 100 * MB
+
+        asyncio.run(scenario())
+
+        assert self.budget.reserved == 0
+
+    def test_full_queue_and_timeout_reject(self):
+        async def scenario():
+            budget = MemoryBudget(
+                "test_memory", budget_bytes=100 * MB, max_queue=1, timeout=0.05
+            )
+            held = await budget.acquire(100 * MB)
+            waiting = asyncio.create_task(budget.acquire(10 * MB))
+            await asyncio.sleep(0)
+
+            with pytest.raises(ExecutorOverloadedError):
+                await budget.acquire(10 * MB)
+            with pytest.raises(ExecutorOverloadedError):
+                await waiting
+
+            budget.release(held)
+            return budget
+
+        budget = asyncio.run(scenario())
+
+        assert budget.reserved == 0
+        assert budget.queued == 0
+
+    def test_cancelled_waiter_unblocks_queue(self):
+        """A client that goes away while queued does not hold back later jobs."""
+
+        async def scenario():
+            held = await self.budget.acquire(50 * MB)
+            big = asyncio.create_task(self.budget.acquire(90 * MB))
+            small = asyncio.create_task(self.budget.acquire(10 * MB))
+            await asyncio.sleep(0)
+
+            big.cancel()
+            assert await small == 10 * MB
+            self.budget.release(10 * MB)
+            self.budget.release(held)
+
+        asyncio.run(scenario())
+
+        assert self.budget.reserved == 0
@@ -0,0 +1,262 @@
+"""
+Unit tests for the incremental-update output of stamped PDFs
+"""
+
+from io import BytesIO
+
+import fitz  # PyMuPDF
+import pypdf
+import PyPDF2
+import pytest
+from reportlab.pdfgen import canvas
+
+from app.utils.incremental_pdf import (
+    IncrementalWriter,
+    create_output_writer,
+    previous_xref,
+)
+from app.utils.qr_overlay import QROverlay
+from tests.test_utils.test_qr_overlay import (
+    HEIGHT,
+    QR_DATA,
+    QR_SIZE,
+    decode_region,
+    make_document,
+)
+
+
+def make_xref_stream_pdf() -> bytes:
+    """Build a one-page PDF 1.5 document whose cross-reference is an /XRef stream."""
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 842 595] /Contents 4 0 R >>",
+        b"<< /Length 17 >>\nstream\n0 0 m 842 595 l S\nendstream",
+    ]
+    output = bytearray(b"%PDF-1.5\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(output))
+        output += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref_offset = len(output)
+    rows = b"\x00\x00\x00\x00\xff\xff" + b"".join(
+        b"\x01" + offset.to_bytes(4, "big") + b"\x00"
+        for offset in offsets + [xref_offset]
+    )
+    output += (
+        b"5 0 obj\n<< /Type /XRef /Size 6 /W [1 4 1] /Root 1 0 R /Length %d >>\n"
+        b"stream\n" % len(rows)
+    )
+    output += rows + b"\nendstream\nendobj\n"
+    output += b"startxref\n%d\n%%%%EOF\n" % xref_offset
+    return bytes(output)
+
+
+def stamp_incrementally(
+    library, pdf_content: bytes, pages=(0,), x: float = 1000
+) -> IncrementalWriter:
+    """Stamp the given pages through an incremental writer."""
+    reader = library.PdfReader(BytesIO(pdf_content))
+    writer = IncrementalWriter(reader, pdf_content)
+    overlay = QROverlay(writer)
+    for i, page in enumerate(reader.pages):
+        writer_page = writer.add_page(page)
+        if i in pages:
+            overlay.stamp(writer_page, QR_DATA, x, 200, QR_SIZE, label=f"Page {i + 1}")
+    return writer
+
+
+def write(writer) -> bytes:
+    output = BytesIO()
+    writer.write(output)
+    return output.getvalue()
+
+
+@pytest.mark.parametrize("library", [PyPDF2, pypdf], ids=["PyPDF2", "pypdf"])
+class TestIncrementalWriter:
+    """Test incremental updates with both PDF libraries"""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.pdf_content = make_document(3)
+
+    def test_original_revision_is_preserved(self, library):
+        """The output starts with the original bytes and chains to its xref."""
+        writer = stamp_incrementally(library, self.pdf_content)
+        output = write(writer)
+
+        assert output.startswith(self.pdf_content)
+        update = output[len(self.pdf_content) :]
+        assert b"/Prev %d" % previous_xref(self.pdf_content)[0] in update
+        assert update.rstrip().endswith(b"%%EOF")
+
+    def test_only_stamped_pages_are_written(self, library):
+        """Unchanged pages and shared objects are not repeated in the update."""
+        writer = stamp_incrementally(library, self.pdf_content, pages=(0, 2))
+
+        modified = writer.modified_pages
+        assert [page.indirect_reference.idnum for page in modified] == [
+            writer.reader.pages[0].indirect_reference.idnum,
+            writer.reader.pages[2].indirect_reference.idnum,
+        ]
+
+        lines = write(writer)[len(self.pdf_content) :].splitlines()
+        page_headers = [
+            b"%d 0 obj" % page.indirect_reference.idnum for page in writer.reader.pages
+        ]
+        assert page_headers[0] in lines
+        assert page_headers[1] not in lines
+        assert page_headers[2] in lines
+
+    def test_stamped_qr_code_decodes(self, library):
+        """Readers resolve the updated pages and render the QR code."""
+        output = write(stamp_incrementally(library, self.pdf_content))
+
+        clip = fitz.Rect(990, HEIGHT - 310, 1110, HEIGHT - 190)
+        assert decode_region(output, clip) == QR_DATA
+
+        doc = fitz.open(stream=output, filetype="pdf")
+        assert len(doc) == 3
+        assert "Page 1" in doc[0].get_text()
+        assert doc[1].get_image_info() == []
+        assert "Sheet 3" in doc[2].get_text()
+        doc.close()
+
+    def test_update_is_readable_by_pdf_libraries(self, library):
+        """Both PDF libraries read the update in strict mode."""
+        output = write(stamp_incrementally(library, self.pdf_content))
+
+        for reader_library in (PyPDF2, pypdf):
+            reader = reader_library.PdfReader(BytesIO(output), strict=True)
+            assert len(reader.pages) == 3
+            assert "/PteQr1" in reader.pages[0]["/Resources"]["/XObject"]
+            assert "/XObject" not in reader.pages[1]["/Resources"]
+
+    def test_unchanged_document_gets_empty_update(self, library):
+        """Without stamps only a new xref section is appended."""
+        writer = stamp_incrementally(library, self.pdf_content, pages=())
+        output = write(writer)
+
+        assert writer.modified_pages == []
+        assert output.startswith(self.pdf_content)
+        assert len(library.PdfReader(BytesIO(output)).pages) == 3
+
+    def test_xref_stream_original(self, library):
+        """A document with an /XRef stream is updated with an /XRef stream."""
+        pdf_content = make_xref_stream_pdf()
+        assert previous_xref(pdf_content)[1]
+
+        output = write(stamp_incrementally(library, pdf_content, x=600))
+        update = output[len(pdf_content) :]
+
+        assert output.startswith(pdf_content)
+        assert b"/Type /XRef" in update
+        assert b"\nxref\n" not in update
+        doc = fitz.open(stream=output, filetype="pdf")
+        assert len(doc[0].get_image_info()) == 1
+        doc.close()
+        for reader_library in (PyPDF2, pypdf):
+            reader = reader_library.PdfReader(BytesIO(output))
+            assert "/PteQr1" in reader.pages[0]["/Resources"]["/XObject"]
+
+    def test_merged_page_from_another_document(self, library):
+        """Objects of a merged ReportLab page are copied into the update."""
+        buffer = BytesIO()
+        c = canvas.Canvas(buffer, pagesize=(842, 595))
+        c.drawString(100, 100, "Merged overlay")
+        c.save()
+
+        reader = library.PdfReader(BytesIO(self.pdf_content))
+        page = reader.pages[1]
+        page.merge_page(library.PdfReader(BytesIO(buffer.getvalue())).pages[0])
+        writer = IncrementalWriter(reader, self.pdf_content)
+        for reader_page in reader.pages:
+            writer.add_page(reader_page)
+        output = write(writer)
+
+        assert [p.indirect_reference.idnum for p in writer.modified_pages] == [
+            page.indirect_reference.idnum
+        ]
+        doc = fitz.open(stream=output, filetype="pdf")
+        assert "Merged overlay" in doc[1].get_text()
+        assert "Sheet 2" in doc[1].get_text()
+        assert "Merged overlay" not in doc[0].get_text()
+        doc.close()
+
+    def test_pages_of_another_reader_are_rejected(self, library):
+        """Only pages of the updated document can be added."""
+        writer = IncrementalWriter(
+            library.PdfReader(BytesIO(self.pdf_content)), self.pdf_content
+        )
+        other = library.PdfReader(BytesIO(self.pdf_content))
+
+        with pytest.raises(ValueError):
+            writer.add_page(other.pages[0])
+
+    def test_original_as_file(self, library, tmp_path):
+        """The original document can be an open file."""
+        path = tmp_path / "drawing.pdf"
+        path.write_bytes(self.pdf_content)
+
+        with open(path, "rb") as file:
+            reader = library.PdfReader(file)
+            writer = IncrementalWriter(reader, file)
+            QROverlay(writer).stamp(
+                writer.add_page(reader.pages[0]), QR_DATA, 1000, 200, QR_SIZE
+            )
+            output = write(writer)
+
+        assert output.startswith(self.pdf_content)
+        assert len(library.PdfReader(BytesIO(output)).pages) == 3
+
+
+@pytest.mark.parametrize("library", [PyPDF2, pypdf], ids=["PyPDF2", "pypdf"])
+class TestCreateOutputWriter:
+    """Test output writer selection"""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.pdf_content = make_document(1)
+
+    def test_rewrite_mode(self, library):
+        reader = library.PdfReader(BytesIO(self.pdf_content))
+
+        writer = create_output_writer(reader, self.pdf_content, mode="rewrite")
+
+        assert isinstance(writer, library.PdfWriter)
+
+    def test_incremental_mode(self, library):
+        reader = library.PdfReader(BytesIO(self.pdf_content))
+
+        writer = create_output_writer(reader, self.pdf_content, mode="incremental")
+
+        assert isinstance(writer, IncrementalWriter)
+        assert writer.pdf_library == library.__name__
+
+    def test_default_mode_from_settings(self, library, monkeypatch):
+        monkeypatch.setattr("app.core.config.settings.PDF_OUTPUT_MODE", "incremental")
+        reader = library.PdfReader(BytesIO(self.pdf_content))
+
+        assert isinstance(
+            create_output_writer(reader, self.pdf_content), IncrementalWriter
+        )
+        assert isinstance(create_output_writer(reader, None), library.PdfWriter)
+
+    def test_encrypted_document_is_rewritten(self, library):
+        source = library.PdfWriter()
+        source.append_pages_from_reader(library.PdfReader(BytesIO(self.pdf_content)))
+        source.encrypt("")
+        encrypted = BytesIO()
+        source.write(encrypted)
+        reader = library.PdfReader(BytesIO(encrypted.getvalue()))
+
+        writer = create_output_writer(reader, encrypted.getvalue(), mode="incremental")
+
+        assert reader.is_encrypted
+        assert isinstance(writer, library.PdfWriter)
+
+    def test_unknown_mode(self, library):
+        reader = library.PdfReader(BytesIO(self.pdf_content))
+
+        with pytest.raises(ValueError):
+            create_output_writer(reader, self.pdf_content, mode="append")
@@ -0,0 +1,159 @@
+"""
+Unit tests for the content-addressed page layout cache
+"""
+
+import asyncio
+import time
+from io import BytesIO
+
+import fitz  # PyMuPDF
+from reportlab.lib.pagesizes import A3, landscape
+from reportlab.pdfgen import canvas
+
+from app.utils.layout_cache import LayoutCache, page_fingerprint
+from app.utils.pdf_analyzer import PDFAnalyzer
+
+
+def make_drawing_pdf(pages: int = 2, extra_line: bool = False) -> bytes:
+    """Build a multi-page landscape A3 document with distinct sheets."""
+    buffer = BytesIO()
+    width, height = landscape(A3)
+    c = canvas.Canvas(buffer, pagesize=(width, height))
+    for page in range(pages):
+        c.setLineWidth(1.5)
+        c.rect(56.7, 14.2, width - 56.7 - 14.2, height - 14.2 - 14.2)
+        c.rect(width - 14.2 - 524.5, 14.2, 524.5, 155.9)
+        c.drawString(100, 300, f"Sheet {page + 1}")
+        if extra_line and page == pages - 1:
+            c.line(100, 400, 600, 400)
+        c.showPage()
+    c.save()
+    return buffer.getvalue()
+
+
+def fingerprints(pdf_content: bytes) -> list:
+    doc = fitz.open(stream=pdf_content, filetype="pdf")
+    result = [page_fingerprint(page) for page in doc]
+    doc.close()
+    return result
+
+
+class FakeCacheManager:
+    """Minimal stand-in for the Redis cache manager batch API."""
+
+    def __init__(self):
+        self.data = {}
+        self.get_calls = 0
+
+    async def get_many(self, keys):
+        self.get_calls += 1
+        return {key: self.data[key] for key in keys if key in self.data}
+
+    async def set_many(self, values, ttl=None):
+        self.data.update(values)
+        return True
+
+
+class TestPageFingerprint:
+    """Test page content hashing"""
+
+    def test_fingerprint_is_stable_across_resave(self):
+        """Re-saving with renumbered objects keeps page fingerprints."""
+        pdf_content = make_drawing_pdf()
+        doc = fitz.open(stream=pdf_content, filetype="pdf")
+        resaved = doc.tobytes(garbage=4, deflate=True)
+        doc.close()
+
+        original = fingerprints(pdf_content)
+        assert len(set(original)) == 2
+        assert fingerprints(resaved) == original
+
+    def test_fingerprint_changes_with_content(self):
+        """Only the edited sheet gets a new fingerprint."""
+        original = fingerprints(make_drawing_pdf())
+        revised = fingerprints(make_drawing_pdf(extra_line=True))
+
+        assert revised[0] == original[0]
+        assert revised[1] != original[1]
+
+
+class TestLayoutCache:
+    """Test layout cache tiers"""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.cache = LayoutCache(max_entries=2, redis_enabled=False)
+
+    def test_lru_eviction(self):
+        """Least recently used entries are evicted first."""
+        self.cache.set("a", {"v": 1})
+        self.cache.set("b", {"v": 2})
+        assert self.cache.get("a") == {"v": 1}
+
+        self.cache.set("c", {"v": 3})
+
+        assert self.cache.get("b") is None
+        assert self.cache.get("a") == {"v": 1}
+        assert self.cache.stats["evictions"] == 1
+
+    def test_ttl_expiry(self):
+        """Expired entries are dropped on read."""
+        cache = LayoutCache(ttl_seconds=1, redis_enabled=False)
+        cache.set("a", {"v": 1})
+        cache._entries["a"] = (time.monotonic() - 1, {"v": 1})
+
+        assert cache.get("a") is None
+        assert len(cache) == 0
+
+    def test_get_returns_copy(self):
+        """Callers cannot mutate cached values."""
+        self.cache.set("a", {"v": {"x": 1}})
+        self.cache.get("a")["v"]["x"] = 2
+
+        assert self.cache.get("a") == {"v": {"x": 1}}
+
+    def test_prefetch_and_flush(self):
+        """Pending entries are written in one batch and read back in another."""
+        redis = FakeCacheManager()
+        writer = LayoutCache(cache_manager=redis)
+        writer.set("layout:a", {"v": 1})
+        writer.set("layout:b", {"v": 2})
+
+        assert asyncio.run(writer.flush()) == 2
+        assert asyncio.run(writer.flush()) == 0
+
+        reader = LayoutCache(cache_manager=redis)
+        loaded = asyncio.run(reader.prefetch(["layout:a", "layout:b", "layout:c"]))
+
+        assert loaded == 2
+        assert redis.get_calls == 1
+        assert reader.get("layout:b") == {"v": 2}
+        # Keys already in memory are not requested again
+        assert asyncio.run(reader.prefetch(["layout:a"])) == 0
+        assert redis.get_calls == 1
+
+
+class TestAnalyzerLayoutCache:
+    """Test layout cache integration in PDFAnalyzer"""
+
+    def test_unchanged_page_is_not_analyzed_again(self):
+        """A repeated sheet is served from cache without rendering."""
+        analyzer = PDFAnalyzer(cache=LayoutCache(redis_enabled=False))
+
+        first = analyzer.analyze_page_layout(make_drawing_pdf(), 0)
+        second = analyzer.analyze_page_layout(make_drawing_pdf(extra_line=True), 0)
+
+        assert first["analysis_metadata"]["cache_hit"] is False
+        assert second["analysis_metadata"]["cache_hit"] is True
+        assert second["analysis_metadata"]["render_count"] == 0
+        assert second["stamp_top_edge"] == first["stamp_top_edge"]
+        assert second["right_frame_edge"] == first["right_frame_edge"]
+
+    def test_changed_page_is_analyzed(self):
+        """An edited sheet misses the cache."""
+        analyzer = PDFAnalyzer(cache=LayoutCache(redis_enabled=False))
+
+        analyzer.analyze_page_layout(make_drawing_pdf(), 1)
+        revised = analyzer.analyze_page_layout(make_drawing_pdf(extra_line=True), 1)
+
+        assert revised["analysis_metadata"]["cache_hit"] is False
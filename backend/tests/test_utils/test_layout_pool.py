@@ -0,0 +1,82 @@
+"""
+Unit tests for the process pool used for parallel page layout analysis
+"""
+
+import asyncio
+import os
+from io import BytesIO
+
+import pytest
+from reportlab.lib.pagesizes import A3, A4, landscape
+from reportlab.pdfgen import canvas
+
+from app.utils.layout_cache import LayoutCache
+from app.utils.layout_pool import LayoutAnalysisPool
+from app.utils.pdf_analyzer import PDFAnalyzer
+
+PAGES = 4
+
+
+def make_drawing_pdf(pages: int = PAGES) -> bytes:
+    """Build a drawing set: landscape A3 sheets and a portrait cover."""
+    buffer = BytesIO()
+    c = canvas.Canvas(buffer)
+    c.setPageSize(A4)
+    c.drawString(100, 700, "Cover")
+    c.showPage()
+    width, height = landscape(A3)
+    for page in range(pages):
+        c.setPageSize((width, height))
+        c.setLineWidth(1.5)
+        c.rect(56.7, 14.2, width - 56.7 - 14.2, height - 14.2 - 14.2)
+        c.rect(width - 14.2 - 524.5, 14.2, 524.5, 155.9 + page * 10)
+        c.showPage()
+    c.save()
+    return buffer.getvalue()
+
+
+class TestLayoutAnalysisPool:
+    """Test parallel layout analysis"""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.pdf_content = make_drawing_pdf()
+        self.pool = LayoutAnalysisPool(max_workers=2, min_pages=2)
+
+    def teardown_method(self):
+        """Stop worker processes."""
+        self.pool.shutdown()
+
+    def test_pool_matches_in_process_analysis(self):
+        """Workers return the same layouts as the in-process analyzer."""
+        pages = list(range(1, PAGES + 1))
+
+        layouts = asyncio.run(self.pool.analyze(self.pdf_content, pages))
+
+        analyzer = PDFAnalyzer(cache=LayoutCache(redis_enabled=False))
+        assert sorted(layouts) == pages
+        for page_number in pages:
+            expected = analyzer.analyze_page_layout(self.pdf_content, page_number)
+            assert layouts[page_number]["page_number"] == page_number
+            assert layouts[page_number]["stamp_top_edge"] == pytest.approx(
+                expected["stamp_top_edge"]
+            )
+            assert layouts[page_number]["right_frame_edge"] == pytest.approx(
+                expected["right_frame_edge"]
+            )
+
+    def test_shared_document_file_is_removed(self, tmp_path, monkeypatch):
+        """The temporary document copy is deleted after analysis."""
+        monkeypatch.setattr(
+            "app.utils.layout_pool._shared_temp_dir", lambda: str(tmp_path)
+        )
+
+        asyncio.run(self.pool.analyze(self.pdf_content, [1, 2]))
+
+        assert os.listdir(tmp_path) == []
+
+    def test_small_documents_stay_in_process(self):
+        """Documents below the page threshold are not sent to the pool."""
+        assert not self.pool.should_use(1)
+        assert self.pool.should_use(2)
+        assert not LayoutAnalysisPool(max_workers=1, min_pages=1).should_use(10)
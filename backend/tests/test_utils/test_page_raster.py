@@ -0,0 +1,172 @@
+"""
+Unit tests for the shared page raster used by PDF analyzer detectors
+"""
+
+import gc
+from io import BytesIO
+
+import fitz  # PyMuPDF
+import numpy as np
+import pytest
+from PIL import Image
+from reportlab.lib.pagesizes import A3, landscape
+from reportlab.pdfgen import canvas
+
+from app.utils.layout_cache import LayoutCache
+from app.utils.page_raster import (
+    DOCUMENT_COPIES,
+    RENDER_SCALE,
+    PageRaster,
+    estimate_job_memory,
+    pixmap_to_array,
+    render_gray,
+)
+from app.utils.pdf_analyzer import PDFAnalyzer
+from app.utils.pdf_exceptions import PDFPageOutOfRangeError
+
+
+def make_drawing_pdf() -> bytes:
+    """Build a landscape A3 sheet with a frame and a title block."""
+    buffer = BytesIO()
+    width, height = landscape(A3)
+    c = canvas.Canvas(buffer, pagesize=(width, height))
+    c.setLineWidth(1.5)
+    # Frame: 20 mm left margin, 5 mm elsewhere
+    c.rect(56.7, 14.2, width - 56.7 - 14.2, height - 14.2 - 14.2)
+    # Title block 185 x 55 mm in the bottom-right corner
+    c.rect(width - 14.2 - 524.5, 14.2, 524.5, 155.9)
+    c.line(width - 14.2 - 524.5, 14.2 + 77.9, width - 14.2, 14.2 + 77.9)
+    c.save()
+    return buffer.getvalue()
+
+
+class TestPageRaster:
+    """Test page raster context"""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.pdf_content = make_drawing_pdf()
+
+    def test_gray_is_rendered_once(self):
+        """Grayscale array is rendered lazily and reused."""
+        with PageRaster.open(self.pdf_content, 0) as raster:
+            assert raster.render_count == 0
+
+            first = raster.gray
+            second = raster.gray
+
+            assert first is second
+            assert raster.render_count == 1
+            assert first.ndim == 2
+            assert first.shape[1] == pytest.approx(
+                raster.page_width * RENDER_SCALE, abs=1
+            )
+
+    def test_out_of_range_page(self):
+        """Requesting a missing page raises a page error."""
+        with pytest.raises(PDFPageOutOfRangeError):
+            PageRaster.open(self.pdf_content, 5)
+
+    def test_close_releases_owned_document(self):
+        """Closing the raster closes a document it opened itself."""
+        raster = PageRaster.open(self.pdf_content, 0)
+        doc = raster.doc
+        raster.close()
+        assert doc.is_closed
+
+    def test_analyze_page_layout_renders_regions_only(self):
+        """Layout analysis renders clipped search windows, not the whole sheet."""
+        analyzer = PDFAnalyzer(cache=LayoutCache(redis_enabled=False))
+
+        layout = analyzer.analyze_page_layout(self.pdf_content, 0)
+
+        with PageRaster.open(self.pdf_content, 0) as raster:
+            full_page_pixels = raster.width_px * raster.height_px
+
+        metadata = layout["analysis_metadata"]
+        assert layout["is_landscape"] is True
+        assert metadata["render_count"] >= 1
+        assert metadata["rendered_pixels"] < full_page_pixels
+
+    def test_detector_accepts_shared_raster(self):
+        """Public detectors reuse a raster passed by the caller."""
+        analyzer = PDFAnalyzer()
+
+        with PageRaster.open(self.pdf_content, 0) as raster:
+            analyzer.detect_right_frame_edge(None, 0, raster)
+            analyzer.detect_bottom_frame_edge(None, 0, raster)
+            renders = raster.render_count
+
+            analyzer.detect_right_frame_edge(None, 0, raster)
+            analyzer.detect_bottom_frame_edge(None, 0, raster)
+
+            assert raster.render_count == renders
+
+    def test_window_matches_full_render(self):
+        """Clipped window is aligned with the full-page pixel grid."""
+        with PageRaster.open(self.pdf_content, 0) as raster:
+            x0, y0 = raster.width_px - 1134, raster.height_px - 567
+            window = raster.window(x0, y0, raster.width_px, raster.height_px)
+            assert raster.render_count == 1
+            assert (window.left, window.top) == (x0, y0)
+
+            full = raster.gray
+            expected = full[y0:, x0:]
+            assert window.gray.shape == expected.shape
+            assert np.abs(window.gray.astype(int) - expected.astype(int)).mean() < 1
+
+            x_points, y_points = window.to_page_points(10, 20)
+            assert x_points == pytest.approx((x0 + 10) / RENDER_SCALE)
+            assert y_points == pytest.approx((y0 + 20) / RENDER_SCALE)
+
+    def test_window_is_sliced_from_existing_render(self):
+        """Once the full page is rendered, windows do not render again."""
+        with PageRaster.open(self.pdf_content, 0) as raster:
+            full = raster.gray
+            window = raster.window(0, 0, 100, 50)
+
+            assert raster.render_count == 1
+            assert np.shares_memory(window.gray, full)
+
+    def test_render_gray_matches_png_round_trip(self):
+        """Direct grayscale render matches the legacy PNG conversion."""
+        doc = fitz.open(stream=self.pdf_content, filetype="pdf")
+        page = doc[0]
+
+        pix = page.get_pixmap(matrix=fitz.Matrix(RENDER_SCALE, RENDER_SCALE))
+        expected = np.array(Image.open(BytesIO(pix.tobytes("png"))).convert("L"))
+        gray = render_gray(page)
+        doc.close()
+
+        assert gray.dtype == np.uint8
+        assert gray.shape == expected.shape
+        assert np.abs(gray.astype(int) - expected.astype(int)).max() <= 2
+
+    def test_pixmap_array_outlives_pixmap(self):
+        """Array view keeps the pixmap buffer alive without copying."""
+        pix = fitz.Pixmap(fitz.csGRAY, fitz.IRect(0, 0, 7, 3), False)
+        pix.set_rect(pix.irect, (200,))
+        array = pixmap_to_array(pix)
+
+        assert array.ctypes.data == pix.samples_ptr
+
+        del pix
+        gc.collect()
+
+        assert array.shape == (3, 7)
+        assert (array == 200).all()
+
+    def test_job_memory_from_page_boxes(self):
+        """Peak job memory follows page area and the largest concurrent rasters."""
+        doc = fitz.open()
+        doc.new_page(width=3370, height=2384)  # A0 landscape
+        doc.new_page(width=1191, height=842)  # A3 landscape
+        doc.new_page(width=842, height=595)  # A4 landscape
+        a0 = 6740 * 4768 * 4
+        a3 = 2382 * 1684 * 4
+
+        assert estimate_job_memory(doc) == a0
+        assert estimate_job_memory(doc, [1, 2]) == a3
+        assert estimate_job_memory(doc, concurrent_pages=2, document_size=1000) == (
+            a0 + a3 + 1000 * DOCUMENT_COPIES
+        )
@@ -0,0 +1,86 @@
+"""
+Unit tests for single-pass QR stamping in PDFServiceV2
+"""
+
+from io import BytesIO
+
+import fitz  # PyMuPDF
+import pytest
+from reportlab.lib.pagesizes import A3, landscape
+from reportlab.pdfgen import canvas
+
+from app.services import pdf_service_v2
+from app.services.pdf_service_v2 import PDFServiceV2
+from app.utils.pdf_exceptions import PDFAnalysisError
+
+WIDTH, HEIGHT = landscape(A3)
+POSITION = {"x": WIDTH - 120, "y": 180, "width": 99.225, "height": 99.225}
+
+
+def make_document(pages: int) -> bytes:
+    """Build a landscape A3 drawing set."""
+    buffer = BytesIO()
+    c = canvas.Canvas(buffer, pagesize=(WIDTH, HEIGHT))
+    for page in range(pages):
+        c.drawString(100, 100, f"Sheet {page + 1}")
+        c.showPage()
+    c.save()
+    return buffer.getvalue()
+
+
+def qr_positions(page_numbers) -> list:
+    return [
+        {
+            "page_number": i,
+            "qr_data": f"https://pte-qr.example.com/r/DOC/A/{i + 1}",
+            "position": POSITION,
+        }
+        for i in page_numbers
+    ]
+
+
+class TestSinglePassStamping:
+    """Test single-pass stamping engine"""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.service = PDFServiceV2()
+        self.pdf_content = make_document(5)
+
+    def test_stamps_requested_pages_only(self):
+        """QR images land on the requested pages at the requested position."""
+        result = self.service._stamp_pages(self.pdf_content, qr_positions([0, 2, 4]))
+
+        doc = fitz.open(stream=result, filetype="pdf")
+        assert len(doc) == 5
+        for i, page in enumerate(doc):
+            images = page.get_image_info()
+            if i in (0, 2, 4):
+                assert len(images) == 1
+                bbox = fitz.Rect(images[0]["bbox"])
+                assert bbox.x0 == pytest.approx(POSITION["x"], abs=0.5)
+                assert bbox.y1 == pytest.approx(HEIGHT - POSITION["y"], abs=0.5)
+            else:
+                assert images == []
+            assert f"Sheet {i + 1}" in page.get_text()
+        doc.close()
+
+    def test_document_is_parsed_once(self, monkeypatch):
+        """The source document is parsed and written once for all QR codes."""
+        sources = []
+        original_reader = pdf_service_v2.PdfReader
+
+        def counting_reader(stream, *args, **kwargs):
+            sources.append(stream.getvalue() == self.pdf_content)
+            return original_reader(stream, *args, **kwargs)
+
+        monkeypatch.setattr(pdf_service_v2, "PdfReader", counting_reader)
+
+        self.service._stamp_pages(self.pdf_content, qr_positions(range(5)))
+
+        assert sources.count(True) == 1
+
+    def test_page_out_of_range(self):
+        """Positions beyond the last page are rejected."""
+        with pytest.raises(PDFAnalysisError):
+            self.service._stamp_pages(self.pdf_content, qr_positions([7]))
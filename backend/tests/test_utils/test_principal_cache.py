@@ -0,0 +1,94 @@
+"""
+Unit tests for the authenticated-principal cache
+"""
+
+import asyncio
+import uuid
+
+from app.api import dependencies
+from app.models.user import User, UserRole
+from app.services.cache_service import MockCacheService
+from app.services.principal_cache import Principal, PrincipalCache
+from app.services.tiered_cache import TieredCache
+
+
+class CountingAuthService:
+    """Auth service stand-in that counts user lookups"""
+
+    def __init__(self, user):
+        self.user = user
+        self.lookups = 0
+
+    async def get_user_by_username(self, username, db):
+        self.lookups += 1
+        return self.user if username == self.user.username else None
+
+
+class TestPrincipalCache:
+    """Test principal snapshots, cache hits and invalidation"""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.user = User(
+            id=uuid.uuid4(),
+            username="engineer",
+            email="engineer@example.com",
+            full_name="Design Engineer",
+            is_active=True,
+            is_superuser=False,
+        )
+        self.user.roles = [UserRole(id=1, name="employee", permissions='["read"]')]
+        self.auth_service = CountingAuthService(self.user)
+        self.l2 = MockCacheService()
+        self.cache = PrincipalCache(ttl_seconds=60)
+        self.cache.cache = TieredCache(
+            "principal", l2=self.l2, ttl_seconds=60, l1_enabled=True
+        )
+
+    def load(self, monkeypatch, username="engineer"):
+        monkeypatch.setattr(dependencies, "principal_cache", self.cache)
+        monkeypatch.setattr(dependencies, "get_auth_service", lambda: self.auth_service)
+        return asyncio.run(dependencies.load_principal(username, db=None))
+
+    def test_snapshot_round_trip(self):
+        principal = Principal.from_user(self.user)
+
+        restored = Principal.from_dict(principal.to_dict())
+
+        assert restored == principal
+        assert restored.id == self.user.id
+        assert restored.roles[0].name == "employee"
+
+    def test_repeated_requests_skip_user_lookup(self, monkeypatch):
+        """Only the first request of a subject reaches the database."""
+        for _ in range(5):
+            principal = self.load(monkeypatch)
+
+        assert self.auth_service.lookups == 1
+        assert principal.username == "engineer"
+        assert principal.is_active
+
+    def test_l2_hit_serves_another_worker(self, monkeypatch):
+        self.load(monkeypatch)
+        self.cache.clear()
+
+        principal = self.load(monkeypatch)
+
+        assert self.auth_service.lookups == 1
+        assert principal.id == self.user.id
+
+    def test_deactivation_invalidates_principal(self, monkeypatch):
+        """A deactivated user is reloaded, and rejected, on the next request."""
+        self.load(monkeypatch)
+        self.user.is_active = False
+
+        asyncio.run(self.cache.invalidate_user("engineer"))
+        principal = self.load(monkeypatch)
+
+        assert self.auth_service.lookups == 2
+        assert not principal.is_active
+
+    def test_unknown_user_is_not_cached(self, monkeypatch):
+        assert self.load(monkeypatch, "ghost") is None
+        assert self.load(monkeypatch, "ghost") is None
+        assert self.auth_service.lookups == 2
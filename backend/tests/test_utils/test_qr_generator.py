@@ -4,6 +4,8 @@ Unit tests for QR code generator utility
 
 import base64
 
+import fitz  # PyMuPDF
+import pytest
 from PIL import Image
 
 from app.models.qr_code import QRCodeStyleEnum
@@ -169,3 +171,33 @@ class TestQRCodeGenerator:
         url = results[0]["url"]
         assert special_doc_uid in url
         assert special_revision in url
+
+    def test_generate_qr_codes_vector_pdf_only(self):
+        """Test vector PDF output without the raster PNG round trip."""
+        results = self.generator.generate_qr_codes(
+            doc_uid=self.doc_uid,
+            revision=self.revision,
+            pages=[1],
+            size_mm=35,
+            formats=["pdf"],
+        )
+
+        data = results[0]["data"]
+        assert list(data) == ["pdf"]
+
+        doc = fitz.open(stream=base64.b64decode(data["pdf"]), filetype="pdf")
+        page = doc[0]
+        assert page.rect.width == pytest.approx(35 * 72 / 25.4, abs=0.01)
+        assert page.get_image_info() == []
+        assert len(page.get_drawings()) > 0
+        doc.close()
+
+    def test_generate_qr_codes_unsupported_format(self):
+        """Test unknown output formats are rejected."""
+        with pytest.raises(ValueError):
+            self.generator.generate_qr_codes(
+                doc_uid=self.doc_uid,
+                revision=self.revision,
+                pages=[1],
+                formats=["gif"],
+            )
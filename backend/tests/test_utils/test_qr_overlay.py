@@ -0,0 +1,184 @@
+"""
+Unit tests for QR codes written straight into page content
+"""
+
+from io import BytesIO
+
+import cv2
+import fitz  # PyMuPDF
+import numpy as np
+import pypdf
+import PyPDF2
+import pytest
+from reportlab.lib.pagesizes import A3, landscape
+from reportlab.pdfgen import canvas
+
+from app.utils.qr_overlay import QROverlay, qr_matrix, qr_rectangles
+
+WIDTH, HEIGHT = landscape(A3)
+QR_DATA = "https://pte-qr.example.com/r/DOC-1/A/1"
+QR_SIZE = 99.225
+
+
+def decode_region(pdf: bytes, clip: fitz.Rect) -> str:
+    """Render a page region and decode the QR code in it."""
+    doc = fitz.open(stream=pdf, filetype="pdf")
+    pixmap = doc[0].get_pixmap(
+        clip=clip, matrix=fitz.Matrix(4, 4), colorspace=fitz.csGRAY
+    )
+    image = np.frombuffer(pixmap.samples, dtype=np.uint8).reshape(
+        pixmap.height, pixmap.width
+    )
+    doc.close()
+    data, _, _ = cv2.QRCodeDetector().detectAndDecode(image)
+    return data
+
+
+def make_document(pages: int) -> bytes:
+    """Build a landscape A3 document with text on every page."""
+    buffer = BytesIO()
+    c = canvas.Canvas(buffer, pagesize=(WIDTH, HEIGHT))
+    for page in range(pages):
+        # Leave a non-default graphics state at the end of the page stream
+        c.setFillColorRGB(1, 0, 0)
+        c.drawString(100, 100, f"Sheet {page + 1}")
+        c.showPage()
+    c.save()
+    return buffer.getvalue()
+
+
+def stamp(library, pdf_content: bytes, **kwargs) -> bytes:
+    """Stamp the first page with the given PdfReader/PdfWriter library."""
+    reader = library.PdfReader(BytesIO(pdf_content))
+    writer = library.PdfWriter()
+    overlay = QROverlay(writer)
+    for i, page in enumerate(reader.pages):
+        writer_page = writer.add_page(page)
+        if i == 0:
+            overlay.stamp(writer_page, QR_DATA, 1000, 200, QR_SIZE, **kwargs)
+    output = BytesIO()
+    writer.write(output)
+    return output.getvalue()
+
+
+@pytest.mark.parametrize("library", [PyPDF2, pypdf], ids=["PyPDF2", "pypdf"])
+class TestQROverlay:
+    """Test QR overlay with both PDF libraries"""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.pdf_content = make_document(2)
+
+    def test_image_placed_on_stamped_page_only(self, library):
+        """One module-per-pixel image lands at the requested rectangle."""
+        doc = fitz.open(stream=stamp(library, self.pdf_content), filetype="pdf")
+
+        images = doc[0].get_image_info(xrefs=True)
+        assert len(images) == 1
+        bbox = fitz.Rect(images[0]["bbox"])
+        assert bbox.x0 == pytest.approx(1000, abs=0.01)
+        assert bbox.y1 == pytest.approx(HEIGHT - 200, abs=0.01)
+        assert bbox.width == pytest.approx(QR_SIZE, abs=0.01)
+
+        modules = len(qr_matrix(QR_DATA))
+        assert images[0]["width"] == modules
+        assert images[0]["height"] == modules
+
+        assert doc[1].get_image_info() == []
+        assert "Sheet 1" in doc[0].get_text()
+        assert "Sheet 2" in doc[1].get_text()
+        doc.close()
+
+    def test_stamped_qr_code_decodes(self, library):
+        """The rendered QR code decodes back to the encoded data."""
+        clip = fitz.Rect(990, HEIGHT - 310, 1110, HEIGHT - 190)
+
+        assert decode_region(stamp(library, self.pdf_content), clip) == QR_DATA
+
+    def test_vector_mode(self, library):
+        """Vector mode draws filled module runs instead of an image."""
+        pdf = stamp(library, self.pdf_content, mode="vector")
+        doc = fitz.open(stream=pdf, filetype="pdf")
+        assert doc[0].get_image_info() == []
+        filled = [d for d in doc[0].get_drawings() if d["fill"] == (0.0, 0.0, 0.0)]
+        assert filled
+        doc.close()
+
+        clip = fitz.Rect(990, HEIGHT - 310, 1110, HEIGHT - 190)
+        assert decode_region(pdf, clip) == QR_DATA
+
+    def test_unknown_mode(self, library):
+        """Unknown render modes are rejected."""
+        with pytest.raises(ValueError):
+            stamp(library, self.pdf_content, mode="bitmap")
+
+    def test_page_graphics_state_is_isolated(self, library):
+        """The QR code is drawn in black despite the page's red fill colour."""
+        doc = fitz.open(stream=stamp(library, self.pdf_content), filetype="pdf")
+        clip = fitz.Rect(1000, HEIGHT - 200 - QR_SIZE, 1000 + QR_SIZE, HEIGHT - 200)
+        pixmap = doc[0].get_pixmap(clip=clip)
+        pixels = np.frombuffer(pixmap.samples, dtype=np.uint8).reshape(-1, pixmap.n)
+        doc.close()
+
+        dark = pixels[pixels.sum(axis=1) < 200]
+        assert len(dark) > 0
+        assert dark[:, 0].max() < 100  # no red modules
+
+    def test_label_and_background(self, library):
+        """Optional label text and white background are written."""
+        doc = fitz.open(
+            stream=stamp(library, self.pdf_content, label="Page 1", background_pad=2),
+            filetype="pdf",
+        )
+
+        assert "Page 1" in doc[0].get_text()
+        assert any(
+            drawing["fill"] == (1.0, 1.0, 1.0)
+            and fitz.Rect(drawing["rect"]).width == pytest.approx(QR_SIZE + 4, abs=0.01)
+            for drawing in doc[0].get_drawings()
+        )
+        doc.close()
+
+    def test_shared_resources_are_not_modified(self, library):
+        """Names added to a stamped page do not leak into shared resources."""
+        reader = library.PdfReader(BytesIO(self.pdf_content))
+        writer = library.PdfWriter()
+        overlay = QROverlay(writer)
+        first = writer.add_page(reader.pages[0])
+        second = writer.add_page(reader.pages[1])
+        second[library.generic.NameObject("/Resources")] = first["/Resources"]
+
+        overlay.stamp(first, QR_DATA, 1000, 200, QR_SIZE, label="Page 1")
+        overlay.stamp(first, QR_DATA, 800, 200, QR_SIZE)
+
+        xobjects = first["/Resources"]["/XObject"]
+        assert sorted(xobjects) == ["/PteQr1", "/PteQr2"]
+        assert "/XObject" not in second["/Resources"].get_object()
+        assert overlay.stamped_pages == 2
+
+
+class TestQRRectangles:
+    """Test merging of QR modules into rectangles"""
+
+    def test_rectangles_cover_dark_modules_exactly(self):
+        """Rectangles do not overlap and cover exactly the dark modules."""
+        matrix = np.array(qr_matrix(QR_DATA))
+        covered = np.zeros(matrix.shape, dtype=int)
+
+        rectangles = qr_rectangles(matrix.tolist())
+        for column, row, width, height in rectangles:
+            covered[row : row + height, column : column + width] += 1
+
+        assert covered.max() == 1
+        assert (covered == matrix).all()
+        assert len(rectangles) < matrix.sum() / 2
+
+    def test_runs_are_merged(self):
+        """Horizontal runs and identical runs in adjacent rows are merged."""
+        matrix = [
+            [True, True, False, True],
+            [True, True, False, False],
+            [False, False, False, True],
+        ]
+
+        assert qr_rectangles(matrix) == [(0, 0, 2, 2), (3, 0, 1, 1), (3, 2, 1, 1)]
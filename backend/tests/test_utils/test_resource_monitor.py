@@ -0,0 +1,138 @@
+"""
+Unit tests for the background resource monitor and memory admission
+"""
+
+import threading
+import time
+
+import pytest
+
+from app.utils.layout_cache import LayoutCache
+from app.utils.page_raster import RENDER_SCALE
+from app.utils.pdf_analyzer import PDFAnalyzer
+from app.utils.pdf_exceptions import PDFMemoryError
+from app.utils.resource_monitor import (
+    RASTER_WORKING_COPIES,
+    ResourceMonitor,
+    ResourceSnapshot,
+    estimate_raster_bytes,
+)
+from tests.test_utils.test_page_raster import make_drawing_pdf
+
+MB = 1024 * 1024
+
+
+def make_snapshot(available_mb: float, cpu_percent: float = 10.0) -> ResourceSnapshot:
+    return ResourceSnapshot(
+        timestamp=time.monotonic(),
+        cpu_percent=cpu_percent,
+        rss_bytes=200 * MB,
+        available_memory=int(available_mb * MB),
+        total_memory=8192 * MB,
+        memory_percent=50.0,
+    )
+
+
+class TestResourceMonitor:
+    """Test sampling, snapshot reads and admission decisions"""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.monitor = ResourceMonitor(interval=0.05, reserve_bytes=256 * MB)
+
+    def teardown_method(self):
+        """Clean up after tests."""
+        self.monitor.stop()
+
+    def test_snapshot_read_does_not_block(self):
+        """Reading the snapshot costs microseconds, not a 100 ms CPU sampling window."""
+        self.monitor.start()
+
+        start = time.perf_counter()
+        for _ in range(1000):
+            snapshot = self.monitor.snapshot
+        elapsed = time.perf_counter() - start
+
+        assert elapsed < 0.05
+        assert snapshot.total_memory > 0
+        assert snapshot.rss_bytes > 0
+
+    def test_background_thread_refreshes_snapshot(self):
+        first = self.monitor.snapshot
+        time.sleep(0.2)
+
+        assert self.monitor.snapshot.timestamp > first.timestamp
+
+    def test_raster_estimate(self):
+        """A0 landscape at 2x is about 33 MP per grayscale copy."""
+        estimate = estimate_raster_bytes(3370.4, 2383.9, RENDER_SCALE)
+
+        assert estimate == 6740 * 4767 * RASTER_WORKING_COPIES
+        assert (
+            estimate_raster_bytes(3370.4, 2383.9, RENDER_SCALE, channels=3)
+            == 3 * estimate
+        )
+
+    def test_admit_within_budget(self):
+        self.monitor._snapshot = make_snapshot(available_mb=1024)
+
+        snapshot = self.monitor.admit(512 * MB, timeout=0)
+
+        assert snapshot.available_memory == 1024 * MB
+
+    def test_admit_rejects_over_budget(self):
+        self.monitor._snapshot = make_snapshot(available_mb=600)
+
+        with pytest.raises(PDFMemoryError) as exc_info:
+            self.monitor.admit(512 * MB, timeout=0, page_number=3)
+
+        assert exc_info.value.required_memory == 512 * MB
+        assert exc_info.value.details["page_number"] == 3
+
+    def test_admit_waits_for_memory(self):
+        """A queued job is admitted once a later sample shows enough free memory."""
+        self.monitor._snapshot = make_snapshot(available_mb=600)
+
+        def release():
+            time.sleep(0.05)
+            self.monitor._snapshot = make_snapshot(available_mb=2048)
+            with self.monitor._sampled:
+                self.monitor._sampled.notify_all()
+
+        threading.Thread(target=release).start()
+        snapshot = self.monitor.admit(512 * MB, timeout=2)
+
+        assert snapshot.available_memory == 2048 * MB
+
+
+class TestAnalyzerAdmission:
+    """Test that analyzers use the monitor instead of blocking psutil calls"""
+
+    def test_analysis_rejected_when_page_raster_exceeds_budget(self, monkeypatch):
+        monitor = ResourceMonitor(interval=60, reserve_bytes=256 * MB)
+        monitor._snapshot = make_snapshot(available_mb=260)
+        monkeypatch.setattr("app.utils.pdf_analyzer.resource_monitor", monitor)
+        monkeypatch.setattr(
+            "app.core.config.settings.ANALYSIS_ADMISSION_WAIT_SECONDS", 0
+        )
+
+        with pytest.raises(PDFMemoryError):
+            PDFAnalyzer(cache=LayoutCache(redis_enabled=False)).analyze_page_layout(
+                make_drawing_pdf(), 0
+            )
+
+    def test_analysis_admitted_without_cpu_sampling(self, monkeypatch):
+        monitor = ResourceMonitor(interval=60, reserve_bytes=256 * MB)
+        monitor._snapshot = make_snapshot(available_mb=4096)
+        monkeypatch.setattr("app.utils.pdf_analyzer.resource_monitor", monitor)
+
+        def blocking_cpu_percent(interval=None):
+            raise AssertionError("cpu_percent must not be sampled per analysis")
+
+        monkeypatch.setattr("psutil.cpu_percent", blocking_cpu_percent)
+
+        result = PDFAnalyzer(
+            cache=LayoutCache(redis_enabled=False)
+        ).analyze_page_layout(make_drawing_pdf(), 0)
+
+        assert result["page_number"] == 0
@@ -0,0 +1,176 @@
+"""
+Unit tests for the asynchronous stamping job queue
+"""
+
+import asyncio
+import uuid
+
+import pytest
+
+from app.core.executor import ExecutorOverloadedError
+from app.services.cache_service import MockCacheService
+from app.services.stamping_jobs import JobStatus, StampingJobQueue
+from app.utils.upload_spool import spool_upload
+from tests.test_utils.test_page_raster import make_drawing_pdf
+from tests.test_utils.test_upload_spool import FakeUpload
+
+USER_ID = uuid.uuid4()
+
+
+class FakeRunner:
+    """Stamps a three page document, waiting for a release signal mid-way"""
+
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+        self.calls = 0
+        self.release = asyncio.Event()
+
+    async def __call__(self, job, progress):
+        self.calls += 1
+        await progress(0, 3)
+        await progress(1, 3)
+        await self.release.wait()
+        await progress(3, 3)
+        if self.fail:
+            raise RuntimeError("analysis failed")
+        return {
+            "document_id": "doc",
+            "qr_codes_count": 3,
+            "pages_processed": 3,
+            "output_file": "out.pdf",
+        }
+
+
+async def spooled(content: bytes):
+    return await spool_upload(FakeUpload(content))
+
+
+class TestStampingJobQueue:
+    """Test submission, idempotency, progress and failure handling"""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.pdf_content = make_drawing_pdf()
+
+    @pytest.fixture(autouse=True)
+    def shared_cache(self, monkeypatch):
+        self.cache = MockCacheService()
+        monkeypatch.setattr("app.services.stamping_jobs.cache_service", self.cache)
+
+    def submit(self, queue, content=None, revision="A"):
+        async def submit():
+            upload = await spooled(content or self.pdf_content)
+            return await queue.submit(upload, "DOC-1", "Drawing set", revision, USER_ID)
+
+        return submit()
+
+    def test_job_runs_in_background_with_progress(self):
+        runner = FakeRunner()
+        queue = StampingJobQueue(workers=1, runner=runner)
+
+        async def scenario():
+            job, created = await self.submit(queue)
+            assert created
+            assert job.status == JobStatus.QUEUED
+
+            states = []
+
+            async def follow():
+                async for state in queue.events(job.id):
+                    states.append(state)
+
+            follower = asyncio.create_task(follow())
+            while job.pages_done < 1:
+                await asyncio.sleep(0.01)
+            runner.release.set()
+            await asyncio.wait_for(follower, 5)
+            await queue.stop()
+            return job, states
+
+        job, states = asyncio.run(scenario())
+
+        assert job.status == JobStatus.SUCCEEDED
+        assert job.result["output_file"] == "out.pdf"
+        assert job.upload is None
+        assert states[-1]["status"] == "succeeded"
+        assert states[-1]["pages_done"] == states[-1]["total_pages"] == 3
+        assert self.cache._cache[queue.job_cache_key(job.id)]["status"] == "succeeded"
+
+    def test_duplicate_submission_attaches_to_running_job(self):
+        runner = FakeRunner()
+        queue = StampingJobQueue(workers=2, runner=runner)
+
+        async def scenario():
+            results = await asyncio.gather(*(self.submit(queue) for _ in range(3)))
+            other_revision, _ = await self.submit(queue, revision="B")
+            await asyncio.sleep(0.05)
+            runner.release.set()
+            await asyncio.sleep(0.05)
+            await queue.stop()
+            return results, other_revision
+
+        results, other_revision = asyncio.run(scenario())
+
+        assert [created for _, created in results].count(True) == 1
+        assert len({job.id for job, _ in results}) == 1
+        assert other_revision.id != results[0][0].id
+        assert runner.calls == 2
+
+    def test_duplicate_from_another_worker_sees_published_job(self):
+        """Two API workers sharing Redis: the second returns the first worker's job."""
+        runner = FakeRunner()
+        first = StampingJobQueue(workers=1, runner=runner)
+        second = StampingJobQueue(workers=1, runner=runner)
+
+        async def scenario():
+            job, _ = await self.submit(first)
+            await asyncio.sleep(0.05)
+            duplicate, created = await self.submit(second)
+            runner.release.set()
+            await asyncio.sleep(0.05)
+            polled = await second.get(job.id)
+            await first.stop()
+            await second.stop()
+            return job, duplicate, created, polled
+
+        job, duplicate, created, polled = asyncio.run(scenario())
+
+        assert not created
+        assert duplicate.id == job.id
+        assert duplicate.status == JobStatus.RUNNING
+        assert polled.status == JobStatus.SUCCEEDED
+        assert runner.calls == 1
+
+    def test_failed_job_can_be_resubmitted(self):
+        runner = FakeRunner(fail=True)
+        runner.release.set()
+        queue = StampingJobQueue(workers=1, runner=runner)
+
+        async def scenario():
+            failed, _ = await self.submit(queue)
+            while not failed.finished:
+                await asyncio.sleep(0.01)
+            retried, created = await self.submit(queue)
+            await queue.stop()
+            return failed, retried, created
+
+        failed, retried, created = asyncio.run(scenario())
+
+        assert failed.status == JobStatus.FAILED
+        assert failed.error == "analysis failed"
+        assert created
+        assert retried.id != failed.id
+
+    def test_full_queue_rejects_submission(self):
+        runner = FakeRunner()
+        queue = StampingJobQueue(workers=1, max_queue=1, runner=runner)
+
+        async def scenario():
+            await self.submit(queue, revision="A")
+            await asyncio.sleep(0.01)
+            await self.submit(queue, revision="B")
+            with pytest.raises(ExecutorOverloadedError):
+                await self.submit(queue, revision="C")
+            await queue.stop()
+
+        asyncio.run(scenario())
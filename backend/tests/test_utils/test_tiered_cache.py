@@ -0,0 +1,136 @@
+"""
+Unit tests for the two-tier (in-process + Redis) status cache
+"""
+
+import asyncio
+import time
+
+from app.services.cache_service import MockCacheService, document_cache_tag
+from app.services.tiered_cache import LocalCache, TieredCache
+
+
+class SharedRedis(MockCacheService):
+    """L2 shared by several workers; publishes reach every subscribed cache"""
+
+    def __init__(self):
+        super().__init__()
+        self.get_calls = 0
+        self.subscribers = []
+
+    async def get(self, key):
+        self.get_calls += 1
+        return await super().get(key)
+
+    async def publish(self, channel, message):
+        for cache in self.subscribers:
+            cache.apply_invalidation(message)
+        return len(self.subscribers)
+
+
+STATUS = {"is_actual": True, "business_status": "ACTUAL"}
+TAGS = [document_cache_tag("DOC-1")]
+
+
+class TestLocalCache:
+    """Test the bounded in-process tier"""
+
+    def test_lru_eviction(self):
+        cache = LocalCache(max_entries=2, ttl_seconds=30)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        assert cache.get("a") == (True, 1)
+        assert cache.get("b") == (False, None)
+        assert len(cache) == 2
+
+    def test_entries_expire(self, monkeypatch):
+        cache = LocalCache(max_entries=10, ttl_seconds=30)
+        cache.set("a", 1, ttl=5)
+        now = time.monotonic()
+        monkeypatch.setattr("app.services.tiered_cache.time.monotonic", lambda: now + 6)
+
+        assert cache.get("a") == (False, None)
+
+    def test_invalidate_tags(self):
+        cache = LocalCache(max_entries=10, ttl_seconds=30)
+        cache.set("a", 1, tags=TAGS)
+        cache.set("b", 2, tags=[document_cache_tag("DOC-2")])
+
+        assert cache.invalidate_tags(TAGS) == 1
+        assert cache.get("a") == (False, None)
+        assert cache.get("b") == (True, 2)
+
+
+class TestTieredCache:
+    """Test L1/L2 lookups and cross-worker invalidation"""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.redis = SharedRedis()
+        self.worker_a = TieredCache("document_status", l2=self.redis, l1_enabled=True)
+        self.worker_b = TieredCache("document_status", l2=self.redis, l1_enabled=True)
+        self.redis.subscribers = [self.worker_a, self.worker_b]
+
+    def test_repeated_scans_are_served_from_l1(self):
+        """Only the first lookup of a popular sheet goes to Redis."""
+        asyncio.run(
+            self.worker_a.set("status:DOC-1:A:1:noauth", STATUS, ttl=900, tags=TAGS)
+        )
+
+        for _ in range(5):
+            assert (
+                asyncio.run(self.worker_a.get("status:DOC-1:A:1:noauth", tags=TAGS))
+                == STATUS
+            )
+
+        assert self.redis.get_calls == 0
+        assert self.worker_a.stats["l1_hits"] == 5
+
+    def test_l2_hit_fills_l1(self):
+        asyncio.run(
+            self.worker_a.set("status:DOC-1:A:1:noauth", STATUS, ttl=900, tags=TAGS)
+        )
+
+        asyncio.run(self.worker_b.get("status:DOC-1:A:1:noauth", tags=TAGS))
+        asyncio.run(self.worker_b.get("status:DOC-1:A:1:noauth", tags=TAGS))
+
+        assert self.redis.get_calls == 1
+        assert self.worker_b.stats == {
+            "l1_hits": 1,
+            "l1_misses": 1,
+            "l2_hits": 1,
+            "l2_misses": 0,
+        }
+
+    def test_invalidation_reaches_other_workers(self):
+        """Superseding a revision on one worker drops the L1 copy on every worker."""
+        asyncio.run(
+            self.worker_a.set("status:DOC-1:A:1:noauth", STATUS, ttl=900, tags=TAGS)
+        )
+        asyncio.run(self.worker_b.get("status:DOC-1:A:1:noauth", tags=TAGS))
+
+        asyncio.run(self.worker_a.invalidate_tags(TAGS))
+
+        assert (
+            asyncio.run(self.worker_b.get("status:DOC-1:A:1:noauth", tags=TAGS)) is None
+        )
+        assert (
+            asyncio.run(self.worker_a.get("status:DOC-1:A:1:noauth", tags=TAGS)) is None
+        )
+
+    def test_l1_bypassed_while_unsubscribed(self):
+        """Without a live subscription L1 misses invalidations, so it is bypassed."""
+        self.worker_a._listener = object()
+        asyncio.run(
+            self.worker_a.set("status:DOC-1:A:1:noauth", STATUS, ttl=900, tags=TAGS)
+        )
+
+        asyncio.run(self.worker_a.get("status:DOC-1:A:1:noauth", tags=TAGS))
+
+        assert self.redis.get_calls == 1
+        assert len(self.worker_a.local) == 0
+
+    def test_malformed_message_is_ignored(self):
+        assert self.worker_b.apply_invalidation("not json") == 0
@@ -0,0 +1,163 @@
+"""
+Unit tests for streaming PDF uploads to the spool
+"""
+
+import asyncio
+import hashlib
+import mmap
+import os
+from io import BytesIO
+
+import fitz  # PyMuPDF
+import pytest
+
+from app.utils.document_handle import DocumentHandle
+from app.utils.page_raster import PageRaster
+from app.utils.pdf_exceptions import (
+    PDFCorruptedError,
+    PDFFileError,
+    PDFFileTooLargeError,
+)
+from app.utils.upload_spool import (
+    PDFMapping,
+    SpooledUpload,
+    map_pdf_file,
+    open_pdf_document,
+    pdf_stream,
+    spool_upload,
+)
+from tests.test_utils.test_page_raster import make_drawing_pdf
+
+
+class FakeUpload:
+    """Minimal UploadFile stand-in: async chunked reads over a buffer"""
+
+    def __init__(self, content: bytes, filename: str = "drawing.pdf"):
+        self.filename = filename
+        self.buffer = BytesIO(content)
+        self.reads = []
+
+    async def read(self, size: int = -1) -> bytes:
+        self.reads.append(size)
+        return self.buffer.read(size)
+
+
+class TestSpoolUpload:
+    """Test incremental validation, hashing and memory-mapped access"""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.pdf_content = make_drawing_pdf()
+
+    def spool(self, content: bytes, **kwargs) -> SpooledUpload:
+        return asyncio.run(spool_upload(FakeUpload(content), **kwargs))
+
+    def test_upload_is_streamed_in_chunks(self):
+        upload_file = FakeUpload(self.pdf_content)
+
+        with asyncio.run(spool_upload(upload_file, chunk_size=512)) as upload:
+            assert upload.size == len(self.pdf_content)
+            assert upload.sha256 == hashlib.sha256(self.pdf_content).hexdigest()
+            assert upload.filename == "drawing.pdf"
+            assert upload.view[:] == self.pdf_content
+
+        assert set(upload_file.reads) == {512}
+        assert len(upload_file.reads) > len(self.pdf_content) // 512
+
+    def test_view_is_a_read_only_memory_map(self):
+        with self.spool(self.pdf_content) as upload:
+            view = upload.view
+
+            assert isinstance(view, mmap.mmap)
+            assert view[:4] == b"%PDF"
+            with pytest.raises(TypeError):
+                view[0] = 0
+
+    def test_spool_file_removed_on_close(self):
+        upload = self.spool(self.pdf_content)
+        upload.view
+        upload.close()
+
+        assert not os.path.exists(upload.path)
+
+    def test_document_handle_opens_spooled_upload(self):
+        with self.spool(self.pdf_content) as upload:
+            with DocumentHandle(upload) as document:
+                assert document.pdf_content is upload.view
+                assert document.page_count == 1
+                assert len(document.doc) == 1
+
+    def test_mapping_is_opened_without_copy(self, monkeypatch):
+        opened = []
+        monkeypatch.setattr(
+            "app.utils.upload_spool.fitz.open",
+            lambda *args, **kwargs: opened.append((args, kwargs)) or fitz.Document(),
+        )
+
+        with self.spool(self.pdf_content) as upload:
+            open_pdf_document(upload.view)
+            assert pdf_stream(upload.view) is upload.view
+
+            assert opened == [((upload.path,), {"filetype": "pdf"})]
+
+    def test_page_raster_opens_mapping(self):
+        with self.spool(self.pdf_content) as upload:
+            with PageRaster.open(upload.view, 0) as raster:
+                assert raster.page.rect.width > 0
+
+    def test_mapping_hash_is_content_based(self, tmp_path):
+        path = tmp_path / "drawing.pdf"
+        path.write_bytes(self.pdf_content)
+
+        with self.spool(self.pdf_content) as upload:
+            mapping = map_pdf_file(str(path))
+            try:
+                assert hash(mapping) == hash(upload.view)
+                assert mapping.sha256 == upload.sha256
+            finally:
+                mapping.close()
+
+    def test_document_handle_maps_file_path(self, tmp_path):
+        path = tmp_path / "drawing.pdf"
+        path.write_bytes(self.pdf_content)
+
+        document = DocumentHandle(str(path))
+        mapping = document.pdf_content
+        assert isinstance(mapping, PDFMapping)
+        assert document.page_count == 1
+        document.close()
+
+        assert mapping.closed
+
+    def test_rejects_missing_signature(self, monkeypatch, tmp_path):
+        monkeypatch.setattr("app.core.config.settings.UPLOAD_SPOOL_DIR", str(tmp_path))
+
+        with pytest.raises(PDFCorruptedError) as exc_info:
+            self.spool(b"GIF89a" + self.pdf_content, chunk_size=2)
+
+        assert exc_info.value.corruption_type == "invalid_signature"
+        assert list(tmp_path.iterdir()) == []
+
+    def test_rejects_truncated_file(self):
+        with pytest.raises(PDFCorruptedError) as exc_info:
+            self.spool(self.pdf_content[: len(self.pdf_content) // 2])
+
+        assert exc_info.value.corruption_type == "truncated_file"
+
+    def test_rejects_empty_file(self):
+        with pytest.raises(PDFFileError):
+            self.spool(b"")
+
+    def test_size_limit_stops_reading(self, monkeypatch, tmp_path):
+        monkeypatch.setattr("app.core.config.settings.UPLOAD_SPOOL_DIR", str(tmp_path))
+        upload_file = FakeUpload(self.pdf_content + b"\0" * 8192)
+
+        with pytest.raises(PDFFileTooLargeError):
+            asyncio.run(
+                spool_upload(
+                    upload_file, max_size=len(self.pdf_content), chunk_size=1024
+                )
+            )
+
+        assert upload_file.buffer.tell() < len(self.pdf_content) + 8192
+        assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,127 @@
+"""
+Unit tests for vector (drawing operator based) frame and stamp detection
+"""
+
+from io import BytesIO
+
+import fitz  # PyMuPDF
+import pytest
+from reportlab.lib.pagesizes import A3, landscape
+from reportlab.pdfgen import canvas
+
+from app.core.config import settings
+from app.utils.page_raster import PageRaster
+from app.utils.pdf_analyzer import PDFAnalyzer
+from app.utils.vector_layout import VectorLayout
+
+WIDTH, HEIGHT = landscape(A3)
+# Frame: 20 mm left margin, 5 mm elsewhere; title block 185 x 55 mm
+FRAME_LEFT, FRAME_MARGIN = 56.7, 14.2
+STAMP_WIDTH, STAMP_HEIGHT = 524.5, 155.9
+
+
+def make_drawing_pdf(as_lines: bool, line_join: int = 1) -> bytes:
+    """Build a landscape A3 sheet with a frame and a title block.
+
+    CAD exports usually draw every stroke as a separate round-joined line,
+    other producers use rectangles; both must be detected.
+    """
+    buffer = BytesIO()
+    c = canvas.Canvas(buffer, pagesize=(WIDTH, HEIGHT))
+    c.setLineWidth(1.5)
+    c.setLineJoin(line_join)
+
+    x0, y0 = FRAME_LEFT, FRAME_MARGIN
+    x1, y1 = WIDTH - FRAME_MARGIN, HEIGHT - FRAME_MARGIN
+    sx0, sy1 = x1 - STAMP_WIDTH, y0 + STAMP_HEIGHT
+    if as_lines:
+        for line in (
+            (x0, y0, x1, y0),
+            (x0, y1, x1, y1),
+            (x0, y0, x0, y1),
+            (x1, y0, x1, y1),
+            (sx0, sy1, x1, sy1),
+            (sx0, y0, sx0, sy1),
+        ):
+            c.line(*line)
+    else:
+        c.rect(x0, y0, x1 - x0, y1 - y0)
+        c.rect(sx0, y0, STAMP_WIDTH, STAMP_HEIGHT)
+    c.line(sx0, y0 + 77.9, x1, y0 + 77.9)
+    c.save()
+    return buffer.getvalue()
+
+
+def make_blank_pdf() -> bytes:
+    """Build a landscape sheet without any vector geometry."""
+    buffer = BytesIO()
+    c = canvas.Canvas(buffer, pagesize=(WIDTH, HEIGHT))
+    c.drawString(100, 100, "scan")
+    c.save()
+    return buffer.getvalue()
+
+
+class TestVectorLayout:
+    """Test vector layout detection"""
+
+    @pytest.mark.parametrize(
+        "as_lines, line_join, source",
+        [(True, 1, "bboxlog"), (True, 0, "drawings"), (False, 0, "drawings")],
+    )
+    def test_frame_and_stamp_from_vectors(self, as_lines, line_join, source):
+        """Frame edges and the title-block top come straight from path data."""
+        pdf_content = make_drawing_pdf(as_lines, line_join)
+        doc = fitz.open(stream=pdf_content, filetype="pdf")
+        layout = VectorLayout(doc[0])
+
+        assert layout.right_frame_x() == pytest.approx(WIDTH - FRAME_MARGIN, abs=0.5)
+        assert layout.bottom_frame_y() == pytest.approx(FRAME_MARGIN, abs=0.5)
+        assert layout.stamp_top_y() == pytest.approx(
+            FRAME_MARGIN + STAMP_HEIGHT, abs=0.5
+        )
+        assert layout.source == source
+        doc.close()
+
+    def test_top_horizontal_line(self):
+        """Top frame line is reported in PDF coordinates."""
+        doc = fitz.open(stream=make_drawing_pdf(True), filetype="pdf")
+        line = VectorLayout(doc[0]).top_horizontal_line()
+        doc.close()
+
+        assert line is not None
+        assert line["y"] == pytest.approx(HEIGHT - FRAME_MARGIN, abs=0.5)
+        assert line["start_x"] == pytest.approx(FRAME_LEFT, abs=0.5)
+        assert line["length_cm"] > 15.0
+
+    def test_no_vector_geometry(self):
+        """Pages without strokes yield no vector result."""
+        doc = fitz.open(stream=make_blank_pdf(), filetype="pdf")
+        layout = VectorLayout(doc[0])
+
+        assert layout.right_frame_x() is None
+        assert layout.bottom_frame_y() is None
+        assert layout.stamp_top_y() is None
+        assert layout.top_horizontal_line() is None
+        doc.close()
+
+    def test_analyzer_skips_rendering_for_vector_pages(self):
+        """Detectors answer from vectors without rasterizing the page."""
+        analyzer = PDFAnalyzer()
+
+        with PageRaster.open(make_drawing_pdf(True), 0) as raster:
+            right = analyzer.detect_right_frame_edge(None, 0, raster)
+            stamp = analyzer.detect_stamp_top_edge_landscape(None, 0, raster)
+
+            assert right == pytest.approx(WIDTH - FRAME_MARGIN, abs=0.5)
+            assert stamp == pytest.approx(FRAME_MARGIN + STAMP_HEIGHT, abs=0.5)
+            assert raster.render_count == 0
+
+    def test_analyzer_falls_back_to_raster(self, monkeypatch):
+        """Without vector geometry (or with it disabled) raster detectors run."""
+        analyzer = PDFAnalyzer()
+        monkeypatch.setattr(settings, "QR_VECTOR_DETECTION", False)
+
+        with PageRaster.open(make_drawing_pdf(True), 0) as raster:
+            analyzer.detect_right_frame_edge(None, 0, raster)
+
+            assert raster.render_count == 1